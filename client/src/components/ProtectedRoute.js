@@ -15,7 +15,8 @@ function ProtectedRoute({ children /*, roles = [] */ }) {
     const decoded = JSON.parse(atob(payload));
     const isExpired = decoded.exp * 1000 < Date.now();
 
-    if (isExpired) {
+    // An expired access token is fine while there's a refresh token; authFetch renews it
+    if (isExpired && !localStorage.getItem('refresh_token')) {
       console.warn('Token expired');
       localStorage.removeItem('token');
       return <Navigate to={`/?redirect=${encodeURIComponent(location.pathname)}`} replace />;
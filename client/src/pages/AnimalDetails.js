@@ -4,7 +4,7 @@ import './DashboardPage.css'; // Re-use existing CSS for general card/button sty
 
 // Removed: mockAdoptableAnimals data is no longer needed as data comes from props
 
-function AnimalDetails({ animals }) { // Now accepts 'animals' as a prop
+function AnimalDetails({ animals, total }) { // 'total' counts every adoptable animal; 'animals' is the first page
   const [selectedAnimalAction, setSelectedAnimalAction] = useState('Adopt'); // Default to 'Adopt' to show listings
 
   const handleAnimalActionClick = (action) => {
@@ -44,17 +44,20 @@ function AnimalDetails({ animals }) { // Now accepts 'animals' as a prop
       {selectedAnimalAction === 'Adopt' && (
         <div className="adoptable-animals-listing">
           <h4 className="listing-title">Animals Available for Adoption</h4>
+          {animals && total > animals.length && (
+            <p className="animal-info">Showing {animals.length} of {total}</p>
+          )}
           {animals && animals.length > 0 ? ( // Check if 'animals' prop exists and has data
             <div className="animal-cards-grid">
               {animals.map(animal => (
                 <div key={animal.id} className="animal-card">
                   <div className="animal-main-photo-container">
-                    <img src={animal.main_photo_url} alt={animal.name} className="animal-main-photo" />
+                    <img src={animal.main_photo_thumbnail_url || animal.main_photo_url} alt={animal.name} className="animal-main-photo" />
                   </div>
                   {animal.gallery_urls && animal.gallery_urls.length > 0 && (
                     <div className="animal-gallery">
                       {animal.gallery_urls.map((imgSrc, idx) => (
-                        <img key={idx} src={imgSrc} alt={`${animal.name} gallery ${idx + 1}`} className="animal-gallery-thumbnail" />
+                        <img key={idx} src={(animal.gallery_thumbnail_urls && animal.gallery_thumbnail_urls[idx]) || imgSrc} alt={`${animal.name} gallery ${idx + 1}`} className="animal-gallery-thumbnail" />
                       ))}
                     </div>
                   )}
@@ -7,6 +7,7 @@ import WaterDetails from './WaterDetails';
 import AnimalDetails from './AnimalDetails';
 import WasteDetails from './WasteDetails';
 import DevelopmentDetails from './DevelopmentDetails';
+import { authFetch, clearSession, logout } from '../utils/auth';
 
 // DashboardPage.js - Version 1.1.0 - Fetch /rates/properties when Rates is opened
 console.log('DashboardPage.js - Version 1.1.0 - Loading...');
@@ -208,16 +209,13 @@ function DashboardPage() {
   const navigate = useNavigate();
 
   const fetchUserProfileAndDashboardData = useCallback(
-    async (token) => {
+    async () => {
       setLoading(true);
       setError(null);
 
       try {
         // 1) Profile
-        const userProfileRes = await fetch(`${API_BASE}/user/profile`, {
-          method: 'GET',
-          headers: { Authorization: 'Bearer ' + token },
-        });
+        const userProfileRes = await authFetch(`${API_BASE}/user/profile`, { method: 'GET' });
 
         const userProfileContentType = userProfileRes.headers.get('content-type');
         let userProfileData = {};
@@ -227,7 +225,7 @@ function DashboardPage() {
 
         if (!userProfileRes.ok) {
           if (userProfileRes.status === 401 || userProfileRes.status === 403) {
-            localStorage.clear();
+            clearSession();
             navigate('/#/');
             return;
           }
@@ -244,9 +242,9 @@ function DashboardPage() {
         if (userProfileData.council_logo_url) localStorage.setItem('userCouncilLogoUrl', userProfileData.council_logo_url);
 
         // 2) Dashboard (everything except Rates)
-        const dashboardRes = await fetch(`${API_BASE}/dashboard/`, {
+        const dashboardRes = await authFetch(`${API_BASE}/dashboard/`, {
           method: 'GET',
-          headers: { 'Content-Type': 'application/json', Authorization: 'Bearer ' + token },
+          headers: { 'Content-Type': 'application/json' },
         });
 
         const dashboardContentType = dashboardRes.headers.get('content-type');
@@ -257,7 +255,7 @@ function DashboardPage() {
 
         if (!dashboardRes.ok) {
           if (dashboardRes.status === 401 || dashboardRes.status === 403) {
-            localStorage.clear();
+            clearSession();
             navigate('/#/');
             return;
           }
@@ -286,12 +284,11 @@ function DashboardPage() {
     setRatesError(null);
 
     try {
-      const token = localStorage.getItem('token');
-      if (!token) throw new Error('Not authenticated');
+      if (!localStorage.getItem('token')) throw new Error('Not authenticated');
 
-      const res = await fetch(`${API_BASE}/rates/properties`, {
+      const res = await authFetch(`${API_BASE}/rates/properties`, {
         method: 'GET',
-        headers: { 'Content-Type': 'application/json', Authorization: 'Bearer ' + token },
+        headers: { 'Content-Type': 'application/json' },
       });
 
       const contentType = res.headers.get('content-type');
@@ -300,7 +297,7 @@ function DashboardPage() {
 
       if (!res.ok) {
         if (res.status === 401 || res.status === 403) {
-          localStorage.clear();
+          clearSession();
           navigate('/#/');
           return;
         }
@@ -332,7 +329,7 @@ function DashboardPage() {
       navigate('/#/');
       return;
     }
-    fetchUserProfileAndDashboardData(token);
+    fetchUserProfileAndDashboardData();
   }, [navigate, fetchUserProfileAndDashboardData]);
 
   const handleTileClick = (category) => {
@@ -380,8 +377,8 @@ function DashboardPage() {
           If the problem persists, please{' '}
           <span
             className="link"
-            onClick={() => {
-              localStorage.clear();
+            onClick={async () => {
+              await logout();
               navigate('/#/');
             }}
           >
@@ -537,8 +534,8 @@ function DashboardPage() {
 
         <button
           className="logout-btn"
-          onClick={() => {
-            localStorage.clear();
+          onClick={async () => {
+            await logout();
             navigate('/#/');
           }}
         >
@@ -580,7 +577,7 @@ function DashboardPage() {
               selectedCategory === 'Water' ? (
                 <WaterDetails properties={selectedCategoryItems} />
               ) : selectedCategory === 'Animals' ? (
-                <AnimalDetails animals={selectedCategoryItems} />
+                <AnimalDetails animals={selectedCategoryItems} total={processes.AnimalsPage?.total} />
               ) : selectedCategory === 'Waste' ? (
                 <WasteDetails wasteData={selectedCategoryItems} />
               ) : selectedCategory === 'Development' ? (
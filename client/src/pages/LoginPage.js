@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import './LoginPage.css';
+import { setSession } from '../utils/auth';
 
 function LoginPage() {
   const [email, setEmail] = useState('');
@@ -10,6 +11,7 @@ function LoginPage() {
 
   useEffect(() => {
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     // Also remove userName if it was stored from previous attempts
     localStorage.removeItem('userName');
   }, []);
@@ -33,7 +35,7 @@ function LoginPage() {
       const data = contentType?.includes('application/json') ? await res.json() : {};
 
       if (res.ok && data.token) {
-        localStorage.setItem('token', data.token);
+        setSession(data);
         console.log('LoginPage: Token successfully stored in localStorage:', localStorage.getItem('token'));
 
         // --- REMOVED JWT DECODING FOR USER NAME ---
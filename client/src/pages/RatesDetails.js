@@ -1,6 +1,7 @@
 // src/pages/RatesDetails.js
 import React, { useEffect, useRef } from 'react';
 import L from 'leaflet';
+import { vectorTileLayer } from '../utils/vectorTiles';
 
 /* =========================
    Inline style injection
@@ -221,6 +222,11 @@ function MiniMap({ item }) {
       });
       L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', { attribution: '' })
         .addTo(mapRef.current);
+      // Hazard / planning overlays on this and neighbouring parcels (server vector tiles)
+      vectorTileLayer('overlays', {
+        minZoom: 13,
+        style: () => ({ color: '#f59e0b', fillColor: '#f59e0b', fillOpacity: 0.25 }),
+      }).addTo(mapRef.current);
     }
 
     const map = mapRef.current;
@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import './LoginPage.css'; // Reuse login styles
+import { setSession } from '../utils/auth';
 
 function SignupPage() {
   const [name, setName] = useState('');
@@ -53,7 +54,7 @@ function SignupPage() {
       console.log('Register response:', data); // ✅ for debugging
 
       if (response.ok && data.token) {
-        localStorage.setItem('token', data.token);
+        setSession(data);
         navigate('/dashboard');
       } else {
         alert(data.message || 'Signup failed. Please try again.');
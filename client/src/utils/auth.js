@@ -1,10 +1,85 @@
 // src/utils/auth.js
+// Access tokens live 15 minutes (auth_tokens.ACCESS_TOKEN_MINUTES); the refresh token from
+// /auth/login or /auth/register buys a new pair. Refresh tokens are single-use and reusing
+// one signs out the whole session, so concurrent 401s share one in-flight refresh.
 import jwtDecode from 'jwt-decode';
 
+const API_BASE = 'https://assemblymk1-backend.onrender.com';
+
+let refreshing = null;
+
 export function getToken() {
   return localStorage.getItem('token');
 }
 
+export function getRefreshToken() {
+  return localStorage.getItem('refresh_token');
+}
+
+// Store the { token, refresh_token } pair from /auth/login, /auth/register or /auth/refresh
+export function setSession(data) {
+  localStorage.setItem('token', data.token);
+  if (data.refresh_token) localStorage.setItem('refresh_token', data.refresh_token);
+}
+
+export function clearSession() {
+  localStorage.clear();
+}
+
+// Resolves true once a fresh pair is stored, false when the session can't be refreshed
+export function refreshSession() {
+  if (!refreshing) {
+    const refreshToken = getRefreshToken();
+    refreshing = (refreshToken
+      ? fetch(`${API_BASE}/auth/refresh`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ refresh_token: refreshToken }),
+        })
+          .then(async (res) => {
+            const data = res.ok ? await res.json() : {};
+            if (!data.token) return false;
+            setSession(data);
+            return true;
+          })
+          .catch((err) => {
+            console.error('Token refresh failed:', err);
+            return false;
+          })
+      : Promise.resolve(false)
+    ).finally(() => {
+      refreshing = null;
+    });
+  }
+  return refreshing;
+}
+
+// fetch() with the bearer token; on a 401 it refreshes once and retries
+export async function authFetch(url, options = {}) {
+  const send = () =>
+    fetch(url, { ...options, headers: { ...options.headers, Authorization: 'Bearer ' + getToken() } });
+  const res = await send();
+  if (res.status !== 401 || !(await refreshSession())) return res;
+  return send();
+}
+
+// Revoke the access token and the refresh token's session server-side, then forget both
+export async function logout() {
+  try {
+    if (getToken()) {
+      await authFetch(`${API_BASE}/auth/logout`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: getRefreshToken() }),
+      });
+    }
+  } catch (err) {
+    console.error('Logout request failed:', err);
+  } finally {
+    clearSession();
+  }
+}
+
 export function getCurrentUserId() {
   const token = getToken();
   if (!token) return null;
@@ -0,0 +1,230 @@
+// src/utils/vectorTiles.js
+// Draws the server's Mapbox Vector Tiles (GET /tiles/<layer>/<z>/<x>/<y>.mvt) on a Leaflet
+// map. Tiles need the bearer token, so they are fetched here rather than through <img>.
+// The decoder covers what vector_tiles.py writes: points, lines and polygons with
+// string / number / bool properties. Past z18 Leaflet scales the z18 tiles up.
+import L from 'leaflet';
+import { authFetch } from './auth';
+
+const API_BASE = 'https://assemblymk1-backend.onrender.com';
+
+const MAX_TILE_ZOOM = 18; // vector_tiles.MAX_ZOOM
+const POINT = 1;
+const LINESTRING = 2;
+const POLYGON = 3;
+
+/* =========================
+   Protobuf reading
+   ========================= */
+class Reader {
+  constructor(bytes, start = 0, end = bytes.length) {
+    this.bytes = bytes;
+    this.pos = start;
+    this.end = end;
+  }
+
+  varint() {
+    let result = 0;
+    let shift = 0;
+    let b;
+    do {
+      b = this.bytes[this.pos++];
+      result += (b & 0x7f) * 2 ** shift;
+      shift += 7;
+    } while (b & 0x80);
+    return result;
+  }
+
+  sint() {
+    const n = this.varint();
+    return n % 2 === 0 ? n / 2 : -(n + 1) / 2;
+  }
+
+  sub() {
+    const len = this.varint();
+    const r = new Reader(this.bytes, this.pos, this.pos + len);
+    this.pos += len;
+    return r;
+  }
+
+  string() {
+    const r = this.sub();
+    return new TextDecoder().decode(this.bytes.subarray(r.pos, r.end));
+  }
+
+  packed() {
+    const r = this.sub();
+    const out = [];
+    while (r.pos < r.end) out.push(r.varint());
+    return out;
+  }
+
+  skip(wireType) {
+    if (wireType === 0) this.varint();
+    else if (wireType === 1) this.pos += 8;
+    else if (wireType === 2) this.pos += this.varint();
+    else if (wireType === 5) this.pos += 4;
+  }
+
+  fields(onField) {
+    while (this.pos < this.end) {
+      const key = this.varint();
+      if (!onField(key >> 3, key & 7, this)) this.skip(key & 7);
+    }
+  }
+}
+
+function readValue(r) {
+  let value = null;
+  const view = new DataView(r.bytes.buffer, r.bytes.byteOffset);
+  r.fields((field, wire, rr) => {
+    if (field === 1) value = rr.string();
+    else if (field === 2) { value = view.getFloat32(rr.pos, true); rr.pos += 4; }
+    else if (field === 3) { value = view.getFloat64(rr.pos, true); rr.pos += 8; }
+    else if (field === 4 || field === 5) value = rr.varint();
+    else if (field === 6) value = rr.sint();
+    else if (field === 7) value = rr.varint() !== 0;
+    else return false;
+    return true;
+  });
+  return value;
+}
+
+function readGeometry(commands) {
+  // Lists of [x, y] paths in tile units; a point feature is one path of its points
+  const paths = [];
+  let path = null;
+  let x = 0;
+  let y = 0;
+  let i = 0;
+  const zigzag = (n) => (n % 2 === 0 ? n / 2 : -(n + 1) / 2);
+  while (i < commands.length) {
+    const cmd = commands[i] & 7;
+    const count = commands[i] >> 3;
+    i += 1;
+    if (cmd === 7) {
+      if (path && path.length) path.push(path[0]);
+      continue;
+    }
+    for (let k = 0; k < count; k += 1) {
+      x += zigzag(commands[i]);
+      y += zigzag(commands[i + 1]);
+      i += 2;
+      if (cmd === 1 && (k === 0 || !path)) {
+        path = [];
+        paths.push(path);
+      }
+      path.push([x, y]);
+    }
+  }
+  return paths;
+}
+
+export function decodeTile(buffer) {
+  // { layerName: { extent, features: [{ id, type, properties, paths }] } }
+  const layers = {};
+  new Reader(new Uint8Array(buffer)).fields((field, wire, r) => {
+    if (field !== 3) return false;
+    const lr = r.sub();
+    const keys = [];
+    const values = [];
+    const raw = [];
+    let name = '';
+    let extent = 4096;
+    lr.fields((f, w, rr) => {
+      if (f === 1) name = rr.string();
+      else if (f === 2) raw.push(rr.sub());
+      else if (f === 3) keys.push(rr.string());
+      else if (f === 4) values.push(readValue(rr.sub()));
+      else if (f === 5) extent = rr.varint();
+      else return false;
+      return true;
+    });
+    const features = raw.map((fr) => {
+      const feature = { id: null, type: 0, properties: {}, paths: [] };
+      let tags = [];
+      let geometry = [];
+      fr.fields((f, w, rr) => {
+        if (f === 1) feature.id = rr.varint();
+        else if (f === 2) tags = rr.packed();
+        else if (f === 3) feature.type = rr.varint();
+        else if (f === 4) geometry = rr.packed();
+        else return false;
+        return true;
+      });
+      for (let t = 0; t + 1 < tags.length; t += 2) feature.properties[keys[tags[t]]] = values[tags[t + 1]];
+      feature.paths = readGeometry(geometry);
+      return feature;
+    });
+    layers[name] = { extent, features };
+    return true;
+  });
+  return layers;
+}
+
+/* =========================
+   Leaflet layer
+   ========================= */
+const DEFAULT_STYLE = { color: '#2563eb', weight: 1, fillColor: '#2563eb', fillOpacity: 0.1, radius: 4 };
+
+function drawFeature(ctx, feature, scale, style) {
+  ctx.strokeStyle = style.color;
+  ctx.lineWidth = style.weight;
+  ctx.fillStyle = style.fillColor;
+  if (feature.type === POINT) {
+    feature.paths.flat().forEach(([x, y]) => {
+      ctx.beginPath();
+      ctx.arc(x * scale, y * scale, style.radius, 0, 2 * Math.PI);
+      ctx.globalAlpha = 1;
+      ctx.fill();
+      ctx.stroke();
+    });
+    return;
+  }
+  ctx.beginPath();
+  feature.paths.forEach((path) => {
+    path.forEach(([x, y], i) => (i === 0 ? ctx.moveTo(x * scale, y * scale) : ctx.lineTo(x * scale, y * scale)));
+  });
+  if (feature.type === POLYGON) {
+    ctx.globalAlpha = style.fillOpacity;
+    ctx.fill('evenodd');
+  }
+  ctx.globalAlpha = 1;
+  if (feature.type === POLYGON || feature.type === LINESTRING) ctx.stroke();
+}
+
+// vectorTileLayer('parcels', { minZoom: 13, style: (props) => ({ color: ... }) }).addTo(map)
+export function vectorTileLayer(layerName, { style, ...options } = {}) {
+  const Layer = L.GridLayer.extend({
+    createTile(coords, done) {
+      const size = this.getTileSize();
+      const canvas = L.DomUtil.create('canvas', 'leaflet-tile');
+      canvas.width = size.x;
+      canvas.height = size.y;
+
+      const { x, y, z } = coords;
+      authFetch(`${API_BASE}/tiles/${layerName}/${z}/${x}/${y}.mvt`)
+        .then((res) => {
+          if (!res.ok) throw new Error(`tile ${z}/${x}/${y}: HTTP ${res.status}`);
+          return res.arrayBuffer();
+        })
+        .then((buffer) => {
+          const layer = decodeTile(buffer)[layerName];
+          if (layer) {
+            const ctx = canvas.getContext('2d');
+            const scale = size.x / layer.extent;
+            layer.features.forEach((feature) => {
+              drawFeature(ctx, feature, scale, { ...DEFAULT_STYLE, ...(style ? style(feature.properties) : {}) });
+            });
+          }
+          done(null, canvas);
+        })
+        .catch((err) => {
+          console.error('Vector tile failed:', err);
+          done(err, canvas);
+        });
+      return canvas;
+    },
+  });
+  return new Layer({ maxNativeZoom: MAX_TILE_ZOOM, ...options });
+}
@@ -0,0 +1,136 @@
+# server/animal_facets.py
+"""
+Precomputed facet index for adoptable animals.
+
+One GROUP BY over (council_id, type, breed, sex, mixed) is cached in-process. Facet
+counts and totals for any filter combination are summed from those buckets, so the
+/animals endpoint and the dashboard tile never run COUNT queries per request.
+The index is marked stale whenever an Animal row is committed and rebuilt on next read.
+"""
+import threading
+import time
+import logging
+from collections import Counter
+
+from sqlalchemy import event, func
+from models import db, Animal, Council
+
+ADOPTABLE_STATUS = 'available_for_adoption'
+
+# Other workers don't see our commit hook, so cap staleness there.
+DEFAULT_TTL_SECONDS = 60
+
+FILTER_FIELDS = ('council_id', 'type', 'breed', 'sex', 'mixed')
+FACET_FIELDS = ('type', 'breed', 'council_id')
+
+
+class AnimalFacetIndex:
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._buckets = None        # [(council_id, type, breed, sex, mixed, count), ...]
+        self._council_names = {}
+        self._built_at = 0.0
+        self._stale = True
+
+    def mark_stale(self):
+        self._stale = True
+
+    def _expired(self):
+        return self._stale or self._buckets is None or (time.monotonic() - self._built_at) > self.ttl_seconds
+
+    def _rebuild(self):
+        rows = (
+            db.session.query(
+                Animal.council_id, Animal.type, Animal.breed, Animal.sex, Animal.mixed,
+                func.count(Animal.id),
+            )
+            .filter(Animal.status == ADOPTABLE_STATUS)
+            .group_by(Animal.council_id, Animal.type, Animal.breed, Animal.sex, Animal.mixed)
+            .all()
+        )
+        council_ids = {r[0] for r in rows}
+        names = {}
+        if council_ids:
+            names = dict(
+                db.session.query(Council.id, Council.name).filter(Council.id.in_(council_ids)).all()
+            )
+        self._buckets = [tuple(r) for r in rows]
+        self._council_names = names
+        self._built_at = time.monotonic()
+        self._stale = False
+        logging.info(f"[animals] Facet index rebuilt: {len(rows)} buckets.")
+
+    def buckets(self):
+        if self._expired():
+            with self._lock:
+                if self._expired():
+                    self._rebuild()
+        return self._buckets
+
+    @staticmethod
+    def _matches(bucket, filters, skip=None):
+        for i, field in enumerate(FILTER_FIELDS):
+            if field == skip or filters.get(field) is None:
+                continue
+            if bucket[i] != filters[field]:
+                return False
+        return True
+
+    def count(self, filters=None):
+        filters = filters or {}
+        return sum(b[5] for b in self.buckets() if self._matches(b, filters))
+
+    def facets(self, filters=None):
+        """
+        Counts per type/breed/council. Each facet ignores its own filter so the
+        client can show the alternatives for a dimension that is already selected.
+        """
+        filters = filters or {}
+        buckets = self.buckets()
+        result = {}
+        for field in FACET_FIELDS:
+            pos = FILTER_FIELDS.index(field)
+            counts = Counter()
+            for b in buckets:
+                if self._matches(b, filters, skip=field):
+                    counts[b[pos]] += b[5]
+            if field == 'council_id':
+                result['council'] = [
+                    {"council_id": k, "council_name": self._council_names.get(k), "count": v}
+                    for k, v in counts.most_common()
+                ]
+            else:
+                result[field] = [{"value": k, "count": v} for k, v in counts.most_common()]
+        return result
+
+
+facet_index = AnimalFacetIndex()
+
+
+# ---------- invalidation ----------
+
+def _session_touches_animals(session):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Animal):
+            return True
+    return False
+
+
+def register_facet_listeners(session_cls=None):
+    """Mark the facet index stale after any commit that wrote Animal rows."""
+    target = session_cls or db.session
+
+    @event.listens_for(target, 'after_flush')
+    def _flag_animal_writes(session, flush_context):
+        if _session_touches_animals(session):
+            session.info['animals_dirty'] = True
+
+    @event.listens_for(target, 'after_commit')
+    def _refresh_on_commit(session):
+        if session.info.pop('animals_dirty', False):
+            facet_index.mark_stale()
+
+    @event.listens_for(target, 'after_rollback')
+    def _clear_on_rollback(session):
+        session.info.pop('animals_dirty', None)
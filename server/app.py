@@ -2,13 +2,32 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
 # REMOVED: from flask_jwt_extended import JWTManager # No longer needed
-from models import db
+from models import db, sync_schema
 from routes.auth import auth
 from routes.dashboard import dashboard
 from routes.process import process
 from routes.admin import admin
 from routes.user import user_bp
 from routes.rates import rates_bp  # <-- NEW: Rates blueprint
+from routes.animals import animals_bp
+from routes.waste import waste_bp
+from routes.development import development_bp
+from routes.jobs import jobs_bp
+from routes.search import search_bp
+from routes.tiles import tiles_bp
+from routes.images import images_bp
+from animal_facets import register_facet_listeners
+from waste_routes import register_route_listeners
+from delta_sync import register_tombstone_listeners
+from process_events import register_process_event_listeners
+from payments_ledger import register_ledger_listeners
+from search import register_search_listeners
+from vector_tiles import register_tile_listeners
+from rate_limit import init_rate_limiting
+from query_budget import init_query_budget
+from token_denylist import init_deny_list
+from image_proxy import init_image_proxy
+from pool_metrics import begin_request, current_checkouts, install_checkout_counter, CHECKOUT_HEADER
 from dotenv import load_dotenv
 import os
 from datetime import timedelta, datetime
@@ -35,23 +54,63 @@ if secret_key is None or secret_key == 'changeme':
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
 app.config['SECRET_KEY'] = secret_key
 app.config['JWT_SECRET_KEY'] = app.config['SECRET_KEY']  # Used by Authlib for JWT signing
+# Signs /img URLs (image_proxy.py); kept apart from SECRET_KEY so neither can forge the other
+app.config['IMAGE_PROXY_KEY'] = os.getenv('IMAGE_PROXY_KEY')
+# Public origin of this API, e.g. https://assemblymk1-backend.onrender.com; absolute /img links
+app.config['API_BASE_URL'] = os.getenv('API_BASE_URL')
+
+# Per-process connection pool; gunicorn.conf.py sizes it to what one worker can use at once
+if os.getenv('DB_POOL_SIZE'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_pre_ping': True,
+    }
 
 # CORS: Allow deployed + local dev frontends
-CORS(app, resources={r"/*": {"origins": [
+CORS_ORIGINS = [
     "https://assemblymk1.onrender.com",
     "http://localhost:3000"
-]}}, supports_credentials=True)
+]
+CORS(app, resources={r"/*": {"origins": CORS_ORIGINS}}, supports_credentials=True)
 
 # --- Initialize Extensions ---
 db.init_app(app)
+register_facet_listeners()
+register_route_listeners()
+register_tombstone_listeners()
+register_process_event_listeners()
+register_ledger_listeners()
+register_search_listeners()
+register_tile_listeners()
+init_rate_limiting(app)
+init_deny_list(app)
+init_image_proxy(app)
 
 # --- Database Table Creation (runs when app is loaded by WSGI server) ---
 with app.app_context():
     logging.info("Attempting to create all database tables if they don't exist...")
     db.create_all()
+    sync_schema(db.engine)
     logging.info("Database table creation process completed.")
     logging.info(f"Authlib version: {authlib.__version__}")
 
+    # QUERY_BUDGET=log|strict: per-request query counts, N+1 warnings, route budgets
+    init_query_budget(app, db.engine)
+
+    # Benchmarks (scripts/bench_serving_modes.py) read connections used per request from a header
+    if os.getenv('DB_CHECKOUT_HEADER') == '1':
+        install_checkout_counter(db.engine)
+
+        @app.before_request
+        def _begin_checkout_count():
+            begin_request()
+
+        @app.after_request
+        def _emit_checkout_count(response):
+            response.headers[CHECKOUT_HEADER] = str(current_checkouts())
+            return response
+
 # --- Register Blueprints ---
 app.register_blueprint(auth, url_prefix='/auth')
 app.register_blueprint(dashboard, url_prefix='/dashboard')
@@ -59,10 +118,18 @@ app.register_blueprint(process, url_prefix='/process')
 app.register_blueprint(admin, url_prefix='/admin')
 app.register_blueprint(user_bp, url_prefix='/user')
 app.register_blueprint(rates_bp, url_prefix='/rates')  # <-- NEW: /rates endpoints
+app.register_blueprint(animals_bp, url_prefix='/animals')
+app.register_blueprint(waste_bp, url_prefix='/waste')
+app.register_blueprint(development_bp, url_prefix='/development')
+app.register_blueprint(jobs_bp, url_prefix='/jobs')
+app.register_blueprint(search_bp, url_prefix='/search')
+app.register_blueprint(tiles_bp, url_prefix='/tiles')
+app.register_blueprint(images_bp, url_prefix='/img')
 
 @app.route('/')
 def index():
     return "LocalGov API running!"
 
 if __name__ == '__main__':
+    # Development server only; production runs gunicorn with gunicorn.conf.py
     app.run(host='0.0.0.0', port=5000)
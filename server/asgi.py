@@ -0,0 +1,241 @@
+# server/asgi.py
+"""
+Optional ASGI serving mode.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+
+GET /dashboard/ is served natively: its independent sections are loaded concurrently,
+each on its own async (asyncpg) connection. It is held to the same limits as the Flask
+view: the 'dashboard' rate limit and its query budget (QUERY_BUDGET=log|strict), counted
+across the async engine and the sync sections. Every other route is delegated unchanged
+to the Flask app through asgiref's WSGI adapter, so both modes expose the same API.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import g, request
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app import app, CORS_ORIGINS
+from models import db, Property, DevelopmentApplication, Process, WaterConsumption
+from partitioning import hot_window
+from routes.decorators import identity_from_header, AuthError
+from routes.dashboard import (
+    DASHBOARD_CATEGORIES,
+    serialize_rates_property,
+    serialize_water_property,
+    serialize_development_application,
+    serialize_process,
+    load_animals_section,
+    load_waste_section,
+)
+from async_db import async_session, dispose_async_engine, on_async_engine
+from pool_metrics import begin_request, current_checkouts, install_checkout_counter, CHECKOUT_HEADER
+from query_budget import (
+    QUERY_COUNT_HEADER,
+    begin_request as begin_query_log,
+    budget_for,
+    current_log,
+    install_query_counter,
+)
+from rate_limit import limiter
+
+flask_asgi = WsgiToAsgi(app)
+
+DASHBOARD_ENDPOINT = 'dashboard.get_dashboard'
+EMIT_CHECKOUTS = os.getenv('DB_CHECKOUT_HEADER') == '1'
+QUERY_BUDGET = os.getenv('QUERY_BUDGET', 'off').lower()
+if EMIT_CHECKOUTS:
+    on_async_engine(install_checkout_counter)
+if QUERY_BUDGET in ('log', 'strict'):
+    on_async_engine(install_query_counter)  # the sync engine is counted by the Flask app
+
+PROCESS_CATEGORIES = [c for c in DASHBOARD_CATEGORIES if c not in ("Rates", "Water", "Development", "Waste", "Animals")]
+
+# ---------- async section loaders (one session = one connection each) ----------
+
+async def _load_rates(user_id):
+    async with async_session() as session:
+        result = await session.execute(
+            select(Property).filter_by(resident_id=user_id).options(joinedload(Property.council_obj))
+        )
+        return [serialize_rates_property(p) for p in result.scalars().all()]
+
+
+async def _load_water(user_id):
+    async with async_session() as session:
+        result = await session.execute(
+            select(Property).filter_by(resident_id=user_id)
+            .options(joinedload(Property.water_consumptions.and_(hot_window(WaterConsumption))))
+            .options(joinedload(Property.council_obj))
+            .order_by(Property.id)
+        )
+        return [serialize_water_property(p) for p in result.unique().scalars().all()]
+
+
+async def _load_development(user_id):
+    async with async_session() as session:
+        result = await session.execute(
+            select(DevelopmentApplication).filter_by(resident_id=user_id)
+            .options(joinedload(DevelopmentApplication.property))
+            .options(joinedload(DevelopmentApplication.council))
+        )
+        return [serialize_development_application(d) for d in result.scalars().all()]
+
+
+async def _load_processes(user_id):
+    """All process-backed categories in one query instead of one per category (hot partitions only)."""
+    async with async_session() as session:
+        result = await session.execute(
+            select(Process).filter(Process.resident_id == user_id, Process.category.in_(PROCESS_CATEGORIES),
+                                   hot_window(Process))
+            .order_by(Process.id)
+        )
+        grouped = defaultdict(list)
+        for p in result.scalars().all():
+            grouped[p.category].append(serialize_process(p))
+        return {c: grouped.get(c, []) for c in PROCESS_CATEGORIES}
+
+
+def _in_app_context(fn, *args):
+    # Animals/Waste read in-process indexes that sit on the sync Flask-SQLAlchemy session
+    with app.app_context():
+        try:
+            return fn(*args)
+        finally:
+            db.session.remove()
+
+
+async def load_dashboard(user_id):
+    rates, water, development, processes, waste, animals = await asyncio.gather(
+        _load_rates(user_id),
+        _load_water(user_id),
+        _load_development(user_id),
+        _load_processes(user_id),
+        asyncio.to_thread(_in_app_context, load_waste_section, user_id),
+        asyncio.to_thread(_in_app_context, load_animals_section),
+    )
+    animals, animals_page = animals
+    data = {"Rates": rates, "Water": water, "Development": development, "Waste": waste, "Animals": animals}
+    data.update(processes)
+    return dict({c: data[c] for c in DASHBOARD_CATEGORIES}, AnimalsPage=animals_page)
+
+
+# ---------- ASGI plumbing ----------
+
+def _headers(scope):
+    return {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+
+
+async def _send_json(send, status, payload, request_headers, extra_headers=None):
+    body = json.dumps(payload).encode()
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    origin = request_headers.get('origin')
+    if origin in CORS_ORIGINS:
+        headers += [(b'access-control-allow-origin', origin.encode()),
+                    (b'access-control-allow-credentials', b'true'),
+                    (b'vary', b'Origin')]
+    if EMIT_CHECKOUTS:
+        headers.append((CHECKOUT_HEADER.lower().encode(), str(current_checkouts()).encode()))
+    for k, v in (extra_headers or {}).items():
+        headers.append((k.lower().encode(), str(v).encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _check_rate_limit(scope, headers, user_id):
+    """
+    The Flask view's @rate_limited('dashboard'), against the same buckets.
+    Returns ((status, payload) or None, response headers).
+    """
+    lim = limiter.declared('dashboard')
+    if lim is None or not limiter.enabled:
+        return None, {}
+    client = scope.get('client') or ('unknown', 0)
+    with app.test_request_context(scope['path'], headers=headers, environ_base={'REMOTE_ADDR': client[0]}):
+        request.current_identity = user_id
+        limited = limiter.check(lim)
+        extra = dict(g.get('rate_limit_headers', {}))
+        if limited is None:
+            return None, extra
+        extra['Retry-After'] = limited.headers['Retry-After']
+        return (limited.status_code, limited.get_json()), extra
+
+
+def _check_query_budget():
+    """The Flask view's @query_budget: (error payload or None, response headers)."""
+    log = current_log()
+    if log is None:
+        return None, {}
+    for shape, n in log.repeats():
+        logging.warning(f"[queries] Possible N+1 in {DASHBOARD_ENDPOINT}: {n}x {shape[:200]}\n{log.stacks.get(shape, '')}")
+    with app.app_context():
+        budget = budget_for(DASHBOARD_ENDPOINT)
+    extra = {QUERY_COUNT_HEADER: log.count}
+    if budget is not None and log.count > budget:
+        logging.error(f"[queries] {DASHBOARD_ENDPOINT} ran {log.count} queries; budget is {budget}")
+        if QUERY_BUDGET == 'strict':
+            return {
+                "error": "Query budget exceeded",
+                "details": f"{DASHBOARD_ENDPOINT} ran {log.count} queries; budget is {budget}."
+            }, extra
+    return None, extra
+
+
+async def dashboard_endpoint(scope, receive, send):
+    begin_request()
+    if QUERY_BUDGET in ('log', 'strict'):
+        begin_query_log()
+    headers = _headers(scope)
+    try:
+        user_id = identity_from_header(headers.get('authorization'), app.config['JWT_SECRET_KEY'])
+    except AuthError as e:
+        return await _send_json(send, e.status, {"message": e.message}, headers)
+
+    if user_id is None or not isinstance(user_id, int) or user_id <= 0:
+        return await _send_json(send, 401, {
+            "error": "Authentication required",
+            "details": "User ID could not be determined or is invalid from the provided token."
+        }, headers)
+
+    limited, limit_headers = await asyncio.to_thread(_check_rate_limit, scope, headers, user_id)
+    if limited is not None:
+        return await _send_json(send, limited[0], limited[1], headers, limit_headers)
+
+    try:
+        data = await load_dashboard(user_id)
+    except Exception as e:
+        logging.error(f"[dashboard] UNEXPECTED SERVER ERROR in async dashboard: {str(e)}", exc_info=True)
+        return await _send_json(send, 500, {
+            "error": "Unable to load dashboard due to server error",
+            "details": str(e)
+        }, headers, limit_headers)
+
+    over_budget, budget_headers = _check_query_budget()
+    if over_budget is not None:
+        return await _send_json(send, 500, over_budget, headers, {**limit_headers, **budget_headers})
+    return await _send_json(send, 200, data, headers, {**limit_headers, **budget_headers})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await dispose_async_engine()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] in ('/dashboard/', '/dashboard'):
+        return await dashboard_endpoint(scope, receive, send)
+    return await flask_asgi(scope, receive, send)
@@ -0,0 +1,73 @@
+# server/async_db.py
+"""
+Async SQLAlchemy engine (asyncpg) for the optional ASGI serving mode (see asgi.py).
+Shares the models and SQLALCHEMY_DATABASE_URI with the WSGI app. The engine is created
+on first use, not at import, so importing asgi.py (tools, tests, a WSGI-only deploy)
+needs no database URL.
+"""
+import os
+import threading
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+
+def async_database_url(url):
+    """postgresql://... or postgresql+psycopg2://... -> postgresql+asyncpg://..."""
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    scheme, rest = url.split('://', 1)
+    if scheme.startswith('postgresql'):
+        return 'postgresql+asyncpg://' + rest
+    return url
+
+
+def make_async_engine(url=None):
+    url = url or os.getenv('ASYNC_SQLALCHEMY_DATABASE_URI') or os.getenv('SQLALCHEMY_DATABASE_URI')
+    if not url:
+        raise RuntimeError("Set ASYNC_SQLALCHEMY_DATABASE_URI or SQLALCHEMY_DATABASE_URI for the ASGI dashboard.")
+    return create_async_engine(
+        async_database_url(url),
+        # Each dashboard request can hold several connections at once (one per section)
+        pool_size=int(os.getenv('ASYNC_DB_POOL_SIZE', '20')),
+        max_overflow=int(os.getenv('ASYNC_DB_MAX_OVERFLOW', '10')),
+        pool_pre_ping=True,
+    )
+
+
+_engine = None
+_sessionmaker = None
+_engine_hooks = []
+_lock = threading.Lock()
+
+
+def on_async_engine(fn):
+    """Call fn(sync_engine) once the engine exists, e.g. to attach event listeners."""
+    with _lock:
+        if _engine is None:
+            _engine_hooks.append(fn)
+            return
+    fn(_engine.sync_engine)
+
+
+def get_async_engine():
+    global _engine, _sessionmaker
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                engine = make_async_engine()
+                for fn in _engine_hooks:
+                    fn(engine.sync_engine)
+                _sessionmaker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+                _engine = engine
+    return _engine
+
+
+def async_session():
+    """A new AsyncSession (one pooled connection while in use)."""
+    get_async_engine()
+    return _sessionmaker()
+
+
+async def dispose_async_engine():
+    if _engine is not None:
+        await _engine.dispose()
@@ -0,0 +1,184 @@
+# server/auth_tokens.py
+"""
+Access and refresh tokens.
+
+- Access tokens are HS256 JWTs that live ACCESS_TOKEN_MINUTES (15) and carry a jti.
+  auth_required checks the jti against the in-process deny list (token_denylist.py),
+  never the database.
+- Refresh tokens are opaque random strings that live REFRESH_TOKEN_DAYS (30). Only
+  their SHA-256 is stored. A refresh is one indexed lookup and no password hash, so it
+  costs far less than /auth/login. Each refresh rotates the token: the old one is
+  marked used, and the new one joins the same family.
+- Presenting a refresh token that was already rotated means it leaked. The whole
+  family is revoked, and the family's still-live access tokens go on the deny list.
+- Stream tickets open EventSource streams, which can't send headers, so the credential
+  has to go in the URL, where proxies and access logs keep it. A ticket lives
+  STREAM_TICKET_SECONDS (60) and is signed with a key derived for tickets alone, so it
+  opens a stream and is refused everywhere a bearer token is accepted.
+"""
+import datetime as dt
+import hashlib
+import hmac
+import os
+import secrets
+import uuid
+
+from sqlalchemy import insert, update
+
+from models import db, Resident, RefreshToken, RevokedToken
+from routes.decorators import jwt_instance
+from token_denylist import deny_list
+
+ACCESS_TOKEN_MINUTES = int(os.getenv('ACCESS_TOKEN_MINUTES', '15'))
+REFRESH_TOKEN_DAYS = int(os.getenv('REFRESH_TOKEN_DAYS', '30'))
+STREAM_TICKET_SECONDS = int(os.getenv('STREAM_TICKET_SECONDS', '60'))
+
+
+class TokenError(ValueError):
+    pass
+
+
+def _hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_access_token(resident, secret_key, now=None):
+    """(token, jti, expires_at)"""
+    now = now or dt.datetime.utcnow()
+    jti = uuid.uuid4().hex
+    expires_at = now + dt.timedelta(minutes=ACCESS_TOKEN_MINUTES)
+    payload = {'sub': resident.id, 'iat': now, 'exp': expires_at, 'jti': jti, 'name': resident.name}
+    token = jwt_instance.encode({'alg': 'HS256'}, payload, secret_key).decode('utf-8')
+    return token, jti, expires_at
+
+
+def _ticket_key(secret_key):
+    return hmac.new(secret_key.encode(), b'stream-ticket', hashlib.sha256).digest()
+
+
+def issue_stream_ticket(resident_id, secret_key, now=None):
+    """(ticket, expires_in) for ?ticket= on an event stream."""
+    now = now or dt.datetime.utcnow()
+    payload = {'sub': resident_id, 'iat': now, 'exp': now + dt.timedelta(seconds=STREAM_TICKET_SECONDS),
+               'typ': 'stream'}
+    return jwt_instance.encode({'alg': 'HS256'}, payload, _ticket_key(secret_key)).decode('utf-8'), STREAM_TICKET_SECONDS
+
+
+def stream_ticket_identity(ticket, secret_key):
+    """The resident a ticket was issued to. Raises TokenError if it's invalid or expired."""
+    try:
+        claims = jwt_instance.decode(ticket, _ticket_key(secret_key))
+        claims.validate()
+    except Exception:
+        raise TokenError("Invalid or expired stream ticket")
+    if claims.get('typ') != 'stream':
+        raise TokenError("Invalid or expired stream ticket")
+    return claims.get('sub')
+
+
+def issue_tokens(resident, secret_key, family_id=None, commit=True):
+    """
+    A new access/refresh pair. Without family_id this starts a new family (a login).
+    Returns the response fields: token, refresh_token, expires_in.
+    """
+    now = dt.datetime.utcnow()
+    access, jti, access_exp = issue_access_token(resident, secret_key, now)
+    refresh = secrets.token_urlsafe(32)
+    db.session.add(RefreshToken(
+        resident_id=resident.id,
+        family_id=family_id or uuid.uuid4().hex,
+        token_hash=_hash(refresh),
+        expires_at=now + dt.timedelta(days=REFRESH_TOKEN_DAYS),
+        access_jti=jti,
+        access_expires_at=access_exp,
+    ))
+    if commit:
+        db.session.commit()
+    return {"token": access, "refresh_token": refresh, "expires_in": ACCESS_TOKEN_MINUTES * 60}
+
+
+def rotate_refresh_token(refresh, secret_key):
+    """Exchange a refresh token for a new pair. Raises TokenError (the caller answers 401)."""
+    row = RefreshToken.query.filter_by(token_hash=_hash(refresh or '')).first()
+    now = dt.datetime.utcnow()
+    if row is None:
+        raise TokenError("Invalid refresh token")
+    if row.revoked_at is not None or row.expires_at <= now:
+        raise TokenError("Refresh token has expired or been revoked")
+
+    # Claim the row atomically: of two concurrent refreshes with one token, only one wins
+    claimed = db.session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == row.id, RefreshToken.used_at.is_(None))
+        .values(used_at=now)
+    ).rowcount
+    if not claimed:
+        db.session.rollback()
+        revoke_family(row.family_id, reason='refresh_reuse')
+        raise TokenError("Refresh token was already used; all sessions from that login have been signed out")
+
+    resident = db.session.get(Resident, row.resident_id)
+    return issue_tokens(resident, secret_key, family_id=row.family_id)
+
+
+def deny(entries, reason=None, commit=True):
+    """Deny-list (jti, expires_at) pairs. Expired ones are skipped; they're rejected anyway."""
+    now = dt.datetime.utcnow()
+    entries = {jti: exp for jti, exp in entries if jti and exp and exp > now}
+    if not entries:
+        return 0
+    existing = {j for (j,) in db.session.query(RevokedToken.jti).filter(RevokedToken.jti.in_(list(entries)))}
+    rows = [{"jti": jti, "expires_at": exp, "reason": reason, "revoked_at": now}
+            for jti, exp in entries.items() if jti not in existing]
+    if rows:
+        db.session.execute(insert(RevokedToken), rows)
+    if commit:
+        db.session.commit()
+    for jti, exp in entries.items():
+        deny_list.add(jti, exp)
+    return len(entries)
+
+
+def revoke_family(family_id, reason=None):
+    """Revoke every refresh token in a family and deny its live access tokens."""
+    rows = RefreshToken.query.filter_by(family_id=family_id).all()
+    now = dt.datetime.utcnow()
+    for r in rows:
+        if r.revoked_at is None:
+            r.revoked_at = now
+    deny([(r.access_jti, r.access_expires_at) for r in rows], reason=reason, commit=False)
+    db.session.commit()
+    return len(rows)
+
+
+def logout(claims, refresh=None):
+    """Revoke the presented access token and, if given, the refresh token's family."""
+    exp = claims.get('exp')
+    denied = deny([(claims.get('jti'), dt.datetime.utcfromtimestamp(exp) if exp else None)], reason='logout',
+                  commit=False)
+    families = 0
+    if refresh:
+        row = RefreshToken.query.filter_by(token_hash=_hash(refresh)).first()
+        if row and row.resident_id == claims.get('sub'):
+            families = 1
+            revoke_family(row.family_id, reason='logout')
+    db.session.commit()
+    return {"access_revoked": bool(denied), "sessions_revoked": families}
+
+
+def revoke_resident(resident_id, reason='admin'):
+    """Sign a resident out everywhere."""
+    families = [f for (f,) in db.session.query(RefreshToken.family_id)
+                .filter(RefreshToken.resident_id == resident_id, RefreshToken.revoked_at.is_(None)).distinct()]
+    for family_id in families:
+        revoke_family(family_id, reason=reason)
+    return len(families)
+
+
+def purge_expired_tokens(now=None):
+    """Drop deny-list rows and refresh tokens past their expiry. Returns rows deleted."""
+    now = now or dt.datetime.utcnow()
+    n = RevokedToken.query.filter(RevokedToken.expires_at < now).delete(synchronize_session=False)
+    n += RefreshToken.query.filter(RefreshToken.expires_at < now).delete(synchronize_session=False)
+    db.session.commit()
+    return n
@@ -0,0 +1,541 @@
+# server/bulk_import.py
+"""
+Streaming bulk import of council back-office extracts: valuations, water meter
+readings and rate charges.
+
+- Files are read in chunks of `chunk_size` rows: CSV with the csv module, Parquet with
+  pyarrow's batch iterator. Memory is bounded by one chunk.
+- Each chunk is turned into NumPy string columns. Parsing (numbers, money, dates),
+  validation and property resolution run on whole columns. Property references are
+  resolved against an in-memory, sorted key array built once per council.
+- Writes:
+    valuations  INSERT ... ON CONFLICT (property_id, year) DO UPDATE
+    water       staging table (COPY on Postgres), then UPDATE matches / INSERT the rest
+                on (property_id, quarter_start_date)
+    charges     same, on (property_id, period_start, category, description)
+- Every chunk commits together with its ImportRun progress row. A failed or killed
+  run restarts after its last committed chunk. Rejected rows go to a per-run CSV
+  report with chunk, row number and reason.
+"""
+import abc
+import csv
+import datetime as dt
+import hashlib
+import io
+import logging
+import os
+import uuid
+
+import numpy as np
+from sqlalchemy import BigInteger, Column, Date, Float, Integer, MetaData, String, Table, insert, select, text
+
+from models import db, ImportRun, Property, RatesAccount, Valuation, WaterConsumption, RateCharge
+
+DEFAULT_CHUNK_SIZE = 50000
+REPORT_DIR = os.getenv(
+    'IMPORT_REPORT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'var', 'imports')
+)
+PROPERTY_KEYS = ('property_id', 'account_number', 'address')
+CHARGE_CATEGORIES = ('general_rate', 'waste', 'stormwater', 'levy', 'concession')
+
+
+class BulkImportError(Exception):
+    """Raised for problems with the file as a whole (missing columns, unknown dataset)."""
+
+
+# ---------- readers ----------
+
+def _csv_chunks(path, chunk_size):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader)]
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) >= chunk_size:
+                yield header, rows
+                rows = []
+        if rows:
+            yield header, rows
+
+
+def _parquet_chunks(path, chunk_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise BulkImportError("Parquet import needs pyarrow (pip install pyarrow).")
+    pf = pq.ParquetFile(path)
+    for batch in pf.iter_batches(batch_size=chunk_size):
+        data = batch.to_pydict()
+        header = list(data)
+        yield header, list(zip(*(data[h] for h in header)))
+
+
+def read_chunks(path, chunk_size):
+    """Yield (header, rows) per chunk; rows are sequences of raw cell values."""
+    reader = _parquet_chunks if path.lower().endswith('.parquet') else _csv_chunks
+    yield from reader(path, chunk_size)
+
+
+def to_columns(header, rows):
+    """header -> stripped str array per column ('' for empty or missing cells)."""
+    return {
+        name: np.char.strip(np.array(['' if j >= len(r) or r[j] is None else str(r[j]) for r in rows], dtype=str))
+        for j, name in enumerate(header)
+    }
+
+
+# ---------- vectorized parsing ----------
+
+def _floats(col, money=False):
+    """(values, bad): NaN where empty; bad marks non-empty cells that don't parse."""
+    if money:
+        col = np.char.replace(np.char.replace(col, '$', ''), ',', '')
+    out = np.full(col.shape, np.nan)
+    bad = np.zeros(col.shape, dtype=bool)
+    present = col != ''
+    try:
+        out[present] = col[present].astype(np.float64)
+    except ValueError:
+        for i in np.nonzero(present)[0]:
+            try:
+                out[i] = float(col[i])
+            except ValueError:
+                bad[i] = True
+    return out, bad
+
+
+def _dates(col):
+    """(datetime64[D] values, bad). ISO dates take the vectorized path, dd/mm/yyyy falls back per cell."""
+    out = np.full(col.shape, np.datetime64('NaT'), dtype='datetime64[D]')
+    bad = np.zeros(col.shape, dtype=bool)
+    present = col != ''
+    try:
+        out[present] = col[present].astype('datetime64[D]')
+    except ValueError:
+        for i in np.nonzero(present)[0]:
+            value = col[i]
+            for parse in (dt.date.fromisoformat, lambda s: dt.datetime.strptime(s, '%d/%m/%Y').date()):
+                try:
+                    out[i] = np.datetime64(parse(value[:10]), 'D')
+                    break
+                except ValueError:
+                    continue
+            else:
+                bad[i] = True
+    return out, bad
+
+
+def _py(values, integer=False):
+    """NumPy column -> Python list for the DB driver, with NaN/NaT as None."""
+    if values.dtype.kind == 'M':
+        return [None if np.isnat(v) else v.astype(object) for v in values]
+    if values.dtype.kind == 'f':
+        cast = int if integer else float
+        return [None if np.isnan(v) else cast(v) for v in values]
+    if values.dtype.kind in 'iu':
+        return values.tolist()
+    return [None if v == '' else str(v) for v in values]
+
+
+class Rejects:
+    """Per-row rejection reasons for one chunk (first reason wins)."""
+
+    def __init__(self, n):
+        self.reason = np.full(n, '', dtype=object)
+
+    def add(self, mask, reason):
+        self.reason[mask & (self.reason == '')] = reason
+
+    @property
+    def ok(self):
+        return self.reason == ''
+
+
+# ---------- property lookup ----------
+
+class PropertyLookup:
+    """Sorted key array -> property id for one council; resolved with np.searchsorted."""
+
+    def __init__(self, council_id, key):
+        if key not in PROPERTY_KEYS:
+            raise BulkImportError(f"key must be one of {', '.join(PROPERTY_KEYS)}")
+        if key == 'account_number':
+            q = (select(RatesAccount.account_number, RatesAccount.property_id)
+                 .join(Property, Property.id == RatesAccount.property_id)
+                 .where(Property.council_id == council_id, RatesAccount.account_number.isnot(None)))
+        elif key == 'address':
+            q = select(Property.address, Property.id).where(Property.council_id == council_id)
+        else:
+            q = select(Property.id, Property.id).where(Property.council_id == council_id)
+        rows = db.session.execute(q).all()
+        keys = np.array([self._norm(key, r[0]) for r in rows], dtype=str)
+        ids = np.array([r[1] for r in rows], dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+        self.key = key
+        self.keys, self.ids = keys[order], ids[order]
+        if key == 'address':
+            # An address shared by several properties can't be resolved; drop it from the lookup
+            uniq, counts = np.unique(self.keys, return_counts=True)
+            keep = np.isin(self.keys, uniq[counts == 1])
+            self.keys, self.ids = self.keys[keep], self.ids[keep]
+
+    @staticmethod
+    def _norm(key, value):
+        value = str(value).strip()
+        return ' '.join(value.upper().split()) if key == 'address' else value
+
+    def resolve(self, refs):
+        """(property_ids, found) for a str array of references."""
+        if self.key == 'address':
+            refs = np.array([self._norm('address', r) for r in refs], dtype=str)
+        if self.keys.size == 0:
+            return np.zeros(refs.size, dtype=np.int64), np.zeros(refs.size, dtype=bool)
+        idx = np.clip(np.searchsorted(self.keys, refs), 0, self.keys.size - 1)
+        found = self.keys[idx] == refs
+        return np.where(found, self.ids[idx], 0), found
+
+
+# ---------- datasets ----------
+
+def _money_cents(cols, rj, name, required):
+    """Prefer <name>_cents; otherwise a dollar column <name> converted to cents."""
+    if f"{name}_cents" in cols:
+        v, bad = _floats(cols[f"{name}_cents"])
+    elif name in cols:
+        v, bad = _floats(cols[name], money=True)
+        v = v * 100.0
+    else:
+        v, bad = np.full(rj.reason.size, np.nan), np.zeros(rj.reason.size, dtype=bool)
+    rj.add(bad, f"{name}: not a number")
+    if required:
+        rj.add(np.isnan(v), f"{name}: required")
+    return np.rint(v)
+
+
+def _dedupe_last(keys_columns, ok):
+    """Mask keeping only the last occurrence of each key among ok rows (later rows win)."""
+    idx = np.nonzero(ok)[0]
+    if idx.size == 0:
+        return ok
+    composite = np.array(['\x1f'.join(map(str, t)) for t in zip(*(c[idx] for c in keys_columns))], dtype=str)
+    _, last_rev = np.unique(composite[::-1], return_index=True)
+    keep = np.zeros_like(ok)
+    keep[idx[idx.size - 1 - last_rev]] = True
+    return keep
+
+
+class Dataset(abc.ABC):
+    name = None
+    required = ()
+    integer_columns = ()
+
+    def check_header(self, cols):
+        missing = [c for c in self.required if c not in cols]
+        if missing:
+            raise BulkImportError(f"{self.name}: missing column(s) {', '.join(missing)}")
+
+    @abc.abstractmethod
+    def transform(self, cols, pid, rj):
+        """Return {column: array} for the target table. Add rejections to rj."""
+
+    @abc.abstractmethod
+    def write(self, conn, records):
+        """Upsert records (list of dicts) on conn; returns the number of rows written."""
+
+
+class ValuationsDataset(Dataset):
+    name = 'valuations'
+    required = ('year',)
+    integer_columns = ('land_value_cents', 'capital_value_cents')
+
+    def transform(self, cols, pid, rj):
+        year, bad = _floats(cols['year'])
+        rj.add(bad | np.isnan(year), "year: required integer")
+        rj.add(~np.isnan(year) & ((year < 1900) | (year > 2200)), "year: out of range")
+        land = _money_cents(cols, rj, 'land_value', required=False)
+        capital = _money_cents(cols, rj, 'capital_value', required=False)
+        rj.add(np.isnan(land) & np.isnan(capital), "land_value/capital_value: at least one required")
+        rj.add((land < 0) | (capital < 0), "value: negative")
+        year = np.nan_to_num(year).astype(np.int64)
+        keep = _dedupe_last([pid, year], rj.ok)
+        rj.add(rj.ok & ~keep, "duplicate of a later row")
+        return {"property_id": pid, "year": year, "land_value_cents": land, "capital_value_cents": capital}
+
+    def write(self, conn, records):
+        if conn.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        now = dt.datetime.utcnow()
+        rows = [dict(r, created_at=now) for r in records]
+        stmt = upsert(Valuation.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['property_id', 'year'],
+            set_={"land_value_cents": stmt.excluded.land_value_cents,
+                  "capital_value_cents": stmt.excluded.capital_value_cents,
+                  "updated_at": now},
+        )
+        conn.execute(stmt, rows)
+        return len(rows)
+
+
+class StagedDataset(Dataset):
+    """Upsert through a temporary staging table, for targets without a unique key."""
+    table = None
+    key_columns = ()
+    staging_columns = ()
+
+    def _staging_table(self):
+        name = f"stg_{self.name}_{uuid.uuid4().hex[:8]}"
+        return Table(name, MetaData(), *[Column(c, t) for c, t in self.staging_columns],
+                     prefixes=['TEMPORARY'], postgresql_on_commit='DROP')
+
+    def _copy(self, conn, stg, records):
+        names = [c for c, _ in self.staging_columns]
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        for r in records:
+            w.writerow(['' if r[c] is None else r[c] for c in names])
+        buf.seek(0)
+        cursor = conn.connection.dbapi_connection.cursor()
+        # Empty CSV fields load as NULL with FORMAT csv
+        cursor.copy_expert(f"COPY {stg.name} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+    def write(self, conn, records):
+        stg = self._staging_table()
+        stg.create(conn)
+        postgres = conn.dialect.name == 'postgresql'
+        if postgres:
+            self._copy(conn, stg, records)
+        else:
+            conn.execute(insert(stg), records)
+
+        target = self.table.name
+        data_cols = [c for c, _ in self.staging_columns if c not in self.key_columns]
+        match = ' AND '.join(
+            f"COALESCE(t.{c}, '') = COALESCE(s.{c}, '')" if c == 'description' else f"t.{c} = s.{c}"
+            for c in self.key_columns)
+        now = {"now": dt.datetime.utcnow()}
+        conn.execute(text(
+            f"UPDATE {target} AS t SET {', '.join(f'{c} = s.{c}' for c in data_cols)}, updated_at = :now "
+            f"FROM {stg.name} AS s WHERE {match}"), now)
+        cols = [c for c, _ in self.staging_columns]
+        conn.execute(text(
+            f"INSERT INTO {target} ({', '.join(cols)}, created_at, updated_at) "
+            f"SELECT {', '.join('s.' + c for c in cols)}, :now, :now FROM {stg.name} AS s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {target} AS t WHERE {match})"), now)
+        if not postgres:
+            stg.drop(conn)  # Postgres drops it on commit
+        return len(records)
+
+
+class WaterDataset(StagedDataset):
+    name = 'water'
+    table = WaterConsumption.__table__
+    required = ('quarter_start_date', 'consumed_litres', 'allocated_litres')
+    key_columns = ('property_id', 'quarter_start_date')
+    staging_columns = (('property_id', Integer), ('quarter_start_date', Date), ('consumed_litres', Float),
+                       ('allocated_litres', Float), ('amount_owing', Float), ('bill_due_date', Date))
+
+    def transform(self, cols, pid, rj):
+        quarter, bad = _dates(cols['quarter_start_date'])
+        rj.add(bad | np.isnat(quarter), "quarter_start_date: required date")
+        consumed, bad = _floats(cols['consumed_litres'])
+        rj.add(bad | np.isnan(consumed) | (consumed < 0), "consumed_litres: required non-negative number")
+        allocated, bad = _floats(cols['allocated_litres'])
+        rj.add(bad | np.isnan(allocated) | (allocated < 0), "allocated_litres: required non-negative number")
+        owing, bad = _floats(cols['amount_owing'], money=True) if 'amount_owing' in cols else (
+            np.full(pid.size, np.nan), np.zeros(pid.size, dtype=bool))
+        rj.add(bad, "amount_owing: not a number")
+        due, bad = _dates(cols['bill_due_date']) if 'bill_due_date' in cols else (
+            np.full(pid.size, np.datetime64('NaT'), dtype='datetime64[D]'), np.zeros(pid.size, dtype=bool))
+        rj.add(bad, "bill_due_date: not a date")
+        keep = _dedupe_last([pid, quarter], rj.ok)
+        rj.add(rj.ok & ~keep, "duplicate of a later row")
+        return {"property_id": pid, "quarter_start_date": quarter, "consumed_litres": consumed,
+                "allocated_litres": allocated, "amount_owing": owing, "bill_due_date": due}
+
+
+class ChargesDataset(StagedDataset):
+    name = 'charges'
+    table = RateCharge.__table__
+    required = ('period_start', 'category')
+    integer_columns = ('amount_cents',)
+    key_columns = ('property_id', 'period_start', 'category', 'description')
+    staging_columns = (('property_id', Integer), ('period_start', Date), ('period_end', Date),
+                       ('category', String(50)), ('description', String(255)), ('amount_cents', BigInteger))
+
+    def transform(self, cols, pid, rj):
+        start, bad = _dates(cols['period_start'])
+        rj.add(bad | np.isnat(start), "period_start: required date")
+        end, bad = _dates(cols['period_end']) if 'period_end' in cols else (
+            np.full(pid.size, np.datetime64('NaT'), dtype='datetime64[D]'), np.zeros(pid.size, dtype=bool))
+        rj.add(bad, "period_end: not a date")
+        rj.add(~np.isnat(end) & ~np.isnat(start) & (end < start), "period_end: before period_start")
+        category = np.char.lower(cols['category'])
+        rj.add(~np.isin(category, CHARGE_CATEGORIES), "category: unknown")
+        description = cols['description'] if 'description' in cols else np.full(pid.size, '', dtype=str)
+        rj.add(np.char.str_len(description) > 255, "description: longer than 255 characters")
+        amount = _money_cents(cols, rj, 'amount', required=True)
+        keep = _dedupe_last([pid, start, category, description], rj.ok)
+        rj.add(rj.ok & ~keep, "duplicate of a later row")
+        return {"property_id": pid, "period_start": start, "period_end": end, "category": category,
+                "description": description, "amount_cents": amount}
+
+
+DATASETS = {d.name: d for d in (ValuationsDataset(), WaterDataset(), ChargesDataset())}
+
+
+# ---------- runs ----------
+
+def file_fingerprint(path):
+    st = os.stat(path)
+    h = hashlib.sha256(f"{os.path.abspath(path)}|{st.st_size}|{int(st.st_mtime)}".encode())
+    with open(path, 'rb') as f:
+        h.update(f.read(1 << 20))
+    return h.hexdigest()
+
+
+def _start_run(dataset, council_id, path, options, resume):
+    fingerprint = file_fingerprint(path)
+    run = None
+    if resume:
+        run = (ImportRun.query.filter(ImportRun.dataset == dataset, ImportRun.council_id == council_id,
+                                      ImportRun.source_fingerprint == fingerprint,
+                                      ImportRun.status.in_(('running', 'failed')))
+               .order_by(ImportRun.id.desc()).first())
+        if run and run.options != options:
+            run = None  # different key / mapping / chunk size: chunk boundaries don't line up
+    if run is None:
+        run = ImportRun(dataset=dataset, council_id=council_id, source=os.path.abspath(path),
+                        source_fingerprint=fingerprint, options=options)
+        db.session.add(run)
+        db.session.flush()
+        run.error_report = os.path.join(REPORT_DIR, f"run_{run.id}_errors.csv")
+        if os.path.exists(run.error_report):
+            os.remove(run.error_report)  # left by a run whose id was reused (e.g. a restored database)
+    else:
+        logging.info(f"[import] Resuming run {run.id} after chunk {run.chunks_done}.")
+        _trim_rejects(run)
+    run.status = 'running'
+    run.last_error = None
+    db.session.commit()
+    return run
+
+
+def _trim_rejects(run):
+    """
+    Drop report rows of chunks the run never committed. The report is appended before the
+    chunk's commit, so a run that died in between would otherwise list those rows twice.
+    """
+    if not run.error_report or not os.path.exists(run.error_report):
+        return
+    with open(run.error_report, newline='') as f:
+        rows = list(csv.reader(f))
+    kept = rows[:1] + [r for r in rows[1:] if int(r[0]) < run.chunks_done]
+    if len(kept) == len(rows):
+        return
+    tmp = f"{run.error_report}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, 'w', newline='') as f:
+        csv.writer(f).writerows(kept)
+    os.replace(tmp, run.error_report)
+
+
+def _write_rejects(run, chunk_no, first_row, cols, rj):
+    bad = np.nonzero(~rj.ok)[0]
+    if bad.size == 0:
+        return
+    os.makedirs(os.path.dirname(run.error_report), exist_ok=True)
+    new = not os.path.exists(run.error_report)
+    names = list(cols)
+    with open(run.error_report, 'a', newline='') as f:
+        w = csv.writer(f)
+        if new:
+            w.writerow(['chunk', 'row', 'reason'] + names)  # row: 1-based data row in the file
+        for i in bad:
+            w.writerow([chunk_no, first_row + int(i), rj.reason[i]] + [cols[c][i] for c in names])
+
+
+def run_import(dataset, council_id, path, key='property_id', ref_column=None, mapping=None,
+               chunk_size=DEFAULT_CHUNK_SIZE, resume=True):
+    """
+    Import `path` into `dataset` for a council. Returns the ImportRun summary dict.
+    mapping renames file columns to dataset fields ({"ASSESSMENT_NO": "account_number"}).
+    ref_column is the column holding the property reference (defaults to the key name).
+    """
+    spec = DATASETS.get(dataset)
+    if spec is None:
+        raise BulkImportError(f"Unknown dataset '{dataset}'; expected one of {', '.join(DATASETS)}")
+    mapping = mapping or {}
+    ref_column = ref_column or key
+    options = {"key": key, "ref_column": ref_column, "mapping": mapping, "chunk_size": chunk_size}
+
+    lookup = PropertyLookup(council_id, key)
+    run = _start_run(dataset, council_id, path, options, resume)
+    run_id = run.id
+    skip = run.chunks_done
+
+    try:
+        for chunk_no, (header, rows) in enumerate(read_chunks(path, chunk_size)):
+            if chunk_no < skip:
+                continue  # committed by an earlier attempt
+            n = len(rows)
+            cols = {mapping.get(k, k): v for k, v in to_columns(header, rows).items()}
+            del rows
+            if ref_column not in cols:
+                raise BulkImportError(f"missing property reference column '{ref_column}'")
+            spec.check_header(cols)
+
+            rj = Rejects(n)
+            pid, found = lookup.resolve(cols[ref_column])
+            rj.add(~found, f"{ref_column}: no matching property in council {council_id}")
+            arrays = spec.transform(cols, pid, rj)
+
+            ok = rj.ok
+            names = list(arrays)
+            columns = [_py(arrays[c][ok], integer=c in spec.integer_columns) for c in names]
+            records = [dict(zip(names, values)) for values in zip(*columns)]
+            written = spec.write(db.session.connection(), records) if records else 0
+
+            run = db.session.get(ImportRun, run_id)
+            _write_rejects(run, chunk_no, chunk_no * chunk_size + 1, cols, rj)
+            run.chunks_done = chunk_no + 1
+            run.rows_read += n
+            run.rows_written += written
+            run.rows_rejected += int((~ok).sum())
+            db.session.commit()
+            logging.info(f"[import] Run {run_id} chunk {chunk_no}: {n} rows, {written} written, "
+                         f"{int((~ok).sum())} rejected.")
+    except Exception as e:
+        db.session.rollback()
+        run = db.session.get(ImportRun, run_id)
+        run.status = 'failed'
+        run.last_error = str(e)[-4000:]
+        db.session.commit()
+        logging.error(f"[import] Run {run_id} failed after chunk {run.chunks_done}: {e}", exc_info=True)
+        raise
+
+    run = db.session.get(ImportRun, run_id)
+    run.status = 'completed'
+    run.finished_at = dt.datetime.utcnow()
+    db.session.commit()
+    return serialize_import_run(run)
+
+
+def serialize_import_run(run):
+    return {
+        "id": run.id,
+        "dataset": run.dataset,
+        "council_id": run.council_id,
+        "source": run.source,
+        "status": run.status,
+        "chunks_done": run.chunks_done,
+        "rows_read": run.rows_read,
+        "rows_written": run.rows_written,
+        "rows_rejected": run.rows_rejected,
+        "error_report": run.error_report if run.rows_rejected else None,
+        "last_error": run.last_error,
+        "created_at": run.created_at.isoformat() if run.created_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+    }
@@ -0,0 +1,217 @@
+# server/delta_sync.py
+"""
+Change tracking behind GET /dashboard/changes.
+
+- Upserts: every synced table carries an indexed updated_at that is set on insert
+  and on update, so "what changed since T" is a range scan per table.
+- Deletes: a before_flush hook writes a SyncTombstone row for each deleted row of
+  a synced table, in the same transaction as the delete. Bulk Query.delete() bypasses
+  the ORM and is not recorded; use session.delete() for resident-facing rows.
+- Tokens: opaque base64 holding the time taken before the queries run. Each query
+  looks back SYNC_OVERLAP (SYNC_OVERLAP_SECONDS, 5 min) before it, so rows from
+  transactions that were still in flight, or written by a worker with a slightly
+  different clock, are not missed. updated_at is set when a row is written, not when
+  its transaction commits, so the window has to outlast the longest writing transaction.
+- Dedupe: the token also carries a short hash of each row version it sent from inside
+  the overlap window (at most SEEN_MAX, newest first). The next delta skips those, so a
+  wide window doesn't re-send the same rows every poll. Past the cap, rows are sent
+  again; clients upsert by id, so that is harmless.
+- Tombstones older than TOMBSTONE_RETENTION are purged. A token older than that
+  (or unreadable) gets a full resync instead of a delta.
+"""
+import base64
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+
+from sqlalchemy import event, literal, select, union_all
+
+from models import (
+    db, Property, WaterConsumption, Process, DevelopmentApplication,
+    RatesAccount, RatesBill, RatesInvoice, PropertyOverlay, SyncTombstone,
+)
+from partitioning import SPECS, hot_window
+
+SYNC_OVERLAP = dt.timedelta(seconds=int(os.getenv('SYNC_OVERLAP_SECONDS', '300')))
+SEEN_MAX = 200
+TOMBSTONE_RETENTION = dt.timedelta(days=30)
+TOKEN_VERSION = 2
+
+
+# ---------- tokens ----------
+
+def encode_token(at, seen=()):
+    raw = {"v": TOKEN_VERSION, "t": at.isoformat()}
+    if seen:
+        raw["s"] = ".".join(seen)
+    raw = json.dumps(raw, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    """
+    (issued at, row hashes already sent) of a token. The time is None if the token is
+    missing, unreadable or too old for a delta.
+    """
+    if not token:
+        return None, frozenset()
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if raw.get("v") not in (1, TOKEN_VERSION):  # v1 had no hashes: the delta just repeats a few rows
+            return None, frozenset()
+        at = dt.datetime.fromisoformat(raw["t"])
+        seen = frozenset(filter(None, str(raw.get("s", "")).split(".")))
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None, frozenset()
+    if at < dt.datetime.utcnow() - TOMBSTONE_RETENTION:
+        return None, frozenset()
+    return at, seen
+
+
+def row_hash(table, row_id, updated_at):
+    """Short name of one version of one row, as kept in tokens."""
+    return hashlib.sha256(f"{table}:{row_id}:{updated_at.isoformat()}".encode()).hexdigest()[:12]
+
+
+# ---------- tombstones ----------
+
+def _owner(session, obj):
+    """(resident_id, property_id, category) for a deleted row, or None if it isn't synced."""
+    if isinstance(obj, Property):
+        return obj.resident_id, obj.id, None
+    if isinstance(obj, (Process, DevelopmentApplication)):
+        return obj.resident_id, getattr(obj, 'property_id', None), getattr(obj, 'category', None)
+    property_id = None
+    if isinstance(obj, (WaterConsumption, RatesAccount, RatesBill, PropertyOverlay)):
+        property_id = obj.property_id
+    elif isinstance(obj, RatesInvoice):
+        account = session.get(RatesAccount, obj.account_id)
+        property_id = account.property_id if account else None
+    if property_id is None:
+        return None
+    prop = session.get(Property, property_id)
+    return (prop.resident_id, property_id, None) if prop else None
+
+
+def register_tombstone_listeners(session_cls=None):
+    """Record a SyncTombstone for each synced row deleted through the session."""
+    target = session_cls or db.session
+
+    @event.listens_for(target, 'before_flush')
+    def _record_deletes(session, flush_context, instances):
+        if not session.deleted:
+            return
+        with session.no_autoflush:
+            for obj in list(session.deleted):
+                if isinstance(obj, SyncTombstone):
+                    continue
+                owner = _owner(session, obj)
+                if owner is None:
+                    continue
+                resident_id, property_id, category = owner
+                session.add(SyncTombstone(
+                    resident_id=resident_id,
+                    entity=obj.__tablename__,
+                    entity_id=obj.id,
+                    property_id=property_id,
+                    category=category,
+                ))
+
+
+def purge_tombstones(retention=TOMBSTONE_RETENTION):
+    cutoff = dt.datetime.utcnow() - retention
+    n = SyncTombstone.query.filter(SyncTombstone.deleted_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    logging.info(f"[sync] Purged {n} tombstones older than {cutoff.isoformat()}.")
+    return n
+
+
+# ---------- change sets ----------
+
+class ChangeSet:
+    """Ids that changed for one resident since a point in time, grouped by what must be re-sent."""
+
+    def __init__(self):
+        self.properties = set()        # Property row itself (dashboard Rates tile)
+        self.water_properties = set()  # property or any of its readings
+        self.rates_properties = set()  # property, account, bills, invoices or overlays (/rates/properties shape)
+        self.development = set()
+        self.processes = set()
+        self.deleted = {"property": set(), "development_application": set(), "processes": {}}
+        self.sent = {}                 # row hash -> updated_at of every row version read
+
+    def seen_since(self, since):
+        """Hashes of the row versions read that were written after `since`, newest first, for the next token."""
+        recent = sorted(((at, h) for h, at in self.sent.items() if at > since), reverse=True)
+        return [h for _, h in recent[:SEEN_MAX]]
+
+
+def changes_since(user_id, since, seen=frozenset()):
+    """What changed for `user_id` since `since`, less the row versions in `seen` (sent already)."""
+    after = since - SYNC_OVERLAP
+    cs = ChangeSet()
+
+    def fresh(table, rows):
+        # rows: (row id, updated_at, what to re-send)
+        for row_id, updated_at, target in rows:
+            h = row_hash(table, row_id, updated_at)
+            cs.sent[h] = updated_at
+            if h not in seen:
+                yield target
+
+    # Every synced table in one round trip: (table, row id, updated_at, id of what to re-send)
+    # Partitioned tables are read from their hot partitions only, like the payloads they feed
+    def changed(table, model, target, owner=Property.resident_id, *joins):
+        q = select(literal(table).label('source'), model.id.label('row_id'),
+                   model.updated_at.label('updated_at'), target.label('target')).select_from(model)
+        for join in joins:
+            q = q.join(*join)
+        q = q.where(owner == user_id, model.updated_at > after)
+        return q.where(hot_window(model)) if model.__tablename__ in SPECS else q
+
+    to_property = (Property, Property.id == RatesAccount.property_id)
+    rows = {}
+    for source, row_id, updated_at, target in db.session.execute(union_all(
+            changed('property', Property, Property.id),
+            changed('water_consumption', WaterConsumption, WaterConsumption.property_id, Property.resident_id,
+                    (Property, Property.id == WaterConsumption.property_id)),
+            changed('rates_account', RatesAccount, RatesAccount.property_id, Property.resident_id, to_property),
+            changed('rates_bill', RatesBill, RatesBill.property_id, Property.resident_id,
+                    (Property, Property.id == RatesBill.property_id)),
+            changed('rates_invoice', RatesInvoice, RatesAccount.property_id, Property.resident_id,
+                    (RatesAccount, RatesAccount.id == RatesInvoice.account_id), to_property),
+            changed('development_application', DevelopmentApplication, DevelopmentApplication.id,
+                    DevelopmentApplication.resident_id),
+            changed('processes', Process, Process.id, Process.resident_id),
+    )):
+        rows.setdefault(source, []).append((row_id, updated_at, target))
+
+    cs.properties = set(fresh('property', rows.get('property', ())))
+    water = set(fresh('water_consumption', rows.get('water_consumption', ())))
+    rates = set()
+    for table in ('rates_account', 'rates_bill', 'rates_invoice'):
+        rates.update(fresh(table, rows.get(table, ())))
+    cs.development = set(fresh('development_application', rows.get('development_application', ())))
+    cs.processes = set(fresh('processes', rows.get('processes', ())))
+
+    tombstones = SyncTombstone.query.filter(SyncTombstone.resident_id == user_id,
+                                            SyncTombstone.deleted_at > after).all()
+    for t in fresh('sync_tombstone', [(t.id, t.deleted_at, t) for t in tombstones]):
+        if t.entity == 'property':
+            cs.deleted["property"].add(t.entity_id)
+        elif t.entity == 'development_application':
+            cs.deleted["development_application"].add(t.entity_id)
+        elif t.entity == 'processes':
+            cs.deleted["processes"].setdefault(t.category, set()).add(t.entity_id)
+        elif t.entity == 'water_consumption':
+            water.add(t.property_id)
+        else:  # rates_account / rates_bill / rates_invoice / property_overlay
+            rates.add(t.property_id)
+
+    gone = cs.deleted["property"]
+    cs.properties -= gone
+    cs.water_properties = (cs.properties | water) - gone
+    cs.rates_properties = (cs.properties | rates) - gone
+    return cs
@@ -0,0 +1,226 @@
+# server/enotices.py
+"""
+E-notice delivery: email each bill's rates notice to residents who opted in.
+
+A bill is eligible when RatesBill.ebill_active and the property's
+BillingSetting.ebill_active are both set, and notice_delivery doesn't already
+record it as sent (or bounced).
+
+- Eligible bills are streamed in keyset batches over rates_bill.id, so memory stays
+  flat and every batch is an index range scan.
+- Notice inputs are gathered in bulk per batch (notices.gather_notice_inputs). PDFs
+  come from the content-addressed notice store, which renders only what's missing.
+  Subjects and bodies come from string.Templates compiled once per process.
+- A batch is split across `concurrency` threads. Each thread holds one pooled SMTP
+  connection for its whole share (mailer.SMTPPool caps how many are open).
+- Transient failures (4xx, dropped connections, timeouts) are retried with
+  exponential backoff and jitter. Permanent refusals (5xx) are marked 'bounced' and
+  never retried. Bills still failing after the retries are marked 'failed' and are
+  picked up again by the next run.
+- A bill that disappears between the eligibility query and gathering its inputs
+  (deleted meanwhile) is recorded as 'skipped', so every eligible bill leaves a row.
+- Outcomes are written with one upsert per batch, not one UPDATE per message.
+"""
+import datetime as dt
+import logging
+import os
+import random
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from string import Template
+
+from models import db, RatesBill, Property, Resident, BillingSetting, NoticeDelivery
+from mailer import build_message, get_pool, is_broken
+from notices import gather_notice_inputs, notice_path, render_notices
+
+TEMPLATE_VERSION = 1
+MAX_RETRIES = int(os.getenv('ENOTICE_MAX_RETRIES', '3'))
+BACKOFF_SECONDS = float(os.getenv('ENOTICE_BACKOFF_SECONDS', '0.5'))
+
+
+@lru_cache(maxsize=None)
+def compiled_templates(version=TEMPLATE_VERSION):
+    """(subject, body) Templates, parsed once per process."""
+    subject = Template("Your $council_name rates notice - account $account_number")
+    body = Template("""Hi $name,
+
+Your rates notice for $address is attached.
+
+Account: $account_number
+Issued: $bill_date
+Amount: $amount
+Due: $due_date
+
+To change how you receive notices, visit $settings_link
+""")
+    return subject, body
+
+
+def eligible_bills(council_id=None, since=None, batch_size=500):
+    """Yield batches of (bill_id, property_id, email, name, settings_link) rows, keyset-paged on bill id."""
+    done = (db.session.query(NoticeDelivery.id)
+            .filter(NoticeDelivery.bill_id == RatesBill.id, NoticeDelivery.status.in_(('sent', 'bounced')))
+            .exists())
+    last_id = 0
+    while True:
+        q = (db.session.query(RatesBill.id, RatesBill.property_id, Resident.email, Resident.name,
+                              BillingSetting.update_notice_link)
+             .join(Property, Property.id == RatesBill.property_id)
+             .join(BillingSetting, BillingSetting.property_id == RatesBill.property_id)
+             .join(Resident, Resident.id == Property.resident_id)
+             .filter(RatesBill.id > last_id,
+                     RatesBill.ebill_active.is_(True),
+                     BillingSetting.ebill_active.is_(True),
+                     ~done))
+        if council_id:
+            q = q.filter(Property.council_id == council_id)
+        if since:
+            q = q.filter(RatesBill.bill_date >= since)
+        rows = q.order_by(RatesBill.id).limit(batch_size).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _money(cents):
+    return f"${int(cents or 0) / 100:,.2f}"
+
+
+def build_notice_message(row, inputs, digest, store_dir=None):
+    subject, body = compiled_templates()
+    fields = {
+        "name": row.name or "resident",
+        "council_name": inputs["council_name"] or "Council",
+        "account_number": inputs["account_number"] or "-",
+        "address": inputs["address"] or "-",
+        "bill_date": inputs["bill_date"] or "-",
+        "due_date": inputs["due_date"] or "-",
+        "amount": _money(inputs["amount_cents"]),
+        "settings_link": row.update_notice_link or "your council's online services",
+    }
+    msg = build_message(row.email, subject.substitute(fields), body.substitute(fields))
+    with open(notice_path(digest, store_dir), 'rb') as f:
+        msg.add_attachment(f.read(), maintype='application', subtype='pdf',
+                           filename=f"rates-notice-{row.id}.pdf")
+    return msg
+
+
+def _is_permanent(exc):
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in exc.recipients.values())
+    return isinstance(exc, smtplib.SMTPResponseException) and 500 <= exc.smtp_code < 600
+
+
+def send_with_retry(pool, conn, msg, retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+    """Returns (status, attempts, error): status is 'sent', 'bounced' or 'failed'."""
+    for attempt in range(1, retries + 2):
+        try:
+            pool.send(msg, conn)
+            return 'sent', attempt, None
+        except Exception as e:
+            if _is_permanent(e):
+                return 'bounced', attempt, str(e)[:500]
+            if attempt > retries:
+                return 'failed', attempt, str(e)[:500]
+            time.sleep(backoff * 2 ** (attempt - 1) * (0.5 + random.random()))
+            if is_broken(e):
+                try:
+                    pool.reconnect(conn)
+                except Exception as reconnect_error:
+                    logging.warning(f"[enotices] Reconnect failed: {reconnect_error}")
+
+
+def _send_share(pool, share, retries, backoff):
+    """Thread entry point: send a slice of the batch over one pooled connection."""
+    results = []
+    try:
+        with pool.connection() as conn:
+            for key, msg in share:
+                results.append((key,) + send_with_retry(pool, conn, msg, retries, backoff))
+    except Exception as e:
+        # No connection could be opened: everything not yet attempted failed this run
+        attempted = {r[0] for r in results}
+        results += [(key, 'failed', 1, str(e)[:500]) for key, _ in share if key not in attempted]
+    return results
+
+
+def record_deliveries(rows):
+    """Upsert one batch of outcomes; attempts accumulate across runs."""
+    if not rows:
+        return
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    now = dt.datetime.utcnow()
+    stmt = upsert(NoticeDelivery.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['bill_id'],
+        set_={"status": stmt.excluded.status,
+              "email": stmt.excluded.email,
+              "attempts": NoticeDelivery.__table__.c.attempts + stmt.excluded.attempts,
+              "last_error": stmt.excluded.last_error,
+              "notice_hash": stmt.excluded.notice_hash,
+              "sent_at": stmt.excluded.sent_at,
+              "updated_at": now},
+    )
+    db.session.execute(stmt, [dict(r, created_at=now, updated_at=now) for r in rows])
+    db.session.commit()
+
+
+def deliver_enotices(council_id=None, since=None, batch_size=500, concurrency=None, pool=None,
+                     retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, store_dir=None):
+    """Send every eligible notice. Returns counts and throughput."""
+    pool = pool or get_pool()
+    concurrency = max(1, min(concurrency or pool.size, pool.size))
+    started = time.monotonic()
+    totals = {"bills": 0, "sent": 0, "failed": 0, "bounced": 0, "skipped": 0}
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='enotice') as executor:
+        for rows in eligible_bills(council_id, since, batch_size):
+            inputs = gather_notice_inputs([r.id for r in rows])
+            hashes, _ = render_notices(inputs, store_dir=store_dir)
+            db.session.expunge_all()
+
+            by_bill = {r.id: r for r in rows if r.id in inputs}
+            messages = [(bid, build_notice_message(r, inputs[bid], hashes[bid], store_dir))
+                        for bid, r in by_bill.items()]
+            shares = [messages[i::concurrency] for i in range(concurrency)]
+            outcomes = [o for part in executor.map(lambda s: _send_share(pool, s, retries, backoff),
+                                                   [s for s in shares if s])
+                        for o in part]
+            outcomes += [(r.id, 'skipped', 0, "Bill no longer exists") for r in rows if r.id not in inputs]
+
+            now = dt.datetime.utcnow()
+            rows_by_id = {r.id: r for r in rows}
+            record_deliveries([{
+                "bill_id": bid,
+                "property_id": rows_by_id[bid].property_id,
+                "email": rows_by_id[bid].email,
+                "status": status,
+                "attempts": attempts,
+                "last_error": error,
+                "notice_hash": hashes.get(bid),
+                "sent_at": now if status == 'sent' else None,
+            } for bid, status, attempts, error in outcomes])
+
+            totals["bills"] += len(rows)
+            for _, status, _, _ in outcomes:
+                totals[status] += 1
+            logging.info(f"[enotices] {totals['bills']} bills: {totals['sent']} sent, "
+                         f"{totals['failed']} failed, {totals['bounced']} bounced")
+
+    seconds = time.monotonic() - started
+    totals["seconds"] = round(seconds, 3)
+    totals["per_second"] = round(totals["sent"] / seconds, 1) if seconds else 0.0
+    return totals
+
+
+def delivery_summary(council_id=None):
+    """{status: count} of recorded deliveries."""
+    q = db.session.query(NoticeDelivery.status, db.func.count(NoticeDelivery.id))
+    if council_id:
+        q = q.join(Property, Property.id == NoticeDelivery.property_id).filter(Property.council_id == council_id)
+    return dict(q.group_by(NoticeDelivery.status).all())
@@ -0,0 +1,86 @@
+# server/geo.py
+"""Small geodesy helpers shared by the spatial features (no GIS dependency)."""
+import json
+import math
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+M_PER_DEG_LAT = 111_320.0
+
+
+def property_point(gps_coordinates):
+    """(lon, lat) from a {"lat": .., "lon": ..} JSON value, or None."""
+    if not isinstance(gps_coordinates, dict):
+        return None
+    lat = gps_coordinates.get('lat', gps_coordinates.get('latitude'))
+    lon = gps_coordinates.get('lon', gps_coordinates.get('lng', gps_coordinates.get('longitude')))
+    try:
+        return float(lon), float(lat)
+    except (TypeError, ValueError):
+        return None
+
+
+def bounding_box(lat, lon, radius_m):
+    """(min_lat, max_lat, min_lon, max_lon) enclosing a circle. Slightly generous near the poles."""
+    dlat = radius_m / M_PER_DEG_LAT
+    dlon = radius_m / (M_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def haversine_m(lat, lon, lats, lons):
+    """Great-circle distance in metres from one point to arrays of points."""
+    lat1 = math.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def iter_geometries(obj):
+    """Yield bare GeoJSON geometries from a Feature, FeatureCollection or geometry."""
+    if not isinstance(obj, dict):
+        return
+    t = obj.get('type')
+    if t == 'FeatureCollection':
+        for f in obj.get('features') or []:
+            yield from iter_geometries(f)
+    elif t == 'Feature':
+        yield from iter_geometries(obj.get('geometry'))
+    elif t == 'GeometryCollection':
+        for g in obj.get('geometries') or []:
+            yield from iter_geometries(g)
+    elif t:
+        yield obj
+
+
+def load_geojson(value):
+    """A GeoJSON dict from a JSON column value or GeoJSON text (Property.shape_file_data), or None."""
+    if isinstance(value, (str, bytes)):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    return value if isinstance(value, dict) else None
+
+
+def _positions(coords):
+    if coords and isinstance(coords[0], (int, float)):
+        yield coords
+    else:
+        for c in coords or []:
+            yield from _positions(c)
+
+
+def geojson_bbox(value):
+    """(min_lon, min_lat, max_lon, max_lat) of every position in a GeoJSON value, or None."""
+    xs, ys = [], []
+    for geom in iter_geometries(load_geojson(value)):
+        for p in _positions(geom.get('coordinates')):
+            if len(p) >= 2:
+                xs.append(p[0])
+                ys.append(p[1])
+    if not xs:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
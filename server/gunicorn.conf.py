@@ -0,0 +1,181 @@
+# server/gunicorn.conf.py
+"""
+Production server configuration. Picked up automatically when gunicorn starts in server/:
+
+    gunicorn app:app
+    GUNICORN_MODE=gevent gunicorn app:app
+
+- preload_app: the app is imported once in the master process, and caches are warmed there
+  (see when_ready). Workers fork from it and share those pages copy-on-write.
+  - gc.freeze() moves everything loaded so far out of the collector's generations. Later
+    collections then don't write to those objects, which would otherwise un-share their pages.
+  - Any engine connections the master opened during startup belong to it. post_fork
+    disposes each worker's inherited pool without closing them, so no socket is shared
+    between processes.
+- GUNICORN_MODE picks the worker class:
+  - 'gthread' (default): a thread pool per worker.
+  - 'gevent': greenlets. The standard library is monkey-patched before the app is
+    imported, and psycopg2 is given a wait callback so queries yield to other greenlets
+    instead of blocking the worker.
+  - 'sync': one request at a time per worker.
+- Worker counts are sized from the CPUs and memory this container may actually use
+  (cgroup limits, not the host's). Each worker is budgeted GUNICORN_WORKER_MEMORY_MB.
+  WEB_CONCURRENCY, GUNICORN_THREADS and GUNICORN_WORKER_CONNECTIONS override the sizing.
+  DB_POOL_SIZE defaults to what one worker can use at once, and SSE_MAX_STREAMS to the
+  event streams it can hold without starving other requests. gevent suits many streams.
+
+Compare the modes with scripts/bench_serving_modes.py.
+"""
+import gc
+import logging
+import os
+import sys
+
+MODES = ('gthread', 'gevent', 'sync')
+mode = os.getenv('GUNICORN_MODE', 'gthread').lower()
+if mode not in MODES:
+    raise RuntimeError(f"GUNICORN_MODE must be one of {', '.join(MODES)}, not '{mode}'")
+
+
+# ---------- sizing ----------
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """CPUs this process may use: affinity mask, capped by a cgroup CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _read('/sys/fs/cgroup/cpu.max')  # cgroup v2: "<quota> <period>" or "max <period>"
+    if quota and not quota.startswith('max'):
+        q, period = quota.split()
+        cpus = min(cpus, max(1, int(int(q) / int(period))))
+    else:
+        q, period = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us'), _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+        if q and period and int(q) > 0:
+            cpus = min(cpus, max(1, int(q) // int(period)))
+    return max(1, cpus)
+
+
+def available_memory_mb():
+    """Memory this process may use: physical RAM, capped by a cgroup memory limit."""
+    try:
+        total = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        limit = _read(path)
+        if limit and limit.isdigit():
+            total = min(total, int(limit))
+            break
+    return total // (1024 * 1024)
+
+
+def worker_count(cpus, memory_mb, per_worker_mb):
+    # gthread/gevent overlap I/O inside a worker, and the GIL limits each worker to one core,
+    # so about one per core. sync serves one request per worker: the classic 2n+1.
+    # Never more than fit in memory next to the master.
+    wanted = 2 * cpus + 1 if mode == 'sync' else cpus + 1 if mode == 'gthread' else cpus
+    if memory_mb:
+        wanted = min(wanted, max(1, (memory_mb - per_worker_mb) // per_worker_mb))
+    return max(1, wanted)
+
+
+cpus = available_cpus()
+per_worker_mb = int(os.getenv('GUNICORN_WORKER_MEMORY_MB', '256'))
+
+bind = os.getenv('GUNICORN_BIND') or f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY') or worker_count(cpus, available_memory_mb(), per_worker_mb))
+worker_class = mode
+threads = int(os.getenv('GUNICORN_THREADS', '4')) if mode == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '200'))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') != '0'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so slow leaks (and copy-on-write drift) don't accumulate
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+# One worker's concurrent requests each hold at most one connection from the app's pool.
+# Under gevent that would be hundreds, so cap it and let the rest queue for pool_timeout.
+os.environ.setdefault('DB_POOL_SIZE', str(threads if mode != 'gevent' else min(worker_connections, 20)))
+# Each open event stream (process_events.py) holds a thread, or a greenlet under gevent.
+# Leave at least half of a gthread worker's threads for ordinary requests; a sync worker
+# has none to spare, so its clients fall back to polling.
+os.environ.setdefault('SSE_MAX_STREAMS', str({'gthread': threads // 2, 'gevent': worker_connections // 2}.get(mode, 0)))
+
+
+# ---------- gevent ----------
+
+def _gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback: wait on the socket through gevent, so other greenlets run."""
+    from psycopg2 import extensions, OperationalError
+    from gevent.socket import wait_read, wait_write
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state}")
+
+
+if mode == 'gevent':
+    try:
+        from gevent import monkey
+    except ImportError:
+        raise RuntimeError("GUNICORN_MODE=gevent needs gevent (pip install gevent).")
+    # Before the app (and its threading locks, sockets, ...) is imported by preload
+    monkey.patch_all()
+    try:
+        from psycopg2 import extensions
+        extensions.set_wait_callback(_gevent_wait_callback)
+    except ImportError:
+        pass
+
+
+# ---------- hooks ----------
+
+def _warm_caches(app):
+    """Build the in-process indexes once in the master, so every worker inherits them."""
+    from animal_facets import facet_index
+
+    with app.app_context():
+        facet_index.buckets()
+
+
+def when_ready(server):
+    app_module = sys.modules.get('app')
+    if app_module is None:  # GUNICORN_PRELOAD=0: each worker imports the app itself
+        return
+    try:
+        _warm_caches(app_module.app)
+    except Exception as e:
+        logging.error(f"[gunicorn] Cache warm-up failed: {e}", exc_info=True)
+    gc.freeze()
+    server.log.info(f"Preloaded app: {mode} x {server.num_workers} workers"
+                    f"{f' x {threads} threads' if mode == 'gthread' else ''} on {cpus} CPUs")
+
+
+def post_fork(server, worker):
+    app_module = sys.modules.get('app')
+    if app_module is None:
+        return
+    # Drop the pool inherited from the master without closing its sockets, which the
+    # master (and every sibling) still owns. The worker opens its own on first use.
+    with app_module.app.app_context():
+        from models import db
+        db.engine.dispose(close=False)
@@ -0,0 +1,416 @@
+# server/image_proxy.py
+"""
+Resized, re-encoded copies of remote images (animal photos, council logos), served from /img.
+
+- URLs are built server-side by thumbnail_url() and carry an HMAC of the source and the
+  transform, keyed by IMAGE_PROXY_KEY. /img is therefore not an open proxy, and clients
+  can't ask for arbitrary sizes. Without the key no thumbnail URLs are handed out and /img
+  answers 503; payloads still carry the original URLs.
+- The URLs are absolute, on API_BASE_URL (else the host of the request being served), since
+  the web client is served from another origin.
+- Originals are fetched once through the configured fetcher (IMAGE_FETCHER):
+  - 'http' fetches over HTTP(S) with a timeout and a size cap.
+  - 'file' maps a URL's file name into IMAGE_SOURCE_DIR, a local stand-in for tests and
+    offline development.
+  register_fetcher() adds others.
+- Variants are rendered with Pillow in a process pool (IMAGE_WORKERS; 0 renders inline),
+  so decoding and resampling don't hold the serving process's GIL. Concurrent requests
+  for the same image share one fetch and one render.
+- Everything is cached under IMAGE_CACHE_DIR. Originals are keyed by source URL, and
+  variants by source plus transform. The directory is an LRU bounded by
+  IMAGE_CACHE_MAX_BYTES: a hit refreshes the file's mtime, and once the running total
+  passes the bound, the oldest files are deleted down to LOW_WATER of it.
+- A variant's key is its ETag. A signed URL names exactly one rendering, so responses are
+  cacheable for a year (immutable). With fmt=auto the format follows Accept: AVIF, then
+  WebP, when this Pillow build supports them. Those responses Vary on Accept.
+"""
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ProcessPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from flask import has_request_context, request
+
+VERSION = 1  # bump to re-render every variant (changes every key)
+IMAGE_CACHE_DIR = os.getenv(
+    'IMAGE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'var', 'images')
+)
+CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+LOW_WATER = 0.9
+WORKERS = int(os.getenv('IMAGE_WORKERS', '2'))
+RENDER_TIMEOUT = float(os.getenv('IMAGE_RENDER_TIMEOUT', '30'))
+FETCH_TIMEOUT = float(os.getenv('IMAGE_FETCH_TIMEOUT', '10'))
+MAX_SOURCE_BYTES = int(os.getenv('IMAGE_MAX_SOURCE_BYTES', str(20 * 1024 * 1024)))
+MAX_SOURCE_PIXELS = 40_000_000
+MAX_DIMENSION = 2048
+USER_AGENT = 'AssemblyImageProxy/1.0'
+MAX_AGE = 365 * 24 * 3600
+
+FITS = ('cover', 'contain')
+FORMATS = ('auto', 'avif', 'webp', 'jpeg', 'png')
+MIMETYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+SAVE_OPTIONS = {
+    'avif': {'quality': 60},
+    'webp': {'quality': 80, 'method': 4},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+    'png': {'optimize': True},
+}
+
+# Sizes the JSON payloads link to
+THUMBNAILS = {
+    'animal_card': (320, 320, 'cover'),
+    'animal_gallery': (800, 800, 'contain'),
+    'council_logo': (None, 96, 'contain'),
+}
+
+_secret = None
+_base_url = ''
+
+
+class ImageError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message, status)  # both in args, so it survives the trip back from a worker
+        self.message = message
+        self.status = status
+
+
+def init_image_proxy(app):
+    global _secret, _base_url
+    key = app.config.get('IMAGE_PROXY_KEY')
+    if not key:
+        logging.warning("[img] IMAGE_PROXY_KEY is not set: thumbnail URLs are disabled and /img answers 503.")
+    _secret = key.encode() if key else None
+    _base_url = (app.config.get('API_BASE_URL') or '').rstrip('/')
+
+
+# ---------- signed URLs ----------
+
+def _signature(src, w, h, fit, fmt):
+    msg = "\n".join(str(v) for v in (src, w or '', h or '', fit, fmt)).encode()
+    digest = hmac.new(_secret, msg, hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+
+def _origin():
+    if _base_url:
+        return _base_url
+    return request.host_url.rstrip('/') if has_request_context() else ''
+
+
+def thumbnail_url(src, w=None, h=None, fit='cover', fmt='auto'):
+    """Absolute /img URL of a resized copy of src, or None without a src or a signing key."""
+    if not src or not _secret:
+        return None
+    params = {"src": src, "w": w, "h": h, "fit": fit, "fmt": fmt, "s": _signature(src, w, h, fit, fmt)}
+    return _origin() + "/img?" + urlencode({k: v for k, v in params.items() if v is not None})
+
+
+def thumbnail(src, preset):
+    w, h, fit = THUMBNAILS[preset]
+    return thumbnail_url(src, w, h, fit)
+
+
+def parse_params(args):
+    """Validate /img query args. Returns {src, w, h, fit, fmt}; raises ImageError."""
+    if not _secret:
+        raise ImageError("Image resizing is not configured", 503)
+    src, fit, fmt = args.get('src'), args.get('fit', 'cover'), args.get('fmt', 'auto')
+    try:
+        w = int(args['w']) if args.get('w') else None
+        h = int(args['h']) if args.get('h') else None
+    except ValueError:
+        raise ImageError("w and h must be integers")
+    if not src or (w is None and h is None):
+        raise ImageError("src and w or h are required")
+    if fit not in FITS or fmt not in FORMATS:
+        raise ImageError(f"fit must be one of {', '.join(FITS)} and fmt one of {', '.join(FORMATS)}")
+    if any(v is not None and not 0 < v <= MAX_DIMENSION for v in (w, h)):
+        raise ImageError(f"w and h must be between 1 and {MAX_DIMENSION}")
+    if not hmac.compare_digest(args.get('s', ''), _signature(src, w, h, fit, fmt)):
+        raise ImageError("Invalid image signature", 403)
+    return {"src": src, "w": w, "h": h, "fit": fit, "fmt": fmt}
+
+
+# ---------- fetchers ----------
+
+class HttpFetcher:
+    def __init__(self, timeout=FETCH_TIMEOUT, max_bytes=MAX_SOURCE_BYTES):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+
+    def fetch(self, url):
+        if urlsplit(url).scheme not in ('http', 'https'):
+            raise ImageError("Unsupported image source")
+        request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+                data = resp.read(self.max_bytes + 1)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise ImageError(f"Could not fetch source image: {e}", 502)
+        if len(data) > self.max_bytes:
+            raise ImageError("Source image is too large", 502)
+        return data
+
+
+class FileFetcher:
+    """Serves a URL's file name from a local directory."""
+
+    def __init__(self, root=None):
+        self.root = os.path.realpath(root or os.getenv('IMAGE_SOURCE_DIR', '.'))
+
+    def fetch(self, url):
+        path = os.path.realpath(os.path.join(self.root, os.path.basename(urlsplit(url).path)))
+        if os.path.dirname(path) != self.root:
+            raise ImageError("Unsupported image source")
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise ImageError("Source image not found", 404)
+
+
+FETCHERS = {'http': HttpFetcher, 'file': FileFetcher}
+_fetcher = None
+
+
+def register_fetcher(name, factory):
+    FETCHERS[name] = factory
+
+
+def get_fetcher():
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = FETCHERS[os.getenv('IMAGE_FETCHER', 'http')]()
+    return _fetcher
+
+
+def set_fetcher(fetcher):
+    global _fetcher
+    _fetcher = fetcher
+
+
+# ---------- disk cache ----------
+
+class DiskLRU:
+    def __init__(self, root=IMAGE_CACHE_DIR, max_bytes=CACHE_MAX_BYTES, low_water=LOW_WATER):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        self._total = None  # running estimate; rescanned on first write and on every eviction
+
+    def path(self, kind, key, ext):
+        return os.path.join(self.root, kind, key[:2], key[2:4], f"{key}.{ext}")
+
+    def hit(self, path):
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def store(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)  # atomic: readers never see a partial file
+        self.added(path)
+
+    def added(self, path):
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._scan())
+            else:
+                self._total += os.path.getsize(path)
+            over = self._total > self.max_bytes
+        if over:
+            self.evict()
+
+    def _scan(self):
+        """(mtime, size, path) of every cached file."""
+        out = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue
+                p = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(p)
+                except FileNotFoundError:
+                    continue
+                out.append((st.st_mtime, st.st_size, p))
+        return out
+
+    def evict(self):
+        """Delete least recently used files until the cache is under its low-water mark. Returns bytes freed."""
+        with self._lock:
+            files = sorted(self._scan())
+            total = sum(size for _, size, _ in files)
+            target, freed = self.max_bytes * self.low_water, 0
+            recent = time.time() - RENDER_TIMEOUT  # may be an original a render is still reading
+            for mtime, size, p in files:
+                if total - freed <= target or mtime > recent:
+                    break
+                try:
+                    os.remove(p)
+                    freed += size
+                except FileNotFoundError:
+                    pass
+            self._total = total - freed
+        if freed:
+            logging.info(f"[img] Evicted {freed} bytes from the image cache.")
+        return freed
+
+    def size(self):
+        return sum(size for _, size, _ in self._scan())
+
+
+cache = DiskLRU()
+
+
+# ---------- rendering ----------
+
+def _render(args):
+    """Process-pool entry point: write a resized, re-encoded copy of src_path to dst_path."""
+    src_path, dst_path, w, h, fit, fmt = args
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    try:
+        with Image.open(src_path) as im:
+            if im.width * im.height > MAX_SOURCE_PIXELS:
+                raise ImageError("Source image is too large", 422)
+            side = max(w or 0, h or 0)
+            im.draft('RGB', (side, side))  # JPEG: decode at a reduced scale; square so EXIF rotation can't undershoot
+            im = ImageOps.exif_transpose(im)
+            if fit == 'cover' and w and h:
+                scale = min(1.0, im.width / w, im.height / h)  # never upscale, keep the requested aspect
+                size = (max(1, round(w * scale)), max(1, round(h * scale)))
+                im = ImageOps.fit(im, size, Image.LANCZOS)
+            else:
+                im.thumbnail((w or MAX_DIMENSION, h or MAX_DIMENSION), Image.LANCZOS)
+            if fmt == 'jpeg':
+                if im.mode in ('RGBA', 'LA', 'P'):
+                    im = im.convert('RGBA')
+                    flat = Image.new('RGB', im.size, (255, 255, 255))
+                    flat.paste(im, mask=im.getchannel('A'))
+                    im = flat
+                elif im.mode != 'RGB':
+                    im = im.convert('RGB')
+            elif im.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                im = im.convert('RGBA' if 'transparency' in im.info or im.mode in ('P', 'PA') else 'RGB')
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dst_path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                im.save(f, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+            os.replace(tmp, dst_path)
+    except (UnidentifiedImageError, Image.DecompressionBombError):
+        raise ImageError("Source is not a supported image", 415)
+    return dst_path
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """One render pool per process (forked workers get their own)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool, _pool_pid = ProcessPoolExecutor(max_workers=WORKERS), os.getpid()
+        return _pool
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _once(key, fn):
+    """Run fn for key, or wait for the call already running it in this process."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _inflight[key] = Future()
+    if not owner:
+        return future.result(timeout=RENDER_TIMEOUT)
+    try:
+        result = fn()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _digest(*parts):
+    return hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def supported_formats():
+    try:
+        from PIL import features
+    except ImportError:
+        raise ImageError("Image resizing needs Pillow (pip install Pillow).", 501)
+    return {'jpeg', 'png'} | {f for f in ('webp', 'avif') if features.check(f)}
+
+
+def resolve_format(fmt, accept, src):
+    """The output format: as asked, or for 'auto' the best one the client accepts."""
+    available = supported_formats()
+    if fmt != 'auto':
+        if fmt not in available:
+            raise ImageError(f"This server can't encode {fmt}", 415)
+        return fmt
+    for candidate in ('avif', 'webp'):
+        if candidate in available and MIMETYPES[candidate] in (accept or ''):
+            return candidate
+    return 'png' if urlsplit(src).path.lower().endswith(('.png', '.gif', '.svg')) else 'jpeg'
+
+
+def original_path(src):
+    """Path of the cached original, fetching it on first use."""
+    key = _digest('src', src)
+    path = cache.path('originals', key, 'src')
+    if cache.hit(path):
+        return path
+
+    def fetch():
+        if not os.path.exists(path):
+            cache.store(path, get_fetcher().fetch(src))
+        return path
+
+    return _once(f"src:{key}", fetch)
+
+
+def get_variant(src, w, h, fit, fmt, accept=''):
+    """(path, mimetype, etag) of a rendered variant, fetching and rendering as needed."""
+    out = resolve_format(fmt, accept, src)
+    key = _digest(VERSION, src, w, h, fit, out)
+    path = cache.path('variants', key, out)
+    if cache.hit(path):
+        return path, MIMETYPES[out], key
+
+    def render():
+        if not os.path.exists(path):
+            args = (original_path(src), path, w, h, fit, out)
+            if WORKERS > 0:
+                _get_pool().submit(_render, args).result(timeout=RENDER_TIMEOUT)
+            else:
+                _render(args)
+            cache.added(path)
+        return path
+
+    return _once(key, render), MIMETYPES[out], key
@@ -0,0 +1,200 @@
+# server/instalments.py
+"""
+Normalized instalment schedules and the due-date reminder sweep.
+
+RatesAccount.instalment_plan used to be the only copy of an account's schedule: a
+JSON list with float dollar amounts. Finding "everything due next week" meant loading
+and parsing every account's JSON. Schedules now live in the instalment table, one row
+per (account, seq). The reminder sweep is a single range scan of
+ix_instalment_status_due (status, due_date, id).
+
+- backfill_instalments() copies legacy JSON plans into rows (idempotent).
+- mark_overdue() flips past-due instalments to 'overdue' in one UPDATE.
+- send_due_reminders() emails residents whose instalments fall due in the next N days,
+  over the pooled SMTP client in mailer.py, and stamps reminder_sent_at in bulk.
+- serialize_schedule() keeps the /rates/properties instalment_schedule shape:
+  [{"seq", "due_date", "amount"}] with amount in dollars.
+"""
+import datetime as dt
+import logging
+import smtplib
+import time
+from decimal import Decimal, InvalidOperation
+from string import Template
+
+from models import db, Instalment, RatesAccount, Property, Resident
+from mailer import build_message, get_pool, is_broken
+
+REMINDER_SUBJECT = Template("Rates instalment $seq of $$${amount} due $due_date")
+REMINDER_BODY = Template("""Hi $name,
+
+Instalment $seq for rates account $account_number ($address) is due on $due_date.
+
+Amount due: $$${amount}
+
+If you've already paid, please ignore this reminder.
+""")
+
+
+def _cents(item):
+    if item.get("amount_cents") is not None:
+        return int(item["amount_cents"])
+    try:
+        return int((Decimal(str(item["amount"])) * 100).quantize(Decimal(1)))
+    except (KeyError, InvalidOperation, TypeError):
+        return None
+
+
+def plan_rows(account):
+    """
+    Instalment rows for an account's legacy JSON plan. Malformed items are skipped, and so is
+    a repeated seq (the first one wins): (account_id, seq) is unique, and one clash would
+    fail the whole backfill batch.
+    """
+    rows, seen = [], set()
+    for i, item in enumerate(account.instalment_plan or [], start=1):
+        if not isinstance(item, dict):
+            continue
+        amount_cents = _cents(item)
+        try:
+            due_date = dt.date.fromisoformat(str(item["due_date"])[:10])
+            seq = int(item.get("seq") or i)
+        except (KeyError, ValueError, TypeError):
+            continue
+        if amount_cents is None:
+            continue
+        if seq in seen:
+            logging.warning(f"[instalments] Account {account.id}: instalment seq {seq} repeated, skipped")
+            continue
+        seen.add(seq)
+        rows.append({"account_id": account.id, "seq": seq,
+                     "due_date": due_date, "amount_cents": amount_cents, "status": "due"})
+    return rows
+
+
+def backfill_instalments(batch_size=500):
+    """Create rows for accounts that have a JSON plan and no instalments yet. Returns rows created."""
+    created, last_id = 0, 0
+    has_rows = db.session.query(Instalment.id).filter(Instalment.account_id == RatesAccount.id).exists()
+    while True:
+        accounts = (RatesAccount.query
+                    .filter(RatesAccount.id > last_id, RatesAccount.instalment_plan.isnot(None), ~has_rows)
+                    .order_by(RatesAccount.id).limit(batch_size).all())
+        if not accounts:
+            return created
+        rows = [r for acc in accounts for r in plan_rows(acc)]
+        if rows:
+            db.session.execute(db.insert(Instalment), rows)
+        db.session.commit()
+        created += len(rows)
+        last_id = accounts[-1].id
+
+
+def mark_overdue(today=None):
+    """'due' instalments whose date has passed become 'overdue'. Returns rows changed."""
+    today = today or dt.date.today()
+    n = (Instalment.query
+         .filter(Instalment.status == 'due', Instalment.due_date < today)
+         .update({Instalment.status: 'overdue', Instalment.updated_at: dt.datetime.utcnow()},
+                 synchronize_session=False))
+    db.session.commit()
+    return n
+
+
+def due_instalments(within_days=7, today=None, batch_size=500):
+    """
+    Yield batches of instalments due in [today, today + within_days] that haven't been
+    reminded, with the resident's contact details. Keyset-paged on (due_date, id) so each
+    batch is an index range scan, whatever the table size.
+    """
+    today = today or dt.date.today()
+    until = today + dt.timedelta(days=within_days)
+    cursor = None
+    while True:
+        q = (db.session.query(Instalment.id, Instalment.seq, Instalment.due_date, Instalment.amount_cents,
+                              RatesAccount.account_number, Property.address, Resident.name, Resident.email)
+             .join(RatesAccount, RatesAccount.id == Instalment.account_id)
+             .join(Property, Property.id == RatesAccount.property_id)
+             .join(Resident, Resident.id == Property.resident_id)
+             .filter(Instalment.status == 'due',
+                     Instalment.due_date.between(today, until),
+                     Instalment.reminder_sent_at.is_(None)))
+        if cursor:
+            q = q.filter(db.tuple_(Instalment.due_date, Instalment.id) > cursor)
+        rows = q.order_by(Instalment.due_date, Instalment.id).limit(batch_size).all()
+        if not rows:
+            return
+        yield rows
+        cursor = (rows[-1].due_date, rows[-1].id)
+
+
+def reminder_message(row):
+    fields = {
+        "name": row.name or "resident",
+        "seq": row.seq,
+        "account_number": row.account_number,
+        "address": row.address,
+        "due_date": row.due_date.strftime('%d %b %Y'),
+        "amount": f"{row.amount_cents / 100:,.2f}",
+    }
+    return build_message(row.email, REMINDER_SUBJECT.substitute(fields), REMINDER_BODY.substitute(fields))
+
+
+def _reconnect(pool, conn):
+    """Re-open a connection a send broke. If that fails, raise so pool.connection() drops it."""
+    try:
+        pool.reconnect(conn)
+    except Exception as e:
+        raise smtplib.SMTPServerDisconnected(f"reconnecting to {pool.host}:{pool.port} failed: {e}") from e
+
+
+def send_due_reminders(within_days=7, today=None, batch_size=500, pool=None):
+    """
+    Email a reminder for each instalment due in the next `within_days` days. One pooled
+    connection carries a whole batch, and sent rows are stamped with one UPDATE per batch.
+    Failed sends stay unstamped and are retried by the next run.
+    A send that breaks the connection gets it re-opened before the next message. If that
+    fails too, the connection is dropped from the pool and the sweep stops until next run.
+    """
+    pool = pool or get_pool()
+    started = time.monotonic()
+    sent = failed = 0
+    for rows in due_instalments(within_days, today, batch_size):
+        done = []
+        unreachable = False
+        try:
+            with pool.connection() as conn:
+                for row in rows:
+                    try:
+                        pool.send(reminder_message(row), conn)
+                        done.append(row.id)
+                    except Exception as e:
+                        logging.warning(f"[instalments] Reminder for instalment {row.id} to {row.email} failed: {e}")
+                        if is_broken(e):
+                            _reconnect(pool, conn)
+        except smtplib.SMTPServerDisconnected as e:
+            unreachable = True
+            logging.error(f"[instalments] SMTP server unreachable, stopping the sweep: {e}")
+        if done:
+            (Instalment.query.filter(Instalment.id.in_(done))
+             .update({Instalment.reminder_sent_at: dt.datetime.utcnow()}, synchronize_session=False))
+            db.session.commit()
+        sent += len(done)
+        failed += len(rows) - len(done)
+        if unreachable:
+            break
+    seconds = round(time.monotonic() - started, 3)
+    logging.info(f"[instalments] Sent {sent} reminders ({failed} failed) in {seconds}s")
+    return {"sent": sent, "failed": failed, "seconds": seconds}
+
+
+def serialize_schedule(account, instalments=None):
+    """The instalment_schedule payload; falls back to the legacy JSON for accounts not yet backfilled."""
+    if account is None:
+        return []
+    if instalments is None:
+        instalments = account.instalments
+    if not instalments:
+        return account.instalment_plan or []
+    return [{"seq": i.seq, "due_date": i.due_date.isoformat(), "amount": round(i.amount_cents / 100.0, 2)}
+            for i in instalments]
@@ -0,0 +1,133 @@
+# server/job_handlers.py
+"""
+Job kinds runnable by worker.py. Import this module wherever jobs are enqueued so the
+handler's queue / retry / concurrency settings apply.
+Handlers with every=... are periodic: worker.py enqueues them once per period.
+"""
+import datetime as dt
+
+from jobs import job_handler
+
+
+@job_handler('seed_rates', queue='maintenance', max_attempts=1, concurrency=1)
+def seed_rates_job(payload):
+    from scripts.seed_rates import seed
+    seed()
+    return {"seeded": True}
+
+
+@job_handler('assign_waste_routes', queue='maintenance', max_attempts=3, concurrency=2)
+def assign_waste_routes_job(payload):
+    from waste_routes import assign_routes_for_council
+    return {"council_id": payload["council_id"], "rows": assign_routes_for_council(payload["council_id"])}
+
+
+@job_handler('render_rates_notices', queue='maintenance', max_attempts=3, concurrency=1)
+def render_rates_notices_job(payload):
+    from notices import render_council_notices
+    since = dt.date.fromisoformat(payload["since"]) if payload.get("since") else None
+    return render_council_notices(payload["council_id"], since=since, processes=payload.get("processes"))
+
+
+@job_handler('commit_rating_run', queue='maintenance', max_attempts=1, concurrency=1)
+def commit_rating_run_job(payload):
+    from rating_engine import run_rating
+    return run_rating(payload["council_id"], payload["financial_year"], commit=True)
+
+
+@job_handler('purge_sync_tombstones', queue='maintenance', max_attempts=3, concurrency=1,
+             every=dt.timedelta(days=1))
+def purge_sync_tombstones_job(payload):
+    from delta_sync import purge_tombstones
+    return {"purged": purge_tombstones()}
+
+
+@job_handler('purge_process_events', queue='maintenance', max_attempts=3, concurrency=1,
+             every=dt.timedelta(hours=6))
+def purge_process_events_job(payload):
+    from process_events import purge_events
+    return {"purged": purge_events()}
+
+
+@job_handler('bulk_import', queue='maintenance', max_attempts=3, concurrency=2)
+def bulk_import_job(payload):
+    # Retries resume after the last committed chunk
+    from bulk_import import run_import
+    return run_import(payload["dataset"], payload["council_id"], payload["path"],
+                      key=payload.get("key", "property_id"), ref_column=payload.get("ref_column"),
+                      mapping=payload.get("mapping"))
+
+
+@job_handler('maintain_partitions', queue='maintenance', max_attempts=3, concurrency=1,
+             every=dt.timedelta(days=1))
+def maintain_partitions_job(payload):
+    from partitioning import maintain_partitions
+    return {"tables": maintain_partitions(payload.get("tables"), archive=payload.get("archive", True))}
+
+
+@job_handler('ledger_snapshots', queue='maintenance', max_attempts=3, concurrency=1,
+             every=dt.timedelta(days=1))
+def ledger_snapshots_job(payload):
+    from payments_ledger import take_snapshots
+    as_of = dt.date.fromisoformat(payload["as_of"]) if payload.get("as_of") else None
+    return {"snapshots": take_snapshots(as_of)}
+
+
+@job_handler('open_ledgers', queue='maintenance', max_attempts=1, concurrency=1)
+def open_ledgers_job(payload):
+    from payments_ledger import open_ledgers
+    return {"opened": open_ledgers(payload.get("council_id"))}
+
+
+@job_handler('backfill_instalments', queue='maintenance', max_attempts=3, concurrency=1)
+def backfill_instalments_job(payload):
+    from instalments import backfill_instalments
+    return {"created": backfill_instalments()}
+
+
+@job_handler('send_instalment_reminders', queue='maintenance', max_attempts=3, concurrency=1)
+def send_instalment_reminders_job(payload):
+    # Sent instalments are stamped per batch, so a retry only sends what's left
+    from instalments import mark_overdue, send_due_reminders
+    today = dt.date.fromisoformat(payload["today"]) if payload.get("today") else None
+    overdue = mark_overdue(today)
+    return dict(send_due_reminders(payload.get("days", 7), today=today), overdue=overdue)
+
+
+@job_handler('send_enotices', queue='maintenance', max_attempts=3, concurrency=1)
+def send_enotices_job(payload):
+    # Sent bills are recorded per batch, so a retry only sends what's left
+    from enotices import deliver_enotices
+    since = dt.date.fromisoformat(payload["since"]) if payload.get("since") else None
+    return deliver_enotices(payload.get("council_id"), since=since, concurrency=payload.get("concurrency"))
+
+
+@job_handler('purge_expired_tokens', queue='maintenance', max_attempts=3, concurrency=1,
+             every=dt.timedelta(hours=6))
+def purge_expired_tokens_job(payload):
+    from auth_tokens import purge_expired_tokens
+    return {"purged": purge_expired_tokens()}
+
+
+@job_handler('purge_rate_limit_buckets', queue='maintenance', max_attempts=3, concurrency=1,
+             every=dt.timedelta(hours=6))
+def purge_rate_limit_buckets_job(payload):
+    # Only the database backend keeps buckets outside the process; idle ones are full anyway
+    from rate_limit import limiter, DatabaseBackend
+    if not isinstance(limiter.backend, DatabaseBackend):
+        return {"purged": 0}
+    return {"purged": limiter.backend.purge(payload.get("idle_seconds", 86400))}
+
+
+@job_handler('rebuild_search', queue='maintenance', max_attempts=3, concurrency=1)
+def rebuild_search_job(payload):
+    from search import rebuild_search_documents
+    return {"documents": rebuild_search_documents()}
+
+
+@job_handler('recompute_overlays', queue='maintenance', max_attempts=3, concurrency=1)
+def recompute_overlays_job(payload):
+    # Results are upserted against what's stored, so a retry only rewrites what differs
+    from overlay_engine import recompute_overlays
+    return recompute_overlays(payload.get("council_id"), full=payload.get("full", False),
+                              processes=payload.get("processes"))
@@ -0,0 +1,294 @@
+# server/jobs.py
+"""
+Database-backed job queue. No broker: jobs are rows in the `job` table.
+
+- enqueue() is idempotent on idempotency_key.
+- Workers claim with SELECT ... FOR UPDATE SKIP LOCKED on Postgres. On SQLite a
+  guarded UPDATE is enough, since SQLite serializes writers.
+- Handlers declare max_attempts and an optional per-kind concurrency limit.
+- Failures retry with exponential backoff and end as 'dead' after max_attempts.
+- A running worker refreshes locked_at on its jobs every HEARTBEAT_INTERVAL, however
+  long they run. A job whose lock is older than LOCK_TIMEOUT lost its worker. It is
+  requeued with backoff, and that counts as an attempt: a job that keeps killing its
+  worker ends as 'dead' too. A worker that finishes a job it no longer holds records nothing.
+- Handlers declared with every=timedelta(...) are periodic. Workers enqueue them once
+  per period; the period slot is the idempotency key, so any number of workers enqueue it once.
+
+Register handlers with @job_handler (see job_handlers.py) and run `python worker.py`.
+"""
+import datetime as dt
+import logging
+import traceback
+import zlib
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Job
+
+HEARTBEAT_INTERVAL = dt.timedelta(seconds=30)
+LOCK_TIMEOUT = dt.timedelta(minutes=5)  # ten missed heartbeats
+BASE_BACKOFF_SECONDS = 10
+MAX_BACKOFF_SECONDS = 3600
+
+_handlers = {}
+
+
+class JobHandler:
+    def __init__(self, fn, kind, queue, max_attempts, concurrency, every=None):
+        self.fn = fn
+        self.kind = kind
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency  # max jobs of this kind running across all workers; None = unlimited
+        self.every = every              # timedelta: enqueued once per period with an empty payload
+
+
+def job_handler(kind, queue='default', max_attempts=5, concurrency=None, every=None):
+    """Register fn(payload) -> JSON-serializable result as the handler for `kind`."""
+    def decorator(fn):
+        _handlers[kind] = JobHandler(fn, kind, queue, max_attempts, concurrency, every)
+        return fn
+    return decorator
+
+
+def registered_handlers():
+    return dict(_handlers)
+
+
+def handler_queues():
+    """Every queue a registered handler runs on (what a worker serves by default)."""
+    return sorted({'default'} | {h.queue for h in _handlers.values()})
+
+
+# ---------- producer side ----------
+
+def enqueue(kind, payload=None, priority=0, run_at=None, idempotency_key=None,
+            queue=None, max_attempts=None, created_by=None):
+    """
+    Insert a job and commit. With an idempotency_key, a second enqueue returns the
+    existing job instead of creating a duplicate.
+    """
+    handler = _handlers.get(kind)
+    if idempotency_key:
+        existing = Job.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing:
+            return existing
+
+    job = Job(
+        kind=kind,
+        queue=queue or (handler.queue if handler else 'default'),
+        payload=payload,
+        priority=priority,
+        run_at=run_at or dt.datetime.utcnow(),
+        idempotency_key=idempotency_key,
+        max_attempts=max_attempts or (handler.max_attempts if handler else 5),
+        created_by=created_by,
+    )
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Lost a race with another producer using the same key
+        db.session.rollback()
+        return Job.query.filter_by(idempotency_key=idempotency_key).first()
+    logging.info(f"[jobs] Enqueued job {job.id} kind={kind} priority={priority}")
+    return job
+
+
+_EPOCH = dt.datetime(1970, 1, 1)
+
+
+def enqueue_periodic(now=None):
+    """Enqueue each periodic kind whose current period has no job yet. Returns the jobs enqueued."""
+    now = now or dt.datetime.utcnow()
+    enqueued = []
+    for handler in _handlers.values():
+        if not handler.every:
+            continue
+        slot = int((now - _EPOCH).total_seconds() // handler.every.total_seconds())
+        key = f"periodic:{handler.kind}:{slot}"
+        if Job.query.filter_by(idempotency_key=key).first() is None:
+            enqueued.append(enqueue(handler.kind, {}, idempotency_key=key))
+    return enqueued
+
+
+def serialize_job(job: Job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "queue": job.queue,
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_at": job.run_at.isoformat() if job.run_at else None,
+        "result": job.result,
+        "last_error": job.last_error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+# ---------- worker side ----------
+
+def _is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _saturated_kinds():
+    """Kinds whose running count has reached the handler's concurrency limit."""
+    limited = {k: h.concurrency for k, h in _handlers.items() if h.concurrency}
+    if not limited:
+        return set()
+    rows = (
+        db.session.query(Job.kind, db.func.count(Job.id))
+        .filter(Job.status == 'running', Job.kind.in_(limited))
+        .group_by(Job.kind)
+        .all()
+    )
+    return {kind for kind, n in rows if n >= limited[kind]}
+
+
+def _lock_kind(kind):
+    """Serialize claims of one limited kind for the rest of the transaction (Postgres only)."""
+    if _is_postgres():
+        db.session.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": zlib.crc32(kind.encode())})
+
+
+def claim_next(worker_id, queues=('default',)):
+    """Claim one runnable job for this worker, or return None. Commits the claim."""
+    now = dt.datetime.utcnow()
+    excluded = _saturated_kinds()
+    q = Job.query.filter(
+        Job.status == 'queued',
+        Job.queue.in_(queues),
+        Job.run_at <= now,
+    )
+    if excluded:
+        q = q.filter(Job.kind.notin_(excluded))
+    q = q.order_by(Job.priority.desc(), Job.id.asc())
+
+    if _is_postgres():
+        job = q.with_for_update(skip_locked=True).limit(1).first()
+        if job is None:
+            db.session.rollback()
+            return None
+        handler = _handlers.get(job.kind)
+        if handler and handler.concurrency:
+            _lock_kind(job.kind)
+            running = Job.query.filter_by(kind=job.kind, status='running').count()
+            if running >= handler.concurrency:
+                db.session.rollback()
+                return None
+        job.status = 'running'
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts += 1
+        db.session.commit()
+        return job
+
+    # SQLite / other: optimistic claim, the WHERE status='queued' guard makes it exclusive
+    candidate = q.with_entities(Job.id).limit(1).first()
+    if candidate is None:
+        db.session.rollback()
+        return None
+    claimed = (
+        Job.query.filter(Job.id == candidate.id, Job.status == 'queued')
+        .update({Job.status: 'running', Job.locked_by: worker_id, Job.locked_at: now,
+                 Job.attempts: Job.attempts + 1}, synchronize_session=False)
+    )
+    db.session.commit()
+    return Job.query.get(candidate.id) if claimed else None
+
+
+def _backoff(attempts):
+    return dt.timedelta(seconds=min(BASE_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0), MAX_BACKOFF_SECONDS))
+
+
+def _still_owned(job, owner):
+    """False (and logged) when the job was requeued from under this worker, e.g. after missed heartbeats."""
+    if job.status == 'running' and job.locked_by == owner:
+        return True
+    logging.warning(f"[jobs] Job {job.id} ({job.kind}) is no longer held by {owner}; not recording this run.")
+    db.session.rollback()
+    return False
+
+
+def run_job(job: Job):
+    """Execute a claimed job and record the outcome."""
+    handler = _handlers.get(job.kind)
+    job_id, owner = job.id, job.locked_by
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        result = handler.fn(job.payload or {})
+    except Exception as e:
+        db.session.rollback()
+        job = Job.query.get(job_id)
+        if not _still_owned(job, owner):
+            return False
+        job.last_error = f"{e}\n{traceback.format_exc()}"[-4000:]
+        job.locked_by = None
+        job.locked_at = None
+        if job.attempts >= job.max_attempts or handler is None:
+            job.status = 'dead'
+            job.finished_at = dt.datetime.utcnow()
+            logging.error(f"[jobs] Job {job_id} ({job.kind}) is dead after {job.attempts} attempts: {e}")
+        else:
+            job.status = 'queued'
+            job.run_at = dt.datetime.utcnow() + _backoff(job.attempts)
+            logging.warning(f"[jobs] Job {job_id} ({job.kind}) failed attempt {job.attempts}; retrying at {job.run_at}")
+        db.session.commit()
+        return False
+
+    job = Job.query.get(job_id)
+    if not _still_owned(job, owner):
+        return False
+    job.status = 'succeeded'
+    job.result = result
+    job.last_error = None
+    job.locked_by = None
+    job.locked_at = None
+    job.finished_at = dt.datetime.utcnow()
+    db.session.commit()
+    logging.info(f"[jobs] Job {job_id} ({job.kind}) succeeded.")
+    return True
+
+
+def heartbeat(worker_ids):
+    """Refresh locked_at on the jobs these workers are running. Returns the number touched."""
+    n = (
+        Job.query.filter(Job.status == 'running', Job.locked_by.in_(list(worker_ids)))
+        .update({Job.locked_at: dt.datetime.utcnow()}, synchronize_session=False)
+    )
+    db.session.commit()
+    return n
+
+
+def requeue_stale(timeout=LOCK_TIMEOUT):
+    """
+    Recover jobs whose worker stopped heartbeating. The claim already counted the
+    attempt: jobs out of attempts are marked dead, the rest requeued with backoff.
+    Returns the number recovered.
+    """
+    now = dt.datetime.utcnow()
+    q = Job.query.filter(Job.status == 'running', Job.locked_at < now - timeout)
+    if _is_postgres():
+        q = q.with_for_update(skip_locked=True)  # a heartbeat or another sweep holds it: leave it
+    stale = q.all()
+    for job in stale:
+        job.locked_by = None
+        job.locked_at = None
+        job.last_error = f"Worker stopped heartbeating during attempt {job.attempts}."
+        if job.attempts >= job.max_attempts:
+            job.status = 'dead'
+            job.finished_at = now
+        else:
+            job.status = 'queued'
+            job.run_at = now + _backoff(job.attempts)
+    db.session.commit()
+    if stale:
+        dead = sum(1 for j in stale if j.status == 'dead')
+        logging.warning(f"[jobs] Recovered {len(stale)} stale running jobs ({dead} now dead).")
+    return len(stale)
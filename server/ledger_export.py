@@ -0,0 +1,249 @@
+# server/ledger_export.py
+"""
+Streaming per-council ledger extracts for finance reconciliation.
+
+Rows come from a Core SELECT executed with stream_results / yield_per. On Postgres
+that is a server-side cursor, so only one batch of plain tuples is in memory at any
+time, whatever the council's size. No ORM objects are built. Each batch is encoded
+(CSV, NDJSON or Parquet) and optionally gzip-compressed on the fly, then handed
+to the caller as bytes. The same generator feeds the HTTP endpoint and the CLI.
+
+Tables: accounts (rates_account), bills (rates_bill), invoices (rates_invoice),
+charges (rate_charge). Each can be filtered on its date column and limited to
+selected columns. With archive=True, partitioned tables are read through their
+<table>_all view, which includes partitions moved to the archive schema (see partitioning.py).
+"""
+import csv
+import datetime as dt
+import io
+import json
+import zlib
+
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Integer, JSON, select
+
+from models import db, Property, RatesAccount, RatesBill, RatesInvoice, RateCharge
+from partitioning import SPECS as PARTITIONED, has_archive, history_table
+
+BATCH_SIZE = 5000
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _columns(model):
+    return {c.name: c for c in model.__table__.columns}
+
+
+# name -> (model, default date column, extra joined columns)
+TABLES = {
+    'accounts': (RatesAccount, 'created_at', {'address': Property.address}),
+    'bills': (RatesBill, 'bill_date', {'account_number': RatesAccount.account_number, 'address': Property.address}),
+    'invoices': (RatesInvoice, 'issue_date', {'property_id': RatesAccount.property_id, 'address': Property.address}),
+    'charges': (RateCharge, 'period_start', {'account_number': RatesAccount.account_number, 'address': Property.address}),
+}
+
+
+def available_columns(table):
+    model, _, extra = TABLES[table]
+    return list(_columns(model)) + [c for c in extra if c not in _columns(model)]
+
+
+def _source(model, archive):
+    if not archive or model.__tablename__ not in PARTITIONED:
+        return model.__table__
+    if not has_archive(model.__tablename__):
+        raise ExportError(f"{model.__tablename__} has no archive yet")
+    return history_table(model)
+
+
+def build_query(council_id, table, columns=None, date_from=None, date_to=None, date_column=None, archive=False):
+    """Core SELECT for one table of one council, ordered by primary key. Returns (stmt, names, columns)."""
+    if table not in TABLES:
+        raise ExportError(f"Unknown table '{table}'; expected one of {', '.join(TABLES)}")
+    model, default_date, extra = TABLES[table]
+    src = _source(model, archive)
+    own = {c.name: c for c in src.columns}
+    all_cols = dict(own, **{k: v for k, v in extra.items() if k not in own})
+    names = columns or list(all_cols)
+    unknown = [n for n in names if n not in all_cols]
+    if unknown:
+        raise ExportError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+    cols = [all_cols[n] for n in names]
+
+    date_name = date_column or default_date
+    date_col = own.get(date_name)
+    if date_col is None or not isinstance(date_col.type, (Date, DateTime)):
+        raise ExportError(f"{table} can't be filtered on '{date_name}'")
+
+    stmt = select(*[c.label(n) for n, c in zip(names, cols)])
+    if model is RatesInvoice:
+        stmt = (stmt.select_from(src)
+                .join(RatesAccount, RatesAccount.id == src.c.account_id)
+                .join(Property, Property.id == RatesAccount.property_id))
+    elif model is RatesAccount:
+        stmt = stmt.select_from(src).join(Property, Property.id == src.c.property_id)
+    else:
+        stmt = (stmt.select_from(src)
+                .join(Property, Property.id == src.c.property_id)
+                .outerjoin(RatesAccount, RatesAccount.property_id == src.c.property_id))
+    stmt = stmt.where(Property.council_id == council_id)
+    if date_from:
+        stmt = stmt.where(date_col >= date_from)
+    if date_to:
+        # inclusive end date, also for datetime columns
+        stmt = stmt.where(date_col < date_to + dt.timedelta(days=1)) if isinstance(date_col.type, DateTime) \
+            else stmt.where(date_col <= date_to)
+    return stmt.order_by(src.c.id), names, cols
+
+
+def iter_batches(stmt, batch_size=BATCH_SIZE):
+    """Lists of row tuples, fetched through a server-side cursor on its own connection."""
+    with db.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        for partition in result.partitions():
+            yield [tuple(r) for r in partition]
+
+
+# ---------- encoders ----------
+
+def _cell(v):
+    if v is None:
+        return ''
+    if isinstance(v, (dt.date, dt.datetime)):
+        return v.isoformat()
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, separators=(',', ':'))
+    return v
+
+
+def _json_default(v):
+    if isinstance(v, (dt.date, dt.datetime)):
+        return v.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(v).__name__}")
+
+
+def encode_csv(names, batches):
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(names)
+    for rows in batches:
+        w.writerows([[_cell(v) for v in r] for r in rows])
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def encode_ndjson(names, batches):
+    for rows in batches:
+        yield ''.join(
+            json.dumps(dict(zip(names, r)), default=_json_default, separators=(',', ':')) + '\n' for r in rows
+        ).encode()
+
+
+def _arrow_type(pa, col):
+    t = col.type
+    if isinstance(t, (BigInteger, Integer)):
+        return pa.int64()
+    if isinstance(t, Boolean):
+        return pa.bool_()
+    if isinstance(t, DateTime):
+        return pa.timestamp('us')
+    if isinstance(t, Date):
+        return pa.date32()
+    return pa.string()
+
+
+class _Sink:
+    """Write-only file object whose contents are drained after each row group."""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        out, self.parts = b''.join(self.parts), []
+        return out
+
+
+def encode_parquet(names, batches, cols):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow).")
+    schema = pa.schema([(n, _arrow_type(pa, c)) for n, c in zip(names, cols)])
+    json_cols = {i for i, c in enumerate(cols) if isinstance(c.type, JSON)}
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    for rows in batches:
+        arrays = []
+        for i, n in enumerate(names):
+            values = [r[i] for r in rows]
+            if i in json_cols:
+                values = [None if v is None else json.dumps(v, separators=(',', ':')) for v in values]
+            arrays.append(pa.array(values, type=schema.field(n).type))
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))  # one row group per batch
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(chunks, level=6):
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def export_stream(council_id, table, fmt='csv', columns=None, date_from=None, date_to=None,
+                  date_column=None, compress=False, batch_size=BATCH_SIZE, archive=False):
+    """
+    Validate the request and return a generator of bytes. Validation happens before
+    the first chunk, so callers can turn ExportError into a 400.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format '{fmt}'; expected one of {', '.join(FORMATS)}")
+    stmt, names, cols = build_query(council_id, table, columns, date_from, date_to, date_column, archive)
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401  (fail before streaming starts)
+        except ImportError:
+            raise ExportError("Parquet export needs pyarrow (pip install pyarrow).")
+
+    def generate():
+        batches = iter_batches(stmt, batch_size)
+        if fmt == 'csv':
+            chunks = encode_csv(names, batches)
+        elif fmt == 'ndjson':
+            chunks = encode_ndjson(names, batches)
+        else:
+            # Parquet is already compressed per column; gzip on top would only cost CPU
+            return encode_parquet(names, batches, cols)
+        return gzip_stream(chunks) if compress else chunks
+
+    return generate()
+
+
+def export_filename(council_id, table, fmt, compress):
+    suffix = '.gz' if compress and fmt != 'parquet' else ''
+    return f"council-{council_id}-{table}.{fmt}{suffix}"
@@ -0,0 +1,159 @@
+# server/mailer.py
+"""
+Outbound email over a small pool of persistent SMTP connections.
+
+Opening an SMTP session (TCP connect, EHLO, STARTTLS, AUTH) costs far more than
+sending one message. Batch senders therefore check a connection out of the pool,
+send many messages on it, and hand it back. Broken or idle-timed-out connections
+are replaced transparently: a send that fails with a disconnect is retried once on
+a fresh connection.
+
+Configuration (env):
+    SMTP_HOST (localhost), SMTP_PORT (25), SMTP_USER, SMTP_PASSWORD,
+    SMTP_STARTTLS (0/1), SMTP_SSL (0/1), SMTP_TIMEOUT (30), SMTP_POOL_SIZE (4),
+    MAIL_FROM (no-reply@localhost)
+
+For local runs point SMTP_HOST/SMTP_PORT at scripts/smtp_sink.py.
+"""
+import logging
+import os
+import queue
+import smtplib
+import threading
+from contextlib import contextmanager
+from email.message import EmailMessage
+
+
+def is_broken(exc):
+    """True if `exc` means the connection is unusable (as opposed to a per-message refusal)."""
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+def build_message(to, subject, body, sender=None, html=None):
+    msg = EmailMessage()
+    msg['From'] = sender or os.getenv('MAIL_FROM', 'no-reply@localhost')
+    msg['To'] = to
+    msg['Subject'] = subject
+    msg.set_content(body)
+    if html:
+        msg.add_alternative(html, subtype='html')
+    return msg
+
+
+class SMTPPool:
+    def __init__(self, host='localhost', port=25, username=None, password=None, starttls=False,
+                 use_ssl=False, timeout=30, size=4):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    @classmethod
+    def from_env(cls, size=None):
+        return cls(
+            host=os.getenv('SMTP_HOST', 'localhost'),
+            port=int(os.getenv('SMTP_PORT', '25')),
+            username=os.getenv('SMTP_USER') or None,
+            password=os.getenv('SMTP_PASSWORD') or None,
+            starttls=os.getenv('SMTP_STARTTLS') == '1',
+            use_ssl=os.getenv('SMTP_SSL') == '1',
+            timeout=float(os.getenv('SMTP_TIMEOUT', '30')),
+            size=size or int(os.getenv('SMTP_POOL_SIZE', '4')),
+        )
+
+    def _handshake(self, conn):
+        conn.ehlo()
+        if self.starttls and not self.use_ssl:
+            conn.starttls()
+            conn.ehlo()
+        if self.username:
+            conn.login(self.username, self.password or '')
+        self.opened += 1
+
+    def _open(self):
+        cls = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        conn = cls(self.host, self.port, timeout=self.timeout)
+        self._handshake(conn)
+        return conn
+
+    def reconnect(self, conn):
+        """Re-open a checked-out connection in place after it broke."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        conn.connect(self.host, self.port)
+        self._handshake(conn)
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def connection(self):
+        """Check out a live connection; at most `size` are in use at once."""
+        self._slots.acquire()
+        conn = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+            yield conn
+        except Exception as e:
+            if conn is not None and is_broken(e):
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put(conn)
+            self._slots.release()
+
+    def send(self, msg, conn=None):
+        """Send one message, on `conn` if given. Retries once on a dropped connection."""
+        if conn is not None:
+            try:
+                return conn.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # Idle timeout on the server side: reconnect the same object and try once more
+                self.reconnect(conn)
+                return conn.send_message(msg)
+        with self.connection() as c:
+            return self.send(msg, c)
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide pool configured from the environment."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPPool.from_env()
+            logging.info(f"[mail] SMTP pool -> {_pool.host}:{_pool.port} (size {_pool.size})")
+        return _pool
@@ -1,6 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import DDL, event, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.schema import CreateColumn
 import datetime
+import logging
+
+from geo import geojson_bbox
 
 db = SQLAlchemy()
 
@@ -15,6 +20,8 @@ class Resident(db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    # Council staff: may use the /admin routes (granted with scripts/grant_admin.py)
+    is_admin = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
     # Relationships
     processes = db.relationship('Process', backref='resident', lazy=True)
@@ -47,7 +54,7 @@ class Process(db.Model):
     form_data = db.Column(JSONB)
     status = db.Column(db.String(50), default='pending', nullable=False)
     submitted_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, nullable=False, index=True)
 
     def __repr__(self):
         return f'<Process {self.title}>'
@@ -84,12 +91,19 @@ class Property(db.Model):
     property_type = db.Column(db.String(50), nullable=False, default='investment')  # 'primary' | 'investment'
     gps_coordinates = db.Column(JSONB, nullable=True)  # {"lat": ..., "lon": ...}
     shape_file_data = db.Column(db.Text, nullable=True)  # GeoJSON as text
+    # Parcel bounding box, materialized from shape_file_data on write (vector tile lookups)
+    min_lon = db.Column(db.Float, nullable=True)
+    min_lat = db.Column(db.Float, nullable=True)
+    max_lon = db.Column(db.Float, nullable=True)
+    max_lat = db.Column(db.Float, nullable=True)
+    # Set when the parcel changes; cleared once overlay_engine has re-derived its overlays
+    overlays_stale = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
     land_size_sqm = db.Column(db.Float, nullable=True)
     property_value = db.Column(db.Float, nullable=True)
     land_value = db.Column(db.Float, nullable=True)
     zone = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)  # delta sync
 
     # Existing relationships
     water_consumptions = db.relationship('WaterConsumption', backref='property', lazy=True)
@@ -105,10 +119,26 @@ class Property(db.Model):
     overlays = db.relationship('PropertyOverlay', backref='property', lazy=True)                      # 1‑to‑many
     billing_setting = db.relationship('BillingSetting', backref='property', uselist=False, lazy=True) # 1‑to‑1
 
+    __table_args__ = (
+        db.Index('ix_property_bbox', 'min_lat', 'min_lon'),
+        db.Index('ix_property_overlays_stale', 'id',
+                 postgresql_where=text('overlays_stale'), sqlite_where=text('overlays_stale')),
+    )
+
     def __repr__(self):
         return f'<Property {self.address}>'
 
 
+@db.event.listens_for(Property, 'before_insert')
+@db.event.listens_for(Property, 'before_update')
+def _materialize_parcel_bbox(mapper, connection, target):
+    if not inspect(target).attrs.shape_file_data.history.has_changes():
+        return
+    bbox = geojson_bbox(target.shape_file_data)
+    target.min_lon, target.min_lat, target.max_lon, target.max_lat = bbox or (None, None, None, None)
+    target.overlays_stale = True
+
+
 class WaterConsumption(db.Model):
     __tablename__ = 'water_consumption'
     id = db.Column(db.Integer, primary_key=True)
@@ -119,7 +149,7 @@ class WaterConsumption(db.Model):
     amount_owing = db.Column(db.Float, nullable=True)
     bill_due_date = db.Column(db.Date, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)  # delta sync
 
     def __repr__(self):
         q = 1 + (self.quarter_start_date.month - 1) // 3 if self.quarter_start_date else '?'
@@ -144,6 +174,12 @@ class Animal(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        # /animals listing: WHERE status = ? [AND council_id/type = ?] ORDER BY id
+        db.Index('ix_animal_status_id', 'status', 'id'),
+        db.Index('ix_animal_status_council_type', 'status', 'council_id', 'type'),
+    )
+
     def __repr__(self):
         return f'<Animal {self.name} ({self.type})>'
 
@@ -165,6 +201,44 @@ class WasteCollection(db.Model):
         return f'<WasteCollection {self.collection_type} Council {self.council_id}>'
 
 
+class PublicHoliday(db.Model):
+    """Local calendar used by the waste schedule engine to shift collections off holidays."""
+    __tablename__ = 'public_holiday'
+    id = db.Column(db.Integer, primary_key=True)
+    council_id = db.Column(db.Integer, db.ForeignKey('council.id'), nullable=True, index=True)  # NULL = applies to every council
+    holiday_date = db.Column(db.Date, nullable=False, index=True)
+    name = db.Column(db.String(200), nullable=False)
+    shift_days = db.Column(db.Integer, nullable=False, default=1)  # collections on this day move forward N days
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('council_id', 'holiday_date', name='uq_public_holiday_council_date'),
+    )
+
+    def __repr__(self):
+        return f'<PublicHoliday {self.holiday_date} {self.name}>'
+
+
+class PropertyWasteRoute(db.Model):
+    """Precomputed property -> serving waste route (see waste_routes.assign_routes_for_council)."""
+    __tablename__ = 'property_waste_route'
+    id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id', ondelete='CASCADE'), nullable=False, index=True)
+    waste_collection_id = db.Column(db.Integer, db.ForeignKey('waste_collection.id', ondelete='CASCADE'), nullable=False)
+    distance_m = db.Column(db.Float, nullable=True)  # 0 inside a service area, NULL for council-wide streams
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('property_id', 'waste_collection_id', name='uq_property_waste_route'),
+    )
+
+    def __repr__(self):
+        return f'<PropertyWasteRoute prop={self.property_id} route={self.waste_collection_id}>'
+
+
 class DevelopmentApplication(db.Model):
     __tablename__ = 'development_application'
     id = db.Column(db.Integer, primary_key=True)
@@ -179,13 +253,31 @@ class DevelopmentApplication(db.Model):
     description = db.Column(db.Text, nullable=True)
     documents_url = db.Column(JSONB, nullable=True)  # array of URLs
     gps_coordinates = db.Column(JSONB, nullable=True)
+    # Materialized from gps_coordinates on write, so radius searches can use a btree
+    lat = db.Column(db.Float, nullable=True)
+    lon = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)  # delta sync
+
+    __table_args__ = (
+        db.Index('ix_development_application_lat_lon', 'lat', 'lon'),
+    )
 
     def __repr__(self):
         return f'<DevelopmentApplication {self.application_type} - {self.status}>'
 
 
+@db.event.listens_for(DevelopmentApplication, 'before_insert')
+@db.event.listens_for(DevelopmentApplication, 'before_update')
+def _materialize_da_coordinates(mapper, connection, target):
+    coords = target.gps_coordinates if isinstance(target.gps_coordinates, dict) else {}
+    try:
+        target.lat = float(coords.get('lat', coords.get('latitude')))
+        target.lon = float(coords.get('lon', coords.get('lng', coords.get('longitude'))))
+    except (TypeError, ValueError):
+        target.lat = target.lon = None
+
+
 # =========================
 # NEW: Rates Domain Models
 # =========================
@@ -199,7 +291,7 @@ class RatesAccount(db.Model):
     # Core balances & schedules
     balance_cents = db.Column(db.BigInteger, nullable=False, default=0)
     next_due_date = db.Column(db.Date, nullable=True)
-    instalment_plan = db.Column(JSONB, nullable=True)  # [{seq, due_date, amount_cents}, ...]
+    instalment_plan = db.Column(JSONB, nullable=True)  # legacy [{seq, due_date, amount}]; superseded by Instalment
 
     # Concessions / settings / overlays / links
     concessions = db.Column(JSONB, nullable=True)       # {"pensioner": true, ...}
@@ -212,7 +304,9 @@ class RatesAccount(db.Model):
     contact_links = db.Column(JSONB, nullable=True)     # {"apply_concession": "...", ...}
 
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)  # delta sync
+
+    instalments = db.relationship('Instalment', backref='account', lazy=True, order_by='Instalment.seq')
 
     # NEW: invoices relationship (for new endpoint/logic)
     invoices = db.relationship(
@@ -239,7 +333,7 @@ class RatesBill(db.Model):
     pdf_url = db.Column(db.String(500), nullable=True)
 
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)  # delta sync
 
     __table_args__ = (
         db.Index('ix_rates_bill_prop_date_desc', 'property_id', 'bill_date'),
@@ -263,12 +357,36 @@ class RatesInvoice(db.Model):
     payment_method_suggested = db.Column(db.String(32), nullable=True)  # 'direct_debit','bpay','card'
 
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)  # delta sync
 
     def __repr__(self):
         return f'<RatesInvoice account_id={self.account_id} amount_cents={self.amount_cents} status={self.status}>'
 
 
+class Instalment(db.Model):
+    """One instalment of an account's payment schedule (see instalments.py)."""
+    __tablename__ = 'instalment'
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('rates_account.id'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    amount_cents = db.Column(db.BigInteger, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='due')  # due | paid | overdue | cancelled
+    reminder_sent_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('account_id', 'seq', name='uq_instalment_account_seq'),
+        # Reminder sweep: WHERE status='due' AND due_date BETWEEN ... ORDER BY due_date, id
+        db.Index('ix_instalment_status_due', 'status', 'due_date', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<Instalment account={self.account_id} #{self.seq} {self.due_date} {self.amount_cents}>'
+
+
 class Valuation(db.Model):
     __tablename__ = 'valuation'
     id = db.Column(db.Integer, primary_key=True)
@@ -305,6 +423,25 @@ class RateCharge(db.Model):
         return f'<RateCharge prop={self.property_id} {self.category} {self.amount_cents}>'
 
 
+class RatingParameters(db.Model):
+    """Per-council rating parameters for a financial year (see rating_engine.py for the schema)."""
+    __tablename__ = 'rating_parameters'
+    id = db.Column(db.Integer, primary_key=True)
+    council_id = db.Column(db.Integer, db.ForeignKey('council.id'), nullable=False)
+    financial_year = db.Column(db.Integer, nullable=False)  # year the period starts, e.g. 2026 for 2026-27
+    params = db.Column(JSONB, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('council_id', 'financial_year', name='uq_rating_parameters_council_year'),
+    )
+
+    def __repr__(self):
+        return f'<RatingParameters council={self.council_id} fy={self.financial_year}>'
+
+
 class WasteEntitlement(db.Model):
     __tablename__ = 'waste_entitlement'
     id = db.Column(db.Integer, primary_key=True)
@@ -343,10 +480,17 @@ class PropertyOverlay(db.Model):
     kind = db.Column(db.String(50), nullable=False)   # 'flood','bushfire','heritage', ...
     source = db.Column(db.String(200), nullable=True)
     note = db.Column(db.Text, nullable=True)
+    # Derived from an overlay layer by overlay_engine, which owns these rows; hand-entered rows are never touched
+    derived = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('uq_property_overlay_derived', 'property_id', 'kind', 'source', unique=True,
+                 postgresql_where=text('derived'), sqlite_where=text('derived')),
+    )
+
     def __repr__(self):
         return f'<PropertyOverlay prop={self.property_id} {self.kind}>'
 
@@ -380,3 +524,346 @@ class CouncilContact(db.Model):
 
     def __repr__(self):
         return f'<CouncilContact council={self.council_id}>'
+
+
+class NoticeDelivery(db.Model):
+    """Email delivery of one bill's rates notice (see enotices.py)."""
+    __tablename__ = 'notice_delivery'
+    id = db.Column(db.Integer, primary_key=True)
+    # No FK: rates_bill may be partitioned, and its primary key is then (id, bill_date)
+    bill_id = db.Column(db.Integer, nullable=False, unique=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'), nullable=False, index=True)
+    email = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='sent')  # sent | failed | bounced | skipped
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(500), nullable=True)
+    notice_hash = db.Column(db.String(64), nullable=True)  # the notice PDF that was attached
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f'<NoticeDelivery bill={self.bill_id} {self.status} attempts={self.attempts}>'
+
+
+# =========================
+# Auth tokens
+# =========================
+
+class RefreshToken(db.Model):
+    """
+    One rotating refresh token (see auth_tokens.py). Only a hash of the token is stored.
+    Every token descends from a login through family_id; reuse of a rotated token
+    revokes the whole family.
+    """
+    __tablename__ = 'refresh_token'
+    id = db.Column(db.Integer, primary_key=True)
+    resident_id = db.Column(db.Integer, db.ForeignKey('resident.id'), nullable=False, index=True)
+    family_id = db.Column(db.String(32), nullable=False, index=True)
+    token_hash = db.Column(db.String(64), nullable=False, unique=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    used_at = db.Column(db.DateTime, nullable=True)      # set when rotated
+    revoked_at = db.Column(db.DateTime, nullable=True)
+    # The access token issued alongside, so revoking the family can deny it too
+    access_jti = db.Column(db.String(32), nullable=True)
+    access_expires_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RefreshToken resident={self.resident_id} family={self.family_id}>'
+
+
+class RevokedToken(db.Model):
+    """jti deny list for access tokens. Rows can be purged once expires_at has passed."""
+    __tablename__ = 'revoked_token'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)  # sync cursor
+    jti = db.Column(db.String(32), nullable=False, unique=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    reason = db.Column(db.String(50), nullable=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti} until {self.expires_at}>'
+
+
+# =========================
+# Payments ledger
+# =========================
+
+class LedgerEntry(db.Model):
+    """
+    Append-only money movements on a rates account (see payments_ledger.py). Positive
+    amounts increase what is owed (charges), negative ones reduce it (payments). Mistakes
+    are corrected with a reversal entry, never by editing a row.
+    """
+    __tablename__ = 'ledger_entry'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('rates_account.id'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)                 # 1, 2, 3 ... per account, in posting order
+    entry_type = db.Column(db.String(20), nullable=False)       # charge | payment | adjustment | reversal
+    amount_cents = db.Column(db.BigInteger, nullable=False)
+    effective_date = db.Column(db.Date, nullable=False)         # date the money moved (may precede posting)
+    reference = db.Column(db.String(100), nullable=True)        # external ref (receipt, BPAY CRN); idempotency key
+    method = db.Column(db.String(30), nullable=True)            # payments: 'bpay','card','direct_debit',...
+    description = db.Column(db.String(255), nullable=True)
+    reverses_id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), db.ForeignKey('ledger_entry.id'),
+                            nullable=True, unique=True)
+    posted_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('account_id', 'seq', name='uq_ledger_entry_account_seq'),
+        db.UniqueConstraint('account_id', 'reference', name='uq_ledger_entry_account_reference'),
+        db.Index('ix_ledger_entry_account_date', 'account_id', 'effective_date'),
+    )
+
+    def __repr__(self):
+        return f'<LedgerEntry {self.account_id}#{self.seq} {self.entry_type} {self.amount_cents}>'
+
+
+# Enforce append-only in the database too, not only through the ORM
+event.listen(LedgerEntry.__table__, 'after_create', DDL("""
+    CREATE OR REPLACE FUNCTION ledger_entry_append_only() RETURNS trigger AS $$
+    BEGIN
+        RAISE EXCEPTION 'ledger_entry is append-only; post a reversal instead';
+    END $$ LANGUAGE plpgsql;
+    CREATE TRIGGER ledger_entry_append_only BEFORE UPDATE OR DELETE ON ledger_entry
+        FOR EACH ROW EXECUTE FUNCTION ledger_entry_append_only();
+""").execute_if(dialect='postgresql'))
+
+
+class LedgerSnapshot(db.Model):
+    """
+    Balance of an account at the end of as_of_date, counting every entry up to through_seq.
+    Balances and statements start from the latest snapshot instead of the first entry.
+    """
+    __tablename__ = 'ledger_snapshot'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('rates_account.id'), nullable=False)
+    as_of_date = db.Column(db.Date, nullable=False)
+    through_seq = db.Column(db.Integer, nullable=False)
+    balance_cents = db.Column(db.BigInteger, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_ledger_snapshot_account_date', 'account_id', 'as_of_date'),
+    )
+
+    def __repr__(self):
+        return f'<LedgerSnapshot {self.account_id} {self.as_of_date} {self.balance_cents}>'
+
+
+# =========================
+# Background jobs
+# =========================
+
+# JSONB on Postgres, plain JSON elsewhere, so the queue also runs against SQLite in dev
+PortableJSON = db.JSON().with_variant(JSONB, 'postgresql')
+
+
+class Job(db.Model):
+    __tablename__ = 'job'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    kind = db.Column(db.String(100), nullable=False)          # handler name, e.g. 'assign_waste_routes'
+    queue = db.Column(db.String(50), nullable=False, default='default')
+    payload = db.Column(PortableJSON, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued | running | succeeded | failed | dead
+    priority = db.Column(db.Integer, nullable=False, default=0)          # higher runs first
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    idempotency_key = db.Column(db.String(200), nullable=True, unique=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('resident.id'), nullable=True)
+
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    result = db.Column(PortableJSON, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Claim query: WHERE status='queued' AND queue IN (...) AND run_at <= now ORDER BY priority DESC, id
+        db.Index('ix_job_claim', 'status', 'queue', 'priority', 'run_at'),
+        db.Index('ix_job_kind_status', 'kind', 'status'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+
+class ImportRun(db.Model):
+    """Progress of one bulk file import (see bulk_import.py). Updated in the same transaction as each chunk."""
+    __tablename__ = 'import_run'
+    id = db.Column(db.Integer, primary_key=True)
+    dataset = db.Column(db.String(30), nullable=False)             # valuations | water | charges
+    council_id = db.Column(db.Integer, db.ForeignKey('council.id'), nullable=False)
+    source = db.Column(db.String(500), nullable=False)
+    source_fingerprint = db.Column(db.String(64), nullable=False)  # size/mtime/head hash: resume only the same file
+    options = db.Column(PortableJSON, nullable=True)                # key, column mapping, chunk size
+    status = db.Column(db.String(20), nullable=False, default='running')  # running | completed | failed
+    chunks_done = db.Column(db.Integer, nullable=False, default=0)
+    rows_read = db.Column(db.BigInteger, nullable=False, default=0)
+    rows_written = db.Column(db.BigInteger, nullable=False, default=0)
+    rows_rejected = db.Column(db.BigInteger, nullable=False, default=0)
+    error_report = db.Column(db.String(500), nullable=True)        # CSV of rejected rows, per chunk
+    last_error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_import_run_resume', 'dataset', 'council_id', 'source_fingerprint', 'status'),
+    )
+
+    def __repr__(self):
+        return f'<ImportRun {self.id} {self.dataset} {self.status}>'
+
+
+# =========================
+# Change tracking
+# =========================
+
+class SyncTombstone(db.Model):
+    """Deleted rows, kept so /dashboard/changes can report deletes (see delta_sync.py)."""
+    __tablename__ = 'sync_tombstone'
+    id = db.Column(db.Integer, primary_key=True)
+    resident_id = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String(50), nullable=False)   # table name of the deleted row
+    entity_id = db.Column(db.Integer, nullable=False)
+    property_id = db.Column(db.Integer, nullable=True)  # parent property for child rows (readings, bills, ...)
+    category = db.Column(db.String(50), nullable=True)  # Process.category for processes
+    deleted_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_sync_tombstone_resident_deleted', 'resident_id', 'deleted_at'),
+    )
+
+    def __repr__(self):
+        return f'<SyncTombstone {self.entity}:{self.entity_id}>'
+
+
+class ProcessEvent(db.Model):
+    """Process status changes, replayed to SSE clients that reconnect with Last-Event-ID (see process_events.py)."""
+    __tablename__ = 'process_event'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    resident_id = db.Column(db.Integer, nullable=False)
+    process_id = db.Column(db.Integer, nullable=False)
+    data = db.Column(PortableJSON, nullable=False)  # the event payload as sent to clients
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_process_event_resident_id', 'resident_id', 'id'),
+        db.Index('ix_process_event_resident_created', 'resident_id', 'created_at'),  # stream cursors
+    )
+
+    def __repr__(self):
+        return f'<ProcessEvent {self.id} process={self.process_id}>'
+
+
+# =========================
+# Hazard overlay layers
+# =========================
+
+class OverlayFeature(db.Model):
+    """One polygon of a council overlay layer (flood, bushfire, heritage, ...); see overlay_engine.py."""
+    __tablename__ = 'overlay_feature'
+    id = db.Column(db.Integer, primary_key=True)
+    council_id = db.Column(db.Integer, db.ForeignKey('council.id'), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)          # PropertyOverlay.kind of the parcels it covers
+    source = db.Column(db.String(200), nullable=False)       # layer name, e.g. 'Flood Planning Area 2024'
+    feature_key = db.Column(db.String(200), nullable=False)  # stable id within the layer
+    note = db.Column(db.Text, nullable=True)
+    geometry = db.Column(JSONB, nullable=False)              # GeoJSON Polygon / MultiPolygon
+    geometry_hash = db.Column(db.String(64), nullable=False)
+    min_lon = db.Column(db.Float, nullable=False)
+    min_lat = db.Column(db.Float, nullable=False)
+    max_lon = db.Column(db.Float, nullable=False)
+    max_lat = db.Column(db.Float, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('council_id', 'source', 'feature_key', name='uq_overlay_feature_key'),
+    )
+
+    def __repr__(self):
+        return f'<OverlayFeature {self.kind} {self.source}:{self.feature_key}>'
+
+
+class OverlayChange(db.Model):
+    """Area where a layer load added, changed or removed features; consumed by the next overlay recompute."""
+    __tablename__ = 'overlay_change'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    council_id = db.Column(db.Integer, nullable=False)
+    min_lon = db.Column(db.Float, nullable=False)
+    min_lat = db.Column(db.Float, nullable=False)
+    max_lon = db.Column(db.Float, nullable=False)
+    max_lat = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<OverlayChange council={self.council_id} #{self.id}>'
+
+
+# =========================
+# Search
+# =========================
+
+class SearchDocument(db.Model):
+    """
+    One searchable row per policy, process and development application, kept in step
+    by the session listeners in search.py. resident_id is NULL for public documents.
+    """
+    __tablename__ = 'search_document'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    doc_type = db.Column(db.String(20), nullable=False)  # policy | process | development
+    doc_id = db.Column(db.Integer, nullable=False)
+    resident_id = db.Column(db.Integer, nullable=True)
+    category = db.Column(db.String(100), nullable=True)
+    status = db.Column(db.String(50), nullable=True)
+    title = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=True)
+    url = db.Column(db.String(500), nullable=True)
+    # Weighted title (A), category (B), body (C); the in-process index is used off Postgres
+    search_vector = db.Column(TSVECTOR().with_variant(db.Text, 'sqlite'), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('doc_type', 'doc_id', name='uq_search_document_doc'),
+        db.Index('ix_search_document_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_search_document_resident', 'resident_id', 'doc_type'),
+    )
+
+    def __repr__(self):
+        return f'<SearchDocument {self.doc_type}:{self.doc_id}>'
+
+
+# =========================
+# Schema sync
+# =========================
+
+def sync_schema(engine):
+    """
+    db.create_all() only creates missing tables. Add columns and indexes that were
+    declared on tables which already exist, so new fields ship without a manual ALTER.
+    New NOT NULL columns must carry a server_default for this to work on populated tables.
+    """
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c['name'] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name not in existing:
+                    ddl = CreateColumn(col).compile(dialect=engine.dialect)
+                    logging.info(f"[schema] Adding column {table.name}.{col.name}")
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+            for idx in table.indexes:
+                idx.create(conn, checkfirst=True)
@@ -0,0 +1,278 @@
+# server/notices.py
+"""
+Rates notice PDF rendering.
+
+- Inputs for a RatesBill come from the bill, its account's invoice line items (or
+  the period's RateCharge rows), the property/council, and the latest Valuation.
+  They are gathered in bulk with one query per table, never one per bill.
+- Output is content-addressed: <NOTICE_STORE_DIR>/ab/cd/<sha256>.pdf. The hash
+  covers the inputs and TEMPLATE_VERSION, so an unchanged bill is never re-rendered
+  and a changed one gets a new file (and a new ETag).
+- The layout is compiled once per process into PDF operator fragments, so rendering
+  only formats values into them. The writer is small and emits plain PDF 1.4 with
+  the built-in Helvetica font, so no PDF library is needed.
+- Batch runs render in a process pool. Workers write files themselves, so only
+  hashes cross the process boundary.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from sqlalchemy.orm import joinedload
+
+from models import (
+    db, Property, RatesAccount, RatesBill, RatesInvoice, RateCharge, Valuation,
+)
+
+TEMPLATE_VERSION = 1
+NOTICE_STORE_DIR = os.getenv(
+    'NOTICE_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'var', 'notices')
+)
+
+PAGE_W, PAGE_H = 595, 842  # A4 in points
+MAX_LINE_ITEMS = 24
+
+
+def _money(cents):
+    if cents is None:
+        return '-'
+    return f"${int(cents) / 100:,.2f}"
+
+
+# ---------- input gathering ----------
+
+def gather_notice_inputs(bill_ids):
+    """{bill_id: inputs dict} for the given RatesBill ids. Plain data, safe to pickle."""
+    if not bill_ids:
+        return {}
+    bills = (
+        RatesBill.query.filter(RatesBill.id.in_(bill_ids))
+        .options(joinedload(RatesBill.property).joinedload(Property.council_obj))
+        .all()
+    )
+    prop_ids = {b.property_id for b in bills}
+    accounts = {a.property_id: a for a in RatesAccount.query.filter(RatesAccount.property_id.in_(prop_ids)).all()}
+    account_ids = [a.id for a in accounts.values()]
+    bill_dates = {b.bill_date for b in bills}
+
+    invoices = {}
+    if account_ids:
+        for inv in RatesInvoice.query.filter(RatesInvoice.account_id.in_(account_ids),
+                                             RatesInvoice.issue_date.in_(bill_dates)).all():
+            invoices[(inv.account_id, inv.issue_date)] = inv
+
+    charges = {}
+    for c in RateCharge.query.filter(RateCharge.property_id.in_(prop_ids)).order_by(RateCharge.id).all():
+        charges.setdefault(c.property_id, []).append(c)
+
+    valuations = {}
+    for v in Valuation.query.filter(Valuation.property_id.in_(prop_ids)).order_by(Valuation.year.desc()).all():
+        valuations.setdefault(v.property_id, v)  # first seen = latest year
+
+    out = {}
+    for b in bills:
+        prop = b.property
+        council = prop.council_obj if prop else None
+        acc = accounts.get(b.property_id)
+        inv = invoices.get((acc.id, b.bill_date)) if acc else None
+        if inv and inv.line_items:
+            items = [{"label": li.get("label"), "amount_cents": li.get("amount_cents")} for li in inv.line_items]
+        else:
+            items = [
+                {"label": c.description or c.category, "amount_cents": c.amount_cents}
+                for c in charges.get(b.property_id, [])
+                if (c.period_start is None or c.period_start <= b.bill_date)
+                and (c.period_end is None or b.bill_date <= c.period_end)
+            ]
+        val = valuations.get(b.property_id)
+        out[b.id] = {
+            "bill_id": b.id,
+            "council_name": council.name if council else "",
+            "account_number": acc.account_number if acc else "",
+            "address": prop.address if prop else "",
+            "bill_date": b.bill_date.isoformat() if b.bill_date else None,
+            "due_date": inv.due_date.isoformat() if inv and inv.due_date else (
+                acc.next_due_date.isoformat() if acc and acc.next_due_date else None),
+            "amount_cents": b.amount_cents,
+            "payment_status": b.payment_status,
+            "line_items": items,
+            "valuation": {
+                "year": val.year,
+                "land_value_cents": val.land_value_cents,
+                "capital_value_cents": val.capital_value_cents,
+            } if val else None,
+        }
+    return out
+
+
+def notice_hash(inputs):
+    canonical = json.dumps({"v": TEMPLATE_VERSION, "inputs": inputs}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def notice_path(digest, store_dir=None):
+    base = store_dir or NOTICE_STORE_DIR
+    return os.path.join(base, digest[:2], digest[2:4], f"{digest}.pdf")
+
+
+# ---------- template ----------
+
+def _pdf_text(s):
+    s = str(s if s is not None else '')
+    s = s.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return s.encode('latin-1', 'replace').decode('latin-1')
+
+
+@lru_cache(maxsize=None)
+def compiled_template():
+    """
+    Layout compiled to (prefix, field) pairs. prefix holds the positioning operators,
+    field is the key/format applied at render time. Built once per process.
+    """
+    fixed = [
+        (50, 790, 20, "{council_name}"),
+        (50, 765, 14, "Rates Notice"),
+        (50, 735, 10, "Account: {account_number}"),
+        (50, 720, 10, "Property: {address}"),
+        (50, 705, 10, "Issued: {bill_date}"),
+        (50, 690, 10, "Due: {due_date}"),
+        (350, 735, 12, "Amount due: {amount}"),
+        (350, 718, 10, "Status: {payment_status}"),
+        (50, 655, 12, "Charges"),
+        (50, 130, 10, "{valuation_line}"),
+        (50, 100, 8, "Pay by direct debit, BPAY or card. Quote your account number with every payment."),
+    ]
+    ops = [(f"BT /F1 {size} Tf {x} {y} Td (", fmt) for x, y, size, fmt in fixed]
+    row = ("BT /F1 10 Tf 60 {y} Td (", "BT /F1 10 Tf 420 {y} Td (")
+    return ops, row
+
+
+def render_notice_pdf(inputs):
+    ops, (label_op, amount_op) = compiled_template()
+    val = inputs.get("valuation")
+    fields = {
+        "council_name": inputs.get("council_name") or "",
+        "account_number": inputs.get("account_number") or "",
+        "address": inputs.get("address") or "",
+        "bill_date": inputs.get("bill_date") or "-",
+        "due_date": inputs.get("due_date") or "-",
+        "amount": _money(inputs.get("amount_cents")),
+        "payment_status": inputs.get("payment_status") or "",
+        "valuation_line": (
+            f"Valuation {val['year']}: land {_money(val['land_value_cents'])}, "
+            f"capital {_money(val['capital_value_cents'])}" if val else ""
+        ),
+    }
+    parts = [prefix + _pdf_text(fmt.format(**fields)) + ") Tj ET" for prefix, fmt in ops]
+    y = 635
+    for item in (inputs.get("line_items") or [])[:MAX_LINE_ITEMS]:
+        parts.append(label_op.format(y=y) + _pdf_text(item.get("label")) + ") Tj ET")
+        parts.append(amount_op.format(y=y) + _pdf_text(_money(item.get("amount_cents"))) + ") Tj ET")
+        y -= 16
+    parts.append(f"0.5 w 50 {y + 8} m 545 {y + 8} l S")
+    total = sum(int(i.get("amount_cents") or 0) for i in inputs.get("line_items") or [])
+    parts.append(label_op.format(y=y - 8) + "Total charges) Tj ET")
+    parts.append(amount_op.format(y=y - 8) + _pdf_text(_money(total)) + ") Tj ET")
+    return _write_pdf("\n".join(parts).encode('latin-1'))
+
+
+def _write_pdf(content):
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_W} {PAGE_H}] "
+        f"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Length " + str(len(content)).encode() + b" >>\nstream\n" + content + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+# ---------- storage ----------
+
+def _store(digest, pdf_bytes, store_dir=None):
+    path = notice_path(digest, store_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pdf_bytes)
+    os.replace(tmp, path)  # atomic: readers never see a partial file
+    return path
+
+
+def _render_and_store(args):
+    """Process-pool entry point."""
+    digest, inputs, store_dir = args
+    path = notice_path(digest, store_dir)
+    if not os.path.exists(path):
+        _store(digest, render_notice_pdf(inputs), store_dir)
+    return digest
+
+
+def ensure_notice(inputs, store_dir=None):
+    """Render one notice inline if it isn't cached. Returns (digest, path)."""
+    digest = notice_hash(inputs)
+    path = notice_path(digest, store_dir)
+    if not os.path.exists(path):
+        _store(digest, render_notice_pdf(inputs), store_dir)
+    return digest, path
+
+
+def render_notices(inputs_by_bill, pool=None, store_dir=None, chunksize=64):
+    """
+    Render every missing notice, in `pool` (a ProcessPoolExecutor) when given.
+    Returns (hashes_by_bill, rendered_count). Stored notices are skipped before dispatch.
+    """
+    store_dir = store_dir or NOTICE_STORE_DIR
+    hashes = {bid: notice_hash(inp) for bid, inp in inputs_by_bill.items()}
+    todo = [(h, inputs_by_bill[bid], store_dir) for bid, h in hashes.items()
+            if not os.path.exists(notice_path(h, store_dir))]
+    if pool is None or len(todo) <= chunksize:
+        for args in todo:
+            _render_and_store(args)
+    else:
+        for _ in pool.map(_render_and_store, todo, chunksize=chunksize):
+            pass
+    return hashes, len(todo)
+
+
+def render_council_notices(council_id, since=None, batch_size=2000, processes=None):
+    """
+    Notice run for a council: keyset-batched over bill ids so memory stays bounded,
+    with one process pool for the whole run. `since` limits it to bills issued on/after that date.
+    """
+    last_id, total, rendered = 0, 0, 0
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        while True:
+            q = (
+                db.session.query(RatesBill.id)
+                .join(Property, Property.id == RatesBill.property_id)
+                .filter(Property.council_id == council_id, RatesBill.id > last_id)
+            )
+            if since:
+                q = q.filter(RatesBill.bill_date >= since)
+            ids = [r[0] for r in q.order_by(RatesBill.id).limit(batch_size).all()]
+            if not ids:
+                break
+            inputs = gather_notice_inputs(ids)
+            db.session.expunge_all()
+            _, n = render_notices(inputs, pool=pool)
+            total += len(ids)
+            rendered += n
+            last_id = ids[-1]
+            logging.info(f"[notices] Council {council_id}: {total} bills checked, {rendered} rendered.")
+    return {"council_id": council_id, "bills": total, "rendered": rendered}
@@ -0,0 +1,416 @@
+# server/overlay_engine.py
+"""
+Derive PropertyOverlay rows from council overlay layers (flood, bushfire, heritage, ...).
+
+Loading: load_layer() replaces one layer (council + source) with the polygons of a GeoJSON
+FeatureCollection. Features are diffed against the stored layer by key and geometry hash,
+so a reload writes only what changed. Each added, changed or removed feature appends its
+area (old and new bounding box) to overlay_change.
+
+Recomputing (recompute_overlays):
+- Which parcels: every parcel with full=True. Otherwise only parcels flagged
+  overlays_stale (the bbox hook in models.py sets it when shape_file_data changes), plus
+  parcels whose bbox overlaps an overlay_change area.
+- Index: each council's features are bucketed into a GRID_DEG lon/lat grid by bounding box,
+  as in waste_routes. Their edges are flattened into numpy arrays once.
+- Test: bbox first, then exact polygon intersection. Two polygons intersect when their
+  edges properly cross, or when most vertices of one lie inside the other. The inside test
+  is even-odd over all rings, so holes count. A parcel that only shares a boundary with a
+  feature is not covered. Only the feature edges near the parcel are examined, vectorised
+  with numpy.
+- Parallel: parcels are read in batches and spread over a ProcessPoolExecutor. The index
+  is shipped to each worker once, through the pool initializer.
+- Writes: each batch is one transaction. It upserts derived rows (derived=True) on
+  uq_property_overlay_derived, deletes derived rows that no longer apply, and clears the
+  stale flags. Hand-entered overlays are never touched. Parcels whose overlays changed get
+  a new updated_at, so /dashboard/changes sends them again, and their cached vector tiles
+  are dropped.
+- Change areas: a run deletes exactly the overlay_change rows it read, never a range of
+  ids, so a row committed out of id order during the run is kept for the next one.
+"""
+import datetime as dt
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy import and_, bindparam, delete, insert, or_, update
+
+from models import db, Property, PropertyOverlay, OverlayFeature, OverlayChange
+from geo import geojson_bbox, iter_geometries, load_geojson
+from vector_tiles import invalidate_tiles
+
+GRID_DEG = 0.01          # ~1.1 km cells at Sydney's latitude
+BATCH_SIZE = 500         # parcels per process-pool task
+CHANGE_CHUNK = 50        # overlay_change areas per parcel lookup query
+
+
+# ---------- geometry ----------
+
+def _rings(value):
+    """Every polygon ring of a GeoJSON value, as (n, 2) float arrays."""
+    rings = []
+    for geom in iter_geometries(load_geojson(value)):
+        t, coords = geom.get('type'), geom.get('coordinates') or []
+        polygons = coords if t == 'MultiPolygon' else [coords] if t == 'Polygon' else []
+        for polygon in polygons:
+            for ring in polygon:
+                try:
+                    a = np.asarray([c[:2] for c in ring], dtype=np.float64)
+                except (TypeError, ValueError, IndexError):
+                    continue
+                if a.ndim == 2 and a.shape[1] == 2 and len(a) >= 3:
+                    rings.append(a)
+    return rings
+
+
+class Shape:
+    """A polygon set flattened for intersection tests."""
+    __slots__ = ('vertices', 'edges', 'edge_lo', 'edge_hi', 'bbox')
+
+    def __init__(self, rings):
+        closed = [r if np.array_equal(r[0], r[-1]) else np.vstack([r, r[:1]]) for r in rings]
+        self.vertices = np.concatenate([r[:-1] for r in closed])
+        self.edges = np.concatenate([np.hstack([r[:-1], r[1:]]) for r in closed])  # x1, y1, x2, y2
+        self.edge_lo = np.minimum(self.edges[:, :2], self.edges[:, 2:])
+        self.edge_hi = np.maximum(self.edges[:, :2], self.edges[:, 2:])
+        (x0, y0), (x1, y1) = self.vertices.min(axis=0), self.vertices.max(axis=0)
+        self.bbox = (float(x0), float(y0), float(x1), float(y1))
+
+    @classmethod
+    def from_geojson(cls, value):
+        rings = _rings(value)
+        return cls(rings) if rings else None
+
+
+def _overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _edges_near(shape, bbox):
+    x0, y0, x1, y1 = bbox
+    lo, hi = shape.edge_lo, shape.edge_hi
+    return shape.edges[(hi[:, 0] >= x0) & (lo[:, 0] <= x1) & (hi[:, 1] >= y0) & (lo[:, 1] <= y1)]
+
+
+def _crossing(a, b):
+    """Whether any edge of a properly crosses any edge of b (touching and collinear don't count)."""
+    if not len(a) or not len(b):
+        return False
+    ax1, ay1, ax2, ay2 = (a[:, i][:, None] for i in range(4))
+    bx1, by1, bx2, by2 = (b[:, i][None, :] for i in range(4))
+
+    def orient(x1, y1, x2, y2, x, y):
+        return (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1)
+
+    d1, d2 = orient(bx1, by1, bx2, by2, ax1, ay1), orient(bx1, by1, bx2, by2, ax2, ay2)
+    d3, d4 = orient(ax1, ay1, ax2, ay2, bx1, by1), orient(ax1, ay1, ax2, ay2, bx2, by2)
+    return bool(np.any((d1 * d2 < 0) & (d3 * d4 < 0)))
+
+
+def _mostly_inside(points, edges):
+    """Even-odd ray casting of every point against every edge; True if more than half are inside."""
+    if not len(edges):
+        return False
+    px, py = points[:, 0:1], points[:, 1:2]
+    x1, y1, x2, y2 = (edges[:, i][None, :] for i in range(4))
+    straddles = (y1 > py) != (y2 > py)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cross_x = (x2 - x1) * (py - y1) / (y2 - y1) + x1
+    inside = np.count_nonzero(straddles & (px < cross_x), axis=1) % 2 == 1
+    return np.count_nonzero(inside) * 2 > len(points)
+
+
+def intersects(parcel, feature):
+    if not _overlaps(parcel.bbox, feature.bbox):
+        return False
+    if _crossing(parcel.edges, _edges_near(feature, parcel.bbox)):
+        return True
+    # No crossings: one lies inside the other, or they're apart
+    x0, y0, x1, y1 = parcel.bbox
+    if _mostly_inside(parcel.vertices, _edges_near(feature, (x0, y0, math.inf, y1))):
+        return True
+    f0, g0, f1, g1 = feature.bbox
+    return x0 <= f0 and f1 <= x1 and y0 <= g0 and g1 <= y1 and _mostly_inside(feature.vertices, parcel.edges)
+
+
+# ---------- index ----------
+
+class FeatureIndex:
+    """Overlay features of some councils, bucketed into a lon/lat grid."""
+
+    def __init__(self, grid_deg=GRID_DEG):
+        self.grid_deg = grid_deg
+        self.features = []                # (kind, source, note, Shape)
+        self.cells = defaultdict(list)    # (council_id, cx, cy) -> feature indexes
+
+    def _cells(self, bbox):
+        g = self.grid_deg
+        return [(cx, cy)
+                for cx in range(int(math.floor(bbox[0] / g)), int(math.floor(bbox[2] / g)) + 1)
+                for cy in range(int(math.floor(bbox[1] / g)), int(math.floor(bbox[3] / g)) + 1)]
+
+    def add(self, council_id, kind, source, note, geometry):
+        shape = Shape.from_geojson(geometry)
+        if shape is None:
+            return
+        i = len(self.features)
+        self.features.append((kind, source, note, shape))
+        for cx, cy in self._cells(shape.bbox):
+            self.cells[(council_id, cx, cy)].append(i)
+
+    @classmethod
+    def load(cls, council_ids, batch_size=1000):
+        index, last_id = cls(), 0
+        while True:
+            rows = (db.session.query(OverlayFeature.id, OverlayFeature.council_id, OverlayFeature.kind,
+                                     OverlayFeature.source, OverlayFeature.note, OverlayFeature.geometry)
+                    .filter(OverlayFeature.council_id.in_(list(council_ids)), OverlayFeature.id > last_id)
+                    .order_by(OverlayFeature.id).limit(batch_size).all())
+            if not rows:
+                return index
+            for r in rows:
+                index.add(r.council_id, r.kind, r.source, r.note, r.geometry)
+            last_id = rows[-1].id
+
+    def overlays_for(self, council_id, parcel):
+        """{(kind, source): note} of the features covering a parcel."""
+        candidates = set()
+        for cx, cy in self._cells(parcel.bbox):
+            candidates.update(self.cells.get((council_id, cx, cy), ()))
+        found = {}
+        for i in sorted(candidates):
+            kind, source, note, shape = self.features[i]
+            if (kind, source) not in found and intersects(parcel, shape):
+                found[(kind, source)] = note
+        return found
+
+
+_worker_index = None
+
+
+def _init_worker(index):
+    global _worker_index
+    _worker_index = index
+
+
+def _overlay_batch(rows, index=None):
+    """Process-pool entry point: [(property_id, council_id, shape_file_data)] -> [(property_id, overlays)]."""
+    index = index or _worker_index
+    out = []
+    for pid, council_id, shape in rows:
+        parcel = Shape.from_geojson(shape)
+        out.append((pid, index.overlays_for(council_id, parcel) if parcel is not None else {}))
+    return out
+
+
+# ---------- layers ----------
+
+def _feature_key(feature, geometry_hash, key_property):
+    props = feature.get('properties') or {}
+    if key_property and props.get(key_property) is not None:
+        return str(props[key_property])[:200]
+    if feature.get('id') is not None:
+        return str(feature['id'])[:200]
+    return geometry_hash
+
+
+def load_layer(council_id, kind, source, geojson, key_property=None, note_property=None):
+    """
+    Replace one council layer with the polygons of a GeoJSON FeatureCollection (dict or text).
+    Features are matched on properties[key_property], then the feature id, then the geometry
+    hash. Loading an empty collection drops the layer.
+    Returns {"added", "changed", "removed", "unchanged"}.
+    """
+    collection = load_geojson(geojson) or {}
+    features = collection.get('features') if collection.get('type') == 'FeatureCollection' else [collection]
+    incoming = {}
+    for feature in features or []:
+        if not isinstance(feature, dict):
+            continue
+        geometry = feature.get('geometry') if feature.get('type') == 'Feature' else feature
+        if not isinstance(geometry, dict) or geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+            continue
+        bbox = geojson_bbox(geometry)
+        if bbox is None:
+            continue
+        digest = hashlib.sha256(json.dumps(geometry, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+        note = (feature.get('properties') or {}).get(note_property) if note_property else None
+        incoming[_feature_key(feature, digest, key_property)] = {
+            "kind": kind, "note": None if note is None else str(note), "geometry": geometry, "geometry_hash": digest,
+            "min_lon": bbox[0], "min_lat": bbox[1], "max_lon": bbox[2], "max_lat": bbox[3],
+        }
+
+    f = OverlayFeature
+    existing = {r.feature_key: r for r in db.session.query(
+        f.id, f.feature_key, f.kind, f.note, f.geometry_hash, f.min_lon, f.min_lat, f.max_lon, f.max_lat,
+    ).filter(f.council_id == council_id, f.source == source)}
+
+    now = dt.datetime.utcnow()
+    inserts, updates, removed, areas = [], [], [], []
+    for key, row in incoming.items():
+        old = existing.get(key)
+        new_area = (row["min_lon"], row["min_lat"], row["max_lon"], row["max_lat"])
+        if old is None:
+            inserts.append(dict(row, council_id=council_id, source=source, feature_key=key, created_at=now))
+            areas.append(new_area)
+        elif (old.kind, old.note, old.geometry_hash) != (kind, row["note"], row["geometry_hash"]):
+            updates.append(dict(row, fid=old.id, updated_at=now))
+            areas += [new_area, (old.min_lon, old.min_lat, old.max_lon, old.max_lat)]
+    for key, old in existing.items():
+        if key not in incoming:
+            removed.append(old.id)
+            areas.append((old.min_lon, old.min_lat, old.max_lon, old.max_lat))
+
+    if inserts:
+        db.session.execute(insert(OverlayFeature), inserts)
+    if updates:
+        table = OverlayFeature.__table__
+        db.session.execute(update(table).where(table.c.id == bindparam('fid')), updates)
+    for i in range(0, len(removed), 1000):
+        db.session.execute(delete(OverlayFeature).where(OverlayFeature.id.in_(removed[i:i + 1000])))
+    if areas:
+        db.session.execute(insert(OverlayChange), [
+            {"council_id": council_id, "min_lon": a[0], "min_lat": a[1], "max_lon": a[2], "max_lat": a[3],
+             "created_at": now} for a in areas
+        ])
+    db.session.commit()
+    result = {"added": len(inserts), "changed": len(updates), "removed": len(removed),
+              "unchanged": len(incoming) - len(inserts) - len(updates)}
+    logging.info(f"[overlays] Loaded layer '{source}' for council {council_id}: {result}")
+    return result
+
+
+# ---------- recomputing ----------
+
+def _affected_parcels(council_id, full):
+    """
+    ({property_id: council_id} of the parcels to re-derive, ids of the change areas read).
+    Only the changes read here are consumed: ids are assigned before commit, so one with a
+    lower id than these may still become visible later, and must wait for the next run.
+    """
+    q = db.session.query(Property.id, Property.council_id)
+    if council_id:
+        q = q.filter(Property.council_id == council_id)
+    changes = db.session.query(OverlayChange)
+    if council_id:
+        changes = changes.filter(OverlayChange.council_id == council_id)
+    changes = changes.all()
+    change_ids = [c.id for c in changes]
+    if full:
+        return dict(q.filter(Property.shape_file_data.isnot(None)).all()), change_ids
+
+    parcels = dict(q.filter(Property.overlays_stale.is_(True)).all())
+    for i in range(0, len(changes), CHANGE_CHUNK):
+        areas = [and_(Property.council_id == c.council_id,
+                      Property.min_lat <= c.max_lat, Property.max_lat >= c.min_lat,
+                      Property.min_lon <= c.max_lon, Property.max_lon >= c.min_lon)
+                 for c in changes[i:i + CHANGE_CHUNK]]
+        parcels.update(q.filter(or_(*areas)).all())
+    return parcels, change_ids
+
+
+def write_overlays(results):
+    """
+    Make each parcel's derived overlays match its results: [(property_id, {(kind, source): note})].
+    Returns (rows upserted, rows deleted, property ids whose overlays changed). Doesn't commit.
+    The changed parcels' updated_at moves too: their overlays go out with them in delta sync.
+    """
+    current = defaultdict(dict)
+    ids = [pid for pid, _ in results]
+    for oid, pid, kind, source, note in (
+            db.session.query(PropertyOverlay.id, PropertyOverlay.property_id, PropertyOverlay.kind,
+                             PropertyOverlay.source, PropertyOverlay.note)
+            .filter(PropertyOverlay.derived.is_(True), PropertyOverlay.property_id.in_(ids))):
+        current[pid][(kind, source)] = (oid, note)
+
+    now = dt.datetime.utcnow()
+    rows, gone, changed = [], [], set()
+    for pid, found in results:
+        have = current.get(pid, {})
+        for (kind, source), note in found.items():
+            if (kind, source) not in have or have[(kind, source)][1] != note:
+                rows.append({"property_id": pid, "kind": kind, "source": source, "note": note, "derived": True,
+                             "created_at": now, "updated_at": now})
+                changed.add(pid)
+        for key, (oid, _) in have.items():
+            if key not in found:
+                gone.append(oid)
+                changed.add(pid)
+
+    if rows:
+        if db.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        stmt = upsert(PropertyOverlay.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['property_id', 'kind', 'source'],
+            index_where=PropertyOverlay.__table__.c.derived,
+            set_={"note": stmt.excluded.note, "updated_at": now},
+        )
+        db.session.execute(stmt, rows)
+    if gone:
+        db.session.execute(delete(PropertyOverlay).where(PropertyOverlay.id.in_(gone)))
+    if changed:
+        table = Property.__table__
+        db.session.execute(update(table).where(table.c.id.in_(sorted(changed))).values(updated_at=now))
+    return len(rows), len(gone), changed
+
+
+def recompute_overlays(council_id=None, full=False, batch_size=BATCH_SIZE, processes=None):
+    """Re-derive overlays for changed parcels (or every parcel with full=True). Returns counts and throughput."""
+    started = time.monotonic()
+    parcels, change_ids = _affected_parcels(council_id, full)
+    ids = sorted(parcels)
+    index = FeatureIndex.load(set(parcels.values()))
+
+    totals = {"parcels": 0, "upserted": 0, "deleted": 0, "changed_parcels": 0}
+    table = Property.__table__
+    workers = processes or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index,)) \
+        if len(ids) > batch_size and workers > 1 else None
+    try:
+        step = batch_size * (workers if pool else 1)
+        for i in range(0, len(ids), step):
+            chunk = ids[i:i + step]
+            # Clear the flags before reading the shapes: a parcel edited meanwhile is flagged again
+            db.session.execute(update(table).where(table.c.id.in_(chunk))
+                               .values(overlays_stale=False, updated_at=table.c.updated_at))
+            rows = (db.session.query(Property.id, Property.council_id, Property.shape_file_data,
+                                     Property.min_lon, Property.min_lat, Property.max_lon, Property.max_lat)
+                    .filter(Property.id.in_(chunk)).all())
+            work = [[r[:3] for r in rows[j:j + batch_size]] for j in range(0, len(rows), batch_size)]
+            if pool:
+                results = [r for part in pool.map(_overlay_batch, work) for r in part]
+            else:
+                results = [r for part in work for r in _overlay_batch(part, index)]
+            upserted, deleted, changed = write_overlays(results)
+            db.session.commit()
+
+            bboxes = [tuple(r[3:]) for r in rows if r.id in changed and r.min_lon is not None]
+            invalidate_tiles([(layer, b) for b in bboxes for layer in ('parcels', 'overlays')])
+            totals["parcels"] += len(rows)
+            totals["upserted"] += upserted
+            totals["deleted"] += deleted
+            totals["changed_parcels"] += len(changed)
+            logging.info(f"[overlays] {totals['parcels']}/{len(ids)} parcels checked, "
+                         f"{totals['changed_parcels']} changed")
+    finally:
+        if pool:
+            pool.shutdown()
+
+    # The change areas read above are now reflected; any others wait for the next run
+    for i in range(0, len(change_ids), CHANGE_CHUNK):
+        db.session.execute(delete(OverlayChange).where(OverlayChange.id.in_(change_ids[i:i + CHANGE_CHUNK])))
+    db.session.commit()
+
+    seconds = time.monotonic() - started
+    totals.update(features=len(index.features), seconds=round(seconds, 3),
+                  per_second=round(totals["parcels"] / seconds, 1) if seconds else 0.0)
+    return totals
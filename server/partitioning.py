@@ -0,0 +1,276 @@
+# server/partitioning.py
+"""
+Financial-year range partitioning for the high-growth tables (Postgres only).
+
+    rates_bill         RANGE (bill_date)
+    rates_invoice      RANGE (issue_date)
+    water_consumption  RANGE (quarter_start_date)
+    processes          RANGE (submitted_at)
+
+Each partition holds one financial year (financial_year is the year the period
+starts, as in rating_engine): rates_bill_fy2026 covers 2026-07-01 to 2027-07-01.
+A DEFAULT partition catches rows outside the premade range. They are moved into
+their proper partition when it is created.
+
+- convert: rebuilds an ordinary table as a partitioned one, in one transaction,
+  under an ACCESS EXCLUSIVE lock. The primary key becomes (id, <key>), as Postgres
+  requires. The ORM still identifies rows by id alone. The model's indexes are
+  recreated on the parent and so exist on every partition.
+- maintain: premakes partitions for the next PREMAKE_YEARS. Partitions that ended more
+  than hot_years ago are detached, moved to the ARCHIVE_SCHEMA and attached to
+  an archive parent of the same shape. Hot queries then never plan or vacuum them,
+  and the hot indexes stay small.
+- Hot reads (dashboard, rates) add hot_window() on the partition key, so the planner
+  only visits the hot partitions.
+- Archived rows stay queryable: <table>_all is a view over hot + archive, and
+  history_table() returns it as a Core table (used by ledger exports with archive=1).
+
+Partitioning by council was considered. None of these tables carries council_id (it
+hangs off property), and every hot query filters by date, so date ranges prune better.
+"""
+import datetime as dt
+import logging
+import re
+
+from sqlalchemy import MetaData, inspect, text
+
+from models import db, RatesBill, RatesInvoice, WaterConsumption, Process
+from rating_engine import financial_period
+
+ARCHIVE_SCHEMA = 'archive'
+PREMAKE_YEARS = 2
+
+
+class PartitionSpec:
+    def __init__(self, model, key, hot_years):
+        self.model = model
+        self.table = model.__tablename__
+        self.key = key
+        self.hot_years = hot_years  # financial years kept attached, including the current one
+
+
+SPECS = {
+    spec.table: spec for spec in (
+        PartitionSpec(RatesBill, 'bill_date', hot_years=3),
+        PartitionSpec(RatesInvoice, 'issue_date', hot_years=3),
+        PartitionSpec(WaterConsumption, 'quarter_start_date', hot_years=3),
+        PartitionSpec(Process, 'submitted_at', hot_years=5),
+    )
+}
+
+
+class PartitionError(RuntimeError):
+    pass
+
+
+def financial_year_of(day):
+    return day.year if day.month >= 7 else day.year - 1
+
+
+def partition_name(table, financial_year):
+    return f"{table}_fy{financial_year}"
+
+
+def _bounds(financial_year):
+    start, _ = financial_period(financial_year)
+    return start, financial_period(financial_year + 1)[0]
+
+
+_BOUND = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})")
+
+
+# ---------- catalog ----------
+
+def _require_postgres(conn):
+    if conn.dialect.name != 'postgresql':
+        raise PartitionError("Table partitioning needs Postgres")
+
+
+def is_partitioned(conn, table, schema='public'):
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"
+    ), {"t": f"{schema}.{table}"}).first() is not None
+
+
+def list_partitions(conn, table, schema='public'):
+    """[(name, financial_year or None for DEFAULT, row_estimate)] ordered by year."""
+    rows = conn.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:t)
+    """), {"t": f"{schema}.{table}"}).all()
+    out = []
+    for name, bound, estimate in rows:
+        m = _BOUND.search(bound or '')
+        out.append((name, financial_year_of(dt.date.fromisoformat(m.group(1))) if m else None, max(estimate, 0)))
+    return sorted(out, key=lambda p: (p[1] is None, p[1] or 0))
+
+
+def _columns(conn, table, schema):
+    return conn.execute(text("""
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(:t) AND a.attnum > 0 AND NOT a.attisdropped
+        ORDER BY a.attnum
+    """), {"t": f"{schema}.{table}"}).all()
+
+
+# ---------- DDL ----------
+
+def create_partition(conn, spec, financial_year, schema='public'):
+    """
+    Create and attach one financial-year partition. Rows already sitting in the
+    DEFAULT partition for that range move into it first.
+    """
+    name = partition_name(spec.table, financial_year)
+    lo, hi = _bounds(financial_year)
+    conn.execute(text(
+        f'CREATE TABLE {schema}.{name} (LIKE {schema}.{spec.table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    ))
+    default = f"{spec.table}_default"
+    if schema == 'public' and conn.execute(text("SELECT to_regclass(:t)"), {"t": f"public.{default}"}).scalar():
+        moved = conn.execute(text(
+            f"WITH moved AS (DELETE FROM public.{default} WHERE {spec.key} >= :lo AND {spec.key} < :hi RETURNING *) "
+            f"INSERT INTO public.{name} SELECT * FROM moved"
+        ), {"lo": lo, "hi": hi}).rowcount
+        if moved:
+            logging.info(f"[partitions] Moved {moved} rows from {default} into {name}")
+    conn.execute(text(
+        f"ALTER TABLE {schema}.{spec.table} ATTACH PARTITION {schema}.{name} "
+        f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+    ))
+    logging.info(f"[partitions] Created {schema}.{name} [{lo} .. {hi})")
+    return name
+
+
+def convert_table(conn, spec, premake=PREMAKE_YEARS, today=None):
+    """Rebuild an ordinary table as a partitioned one. Returns the partitions created."""
+    _require_postgres(conn)
+    t, key = spec.table, spec.key
+    if is_partitioned(conn, t):
+        return []
+    today = today or dt.date.today()
+
+    conn.execute(text(f"LOCK TABLE {t} IN ACCESS EXCLUSIVE MODE"))
+    oldest = conn.execute(text(f"SELECT min({key}) FROM {t}")).scalar()
+    if conn.execute(text(
+        "SELECT attidentity <> '' FROM pg_attribute WHERE attrelid = to_regclass(:t) AND attname = 'id'"
+    ), {"t": t}).scalar():
+        raise PartitionError(f"{t}.id is an identity column; only serial ids can be converted")
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": t}).scalar()
+    legacy = f"{t}_unpartitioned"
+
+    conn.execute(text(f"ALTER TABLE {t} RENAME TO {legacy}"))
+    conn.execute(text(
+        f"CREATE TABLE {t} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) "
+        f"PARTITION BY RANGE ({key})"
+    ))
+    if sequence:
+        # The id default keeps using the same sequence; it must outlive the old table
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {t}.id"))
+    for fk in spec.model.__table__.foreign_key_constraints:
+        cols = ', '.join(c.name for c in fk.columns)
+        ref = fk.elements[0].column.table.name
+        ref_cols = ', '.join(e.column.name for e in fk.elements)
+        conn.execute(text(f"ALTER TABLE {t} ADD FOREIGN KEY ({cols}) REFERENCES {ref} ({ref_cols})"))
+
+    if isinstance(oldest, dt.datetime):
+        oldest = oldest.date()
+    current = financial_year_of(today)
+    first = financial_year_of(oldest) if oldest else current
+    created = [create_partition(conn, spec, fy) for fy in range(min(first, current), current + premake + 1)]
+    conn.execute(text(f"CREATE TABLE {t}_default PARTITION OF {t} DEFAULT"))
+
+    copied = conn.execute(text(f"INSERT INTO {t} SELECT * FROM {legacy}")).rowcount
+    conn.execute(text(f"DROP TABLE {legacy}"))
+    conn.execute(text(f"ALTER TABLE {t} ADD PRIMARY KEY (id, {key})"))
+    for idx in spec.model.__table__.indexes:
+        idx.create(conn, checkfirst=True)
+    logging.info(f"[partitions] Converted {t}: {copied} rows into {len(created)} partitions")
+    return created
+
+
+def _ensure_archive(conn, spec):
+    """Archive parent with the hot table's columns, plus the <table>_all view over both."""
+    t, a = spec.table, ARCHIVE_SCHEMA
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {a}"))
+    if not conn.execute(text("SELECT to_regclass(:t)"), {"t": f"{a}.{t}"}).scalar():
+        conn.execute(text(f"CREATE TABLE {a}.{t} (LIKE public.{t}) PARTITION BY RANGE ({spec.key})"))
+    # Columns added to the hot table since (sync_schema) must reach the archive too
+    archived = {name for name, _ in _columns(conn, t, a)}
+    for name, type_ in _columns(conn, t, 'public'):
+        if name not in archived:
+            conn.execute(text(f"ALTER TABLE {a}.{t} ADD COLUMN {name} {type_}"))
+    cols = ', '.join(name for name, _ in _columns(conn, t, 'public'))
+    conn.execute(text(f"DROP VIEW IF EXISTS public.{t}_all"))
+    conn.execute(text(
+        f"CREATE VIEW public.{t}_all AS SELECT {cols} FROM public.{t} UNION ALL SELECT {cols} FROM {a}.{t}"
+    ))
+
+
+def archive_partition(conn, spec, financial_year):
+    name = partition_name(spec.table, financial_year)
+    lo, hi = _bounds(financial_year)
+    _ensure_archive(conn, spec)
+    conn.execute(text(f"ALTER TABLE public.{spec.table} DETACH PARTITION public.{name}"))
+    conn.execute(text(f"ALTER TABLE public.{name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+    conn.execute(text(
+        f"ALTER TABLE {ARCHIVE_SCHEMA}.{spec.table} ATTACH PARTITION {ARCHIVE_SCHEMA}.{name} "
+        f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+    ))
+    logging.info(f"[partitions] Archived {name} to {ARCHIVE_SCHEMA}")
+    return name
+
+
+def maintain_table(conn, spec, premake=PREMAKE_YEARS, archive=True, today=None):
+    """Premake future partitions and archive cold ones. Idempotent."""
+    _require_postgres(conn)
+    if not is_partitioned(conn, spec.table):
+        return {"table": spec.table, "partitioned": False}
+    current = financial_year_of(today or dt.date.today())
+    have = {fy for _, fy, _ in list_partitions(conn, spec.table) if fy is not None}
+    created = [create_partition(conn, spec, fy) for fy in range(current, current + premake + 1) if fy not in have]
+    archived = []
+    if archive:
+        oldest_hot = current - spec.hot_years + 1
+        archived = [archive_partition(conn, spec, fy) for fy in sorted(have) if fy < oldest_hot]
+    return {"table": spec.table, "partitioned": True, "created": created, "archived": archived}
+
+
+def maintain_partitions(tables=None, premake=PREMAKE_YEARS, archive=True, today=None):
+    """Run maintain_table for each partitioned table, one transaction per table."""
+    results = []
+    for name in tables or SPECS:
+        with db.engine.begin() as conn:
+            results.append(maintain_table(conn, SPECS[name], premake=premake, archive=archive, today=today))
+    return results
+
+
+# ---------- reading hot rows ----------
+
+def hot_since(model, today=None):
+    """First day of the oldest financial year kept in `model`'s hot partitions."""
+    spec = SPECS[model.__tablename__]
+    return _bounds(financial_year_of(today or dt.date.today()) - spec.hot_years + 1)[0]
+
+
+def hot_window(model, today=None):
+    """
+    Predicate on the partition key for the rows hot queries show. Postgres only prunes
+    partitions on a condition on the key, so without it a lookup by property or resident
+    visits every partition, and the DEFAULT one, including years maintain hasn't archived yet.
+    """
+    spec = SPECS[model.__tablename__]
+    return getattr(model, spec.key) >= hot_since(model, today)
+
+
+# ---------- reading archived rows ----------
+
+def has_archive(table):
+    return inspect(db.engine).has_table(f"{table}_all")
+
+
+def history_table(model):
+    """Core table over hot + archived rows (<table>_all view) for on-demand historical reads."""
+    return model.__table__.to_metadata(MetaData(), name=f"{model.__tablename__}_all")
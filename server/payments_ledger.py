@@ -0,0 +1,346 @@
+# server/payments_ledger.py
+"""
+Append-only payments ledger for rates accounts.
+
+- Entries: charges (+), payments (-), adjustments (±) and reversals (the negation of
+  an earlier entry). Rows are never updated or deleted. The ORM refuses, and a trigger
+  on Postgres refuses too.
+- Serialization: posting locks the one rates_account row (SELECT ... FOR UPDATE),
+  assigns the next per-account seq and moves RatesAccount.balance_cents in the same
+  transaction. Posts to the same account queue behind each other. Posts to other
+  accounts never wait, and no table lock is taken. Batches lock their accounts in id
+  order, so two batches cannot deadlock.
+- Idempotency: a reference (receipt number, BPAY CRN ...) is unique per account.
+  Re-posting it returns the original entry.
+- Snapshots: take_snapshots() records each changed account's balance as of a date
+  in one INSERT ... SELECT. balance_as_of() and statement() read the latest snapshot
+  on or before the date, plus the entries after it. That is the entries dated after
+  the snapshot, and entries posted after it but back-dated into it (seq > through_seq).
+  Cost is O(entries since the snapshot), not O(history).
+"""
+import datetime as dt
+import logging
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from sqlalchemy import event, func, insert, literal, or_, select
+
+from models import db, Property, RatesAccount, LedgerEntry, LedgerSnapshot
+
+ENTRY_TYPES = ('charge', 'payment', 'adjustment', 'reversal')
+
+
+class LedgerError(ValueError):
+    pass
+
+
+def register_ledger_listeners(session_cls=None):
+    """Refuse ORM updates and deletes of ledger entries."""
+    target = session_cls or db.session
+
+    @event.listens_for(target, 'before_flush')
+    def _append_only(session, flush_context, instances):
+        for obj in list(session.dirty) + list(session.deleted):
+            if isinstance(obj, LedgerEntry) and (obj in session.deleted or session.is_modified(obj)):
+                raise LedgerError("Ledger entries are append-only; post a reversal instead.")
+
+
+# ---------- posting ----------
+
+def _whole_cents(amount_cents):
+    """Amount in cents as an int, rounded half-up: int() would truncate 1999.9 to 1999."""
+    try:
+        return int(Decimal(str(amount_cents)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        raise LedgerError(f"amount_cents must be a number, not {amount_cents!r}.")
+
+
+def _signed(entry_type, amount_cents):
+    amount_cents = _whole_cents(amount_cents)
+    if entry_type == 'charge':
+        if amount_cents <= 0:
+            raise LedgerError("A charge must be a positive amount.")
+        return amount_cents
+    if entry_type == 'payment':
+        if amount_cents <= 0:
+            raise LedgerError("A payment must be a positive amount (it is stored as a credit).")
+        return -amount_cents
+    if entry_type == 'adjustment':
+        if amount_cents == 0:
+            raise LedgerError("An adjustment can't be zero.")
+        return amount_cents
+    raise LedgerError(f"Unknown entry type '{entry_type}'; expected charge, payment or adjustment.")
+
+
+def _lock_accounts(account_ids):
+    """Row-lock the accounts, in id order. Returns {id: RatesAccount} with freshly read balances."""
+    accounts = (RatesAccount.query.filter(RatesAccount.id.in_(account_ids))
+                .order_by(RatesAccount.id).with_for_update().populate_existing().all())
+    found = {a.id: a for a in accounts}
+    missing = set(account_ids) - set(found)
+    if missing:
+        raise LedgerError(f"Unknown rates account(s): {', '.join(map(str, sorted(missing)))}")
+    return found
+
+
+def _next_seqs(account_ids):
+    rows = (db.session.query(LedgerEntry.account_id, func.max(LedgerEntry.seq))
+            .filter(LedgerEntry.account_id.in_(account_ids)).group_by(LedgerEntry.account_id).all())
+    last = dict(rows)
+    return {a: (last.get(a) or 0) + 1 for a in account_ids}
+
+
+def _existing_references(items):
+    refs = [(i["account_id"], i["reference"]) for i in items if i.get("reference")]
+    if not refs:
+        return {}
+    rows = LedgerEntry.query.filter(
+        LedgerEntry.account_id.in_({a for a, _ in refs}),
+        LedgerEntry.reference.in_({r for _, r in refs}),
+    ).all()
+    return {(e.account_id, e.reference): e for e in rows}
+
+
+def post_entries(items, commit=True):
+    """
+    Post many entries in one transaction. Each item is a dict with account_id,
+    entry_type, amount_cents and optionally effective_date, reference, method,
+    description. Returns [(entry, created)], in input order. created is False for
+    an already-posted reference.
+    """
+    if not items:
+        return []
+    try:
+        accounts = _lock_accounts(sorted({i["account_id"] for i in items}))
+        seqs = _next_seqs(list(accounts))
+        existing = _existing_references(items)
+        today = dt.date.today()
+        out = []
+        for item in items:
+            key = (item["account_id"], item.get("reference"))
+            if item.get("reference") and key in existing:
+                out.append((existing[key], False))
+                continue
+            amount = _signed(item["entry_type"], item["amount_cents"])
+            entry = LedgerEntry(
+                account_id=item["account_id"],
+                seq=seqs[item["account_id"]],
+                entry_type=item["entry_type"],
+                amount_cents=amount,
+                effective_date=item.get("effective_date") or today,
+                reference=item.get("reference"),
+                method=item.get("method"),
+                description=item.get("description"),
+            )
+            seqs[item["account_id"]] += 1
+            accounts[item["account_id"]].balance_cents = (accounts[item["account_id"]].balance_cents or 0) + amount
+            db.session.add(entry)
+            if item.get("reference"):
+                existing[key] = entry
+            out.append((entry, True))
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+        return out
+    except Exception:
+        if commit:
+            db.session.rollback()
+        raise
+
+
+def post_entry(account_id, entry_type, amount_cents, effective_date=None, reference=None, method=None,
+               description=None, commit=True):
+    [(entry, created)] = post_entries([{
+        "account_id": account_id, "entry_type": entry_type, "amount_cents": amount_cents,
+        "effective_date": effective_date, "reference": reference, "method": method, "description": description,
+    }], commit=commit)
+    return entry, created
+
+
+def reverse_entry(entry_id, reason=None, effective_date=None, commit=True):
+    """Post the negation of an entry. Each entry can be reversed once, and reversals can't be reversed."""
+    try:
+        original = db.session.get(LedgerEntry, entry_id)
+        if original is None:
+            raise LedgerError(f"Ledger entry {entry_id} not found.")
+        account = _lock_accounts([original.account_id])[original.account_id]
+        if original.entry_type == 'reversal':
+            raise LedgerError("A reversal can't be reversed; post a new entry instead.")
+        if LedgerEntry.query.filter_by(reverses_id=original.id).first():
+            raise LedgerError(f"Ledger entry {entry_id} is already reversed.")
+        entry = LedgerEntry(
+            account_id=original.account_id,
+            seq=_next_seqs([original.account_id])[original.account_id],
+            entry_type='reversal',
+            amount_cents=-original.amount_cents,
+            effective_date=effective_date or dt.date.today(),
+            reverses_id=original.id,
+            description=reason or f"Reversal of {original.entry_type} #{original.seq}",
+        )
+        account.balance_cents = (account.balance_cents or 0) - original.amount_cents
+        db.session.add(entry)
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+        return entry
+    except Exception:
+        if commit:
+            db.session.rollback()
+        raise
+
+
+def open_ledgers(council_id=None, batch_size=1000):
+    """
+    One 'Opening balance' adjustment for every account that has a balance but no
+    ledger entries yet, so the ledger agrees with balance_cents from day one.
+    Accounts are locked like any other post and re-checked under the lock, so two
+    concurrent runs (or a run racing a first payment) open each ledger once.
+    """
+    q = db.session.query(RatesAccount.id).filter(RatesAccount.balance_cents != 0,
+                                                 ~RatesAccount.id.in_(select(LedgerEntry.account_id).distinct()))
+    if council_id is not None:
+        q = q.join(Property, Property.id == RatesAccount.property_id).filter(Property.council_id == council_id)
+    candidates = [account_id for (account_id,) in q.order_by(RatesAccount.id)]
+    db.session.commit()
+
+    today = dt.date.today()
+    opened = 0
+    for i in range(0, len(candidates), batch_size):
+        try:
+            accounts = _lock_accounts(candidates[i:i + batch_size])
+            seqs = _next_seqs(list(accounts))
+            for account_id, account in accounts.items():
+                if seqs[account_id] != 1 or not account.balance_cents:
+                    continue  # opened (or posted to) since the candidates were read
+                db.session.add(LedgerEntry(account_id=account_id, seq=1, entry_type='adjustment',
+                                           amount_cents=account.balance_cents, effective_date=today,
+                                           reference='opening-balance', description='Opening balance'))
+                opened += 1
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    logging.info(f"[ledger] Opened {opened} ledgers from existing balances.")
+    return opened
+
+
+# ---------- reading ----------
+
+def _latest_snapshot(account_id, on_or_before):
+    return (LedgerSnapshot.query
+            .filter(LedgerSnapshot.account_id == account_id, LedgerSnapshot.as_of_date <= on_or_before)
+            .order_by(LedgerSnapshot.as_of_date.desc(), LedgerSnapshot.id.desc()).first())
+
+
+def _since_snapshot(snap):
+    """Filter for the entries a snapshot does not already include."""
+    if snap is None:
+        return literal(True)
+    return or_(LedgerEntry.effective_date > snap.as_of_date, LedgerEntry.seq > snap.through_seq)
+
+
+def balance_as_of(account_id, as_of=None):
+    """Balance at the end of `as_of` (default today), in cents. Positive means owing."""
+    as_of = as_of or dt.date.today()
+    snap = _latest_snapshot(account_id, as_of)
+    delta = (db.session.query(func.coalesce(func.sum(LedgerEntry.amount_cents), 0))
+             .filter(LedgerEntry.account_id == account_id, LedgerEntry.effective_date <= as_of,
+                     _since_snapshot(snap))
+             .scalar())
+    return (snap.balance_cents if snap else 0) + int(delta)
+
+
+def serialize_entry(e):
+    return {
+        "id": e.id,
+        "account_id": e.account_id,
+        "seq": e.seq,
+        "entry_type": e.entry_type,
+        "amount_cents": e.amount_cents,
+        "effective_date": e.effective_date.isoformat(),
+        "reference": e.reference,
+        "method": e.method,
+        "description": e.description,
+        "reverses_id": e.reverses_id,
+        "posted_at": e.posted_at.isoformat() if e.posted_at else None,
+    }
+
+
+def statement(account_id, date_from, date_to):
+    """Opening balance, the entries dated in [date_from, date_to] with running balances, closing balance."""
+    if date_to < date_from:
+        raise LedgerError("Statement end date is before its start date.")
+    opening = balance_as_of(account_id, date_from - dt.timedelta(days=1))
+    entries = (LedgerEntry.query
+               .filter(LedgerEntry.account_id == account_id,
+                       LedgerEntry.effective_date >= date_from, LedgerEntry.effective_date <= date_to)
+               .order_by(LedgerEntry.effective_date, LedgerEntry.seq).all())
+    running = opening
+    lines = []
+    for e in entries:
+        running += e.amount_cents
+        lines.append(dict(serialize_entry(e), balance_cents=running))
+    return {
+        "account_id": account_id,
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "opening_balance_cents": opening,
+        "closing_balance_cents": running,
+        "entries": lines,
+    }
+
+
+# ---------- snapshots ----------
+
+def take_snapshots(as_of=None):
+    """
+    Snapshot every account with entries not covered by its latest snapshot, as of the
+    end of `as_of` (default yesterday). One INSERT ... SELECT. Returns the number of snapshots.
+    """
+    as_of = as_of or dt.date.today() - dt.timedelta(days=1)
+    ranked = select(
+        LedgerSnapshot.account_id, LedgerSnapshot.as_of_date, LedgerSnapshot.through_seq,
+        LedgerSnapshot.balance_cents,
+        func.row_number().over(partition_by=LedgerSnapshot.account_id,
+                               order_by=(LedgerSnapshot.as_of_date.desc(), LedgerSnapshot.id.desc())).label("rn"),
+    ).where(LedgerSnapshot.as_of_date <= as_of).subquery()
+    latest = select(ranked).where(ranked.c.rn == 1).subquery()
+
+    uncovered = or_(latest.c.account_id.is_(None),
+                    LedgerEntry.effective_date > latest.c.as_of_date,
+                    LedgerEntry.seq > latest.c.through_seq)
+    changed = (
+        select(
+            LedgerEntry.account_id.label("account_id"),
+            func.max(LedgerEntry.seq).label("through_seq"),
+            func.coalesce(func.sum(LedgerEntry.amount_cents).filter(LedgerEntry.effective_date <= as_of), 0)
+            .label("delta"),
+            func.count().filter(LedgerEntry.effective_date <= as_of).label("n"),
+        )
+        .select_from(LedgerEntry)
+        .outerjoin(latest, latest.c.account_id == LedgerEntry.account_id)
+        .where(uncovered)
+        .group_by(LedgerEntry.account_id)
+    ).subquery()
+
+    rows = (
+        select(
+            changed.c.account_id,
+            literal(as_of).label("as_of_date"),
+            # every entry the account had, including ones dated after as_of: they count from as_of_date on
+            func.greatest(changed.c.through_seq, func.coalesce(latest.c.through_seq, 0))
+            if db.engine.dialect.name == 'postgresql' else
+            func.max(changed.c.through_seq, func.coalesce(latest.c.through_seq, 0)),
+            (func.coalesce(latest.c.balance_cents, 0) + changed.c.delta).label("balance_cents"),
+            literal(dt.datetime.utcnow()).label("created_at"),
+        )
+        .select_from(changed)
+        .outerjoin(latest, latest.c.account_id == changed.c.account_id)
+        .where(changed.c.n > 0)
+    )
+    n = db.session.execute(insert(LedgerSnapshot).from_select(
+        ["account_id", "as_of_date", "through_seq", "balance_cents", "created_at"], rows)).rowcount
+    db.session.commit()
+    logging.info(f"[ledger] Took {n} balance snapshots as of {as_of.isoformat()}.")
+    return n
@@ -0,0 +1,35 @@
+# server/pool_metrics.py
+"""
+Per-request count of DB connection checkouts, for comparing serving modes.
+
+A mutable dict is stored in a ContextVar at the start of each request. Pool
+'checkout' events increment it. Threads started with asyncio.to_thread copy the
+context, so they update the same dict.
+"""
+import contextvars
+
+from sqlalchemy import event
+
+CHECKOUT_HEADER = 'X-DB-Checkouts'
+
+_request_stats = contextvars.ContextVar('db_request_stats', default=None)
+
+
+def begin_request():
+    stats = {"checkouts": 0}
+    _request_stats.set(stats)
+    return stats
+
+
+def current_checkouts():
+    stats = _request_stats.get()
+    return stats["checkouts"] if stats else 0
+
+
+def install_checkout_counter(sync_engine):
+    """Attach to a sync Engine (for an AsyncEngine pass async_engine.sync_engine)."""
+    @event.listens_for(sync_engine.pool, 'checkout')
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats["checkouts"] += 1
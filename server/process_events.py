@@ -0,0 +1,357 @@
+# server/process_events.py
+"""
+Push process status changes to residents over server-sent events.
+
+- Capture: a before_flush hook turns every Process.status change into a ProcessEvent
+  row, written in the same transaction. The row id is the SSE event id.
+- Ordering: ids are handed out when rows are inserted, not when they commit, so a
+  stream can see event 11 before a slower transaction commits event 10. Streams
+  therefore never filter on "id > last". Each stream keeps a cursor on created_at and
+  re-reads from EVENT_OVERLAP before it. Ids it has already sent are skipped.
+  A client that reconnects with Last-Event-ID is replayed everything created since
+  that event, minus the overlap. It may see an event twice (ids are stable, so it can
+  drop ids it has seen), but it won't miss one.
+- Fan-out inside a worker: EventBroker keeps one Subscription per open stream.
+  Each buffer holds at most BUFFER_SIZE events. A stream that falls further behind
+  is marked overflowed and catches up from the table rather than growing without bound.
+- Fan-out across workers: on Postgres the hook calls pg_notify in the same
+  transaction, so the notification goes out on commit and is dropped on rollback.
+  Every worker runs one PgListener thread (started on the first subscription) that
+  LISTENs and feeds its local broker. Other databases publish locally after
+  commit, which is enough for a single dev process.
+- Streams send a comment line every HEARTBEAT_SECONDS, so proxies keep the
+  connection open and dead clients are noticed.
+- Each open stream holds a worker thread (or greenlet under GUNICORN_MODE=gevent). A stream
+  ends after STREAM_MAX_SECONDS and the browser reconnects with Last-Event-ID. A worker
+  accepts at most SSE_MAX_STREAMS at once; beyond that the route answers 503 with
+  Retry-After, so streams can't take every thread from ordinary requests.
+"""
+import datetime as dt
+import json
+import logging
+import os
+import select
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, inspect, text
+
+from models import db, Process, ProcessEvent
+
+CHANNEL = 'process_events'
+HEARTBEAT_SECONDS = 15
+BUFFER_SIZE = 256
+RETRY_MS = 3000
+REPLAY_LIMIT = 500
+EVENT_RETENTION = dt.timedelta(days=7)
+EVENT_OVERLAP = dt.timedelta(seconds=int(os.getenv('SSE_EVENT_OVERLAP_SECONDS', '300')))
+STREAM_MAX_SECONDS = int(os.getenv('SSE_STREAM_MAX_SECONDS', '300'))
+MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '100'))
+
+
+# ---------- broker ----------
+
+class Subscription:
+    def __init__(self, resident_id, maxlen=BUFFER_SIZE):
+        self.resident_id = resident_id
+        self.maxlen = maxlen
+        self.buffer = deque()
+        self.overflowed = False
+        self.cond = threading.Condition()
+
+    def push(self, payload):
+        with self.cond:
+            if len(self.buffer) >= self.maxlen:
+                # Too far behind: drop the backlog and let the stream re-read it from the table
+                self.buffer.clear()
+                self.overflowed = True
+            else:
+                self.buffer.append(payload)
+            self.cond.notify()
+
+    def mark_gap(self):
+        with self.cond:
+            self.overflowed = True
+            self.cond.notify()
+
+    def wait(self, timeout):
+        """(events, needs_catch_up). Returns early as soon as anything arrives."""
+        with self.cond:
+            if not self.buffer and not self.overflowed:
+                self.cond.wait(timeout)
+            items = list(self.buffer)
+            self.buffer.clear()
+            gap, self.overflowed = self.overflowed, False
+            return items, gap
+
+
+class EventBroker:
+    def __init__(self):
+        self._subs = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, resident_id, maxlen=BUFFER_SIZE):
+        sub = Subscription(resident_id, maxlen)
+        with self._lock:
+            self._subs.setdefault(resident_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subs.get(sub.resident_id)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.resident_id]
+
+    def publish(self, payload):
+        with self._lock:
+            subs = list(self._subs.get(payload["resident_id"], ()))
+        for sub in subs:
+            sub.push(payload)
+
+    def mark_gap_all(self):
+        """After a listener reconnect: every stream re-reads the table from its last id."""
+        with self._lock:
+            subs = [s for group in self._subs.values() for s in group]
+        for sub in subs:
+            sub.mark_gap()
+
+    def stream_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+    def stats(self):
+        with self._lock:
+            return {"residents": len(self._subs), "streams": sum(len(s) for s in self._subs.values())}
+
+
+broker = EventBroker()
+
+
+# ---------- Postgres LISTEN ----------
+
+class PgListener(threading.Thread):
+    """One LISTEN connection per worker process, outside the pool."""
+
+    def __init__(self, engine, channel=CHANNEL):
+        super().__init__(name='process-events-listener', daemon=True)
+        self.engine = engine
+        self.channel = channel
+
+    def run(self):
+        backoff = 1
+        while True:
+            conn = None
+            try:
+                conn = self.engine.raw_connection()
+                conn.detach()  # never hand a LISTENing connection back to the pool
+                raw = conn.dbapi_connection
+                raw.autocommit = True
+                raw.cursor().execute(f"LISTEN {self.channel}")
+                logging.info(f"[events] Listening on '{self.channel}'.")
+                broker.mark_gap_all()  # anything sent while we were disconnected
+                backoff = 1
+                while True:
+                    if select.select([raw], [], [], HEARTBEAT_SECONDS) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        note = raw.notifies.pop(0)
+                        try:
+                            broker.publish(json.loads(note.payload))
+                        except (ValueError, KeyError) as e:
+                            logging.warning(f"[events] Ignoring malformed notification: {e}")
+            except Exception as e:
+                logging.error(f"[events] Listener connection lost: {e}; reconnecting in {backoff}s", exc_info=True)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener():
+    """Start this process's LISTEN thread (Postgres only). Safe to call per request."""
+    global _listener
+    if db.engine.dialect.name != 'postgresql':
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = PgListener(db.engine)
+            _listener.start()
+
+
+# ---------- capture ----------
+
+def _status_changes(session):
+    for obj in session.dirty:
+        if not isinstance(obj, Process):
+            continue
+        hist = inspect(obj).attrs.status.history
+        if hist.added and hist.deleted and hist.added[0] != hist.deleted[0]:
+            yield obj, hist.deleted[0], hist.added[0]
+
+
+def register_process_event_listeners(session_cls=None):
+    """Record and publish Process.status changes on commit."""
+    target = session_cls or db.session
+
+    @event.listens_for(target, 'before_flush')
+    def _record_status_changes(session, flush_context, instances):
+        rows = session.info.setdefault('process_event_rows', [])
+        for proc, old, new in _status_changes(session):
+            row = ProcessEvent(resident_id=proc.resident_id, process_id=proc.id, data={
+                "process_id": proc.id,
+                "resident_id": proc.resident_id,
+                "title": proc.title,
+                "category": proc.category,
+                "previous_status": old,
+                "status": new,
+                "changed_at": dt.datetime.utcnow().isoformat(),
+            })
+            session.add(row)
+            rows.append(row)
+
+    @event.listens_for(target, 'after_flush')
+    def _notify_flushed(session, flush_context):
+        rows = session.info.pop('process_event_rows', None)
+        if not rows:
+            return
+        payloads = [event_payload(r) for r in rows]
+        if session.get_bind().dialect.name == 'postgresql':
+            # Delivered by Postgres on commit, discarded on rollback
+            for p in payloads:
+                session.connection().execute(text("SELECT pg_notify(:c, :p)"), {"c": CHANNEL, "p": json.dumps(p)})
+        else:
+            session.info.setdefault('process_event_pending', []).extend(payloads)
+
+    @event.listens_for(target, 'after_commit')
+    def _publish_on_commit(session):
+        for p in session.info.pop('process_event_pending', []):
+            broker.publish(p)
+
+    @event.listens_for(target, 'after_rollback')
+    def _clear_on_rollback(session):
+        session.info.pop('process_event_rows', None)
+        session.info.pop('process_event_pending', None)
+
+
+# ---------- streaming ----------
+
+def event_payload(row):
+    return dict(row.data, id=row.id, created_at=row.created_at.isoformat())
+
+
+def events_since(resident_id, since, after_id=0, limit=REPLAY_LIMIT):
+    """Events created at or after `since`, in (created_at, id) order, after the key (since, after_id)."""
+    rows = (
+        ProcessEvent.query.filter(
+            ProcessEvent.resident_id == resident_id,
+            db.or_(ProcessEvent.created_at > since,
+                   db.and_(ProcessEvent.created_at == since, ProcessEvent.id > after_id)),
+        )
+        .order_by(ProcessEvent.created_at, ProcessEvent.id).limit(limit).all()
+    )
+    payloads = [event_payload(r) for r in rows]
+    db.session.close()  # streams are long-lived; never hold a pooled connection between reads
+    return payloads
+
+
+def resume_point(resident_id, last_event_id):
+    """created_at of the client's last event (or of the first one after it, if it was purged)."""
+    row = (
+        db.session.query(ProcessEvent.created_at)
+        .filter(ProcessEvent.resident_id == resident_id, ProcessEvent.id >= last_event_id)
+        .order_by(ProcessEvent.id).first()
+    )
+    db.session.close()
+    return row[0] if row else dt.datetime.utcnow()
+
+
+class EventCursor:
+    """
+    Where a stream is, by creation time, plus the ids it sent within EVENT_OVERLAP of
+    that time. Replays start EVENT_OVERLAP back, so events that committed late are
+    still found, and the id set keeps them from being sent twice.
+    """
+
+    def __init__(self, since, sent=()):
+        self.since = since
+        self.sent = {i: since for i in sent}
+
+    def fresh(self, payload):
+        """True (and remembered) the first time an event id is seen."""
+        if payload['id'] in self.sent:
+            return False
+        created = dt.datetime.fromisoformat(payload['created_at'])
+        self.sent[payload['id']] = created
+        if created > self.since:
+            self.since = created
+            horizon = self.since - EVENT_OVERLAP
+            self.sent = {i: t for i, t in self.sent.items() if t >= horizon}
+        return True
+
+    def replay(self, resident_id):
+        since, after_id = self.since - EVENT_OVERLAP, 0
+        while True:
+            rows = events_since(resident_id, since, after_id)
+            for p in rows:
+                if self.fresh(p):
+                    yield p
+            if len(rows) < REPLAY_LIMIT:
+                return
+            since, after_id = dt.datetime.fromisoformat(rows[-1]['created_at']), rows[-1]['id']
+
+
+def format_sse(payload):
+    return f"id: {payload['id']}\nevent: process_status\ndata: {json.dumps(payload)}\n\n"
+
+
+def event_stream(resident_id, last_event_id=None, heartbeat=HEARTBEAT_SECONDS, max_seconds=STREAM_MAX_SECONDS):
+    """
+    Generator of SSE frames for one resident. Without Last-Event-ID the stream starts
+    now; with it, missed events are replayed first. Ends after max_seconds; the
+    browser reconnects with the last id it received.
+    """
+    ensure_listener()
+    sub = broker.subscribe(resident_id)  # before reading the table, so nothing slips between
+    deadline = time.monotonic() + max_seconds
+    try:
+        if last_event_id is not None:
+            cursor = EventCursor(resume_point(resident_id, last_event_id), sent=[last_event_id])
+        else:
+            cursor = EventCursor(dt.datetime.utcnow())
+        yield f"retry: {RETRY_MS}\n\n"
+        catch_up = last_event_id is not None
+        while time.monotonic() < deadline:
+            if catch_up:
+                for p in cursor.replay(resident_id):
+                    yield format_sse(p)
+            items, catch_up = sub.wait(min(heartbeat, max(0.0, deadline - time.monotonic())))
+            if catch_up:
+                continue
+            if not items:
+                yield ": heartbeat\n\n"
+                continue
+            for p in items:
+                if cursor.fresh(p):
+                    yield format_sse(p)
+    finally:
+        broker.unsubscribe(sub)
+
+
+def purge_events(retention=EVENT_RETENTION):
+    cutoff = dt.datetime.utcnow() - retention
+    n = ProcessEvent.query.filter(ProcessEvent.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    logging.info(f"[events] Purged {n} process events older than {cutoff.isoformat()}.")
+    return n
@@ -0,0 +1,157 @@
+# server/query_budget.py
+"""
+Per-request query counting, N+1 detection and per-route query budgets.
+
+Enable with QUERY_BUDGET:
+- off (default): nothing is installed.
+- log: each request's statements are counted through a before_cursor_execute hook.
+  The count is returned in the X-DB-Queries header. A statement shape repeated
+  REPEAT_THRESHOLD or more times in one request (the N+1 signature) is logged with
+  the stack that issued the second occurrence. A route over its budget logs an error.
+- strict: the same as log, but a route over its budget answers 500. This is what the
+  test suite runs (tests/test_query_budgets.py, scripts/check_query_budgets.py).
+
+Budgets are declared next to the route:
+
+    @rates_bp.route("/properties")
+    @auth_required
+    @query_budget(12)
+    def get_rates_properties(): ...
+
+or registered by endpoint name in BUDGETS (e.g. for blueprints you don't own).
+A budget is a constant: a route whose count grows with the number of properties
+will exceed it as soon as a resident has enough of them.
+"""
+import contextvars
+import logging
+import os
+import re
+import traceback
+from collections import Counter
+
+from flask import current_app, jsonify, request
+from sqlalchemy import event
+
+QUERY_COUNT_HEADER = 'X-DB-Queries'
+REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', '3'))
+
+# endpoint -> max queries; @query_budget fills in the rest from the view function
+BUDGETS = {}
+
+_request_log = contextvars.ContextVar('db_query_log', default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement):
+    """SQL with literals and IN lists collapsed, so repeats with different ids compare equal."""
+    shape = _STRING.sub('?', statement)
+    shape = _IN_LIST.sub('IN (?)', shape)
+    shape = _NUMBER.sub('?', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+def _app_stack():
+    """Stack frames from this codebase only, innermost last."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    frames = [f for f in traceback.extract_stack()[:-3]
+              if f.filename.startswith(root) and os.sep + 'venv' not in f.filename]
+    return ''.join(traceback.format_list(frames[-8:]))
+
+
+class QueryLog:
+    def __init__(self, capture_stacks=True):
+        self.count = 0
+        self.shapes = Counter()
+        self.stacks = {}
+        self.capture_stacks = capture_stacks
+
+    def record(self, statement):
+        self.count += 1
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        if self.capture_stacks and self.shapes[shape] == 2:
+            self.stacks[shape] = _app_stack()
+
+    def repeats(self, threshold=REPEAT_THRESHOLD):
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+def begin_request(capture_stacks=True):
+    log = QueryLog(capture_stacks)
+    _request_log.set(log)
+    return log
+
+
+def current_log():
+    return _request_log.get()
+
+
+def install_query_counter(sync_engine):
+    """Attach to a sync Engine (for an AsyncEngine pass async_engine.sync_engine)."""
+    @event.listens_for(sync_engine, 'before_cursor_execute')
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        log = _request_log.get()
+        if log is not None:
+            log.record(statement)
+
+
+def query_budget(max_queries):
+    """Declare the most queries a view may issue per request."""
+    def decorator(f):
+        f._query_budget = max_queries
+        return f
+    return decorator
+
+
+def budget_for(endpoint):
+    if endpoint in BUDGETS:
+        return BUDGETS[endpoint]
+    view = current_app.view_functions.get(endpoint)
+    return getattr(view, '_query_budget', None)
+
+
+def finish_request(response, strict=False):
+    log = _request_log.get()
+    if log is None:
+        return response
+    _request_log.set(None)
+
+    for shape, n in log.repeats():
+        logging.warning(
+            f"[queries] Possible N+1 in {request.endpoint}: {n}x {shape[:200]}\n{log.stacks.get(shape, '')}"
+        )
+
+    budget = budget_for(request.endpoint)
+    if budget is not None and log.count > budget:
+        logging.error(f"[queries] {request.endpoint} ran {log.count} queries; budget is {budget}")
+        if strict:
+            response = jsonify({
+                "error": "Query budget exceeded",
+                "details": f"{request.endpoint} ran {log.count} queries; budget is {budget}."
+            })
+            response.status_code = 500
+    response.headers[QUERY_COUNT_HEADER] = str(log.count)
+    return response
+
+
+def init_query_budget(app, engine):
+    """Install counting for QUERY_BUDGET=log|strict. Returns the mode."""
+    mode = os.getenv('QUERY_BUDGET', 'off').lower()
+    if mode not in ('log', 'strict'):
+        return 'off'
+    install_query_counter(engine)
+
+    @app.before_request
+    def _begin_query_log():
+        begin_request()
+
+    @app.after_request
+    def _check_query_budget(response):
+        return finish_request(response, strict=(mode == 'strict'))
+
+    logging.info(f"[queries] Query budgets enabled ({mode}).")
+    return mode
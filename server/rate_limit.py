@@ -0,0 +1,294 @@
+# server/rate_limit.py
+"""
+Token-bucket rate limiting.
+
+A limit such as "30/minute" with burst 10 lets a client make 10 requests at once.
+After that, requests are admitted at the refill rate of 0.5 per second. Buckets are
+keyed by limit name plus the caller: the authenticated identity (set by
+auth_required) or the client IP.
+
+    @rates_bp.route("/properties")
+    @auth_required
+    @rate_limited('rates.properties', '30/minute', burst=10)        # per identity
+    def get_rates_properties(): ...
+
+    @auth.route('/login', methods=['POST'])
+    @rate_limited('auth.login', '10/minute', per='ip')
+    def login(): ...
+
+Backends (RATE_LIMIT_BACKEND):
+- memory (default): per-process buckets. With N workers the effective limit is up to N times higher.
+- database: one UNLOGGED Postgres row per bucket, refilled and consumed in a single
+  atomic upsert, so every worker shares the same buckets. No extra infrastructure,
+  the same way the job queue and process events use Postgres.
+
+Per-limit overrides come from RATE_LIMITS, a JSON object of name -> "rate" or
+{"rate": ..., "burst": ...}; a rate of "off" disables the limit. Limited responses
+are 429 with Retry-After. Every response under a limit carries X-RateLimit-Limit and
+X-RateLimit-Remaining. If the backend fails, requests are allowed through (fail open)
+and the error is counted.
+"""
+import functools
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, jsonify, request
+from sqlalchemy import text
+
+from models import db
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+MEMORY_MAX_KEYS = 100000
+
+
+def parse_rate(rate):
+    """'30/minute' -> (30, 60). Also accepts '5/10s' style periods in seconds."""
+    count, _, period = rate.partition('/')
+    period = period.strip()
+    if period in PERIODS:
+        seconds = PERIODS[period]
+    elif period.endswith('s') and period[:-1].isdigit():
+        seconds = int(period[:-1])
+    else:
+        raise ValueError(f"Bad rate '{rate}'; expected e.g. '30/minute' or '5/10s'")
+    return int(count), seconds
+
+
+class Limit:
+    def __init__(self, name, rate, burst=None, per='identity', cost=1):
+        count, seconds = parse_rate(rate)
+        self.name = name
+        self.rate = rate
+        self.refill_per_second = count / seconds
+        self.capacity = float(burst if burst is not None else count)
+        self.per = per  # 'identity' (falls back to IP when unauthenticated) | 'ip'
+        self.cost = cost
+
+
+# ---------- backends ----------
+
+class MemoryBackend:
+    def __init__(self, max_keys=MEMORY_MAX_KEYS):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+
+    def consume(self, key, limit):
+        """(allowed, tokens_left)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - last) * limit.refill_per_second)
+            allowed = tokens >= limit.cost
+            if allowed:
+                tokens -= limit.cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._evict(now)
+        return allowed, tokens
+
+    def _evict(self, now):
+        # Buckets idle long enough to have refilled completely carry no state
+        idle = [k for k, (_, last) in self._buckets.items() if now - last > 3600]
+        for k in idle or list(self._buckets)[: len(self._buckets) // 10]:
+            del self._buckets[k]
+
+
+class DatabaseBackend:
+    """Shared buckets in an UNLOGGED Postgres table (bucket state needn't survive a crash)."""
+
+    _SQL = text("""
+        INSERT INTO rate_limit_bucket AS b (key, tokens, allowed, updated_at)
+        VALUES (:key, :capacity - :cost, TRUE, clock_timestamp())
+        ON CONFLICT (key) DO UPDATE SET
+            allowed = LEAST(:capacity, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate) >= :cost,
+            tokens = LEAST(:capacity, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate)
+                     - CASE WHEN LEAST(:capacity, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate)
+                                 >= :cost THEN :cost ELSE 0 END,
+            updated_at = clock_timestamp()
+        RETURNING allowed, tokens
+    """)
+
+    def __init__(self):
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _ensure_table(self, engine):
+        with self._lock:
+            if self._ready:
+                return
+            if engine.dialect.name != 'postgresql':
+                raise RuntimeError("RATE_LIMIT_BACKEND=database needs Postgres")
+            with engine.begin() as conn:
+                conn.execute(text("""
+                    CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_bucket (
+                        key TEXT PRIMARY KEY,
+                        tokens DOUBLE PRECISION NOT NULL,
+                        allowed BOOLEAN NOT NULL,
+                        updated_at TIMESTAMPTZ NOT NULL
+                    )"""))
+            self._ready = True
+
+    def consume(self, key, limit):
+        engine = db.engine
+        if not self._ready:
+            self._ensure_table(engine)
+        # Own short transaction: never entangled with the request's session
+        with engine.begin() as conn:
+            allowed, tokens = conn.execute(self._SQL, {
+                "key": key, "capacity": limit.capacity, "cost": limit.cost, "rate": limit.refill_per_second,
+            }).one()
+        return bool(allowed), float(tokens)
+
+    def purge(self, idle_seconds=86400):
+        with db.engine.begin() as conn:
+            return conn.execute(text(
+                "DELETE FROM rate_limit_bucket WHERE updated_at < clock_timestamp() - make_interval(secs => :s)"
+            ), {"s": idle_seconds}).rowcount
+
+
+def make_backend(name=None):
+    name = (name or os.getenv('RATE_LIMIT_BACKEND', 'memory')).lower()
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'database':
+        return DatabaseBackend()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{name}'")
+
+
+# ---------- limiter ----------
+
+class RateLimiter:
+    def __init__(self, backend=None):
+        self.backend = backend or make_backend()
+        self.enabled = os.getenv('RATE_LIMIT_ENABLED', '1') != '0'
+        self.trust_forwarded = os.getenv('RATE_LIMIT_TRUST_FORWARDED') == '1'
+        self.overrides = self._load_overrides()
+        self.metrics = defaultdict(lambda: {"allowed": 0, "limited": 0, "errors": 0})
+        self._limits = {}
+        self._metrics_lock = threading.Lock()
+
+    @staticmethod
+    def _load_overrides():
+        raw = os.getenv('RATE_LIMITS')
+        if not raw:
+            return {}
+        try:
+            return json.loads(raw)
+        except ValueError as e:
+            logging.error(f"[ratelimit] Ignoring unparsable RATE_LIMITS: {e}")
+            return {}
+
+    def limit(self, name, rate, burst=None, per='identity', cost=1):
+        """Resolve a declared limit against RATE_LIMITS. Returns None if switched off."""
+        override = self.overrides.get(name)
+        if isinstance(override, str):
+            rate, burst = override, None
+        elif isinstance(override, dict):
+            rate, burst = override.get('rate', rate), override.get('burst', burst)
+        if rate == 'off':
+            return None
+        lim = Limit(name, rate, burst, per, cost)
+        self._limits[name] = lim
+        return lim
+
+    def declared(self, name):
+        """The limit a view declared as `name`, or None if it's switched off or undeclared."""
+        return self._limits.get(name)
+
+    def client_ip(self):
+        if self.trust_forwarded:
+            forwarded = request.headers.get('X-Forwarded-For')
+            if forwarded:
+                return forwarded.split(',')[0].strip()
+        return request.remote_addr or 'unknown'
+
+    def caller_key(self, limit):
+        if limit.per == 'identity':
+            identity = getattr(request, 'current_identity', None)
+            if identity is not None:
+                return f"{limit.name}:id:{identity}"
+        return f"{limit.name}:ip:{self.client_ip()}"
+
+    def _count(self, name, field):
+        with self._metrics_lock:
+            self.metrics[name][field] += 1
+
+    def check(self, limit):
+        """None if the request may proceed, else a 429 response."""
+        try:
+            allowed, tokens = self.backend.consume(self.caller_key(limit), limit)
+        except Exception as e:
+            self._count(limit.name, 'errors')
+            logging.error(f"[ratelimit] Backend error for {limit.name}, allowing request: {e}")
+            return None
+
+        g.rate_limit_headers = {
+            'X-RateLimit-Limit': limit.rate,
+            'X-RateLimit-Remaining': str(max(int(tokens), 0)),
+        }
+        if allowed:
+            self._count(limit.name, 'allowed')
+            return None
+
+        self._count(limit.name, 'limited')
+        retry_after = max(1, math.ceil((limit.cost - tokens) / limit.refill_per_second))
+        logging.warning(f"[ratelimit] {limit.name} limited {self.caller_key(limit)}; retry in {retry_after}s")
+        response = jsonify({
+            "error": "Too many requests",
+            "details": f"Rate limit '{limit.rate}' exceeded for {limit.name}. Retry in {retry_after} seconds."
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    def snapshot(self):
+        with self._metrics_lock:
+            counts = {k: dict(v) for k, v in self.metrics.items()}
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "limits": {
+                name: {"rate": lim.rate, "burst": lim.capacity, "per": lim.per, **counts.get(name, {})}
+                for name, lim in self._limits.items()
+            },
+        }
+
+
+limiter = RateLimiter()
+
+
+def rate_limited(name, rate, burst=None, per='identity', cost=1):
+    """
+    Apply a token-bucket limit to a view. Put it below @auth_required so per-identity
+    limits see request.current_identity.
+    """
+    lim = limiter.limit(name, rate, burst, per, cost)
+
+    def decorator(f):
+        if lim is None:
+            return f
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if limiter.enabled:
+                limited = limiter.check(lim)
+                if limited is not None:
+                    return limited
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_rate_limiting(app):
+    """Copy rate-limit headers onto responses of limited views."""
+    @app.after_request
+    def _rate_limit_headers(response):
+        for k, v in getattr(g, 'rate_limit_headers', {}).items():
+            response.headers.setdefault(k, v)
+        return response
@@ -0,0 +1,405 @@
+# server/rating_engine.py
+"""
+Batch rate calculation and what-if modelling.
+
+Parameters are stored per council and financial year in RatingParameters.params:
+
+    {
+      "basis": "capital",                      # or "land": which valuation the rate applies to
+      "valuation_year": 2026,                  # optional, defaults to the financial year
+      "rate_in_dollar": {"default": 0.0021, "zone": {"Commercial": 0.0045},
+                         "category": {"investment": 0.0024}, "zone_category": {"Commercial/investment": 0.005}},
+      "base_cents":    {"default": 60000},     # same shape as rate_in_dollar
+      "minimum_cents": {"default": 110000},    # same shape
+      "waste": {"bin_size_l": {"120": 35000, "240": 42000}, "default_cents": 42000, "extra_bin_cents": 15000},
+      "concessions": {"pensioner": {"percent": 50, "cap_cents": 25000, "applies_to": ["general_rate", "waste"]}},
+      "concession_statuses": ["approved"]
+    }
+
+Tier lookups go from most to least specific: zone_category, zone, category, then default.
+The category is Property.property_type.
+
+The engine runs in keyset batches of properties. Each batch is one Core query per
+table, loaded into NumPy arrays. Parameters are resolved once per distinct
+(zone, category) group and then broadcast to every property in the group. No ORM
+objects are built. A what-if run only reports yield and the per-property change
+against the baseline. A committed run replaces the engine's own RateCharge rows
+for the period in one transaction.
+"""
+import datetime as dt
+import logging
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+
+from models import db, Property, Valuation, WasteEntitlement, Concession, RateCharge, RatingParameters
+
+BATCH_SIZE = 50000
+ENGINE_CATEGORIES = ('general_rate', 'waste', 'concession')
+PERCENTILES = (5, 25, 50, 75, 95)
+HISTOGRAM_BINS = 20
+TOP_MOVERS = 20
+
+
+# ---------- parameters ----------
+
+def financial_period(financial_year):
+    return dt.date(financial_year, 7, 1), dt.date(financial_year + 1, 6, 30)
+
+
+def load_parameters(council_id, financial_year):
+    row = RatingParameters.query.filter_by(council_id=council_id, financial_year=financial_year).first()
+    return row.params if row else None
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+
+def parse_year(value, name):
+    """A financial year as an int, or ValueError (never TypeError) for anything else."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).strip().isdigit():
+        raise ValueError(f"{name} must be a year, e.g. 2026.")
+    year = int(value)
+    if not 1900 <= year <= 9998:
+        raise ValueError(f"{name} must be a year, e.g. 2026.")
+    return year
+
+
+def validate_parameters(params):
+    """Raise ValueError describing the first problem found."""
+    if not isinstance(params, dict):
+        raise ValueError("Parameters must be an object.")
+    if params.get("basis", "capital") not in ("capital", "land"):
+        raise ValueError("basis must be 'capital' or 'land'.")
+    for key in ("rate_in_dollar", "base_cents", "minimum_cents"):
+        tier = params.get(key, {})
+        if not isinstance(tier, dict):
+            raise ValueError(f"{key} must be an object.")
+        values = [tier.get("default", 0)]
+        for section in ("zone", "category", "zone_category"):
+            if not isinstance(tier.get(section, {}), dict):
+                raise ValueError(f"{key}.{section} must be an object.")
+            values += list(tier.get(section, {}).values())
+        if not all(_number(v) for v in values):
+            raise ValueError(f"{key} values must be non-negative numbers.")
+    if "rate_in_dollar" not in params:
+        raise ValueError("rate_in_dollar is required.")
+    if params.get("valuation_year") is not None:
+        parse_year(params["valuation_year"], "valuation_year")
+    statuses = params.get("concession_statuses")
+    if statuses is not None and (not isinstance(statuses, list) or not all(isinstance(x, str) for x in statuses)):
+        raise ValueError("concession_statuses must be a list of strings.")
+
+    waste = params.get("waste") or {}
+    if not isinstance(waste, dict):
+        raise ValueError("waste must be an object.")
+    sizes = waste.get("bin_size_l") or {}
+    if not isinstance(sizes, dict):
+        raise ValueError("waste.bin_size_l must be an object.")
+    if any(not str(size).isdigit() for size in sizes):
+        raise ValueError("waste.bin_size_l keys must be bin sizes in litres.")
+    if not all(_number(v) for v in [waste.get("default_cents", 0), waste.get("extra_bin_cents", 0), *sizes.values()]):
+        raise ValueError("waste values must be non-negative numbers.")
+
+    concessions = params.get("concessions") or {}
+    if not isinstance(concessions, dict):
+        raise ValueError("concessions must be an object.")
+    for name, c in concessions.items():
+        if not isinstance(c, dict):
+            raise ValueError(f"concessions.{name} must be an object.")
+        if not _number(c.get("percent", 0)) or c.get("percent", 0) > 100:
+            raise ValueError(f"concessions.{name}.percent must be between 0 and 100.")
+        if c.get("cap_cents") is not None and not _number(c["cap_cents"]):
+            raise ValueError(f"concessions.{name}.cap_cents must be a non-negative number.")
+        applies = c.get("applies_to") or ["general_rate"]
+        if not isinstance(applies, list) or not set(applies) <= {"general_rate", "waste"}:
+            raise ValueError(f"concessions.{name}.applies_to must list 'general_rate' and/or 'waste'.")
+    return params
+
+
+def _tier(params, key, zone, category):
+    tier = params.get(key) or {}
+    for section, k in (("zone_category", f"{zone}/{category}"), ("zone", zone), ("category", category)):
+        value = (tier.get(section) or {}).get(k)
+        if value is not None:
+            return float(value)
+    return float(tier.get("default", 0))
+
+
+# ---------- loading ----------
+
+def _property_batches(council_id, batch_size):
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Property.id, Property.zone, Property.property_type)
+            .where(Property.council_id == council_id, Property.id > last_id)
+            .order_by(Property.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _aligned(pid, keys, values, fill, dtype):
+    """Scatter values onto the positions of pid (sorted, unique) matching keys."""
+    out = np.full(pid.size, fill, dtype=dtype)
+    if len(keys):
+        out[np.searchsorted(pid, np.asarray(keys, dtype=np.int64))] = np.asarray(values, dtype=dtype)
+    return out
+
+
+def _load_batch(council_id, rows, params, financial_year):
+    """
+    Column arrays for one batch of properties. Each side table is read once for the
+    property id range of the batch, joined to Property on council. So every row that
+    comes back belongs to a property in `rows`.
+    """
+    pid = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    lo, hi = int(pid[0]), int(pid[-1])
+    in_batch = (Property.council_id == council_id, Property.id.between(lo, hi))
+    groups, group_code = np.unique(
+        np.array([f"{r[1] or ''}\x1f{r[2] or ''}" for r in rows], dtype=object), return_inverse=True)
+
+    # Latest valuation at or before valuation_year
+    column = Valuation.land_value_cents if params.get("basis") == "land" else Valuation.capital_value_cents
+    vyear = parse_year(params.get("valuation_year") or financial_year, "valuation_year")
+    vals = db.session.execute(
+        select(Valuation.property_id, column)
+        .join(Property, Property.id == Valuation.property_id)
+        .where(*in_batch, Valuation.year <= vyear)
+        .order_by(Valuation.property_id, Valuation.year)
+    ).all()
+    latest = {property_id: value for property_id, value in vals}  # ordered by year: last one wins
+    valuation = _aligned(pid, list(latest), [np.nan if v is None else v for v in latest.values()],
+                         np.nan, np.float64)
+
+    ents = db.session.execute(
+        select(WasteEntitlement.property_id, WasteEntitlement.bin_size_l, WasteEntitlement.extra_bins)
+        .join(Property, Property.id == WasteEntitlement.property_id)
+        .where(*in_batch)
+    ).all()
+    ent_ids = [e[0] for e in ents]
+
+    statuses = params.get("concession_statuses") or ["approved"]
+    conc = db.session.execute(
+        select(Concession.property_id, Concession.type)
+        .join(Property, Property.id == Concession.property_id)
+        .where(*in_batch, Concession.status.in_(statuses))
+    ).all()
+    by_type = {}
+    for property_id, ctype in conc:
+        by_type.setdefault(ctype, set()).add(property_id)
+
+    return {
+        "property_id": pid,
+        "groups": [tuple(g.split("\x1f")) for g in groups],
+        "group_code": group_code,
+        "valuation": valuation,
+        "has_service": _aligned(pid, ent_ids, [True] * len(ents), False, bool),
+        "bin_size": _aligned(pid, ent_ids, [e[1] or 0 for e in ents], 0, np.int32),
+        "extra_bins": _aligned(pid, ent_ids, [e[2] or 0 for e in ents], 0, np.int32),
+        "concessions": {ctype: _aligned(pid, list(ids), [True] * len(ids), False, bool)
+                        for ctype, ids in by_type.items()},
+    }
+
+
+# ---------- calculation ----------
+
+def compute_batch(batch, params):
+    """Per-property cents as int64 arrays: general, waste, concession (<= 0) and total."""
+    code = batch["group_code"]
+    groups = batch["groups"]
+    rid = np.array([_tier(params, "rate_in_dollar", z, c) for z, c in groups])[code]
+    base = np.array([_tier(params, "base_cents", z, c) for z, c in groups])[code]
+    minimum = np.array([_tier(params, "minimum_cents", z, c) for z, c in groups])[code]
+
+    valuation = np.nan_to_num(batch["valuation"], nan=0.0)
+    general = np.rint(np.maximum(base + valuation * rid, minimum)).astype(np.int64)
+
+    waste_params = params.get("waste") or {}
+    sizes = waste_params.get("bin_size_l") or {}
+    default_cents = int(waste_params.get("default_cents", 0))
+    bin_size = batch["bin_size"]
+    bin_charge = np.full(bin_size.size, default_cents, dtype=np.int64)
+    for size, cents in sizes.items():
+        bin_charge[bin_size == int(size)] = int(cents)
+    waste = np.where(
+        batch["has_service"],
+        bin_charge + batch["extra_bins"].astype(np.int64) * int(waste_params.get("extra_bin_cents", 0)),
+        0,
+    ).astype(np.int64)
+
+    rebate = np.zeros(general.size, dtype=np.int64)
+    for ctype, mask in batch["concessions"].items():
+        rule = (params.get("concessions") or {}).get(ctype)
+        if not rule:
+            continue
+        applies = rule.get("applies_to") or ["general_rate"]
+        eligible = (general if "general_rate" in applies else 0) + (waste if "waste" in applies else 0)
+        amount = np.rint(eligible * float(rule.get("percent", 0)) / 100.0).astype(np.int64)
+        if rule.get("cap_cents") is not None:
+            amount = np.minimum(amount, int(rule["cap_cents"]))
+        rebate += np.where(mask, amount, 0)
+    rebate = np.minimum(rebate, general + waste)  # never below zero overall
+
+    return {"general_rate": general, "waste": waste, "concession": -rebate, "total": general + waste - rebate}
+
+
+def _baseline(council_id, rows_pid, period_start):
+    """Current engine-category totals per property for the period, aligned to rows_pid (NaN if none)."""
+    lo, hi = int(rows_pid[0]), int(rows_pid[-1])
+    totals = db.session.execute(
+        select(RateCharge.property_id, func.sum(RateCharge.amount_cents))
+        .join(Property, Property.id == RateCharge.property_id)
+        .where(Property.council_id == council_id, Property.id.between(lo, hi),
+               RateCharge.period_start == period_start, RateCharge.category.in_(ENGINE_CATEGORIES))
+        .group_by(RateCharge.property_id)
+    ).all()
+    return _aligned(rows_pid, [t[0] for t in totals], [float(t[1]) for t in totals], np.nan, np.float64)
+
+
+def _dollars(cents):
+    return round(float(cents) / 100.0, 2)
+
+
+def _impact(delta, pid, groups, group_code, baseline):
+    has = ~np.isnan(delta)
+    d = delta[has]
+    if d.size == 0:
+        return {"compared": 0}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(baseline[has] > 0, d / baseline[has], np.nan)
+    counts, edges = np.histogram(d, bins=HISTOGRAM_BINS)
+    by_group = []
+    codes = group_code[has]
+    for code in np.unique(codes):
+        sel = d[codes == code]
+        zone, category = groups[code]
+        by_group.append({"zone": zone or None, "category": category or None, "count": int(sel.size),
+                         "mean_change": _dollars(sel.mean()), "median_change": _dollars(np.median(sel))})
+    order = np.argsort(-np.abs(d))[:TOP_MOVERS]
+    pct_valid = pct[~np.isnan(pct)]
+    return {
+        "compared": int(d.size),
+        "increased": int((d > 0).sum()),
+        "decreased": int((d < 0).sum()),
+        "unchanged": int((d == 0).sum()),
+        "total_change": _dollars(d.sum()),
+        "percentiles": {f"p{p}": _dollars(x) for p, x in zip(PERCENTILES, np.percentile(d, PERCENTILES))},
+        "percent_change_percentiles": (
+            {f"p{p}": round(float(x), 4) for p, x in zip(PERCENTILES, np.percentile(pct_valid, PERCENTILES))}
+            if pct_valid.size else {}),
+        "histogram": {"edges": [_dollars(e) for e in edges], "counts": counts.tolist()},
+        "by_zone_category": by_group,
+        "largest_changes": [{"property_id": int(pid[has][k]), "baseline": _dollars(baseline[has][k]),
+                             "change": _dollars(d[k])} for k in order],
+    }
+
+
+# ---------- runs ----------
+
+def _charge_rows(pid, result, period_start, period_end):
+    rows = []
+    for category, description in (("general_rate", "General rate"), ("waste", "Waste service"),
+                                  ("concession", "Concession rebate")):
+        amounts = result[category]
+        for k in np.nonzero(amounts)[0]:
+            rows.append({"property_id": int(pid[k]), "period_start": period_start, "period_end": period_end,
+                         "category": category, "description": description, "amount_cents": int(amounts[k])})
+    return rows
+
+
+def run_rating(council_id, financial_year, params=None, commit=False, baseline_year=None,
+               batch_size=BATCH_SIZE):
+    """
+    Rate every property of a council for the financial year.
+
+    params defaults to the stored parameters. A what-if run (commit=False) writes
+    nothing and returns yield plus the impact distribution against the baseline
+    year's charges (by default the same year). A committed run replaces the
+    general_rate / waste / concession charges of the period in one transaction.
+    """
+    if params is None:
+        params = load_parameters(council_id, financial_year)
+        if params is None:
+            raise ValueError(f"No rating parameters stored for council {council_id} FY{financial_year}.")
+    validate_parameters(params)
+    financial_year = parse_year(financial_year, "financial_year")
+    baseline_year = parse_year(baseline_year, "baseline_year") if baseline_year is not None else None
+    period_start, period_end = financial_period(financial_year)
+    baseline_start, _ = financial_period(baseline_year or financial_year)
+
+    totals = {"general_rate": 0, "waste": 0, "concession": 0, "total": 0}
+    yield_by_group = {}
+    pids, deltas, baselines, codes, group_labels = [], [], [], [], []
+    properties = unvalued = written = 0
+
+    try:
+        if commit:
+            db.session.execute(
+                delete(RateCharge)
+                .where(RateCharge.period_start == period_start, RateCharge.category.in_(ENGINE_CATEGORIES),
+                       RateCharge.property_id.in_(select(Property.id).where(Property.council_id == council_id)))
+                .execution_options(synchronize_session=False)
+            )
+        for rows in _property_batches(council_id, batch_size):
+            batch = _load_batch(council_id, rows, params, financial_year)
+            result = compute_batch(batch, params)
+            pid = batch["property_id"]
+            properties += pid.size
+            unvalued += int(np.isnan(batch["valuation"]).sum())
+            for key in totals:
+                totals[key] += int(result[key].sum())
+
+            # yield per (zone, category); group codes are per batch, so key by label
+            group_totals = np.bincount(batch["group_code"], weights=result["total"], minlength=len(batch["groups"]))
+            for label, amount in zip(batch["groups"], group_totals):
+                yield_by_group[label] = yield_by_group.get(label, 0) + int(amount)
+
+            if commit:
+                charge_rows = _charge_rows(pid, result, period_start, period_end)
+                if charge_rows:
+                    db.session.execute(insert(RateCharge), charge_rows)
+                written += len(charge_rows)
+            else:
+                baseline = _baseline(council_id, pid, baseline_start)
+                pids.append(pid)
+                baselines.append(baseline)
+                deltas.append(result["total"] - baseline)
+                offset = len(group_labels)
+                group_labels.extend(batch["groups"])
+                codes.append(batch["group_code"] + offset)
+            db.session.expunge_all()
+        if commit:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    summary = {
+        "council_id": council_id,
+        "financial_year": financial_year,
+        "period_start": period_start.isoformat(),
+        "period_end": period_end.isoformat(),
+        "mode": "commit" if commit else "what_if",
+        "properties": properties,
+        "unvalued_properties": unvalued,
+        "yield": {k: _dollars(v) for k, v in totals.items()},
+        "yield_by_zone_category": [
+            {"zone": z or None, "category": c or None, "total": _dollars(v)}
+            for (z, c), v in sorted(yield_by_group.items())
+        ],
+    }
+    if commit:
+        summary["charges_written"] = written
+        logging.info(f"[rating] Council {council_id} FY{financial_year}: {written} charges written "
+                     f"for {properties} properties.")
+    elif pids:
+        summary["baseline_year"] = baseline_year or financial_year
+        summary["impact"] = _impact(np.concatenate(deltas), np.concatenate(pids), group_labels,
+                                    np.concatenate(codes), np.concatenate(baselines))
+    return summary
@@ -1,8 +1,25 @@
-from flask import Blueprint, jsonify, request
-from models import Process, db
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+from models import Process, Job, RatingParameters, ImportRun, RatesAccount, db
+from jobs import enqueue, serialize_job
+from valuation_analytics import council_analytics
+from rating_engine import run_rating, validate_parameters, parse_year
+from bulk_import import serialize_import_run
+from ledger_export import export_stream, export_filename, FORMATS
+from rate_limit import limiter
+from auth_tokens import revoke_resident
+from token_denylist import deny_list
+from routes.decorators import require_admin
+from payments_ledger import (
+    LedgerError, post_entry, reverse_entry, balance_as_of, statement, serialize_entry,
+)
+import datetime as dt
+import job_handlers  # noqa: F401  (registers job kinds for enqueue)
 
 admin = Blueprint('admin', __name__)
 
+# Every route below moves money, exports resident data or changes other residents' sessions
+admin.before_request(require_admin)
+
 @admin.route('/all', methods=['GET'])
 def all_processes():
     processes = Process.query.all()
@@ -23,4 +40,196 @@ def update_status(process_id):
         process.status = data.get("status", process.status)
         db.session.commit()
         return jsonify({"message": "Status updated"})
-    return jsonify({"message": "Process not found"}), 404
\ No newline at end of file
+    return jsonify({"message": "Process not found"}), 404
+
+@admin.route('/jobs', methods=['GET'])
+def list_jobs():
+    q = Job.query
+    if request.args.get('status'):
+        q = q.filter_by(status=request.args['status'])
+    if request.args.get('kind'):
+        q = q.filter_by(kind=request.args['kind'])
+    limit = min(int(request.args.get('limit', 100)), 500)
+    jobs = q.order_by(Job.id.desc()).limit(limit).all()
+    counts = dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all())
+    return jsonify({"counts": counts, "jobs": [serialize_job(j) for j in jobs]})
+
+@admin.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    job = Job.query.get(job_id)
+    if job:
+        return jsonify(serialize_job(job))
+    return jsonify({"message": "Job not found"}), 404
+
+@admin.route('/valuations/<int:council_id>/analytics', methods=['GET'])
+def valuation_analytics(council_id):
+    year = request.args.get('year', type=int)
+    outlier_z = request.args.get('outlier_z', default=3.5, type=float)
+    return jsonify(council_analytics(council_id, year=year, outlier_z=outlier_z))
+
+@admin.route('/rating/<int:council_id>/parameters/<int:financial_year>', methods=['GET'])
+def get_rating_parameters(council_id, financial_year):
+    row = RatingParameters.query.filter_by(council_id=council_id, financial_year=financial_year).first()
+    if row:
+        return jsonify({"council_id": council_id, "financial_year": financial_year, "params": row.params})
+    return jsonify({"message": "Rating parameters not found"}), 404
+
+@admin.route('/rating/<int:council_id>/parameters/<int:financial_year>', methods=['PUT'])
+def put_rating_parameters(council_id, financial_year):
+    params = request.json
+    try:
+        validate_parameters(params)
+    except ValueError as e:
+        return jsonify({"error": "Invalid rating parameters", "details": str(e)}), 400
+    row = RatingParameters.query.filter_by(council_id=council_id, financial_year=financial_year).first()
+    if row is None:
+        row = RatingParameters(council_id=council_id, financial_year=financial_year)
+        db.session.add(row)
+    row.params = params
+    db.session.commit()
+    return jsonify({"message": "Rating parameters saved"})
+
+@admin.route('/rating/<int:council_id>/what-if', methods=['POST'])
+def rating_what_if(council_id):
+    """Body: {"financial_year": 2026, "params": {...optional, else stored...}, "baseline_year": 2025}"""
+    data = request.json or {}
+    if not data.get("financial_year"):
+        return jsonify({"error": "financial_year is required"}), 400
+    try:
+        return jsonify(run_rating(council_id, data["financial_year"], params=data.get("params"),
+                                  baseline_year=data.get("baseline_year")))
+    except ValueError as e:
+        return jsonify({"error": "Invalid rating parameters", "details": str(e)}), 400
+
+@admin.route('/rating/<int:council_id>/commit', methods=['POST'])
+def rating_commit(council_id):
+    """Queue a committed run with the stored parameters; poll /admin/jobs/<id> for the summary."""
+    data = request.json or {}
+    if not data.get("financial_year"):
+        return jsonify({"error": "financial_year is required"}), 400
+    try:
+        financial_year = parse_year(data["financial_year"], "financial_year")
+    except ValueError as e:
+        return jsonify({"error": "Invalid rating parameters", "details": str(e)}), 400
+    job = enqueue('commit_rating_run', {"council_id": council_id, "financial_year": financial_year})
+    return jsonify(serialize_job(job)), 202
+
+@admin.route('/imports', methods=['GET'])
+def list_imports():
+    q = ImportRun.query
+    if request.args.get('council_id'):
+        q = q.filter_by(council_id=int(request.args['council_id']))
+    runs = q.order_by(ImportRun.id.desc()).limit(min(int(request.args.get('limit', 50)), 500)).all()
+    return jsonify([serialize_import_run(r) for r in runs])
+
+@admin.route('/imports/<int:run_id>', methods=['GET'])
+def get_import(run_id):
+    run = ImportRun.query.get(run_id)
+    if run:
+        return jsonify(serialize_import_run(run))
+    return jsonify({"message": "Import run not found"}), 404
+
+@admin.route('/councils/<int:council_id>/ledger/<table>.<fmt>', methods=['GET'])
+def export_ledger(council_id, table, fmt):
+    """
+    Stream a ledger table for a council.
+    ?columns=id,amount_cents&from=2025-07-01&to=2026-06-30&date_column=bill_date&gzip=1
+    &archive=1 includes financial years moved to the archive schema.
+    """
+    try:
+        columns = [c.strip() for c in request.args['columns'].split(',') if c.strip()] \
+            if request.args.get('columns') else None
+        date_from = dt.date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        date_to = dt.date.fromisoformat(request.args['to']) if request.args.get('to') else None
+        compress = request.args.get('gzip') in ('1', 'true')
+        chunks = export_stream(council_id, table, fmt, columns=columns, date_from=date_from, date_to=date_to,
+                               date_column=request.args.get('date_column'), compress=compress,
+                               archive=request.args.get('archive') in ('1', 'true'))
+    except ValueError as e:  # ExportError or a bad date
+        return jsonify({"error": "Invalid export request", "details": str(e)}), 400
+
+    filename = export_filename(council_id, table, fmt, compress)
+    gzipped = compress and fmt != 'parquet'
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if gzipped else FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@admin.route('/rate-limits', methods=['GET'])
+def rate_limit_metrics():
+    """Configured limits with allowed / limited / backend-error counts for this worker."""
+    return jsonify(limiter.snapshot()), 200
+
+
+@admin.route('/residents/<int:resident_id>/revoke-tokens', methods=['POST'])
+def revoke_resident_tokens(resident_id):
+    """Sign a resident out everywhere: refresh tokens revoked, live access tokens deny-listed."""
+    return jsonify({"resident_id": resident_id, "sessions_revoked": revoke_resident(resident_id)}), 200
+
+
+@admin.route('/token-denylist', methods=['GET'])
+def token_denylist_stats():
+    """Deny-list size, Bloom filter shape and hit / false-positive counts for this worker."""
+    return jsonify(deny_list.stats()), 200
+
+
+# ---------- payments ledger ----------
+
+def _date_arg(name, default=None):
+    value = request.args.get(name)
+    return dt.date.fromisoformat(value) if value else default
+
+
+@admin.route('/accounts/<int:account_id>/ledger', methods=['POST'])
+def post_ledger_entry(account_id):
+    """
+    Post a charge, payment or adjustment. Body: {entry_type, amount_cents, effective_date?,
+    reference?, method?, description?}. Payments and charges take positive amounts.
+    Re-posting a reference returns the original entry with 200.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        effective = dt.date.fromisoformat(data['effective_date']) if data.get('effective_date') else None
+        entry, created = post_entry(account_id, data.get('entry_type'), data.get('amount_cents', 0),
+                                    effective_date=effective, reference=data.get('reference'),
+                                    method=data.get('method'), description=data.get('description'))
+    except (LedgerError, ValueError, TypeError) as e:
+        return jsonify({"error": "Invalid ledger entry", "details": str(e)}), 400
+    return jsonify(serialize_entry(entry)), 201 if created else 200
+
+
+@admin.route('/ledger/<int:entry_id>/reverse', methods=['POST'])
+def reverse_ledger_entry(entry_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        entry = reverse_entry(entry_id, reason=data.get('reason'))
+    except LedgerError as e:
+        return jsonify({"error": "Cannot reverse entry", "details": str(e)}), 400
+    return jsonify(serialize_entry(entry)), 201
+
+
+@admin.route('/accounts/<int:account_id>/balance', methods=['GET'])
+def account_balance(account_id):
+    if not db.session.get(RatesAccount, account_id):
+        return jsonify({"message": "Account not found"}), 404
+    try:
+        as_of = _date_arg('as_of', dt.date.today())
+    except ValueError as e:
+        return jsonify({"error": "Invalid date", "details": str(e)}), 400
+    return jsonify({"account_id": account_id, "as_of": as_of.isoformat(),
+                    "balance_cents": balance_as_of(account_id, as_of)}), 200
+
+
+@admin.route('/accounts/<int:account_id>/statement', methods=['GET'])
+def account_statement(account_id):
+    """?from=2025-07-01&to=2026-06-30 (defaults: the last 90 days)."""
+    if not db.session.get(RatesAccount, account_id):
+        return jsonify({"message": "Account not found"}), 404
+    try:
+        date_to = _date_arg('to', dt.date.today())
+        date_from = _date_arg('from', date_to - dt.timedelta(days=90))
+        return jsonify(statement(account_id, date_from, date_to)), 200
+    except ValueError as e:  # LedgerError or a bad date
+        return jsonify({"error": "Invalid statement request", "details": str(e)}), 400
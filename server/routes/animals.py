@@ -0,0 +1,147 @@
+# routes/animals.py
+from flask import Blueprint, jsonify, request
+from sqlalchemy.orm import joinedload, load_only
+import base64
+import logging
+
+from models import Animal
+from routes.decorators import auth_required
+from animal_facets import facet_index, ADOPTABLE_STATUS
+from image_proxy import thumbnail
+
+animals_bp = Blueprint("animals", __name__)
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Columns needed for a listing card. gallery_urls / temperament only ship with fields=full.
+THUMBNAIL_COLUMNS = (
+    Animal.id, Animal.council_id, Animal.name, Animal.type, Animal.breed,
+    Animal.mixed, Animal.sex, Animal.age, Animal.status, Animal.main_photo_url,
+)
+
+# ---------- helpers ----------
+
+def _encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    if not cursor:
+        return None
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return int(base64.urlsafe_b64decode(padded.encode()).decode())
+
+
+def _parse_bool(v):
+    if v is None:
+        return None
+    return str(v).strip().lower() in ("1", "true", "yes")
+
+
+def _parse_filters(args):
+    council_id = args.get("council_id")
+    return {
+        "council_id": int(council_id) if council_id else None,
+        "type": args.get("type") or None,
+        "breed": args.get("breed") or None,
+        "sex": args.get("sex") or None,
+        "mixed": _parse_bool(args.get("mixed")),
+    }
+
+
+def serialize_animal_thumbnail(a: Animal):
+    council = a.council_obj
+    return {
+        "id": a.id,
+        "name": a.name,
+        "type": a.type,
+        "breed": a.breed,
+        "mixed": a.mixed,
+        "sex": a.sex,
+        "age": a.age,
+        "status": a.status,
+        "main_photo_url": a.main_photo_url,
+        "main_photo_thumbnail_url": thumbnail(a.main_photo_url, "animal_card"),
+        "council_name": council.name if council else None,
+        "council_logo_url": council.logo_url if council else None,
+        "council_logo_thumbnail_url": thumbnail(council.logo_url, "council_logo") if council else None,
+    }
+
+
+def serialize_animal_full(a: Animal):
+    data = serialize_animal_thumbnail(a)
+    data.update({
+        "temperament": a.temperament,
+        "gallery_urls": a.gallery_urls,
+        "gallery_thumbnail_urls": [thumbnail(url, "animal_gallery") for url in a.gallery_urls or []],
+        "created_at": a.created_at.isoformat() if a.created_at else None,
+        "updated_at": a.updated_at.isoformat() if a.updated_at else None,
+    })
+    return data
+
+
+def list_adoptable_animals(filters, limit=DEFAULT_PAGE_SIZE, after_id=None, full=False):
+    """Keyset page of adoptable animals ordered by id. Returns (items, next_cursor)."""
+    q = Animal.query.filter(Animal.status == ADOPTABLE_STATUS)
+    for field in ("council_id", "type", "breed", "sex", "mixed"):
+        if filters.get(field) is not None:
+            q = q.filter(getattr(Animal, field) == filters[field])
+    if after_id is not None:
+        q = q.filter(Animal.id > after_id)
+    if not full:
+        q = q.options(load_only(*THUMBNAIL_COLUMNS))
+    q = q.options(joinedload(Animal.council_obj)).order_by(Animal.id.asc())
+
+    # Fetch one extra row to know whether another page exists
+    rows = q.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    serialize = serialize_animal_full if full else serialize_animal_thumbnail
+    next_cursor = _encode_cursor(rows[-1].id) if has_more and rows else None
+    return [serialize(a) for a in rows], next_cursor
+
+
+# ---------- routes ----------
+
+@animals_bp.route("/", methods=["GET"], strict_slashes=False)
+@auth_required
+def get_animals():
+    """
+    Paginated adoptable animals.
+    Query: type, breed, sex, council_id, mixed, limit, cursor, fields=full, facets=0
+    """
+    try:
+        filters = _parse_filters(request.args)
+        limit = min(max(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        after_id = _decode_cursor(request.args.get("cursor"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid filter, limit or cursor"}), 400
+
+    try:
+        full = request.args.get("fields") == "full"
+        items, next_cursor = list_adoptable_animals(filters, limit=limit, after_id=after_id, full=full)
+        payload = {
+            "items": items,
+            "next_cursor": next_cursor,
+            "total": facet_index.count(filters),
+        }
+        if request.args.get("facets", "1") != "0":
+            payload["facets"] = facet_index.facets(filters)
+        return jsonify(payload), 200
+    except Exception as e:
+        logging.error(f"[animals] UNEXPECTED SERVER ERROR in get_animals: {str(e)}", exc_info=True)
+        return jsonify({
+            "error": "Unable to load animals due to server error",
+            "details": str(e)
+        }), 500
+
+
+@animals_bp.route("/facets", methods=["GET"])
+@auth_required
+def get_animal_facets():
+    try:
+        filters = _parse_filters(request.args)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid filter"}), 400
+    return jsonify({"total": facet_index.count(filters), "facets": facet_index.facets(filters)}), 200
@@ -1,14 +1,16 @@
 from flask import Blueprint, request, jsonify, current_app
 from models import db, Resident
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
-from authlib.jose import JsonWebToken # Keep this for encoding method directly
-from routes.decorators import jwt_instance # Import jwt_instance
+from routes.decorators import auth_required
+from rate_limit import rate_limited
+from auth_tokens import issue_tokens, rotate_refresh_token, logout as revoke_session, TokenError
 
 auth = Blueprint('auth', __name__)
 
 @auth.route('/register', methods=['POST'])
+@rate_limited('auth.register', '5/hour', burst=3, per='ip')
 def register():
     data = request.get_json()
     name = data.get('name')
@@ -29,21 +31,16 @@ def register():
 
     logging.info(f"User registered: {email}")
 
-    payload = {
-        'sub': new_resident.id,
-        'iat': datetime.utcnow(),
-        'exp': datetime.utcnow() + timedelta(hours=24),
-        'name': new_resident.name
-    }
-    # <<< FIXED THIS LINE: Explicitly added 'alg': 'HS256' to the header dictionary >>>
-    token = jwt_instance.encode({'alg': 'HS256'}, payload, current_app.config['JWT_SECRET_KEY'])
+    # Short-lived access token + rotating refresh token (see auth_tokens.py)
+    tokens = issue_tokens(new_resident, current_app.config['JWT_SECRET_KEY'])
 
     return jsonify({
         "message": "Registration successful.",
-        "token": token.decode('utf-8')
+        **tokens
     }), 201
 
 @auth.route('/login', methods=['POST'])
+@rate_limited('auth.login', '10/minute', burst=5, per='ip')  # password hashing is CPU-heavy
 def login():
     data = request.get_json()
     email = data.get('email')
@@ -57,17 +54,33 @@ def login():
 
     logging.info(f"Login successful for user: {email}")
 
-    payload = {
-        'sub': resident.id,
-        'iat': datetime.utcnow(),
-        'exp': datetime.utcnow() + timedelta(hours=24),
-        'name': resident.name
-    }
-    # <<< FIXED THIS LINE: Explicitly added 'alg': 'HS256' to the header dictionary >>>
-    token = jwt_instance.encode({'alg': 'HS256'}, payload, current_app.config['JWT_SECRET_KEY'])
+    tokens = issue_tokens(resident, current_app.config['JWT_SECRET_KEY'])
 
-    print(f"✅ Login successful. Token: {token.decode('utf-8')}")
     return jsonify({
         "message": "Login successful.",
-        "token": token.decode('utf-8')
+        **tokens
     }), 200
+
+
+@auth.route('/refresh', methods=['POST'])
+@rate_limited('auth.refresh', '30/minute', burst=10, per='ip')
+def refresh():
+    """Exchange a refresh token for a new access/refresh pair. No password hashing involved."""
+    data = request.get_json(silent=True) or {}
+    if not data.get('refresh_token'):
+        return jsonify({"message": "Missing refresh_token"}), 400
+    try:
+        tokens = rotate_refresh_token(data['refresh_token'], current_app.config['JWT_SECRET_KEY'])
+    except TokenError as e:
+        logging.warning(f"Token refresh refused: {e}")
+        return jsonify({"message": str(e)}), 401
+    return jsonify({"message": "Token refreshed.", **tokens}), 200
+
+
+@auth.route('/logout', methods=['POST'])
+@auth_required
+def logout():
+    """Revoke the current access token and, if the body has one, the refresh token's whole session."""
+    data = request.get_json(silent=True) or {}
+    result = revoke_session(request.token_claims, data.get('refresh_token'))
+    return jsonify({"message": "Logged out.", **result}), 200
@@ -1,15 +1,170 @@
 from flask import Blueprint, jsonify, request
-# Import all necessary models: Process, Property, Council, Animal, WaterConsumption, WasteCollection, DevelopmentApplication
-from models import Process, Property, Council, Animal, WaterConsumption, WasteCollection, DevelopmentApplication
+# Import all necessary models: Process, Property, Council, WaterConsumption, WasteCollection, DevelopmentApplication
+from models import Process, Property, Council, WaterConsumption, WasteCollection, DevelopmentApplication
 import traceback
 import logging
 from routes.decorators import auth_required
+from rate_limit import rate_limited
+from query_budget import query_budget
+from routes.animals import list_adoptable_animals
+from animal_facets import facet_index
+from waste_schedule import next_collection_dates
+from waste_routes import precomputed_routes, route_index
+from delta_sync import SYNC_OVERLAP, changes_since, decode_token, encode_token
+from routes.rates import RatesBatch, serialize_rates_detail_property
+from image_proxy import thumbnail
+from partitioning import hot_window
 from sqlalchemy.orm import joinedload # Import joinedload for eager loading
+import datetime
 
 dashboard = Blueprint('dashboard', __name__)
 
+DASHBOARD_ANIMAL_PAGE_SIZE = 12
+
+DASHBOARD_CATEGORIES = [
+    "Rates", "Water", "Development", "Community",
+    "Roads", "Waste", "Animals", "Public Health", "Environment"
+]
+
+# ---------- serializers (shared with the async dashboard in asgi.py) ----------
+
+def serialize_rates_property(item):
+    return {
+        'id': item.id,
+        'address': item.address,
+        'council_name': item.council_obj.name if item.council_obj else None,
+        'council_logo_url': item.council_obj.logo_url if item.council_obj else None,
+        'council_logo_thumbnail_url': thumbnail(item.council_obj.logo_url, 'council_logo') if item.council_obj else None,
+        'gps_coordinates': item.gps_coordinates,
+        'shape_file_data': item.shape_file_data,
+        'land_size_sqm': item.land_size_sqm,
+        'property_value': item.property_value,
+        'land_value': item.land_value,
+        'zone': item.zone,
+        'property_type': item.property_type,
+        'created_at': item.created_at.isoformat() if item.created_at else None,
+        'updated_at': item.updated_at.isoformat() if item.updated_at else None,
+        'type': 'property'
+    }
+
+
+def serialize_water_property(item):
+    return {
+        'id': item.id,
+        'address': item.address,
+        'council_name': item.council_obj.name if item.council_obj else None,
+        'council_logo_url': item.council_obj.logo_url if item.council_obj else None,
+        'council_logo_thumbnail_url': thumbnail(item.council_obj.logo_url, 'council_logo') if item.council_obj else None,
+        'property_type': item.property_type,
+        'land_size_sqm': item.land_size_sqm,
+        'water_consumptions': [{
+            'id': wc.id,
+            'quarter_start_date': wc.quarter_start_date.isoformat(),
+            'consumed_litres': wc.consumed_litres,
+            'allocated_litres': wc.allocated_litres,
+            'amount_owing': wc.amount_owing,
+            'bill_due_date': wc.bill_due_date.isoformat() if wc.bill_due_date else None,
+        } for wc in item.water_consumptions],
+        'type': 'property'
+    }
+
+
+def serialize_waste_collection(item, upcoming):
+    return {
+        'id': item.id,
+        'council_id': item.council_id,
+        'collection_type': item.collection_type,
+        'collection_day': item.collection_day,
+        'collection_frequency': item.collection_frequency,
+        'next_collection_date': upcoming.get(item.id),
+        'route_geojson': item.route_geojson,
+        'notes': item.notes,
+        'council_name': item.council.name if item.council else None, # Access council name via relationship
+        'type': 'waste_collection'
+    }
+
+
+def serialize_development_application(item):
+    return {
+        'id': item.id,
+        'application_type': item.application_type,
+        'status': item.status,
+        'submission_date': item.submission_date.isoformat() if item.submission_date else None,
+        'approval_date': item.approval_date.isoformat() if item.approval_date else None,
+        'estimated_cost': item.estimated_cost,
+        'description': item.description,
+        'documents_url': item.documents_url,
+        'gps_coordinates': item.gps_coordinates,
+        'property_address': item.property.address if item.property else None,
+        'council_name': item.council.name if item.council else None,
+        'council_logo_url': item.council.logo_url if item.council else None,
+        'council_logo_thumbnail_url': thumbnail(item.council.logo_url, 'council_logo') if item.council else None,
+        'created_at': item.created_at.isoformat() if item.created_at else None,
+        'updated_at': item.updated_at.isoformat() if item.updated_at else None,
+        'type': 'development_application'
+    }
+
+
+def serialize_process(item):
+    return {
+        'id': item.id,
+        'title': item.title,
+        'status': item.status,
+        'submitted_at': item.submitted_at.isoformat() if item.submitted_at else None,
+        'updated_at': item.updated_at.isoformat() if item.updated_at else None,
+        'form_data': item.form_data,
+        'type': 'process'
+    }
+
+
+# ---------- sections backed by in-process indexes ----------
+
+def load_animals_section():
+    """
+    (tile items, {"total", "next_cursor"}): the first page plus the count from the facet
+    index, so the tile can say "12 of 340" and continue through /animals?cursor=.
+    Full fields: the tile's cards show temperament and the gallery.
+    """
+    items, next_cursor = list_adoptable_animals({}, limit=DASHBOARD_ANIMAL_PAGE_SIZE, full=True)
+    total = facet_index.count()
+    logging.info(f"[dashboard] Returning {len(items)} of {total} adoptable animals.")
+    return ([dict(item, type='animal', animal_type=item['type']) for item in items],
+            {"total": total, "next_cursor": next_cursor})
+
+
+def load_waste_section(user_id, properties=None):
+    # Fetch waste collection data for the user's council (from the first property; pass the
+    # resident's properties when they are already loaded)
+    if properties is None:
+        user_properties = Property.query.filter_by(resident_id=user_id).order_by(Property.id).first()
+    else:
+        user_properties = properties[0] if properties else None
+    council_id = user_properties.council_id if user_properties else None
+
+    if not council_id:
+        logging.info(f"[dashboard] No properties found for user {user_id}, so no waste collection data fetched.")
+        return [] # No properties, no waste data
+
+    items = WasteCollection.query.filter_by(council_id=council_id)\
+                    .options(joinedload(WasteCollection.council)).all() # Eager load council object
+    logging.info(f"[dashboard] Found {len(items)} waste collections for council_id {council_id}.")
+    # next_collection_date is computed from the schedule, not the stored column
+    upcoming = next_collection_dates(council_id)
+    # Only the route(s) that actually serve the property; all of them if it has no GPS point.
+    # Bulk mode's stored assignment when there is one, else the in-process index
+    serving = precomputed_routes(user_properties.id)
+    if serving is None:
+        serving = route_index.serving_routes(council_id, user_properties.gps_coordinates)
+    if serving is not None:
+        items = [item for item in items if item.id in serving]
+        logging.info(f"[dashboard] {len(items)} waste collections serve property {user_properties.id}.")
+    return [serialize_waste_collection(item, upcoming) for item in items]
+
+
 @dashboard.route('/', methods=['GET'])
 @auth_required
+@rate_limited('dashboard', '30/minute', burst=10)
+@query_budget(12)  # includes first-request warm-up of the animal facet and waste route indexes
 def get_dashboard():
     try:
         user_id = request.current_identity
@@ -22,143 +177,44 @@ def get_dashboard():
                 "details": "User ID could not be determined or is invalid from the provided token."
             }), 401
 
-        categories = [
-            "Rates", "Water", "Development", "Community",
-            "Roads", "Waste", "Animals", "Public Health", "Environment"
-        ]
-
         data = {}
+        # Rates, Water and Waste all read the resident's properties: load them once,
+        # with council and water readings eager-loaded (partitioned tables: hot years only)
+        properties = Property.query.filter_by(resident_id=user_id)\
+                        .options(joinedload(Property.council_obj))\
+                        .options(joinedload(Property.water_consumptions.and_(hot_window(WaterConsumption))))\
+                        .order_by(Property.id).all()
+        logging.info(f"[dashboard] Found {len(properties)} properties for user {user_id}.")
+        # Every process-backed category in one query
+        process_categories = [c for c in DASHBOARD_CATEGORIES
+                              if c not in ("Rates", "Water", "Animals", "Waste", "Development")]
+        processes = {c: [] for c in process_categories}
+        for item in Process.query.filter(Process.resident_id == user_id, Process.category.in_(process_categories),
+                                         hot_window(Process)).order_by(Process.id):
+            processes[item.category].append(item)
 
-        for category in categories:
-            logging.info(f"[dashboard] Querying for resident_id={user_id}, category={category}")
+        for category in DASHBOARD_CATEGORIES:
+            logging.info(f"[dashboard] Building {category} for resident_id={user_id}")
             try:
                 if category == "Rates":
-                    # Fetch properties for the 'Rates' category, joining with Council for logo/name
-                    items = Property.query.filter_by(resident_id=user_id)\
-                                    .options(joinedload(Property.council_obj)).all()
-                    logging.info(f"[dashboard] Found {len(items)} properties for 'Rates' for user {user_id}.")
-                    data[category] = [{
-                        'id': item.id,
-                        'address': item.address,
-                        'council_name': item.council_obj.name if item.council_obj else None,
-                        'council_logo_url': item.council_obj.logo_url if item.council_obj else None,
-                        'gps_coordinates': item.gps_coordinates,
-                        'shape_file_data': item.shape_file_data,
-                        'land_size_sqm': item.land_size_sqm,
-                        'property_value': item.property_value,
-                        'land_value': item.land_value,
-                        'zone': item.zone,
-                        'property_type': item.property_type,
-                        'created_at': item.created_at.isoformat() if item.created_at else None,
-                        'updated_at': item.updated_at.isoformat() if item.updated_at else None,
-                        'type': 'property'
-                    } for item in items]
+                    data[category] = [serialize_rates_property(item) for item in properties]
                 elif category == "Water":
-                    # Fetch properties for 'Water' category, eager-loading WaterConsumption and Council
-                    items = Property.query.filter_by(resident_id=user_id)\
-                                    .options(joinedload(Property.water_consumptions))\
-                                    .options(joinedload(Property.council_obj)).all()
-                    logging.info(f"[dashboard] Found {len(items)} properties for 'Water' for user {user_id}.")
-                    data[category] = [{
-                        'id': item.id,
-                        'address': item.address,
-                        'council_name': item.council_obj.name if item.council_obj else None,
-                        'council_logo_url': item.council_obj.logo_url if item.council_obj else None,
-                        'property_type': item.property_type,
-                        'land_size_sqm': item.land_size_sqm,
-                        'water_consumptions': [{
-                            'id': wc.id,
-                            'quarter_start_date': wc.quarter_start_date.isoformat(),
-                            'consumed_litres': wc.consumed_litres,
-                            'allocated_litres': wc.allocated_litres,
-                            'amount_owing': wc.amount_owing,
-                            'bill_due_date': wc.bill_due_date.isoformat() if wc.bill_due_date else None,
-                        } for wc in item.water_consumptions],
-                        'type': 'property'
-                    } for item in items]
+                    data[category] = [serialize_water_property(item) for item in properties]
                 elif category == "Animals":
-                    # Fetch animals available for adoption, joining with Council for logo/name
-                    items = Animal.query.filter_by(status='available_for_adoption')\
-                                    .options(joinedload(Animal.council_obj)).all()
-                    logging.info(f"[dashboard] Found {len(items)} animals for 'Animals' category.")
-                    data[category] = [{
-                        'id': item.id,
-                        'name': item.name,
-                        'type': item.type,
-                        'breed': item.breed,
-                        'mixed': item.mixed,
-                        'sex': item.sex,
-                        'age': item.age,
-                        'temperament': item.temperament,
-                        'status': item.status,
-                        'main_photo_url': item.main_photo_url,
-                        'gallery_urls': item.gallery_urls,
-                        'council_name': item.council_obj.name if item.council_obj else None,
-                        'council_logo_url': item.council_obj.logo_url if item.council_obj else None,
-                        'created_at': item.created_at.isoformat() if item.created_at else None,
-                        'updated_at': item.updated_at.isoformat() if item.updated_at else None,
-                        'type': 'animal'
-                    } for item in items]
+                    data[category], data["AnimalsPage"] = load_animals_section()
                 elif category == "Waste":
-                    # Fetch waste collection data for the user's council
-                    user_properties = Property.query.filter_by(resident_id=user_id).first()
-                    council_id = user_properties.council_id if user_properties else None
-
-                    if council_id:
-                        items = WasteCollection.query.filter_by(council_id=council_id)\
-                                        .options(joinedload(WasteCollection.council)).all() # Eager load council object
-                        logging.info(f"[dashboard] Found {len(items)} waste collections for council_id {council_id}.")
-                        data[category] = [{
-                            'id': item.id,
-                            'council_id': item.council_id,
-                            'collection_type': item.collection_type,
-                            'collection_day': item.collection_day,
-                            'collection_frequency': item.collection_frequency,
-                            'next_collection_date': item.next_collection_date.isoformat() if item.next_collection_date else None,
-                            'route_geojson': item.route_geojson,
-                            'notes': item.notes,
-                            'council_name': item.council.name if item.council else None, # Access council name via relationship
-                            'type': 'waste_collection'
-                        } for item in items]
-                    else:
-                        logging.info(f"[dashboard] No properties found for user {user_id}, so no waste collection data fetched.")
-                        data[category] = [] # No properties, no waste data
+                    data[category] = load_waste_section(user_id, properties)
                 elif category == "Development":
                     # Fetch development applications for the user, eager-loading Property and Council
                     items = DevelopmentApplication.query.filter_by(resident_id=user_id)\
                                     .options(joinedload(DevelopmentApplication.property))\
                                     .options(joinedload(DevelopmentApplication.council)).all()
                     logging.info(f"[dashboard] Found {len(items)} development applications for user {user_id}.")
-                    data[category] = [{
-                        'id': item.id,
-                        'application_type': item.application_type,
-                        'status': item.status,
-                        'submission_date': item.submission_date.isoformat() if item.submission_date else None,
-                        'approval_date': item.approval_date.isoformat() if item.approval_date else None,
-                        'estimated_cost': item.estimated_cost,
-                        'description': item.description,
-                        'documents_url': item.documents_url,
-                        'gps_coordinates': item.gps_coordinates,
-                        'property_address': item.property.address if item.property else None,
-                        'council_name': item.council.name if item.council else None,
-                        'council_logo_url': item.council.logo_url if item.council else None,
-                        'created_at': item.created_at.isoformat() if item.created_at else None,
-                        'updated_at': item.updated_at.isoformat() if item.updated_at else None,
-                        'type': 'development_application'
-                    } for item in items]
+                    data[category] = [serialize_development_application(item) for item in items]
                 else:
-                    # Fetch processes for other categories
-                    items = Process.query.filter_by(resident_id=user_id, category=category).all()
+                    items = processes[category]
                     logging.info(f"[dashboard] Found {len(items)} processes for category '{category}' for user {user_id}.")
-                    data[category] = [{
-                        'id': item.id,
-                        'title': item.title,
-                        'status': item.status,
-                        'submitted_at': item.submitted_at.isoformat() if item.submitted_at else None,
-                        'updated_at': item.updated_at.isoformat() if item.updated_at else None,
-                        'form_data': item.form_data,
-                        'type': 'process'
-                    } for item in items]
+                    data[category] = [serialize_process(item) for item in items]
 
             except Exception as db_e:
                 logging.error(f"[dashboard] ERROR: Database query failed for category '{category}' and user {user_id}. Error: {db_e}", exc_info=True)
@@ -172,3 +228,108 @@ def get_dashboard():
             "error": "Unable to load dashboard due to server error",
             "details": str(e)
         }), 500
+
+
+# ---------- delta sync ----------
+
+DELTA_CATEGORIES = ["Rates", "Water", "Development"] + [
+    c for c in DASHBOARD_CATEGORIES if c not in ("Rates", "Water", "Development", "Waste", "Animals")
+]
+
+
+def _delta(upserted, deleted=()):
+    return {"upserted": upserted, "deleted": sorted(deleted)}
+
+
+def _only(query, column, ids):
+    """Restrict query to ids; ids=None means no restriction (full sync). Returns [] for an empty set."""
+    if ids is None:
+        return query.all()
+    if not ids:
+        return []
+    return query.filter(column.in_(ids)).all()
+
+
+def build_changes(user_id, since, seen=frozenset()):
+    """
+    Per-category upserts and deletes since `since`, or everything when since is None.
+    Returns (changes, rates detail delta, ChangeSet or None for a full sync).
+    Waste and Animals are not resident data; clients keep refreshing those tiles as before.
+    """
+    cs = changes_since(user_id, since, seen) if since else None
+    ids = lambda attr: getattr(cs, attr) if cs else None
+    deleted = lambda key: cs.deleted[key] if cs else ()
+
+    props = Property.query.filter(Property.resident_id == user_id)\
+                    .options(joinedload(Property.council_obj)).order_by(Property.id)
+    changes = {
+        "Rates": _delta([serialize_rates_property(p) for p in _only(props, Property.id, ids('properties'))],
+                        deleted("property")),
+        "Water": _delta([serialize_water_property(p) for p in _only(
+                            props.options(joinedload(Property.water_consumptions.and_(hot_window(WaterConsumption)))),
+                            Property.id, ids('water_properties'))],
+                        deleted("property")),
+    }
+
+    das = DevelopmentApplication.query.filter(DevelopmentApplication.resident_id == user_id)\
+                    .options(joinedload(DevelopmentApplication.property))\
+                    .options(joinedload(DevelopmentApplication.council))
+    changes["Development"] = _delta(
+        [serialize_development_application(d) for d in _only(das, DevelopmentApplication.id, ids('development'))],
+        deleted("development_application"))
+
+    # All process-backed categories in one query
+    process_categories = DELTA_CATEGORIES[3:]
+    grouped = {c: [] for c in process_categories}
+    procs = Process.query.filter(Process.resident_id == user_id, Process.category.in_(process_categories),
+                                 hot_window(Process))
+    for p in _only(procs, Process.id, ids('processes')):
+        grouped[p.category].append(serialize_process(p))
+    for c in process_categories:
+        changes[c] = _delta(grouped[c], cs.deleted["processes"].get(c, ()) if cs else ())
+
+    rates_props = _only(props, Property.id, ids('rates_properties'))
+    batch = RatesBatch(rates_props)
+    rates_detail = _delta(
+        [serialize_rates_detail_property(p, batch) for p in rates_props],
+        deleted("property"))
+    return changes, rates_detail, cs
+
+
+@dashboard.route('/changes', methods=['GET'])
+@auth_required
+@rate_limited('dashboard.changes', '120/minute', burst=20)
+@query_budget(16)
+def get_dashboard_changes():
+    """
+    GET /dashboard/changes?since=<token>
+    Returns rows created/updated/deleted since the token, per category, and the
+    token for the next call. Without a usable token the response is a full sync
+    ("full": true) with every row listed as upserted.
+    """
+    try:
+        user_id = request.current_identity
+        if user_id is None or not isinstance(user_id, int) or user_id <= 0:
+            return jsonify({
+                "error": "Authentication required",
+                "details": "User ID could not be determined or is invalid from the provided token."
+            }), 401
+
+        issued_at = datetime.datetime.utcnow()  # before reading: anything later is caught next time
+        since, seen = decode_token(request.args.get('since'))
+        changes, rates_detail, cs = build_changes(user_id, since, seen)
+        n = sum(len(v["upserted"]) + len(v["deleted"]) for v in changes.values())
+        logging.info(f"[dashboard] Delta for user {user_id} since {since}: {n} changes (full={since is None}).")
+        return jsonify({
+            "token": encode_token(issued_at, cs.seen_since(issued_at - SYNC_OVERLAP) if cs else ()),
+            "full": since is None,
+            "changes": changes,
+            "rates_properties": rates_detail,
+        }), 200
+
+    except Exception as e:
+        logging.error(f"[dashboard] UNEXPECTED SERVER ERROR in get_dashboard_changes: {str(e)}", exc_info=True)
+        return jsonify({
+            "error": "Unable to load dashboard changes due to server error",
+            "details": str(e)
+        }), 500
@@ -2,51 +2,129 @@
 from flask import request, jsonify, current_app
 from datetime import datetime
 import logging
-from authlib.jose import JsonWebToken, util
+from authlib.jose import JsonWebToken, errors as jose_errors
 import functools # <<< ADDED THIS IMPORT
+from token_denylist import deny_list
+from models import db, Resident
 
 # Initialize Authlib's JsonWebToken instance once with supported algorithms
 jwt_instance = JsonWebToken(['HS256'])
 
+class AuthError(Exception):
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def claims_from_header(auth_header, secret_key):
+    """
+    Validate a 'Bearer <token>' header and return the token's claims.
+    Raises AuthError with the HTTP status to return. Shared by auth_required and the ASGI app.
+    """
+    if not auth_header:
+        logging.warning("Authlib: No Authorization header provided.")
+        raise AuthError("Authorization header is missing")
+
+    try:
+        token_type, token = auth_header.split(' ', 1)
+    except ValueError:
+        logging.warning("Authlib: Invalid Authorization header format.")
+        raise AuthError("Invalid Authorization header format. Expected 'Bearer <token>'")
+
+    if token_type.lower() != 'bearer':
+        logging.warning(f"Authlib: Invalid token type: {token_type}")
+        raise AuthError("Invalid token type. Only 'Bearer' is supported")
+
+    try:
+        # Decode and verify the token using the secret key
+        claims = jwt_instance.decode(token, secret_key)
+
+        # Check if the token has expired manually (Authlib's decode does this too, but for clarity)
+        if claims.get('exp') and datetime.utcfromtimestamp(claims['exp']) < datetime.utcnow():
+            logging.warning("Authlib: Token has expired.")
+            raise AuthError("Token has expired")
+
+        # In-process Bloom filter + exact set; no database query (see token_denylist.py)
+        if deny_list.is_revoked(claims.get('jti')):
+            logging.warning(f"Authlib: Revoked token presented (jti {claims.get('jti')}).")
+            raise AuthError("Token has been revoked")
+
+        return claims
+
+    except jose_errors.JoseError as e:
+        logging.error(f"Authlib: JWT validation failed: {e}", exc_info=True)
+        raise AuthError(f"Invalid token: {e}")
+    except AuthError:
+        raise
+    except Exception as e:
+        logging.error(f"Authlib: Unexpected error during token validation: {e}", exc_info=True)
+        raise AuthError(f"Server error during token validation: {e}", status=500)
+
+
+def identity_from_header(auth_header, secret_key):
+    """The token's 'sub' (see claims_from_header)."""
+    return claims_from_header(auth_header, secret_key).get('sub')
+
+
 # Custom Decorator for JWT Protection (replaces @jwt_required)
 # This decorator will manually validate the JWT from the Authorization header.
 def auth_required(f):
     @functools.wraps(f) # <<< ADDED THIS LINE: Preserves original function metadata
     def wrapper(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if not auth_header:
-            logging.warning("Authlib: No Authorization header provided.")
-            return jsonify({"message": "Authorization header is missing"}), 401
-
         try:
-            token_type, token = auth_header.split(' ', 1)
-        except ValueError:
-            logging.warning("Authlib: Invalid Authorization header format.")
-            return jsonify({"message": "Invalid Authorization header format. Expected 'Bearer <token>'"}), 401
-
-        if token_type.lower() != 'bearer':
-            logging.warning(f"Authlib: Invalid token type: {token_type}")
-            return jsonify({"message": "Invalid token type. Only 'Bearer' is supported"}), 401
+            # Store the identity on the request for easy access in routes
+            request.token_claims = claims_from_header(
+                request.headers.get('Authorization'), current_app.config['JWT_SECRET_KEY']
+            )
+            request.current_identity = request.token_claims.get('sub')
+            logging.info(f"Authlib: Token validated. Identity: {request.current_identity}")
+        except AuthError as e:
+            return jsonify({"message": e.message}), e.status
 
-        try:
-            # Decode and verify the token using the secret key from current_app.config
-            claims = jwt_instance.decode(token, current_app.config['JWT_SECRET_KEY'])
+        return f(*args, **kwargs) # Proceed to the decorated route
+    return wrapper
 
-            # Check if the token has expired manually (Authlib's decode does this too, but for clarity)
-            if claims.get('exp') and datetime.utcfromtimestamp(claims['exp']) < datetime.utcnow():
-                logging.warning("Authlib: Token has expired.")
-                return jsonify({"message": "Token has expired"}), 401
 
-            # Store the identity in Flask's g object for easy access in routes
-            request.current_identity = claims.get('sub')
-            logging.info(f"Authlib: Token validated. Identity: {request.current_identity}")
+def require_admin():
+    """
+    before_request hook for admin-only blueprints: a valid token whose resident is
+    is_admin. Checked against the database on every request, so revoking the flag
+    takes effect immediately. Returns an error response, or None to let the request through.
+    """
+    try:
+        claims = claims_from_header(request.headers.get('Authorization'), current_app.config['JWT_SECRET_KEY'])
+    except AuthError as e:
+        return jsonify({"message": e.message}), e.status
+    resident = db.session.get(Resident, claims.get('sub'))
+    if resident is None or not resident.is_admin:
+        logging.warning(f"Admin route {request.path} refused for resident {claims.get('sub')}.")
+        return jsonify({"message": "Admin access required"}), 403
+    request.token_claims = claims
+    request.current_identity = claims.get('sub')
+    return None
 
-        except util.errors.JoseError as e:
-            logging.error(f"Authlib: JWT validation failed: {e}", exc_info=True)
-            return jsonify({"message": f"Invalid token: {e}"}), 401
-        except Exception as e:
-            logging.error(f"Authlib: Unexpected error during token validation: {e}", exc_info=True)
-            return jsonify({"message": f"Server error during token validation: {e}"}), 500
 
-        return f(*args, **kwargs) # Proceed to the decorated route
+def stream_auth_required(f):
+    """
+    auth_required for EventSource endpoints. Browsers can't set headers on an
+    EventSource, so they pass ?ticket=<stream ticket> from POST /process/events/ticket
+    instead: short-lived and good for nothing but opening a stream. Access tokens are
+    never accepted in the query string, where they would end up in logs.
+    """
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        from auth_tokens import stream_ticket_identity, TokenError
+        try:
+            if request.headers.get('Authorization') or not request.args.get('ticket'):
+                request.current_identity = identity_from_header(
+                    request.headers.get('Authorization'), current_app.config['JWT_SECRET_KEY'])
+            else:
+                request.current_identity = stream_ticket_identity(
+                    request.args['ticket'], current_app.config['JWT_SECRET_KEY'])
+        except AuthError as e:
+            return jsonify({"message": e.message}), e.status
+        except TokenError as e:
+            return jsonify({"message": str(e)}), 401
+        return f(*args, **kwargs)
     return wrapper
@@ -0,0 +1,122 @@
+# routes/development.py
+from flask import Blueprint, jsonify, request
+import logging
+
+import numpy as np
+from sqlalchemy.orm import joinedload
+
+from models import DevelopmentApplication, Property
+from routes.decorators import auth_required
+from geo import property_point, bounding_box, haversine_m
+
+development_bp = Blueprint("development", __name__)
+
+DEFAULT_RADIUS_M = 500
+MAX_RADIUS_M = 10_000
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# ---------- helpers ----------
+
+def _serialize_nearby(item: DevelopmentApplication, distance_m):
+    return {
+        'id': item.id,
+        'application_type': item.application_type,
+        'status': item.status,
+        'submission_date': item.submission_date.isoformat() if item.submission_date else None,
+        'approval_date': item.approval_date.isoformat() if item.approval_date else None,
+        'estimated_cost': item.estimated_cost,
+        'description': item.description,
+        'gps_coordinates': item.gps_coordinates,
+        'property_address': item.property.address if item.property else None,
+        'council_name': item.council.name if item.council else None,
+        'distance_m': round(float(distance_m), 1),
+        'type': 'development_application'
+    }
+
+
+# ---------- routes ----------
+
+@development_bp.route("/nearby", methods=["GET"])
+@auth_required
+def get_nearby_applications():
+    """
+    DAs lodged within radius_m of one of the resident's properties, nearest first.
+    Query: property_id (required), radius_m, status (repeatable), limit, offset
+    """
+    try:
+        property_id = int(request.args["property_id"])
+        radius_m = float(request.args.get("radius_m", DEFAULT_RADIUS_M))
+        limit = min(max(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "property_id is required; radius_m, limit and offset must be numbers"}), 400
+    if not 1 <= radius_m <= MAX_RADIUS_M:  # also false for NaN
+        return jsonify({"error": "Invalid radius_m", "details": f"radius_m must be between 1 and {MAX_RADIUS_M}."}), 400
+    statuses = [s for s in request.args.getlist("status") if s]
+
+    try:
+        prop = Property.query.filter_by(id=property_id, resident_id=request.current_identity).first()
+        if not prop:
+            return jsonify({"message": "Property not found or not authorized"}), 404
+        point = property_point(prop.gps_coordinates)
+        if point is None or not (-90 <= point[1] <= 90 and -180 <= point[0] <= 180):
+            return jsonify({
+                "error": "Property has no valid GPS coordinates",
+                "details": "The property needs a lat between -90 and 90 and a lon between -180 and 180."
+            }), 400
+        lon, lat = point
+
+        # 1) Bounding-box prefilter on the (lat, lon) index; only ids + coordinates come back
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_m)
+        q = DevelopmentApplication.query.with_entities(
+            DevelopmentApplication.id, DevelopmentApplication.lat, DevelopmentApplication.lon
+        ).filter(
+            DevelopmentApplication.lat.between(min_lat, max_lat),
+            DevelopmentApplication.lon.between(min_lon, max_lon),
+        )
+        if statuses:
+            q = q.filter(DevelopmentApplication.status.in_(statuses))
+        candidates = q.all()
+
+        # 2) Exact haversine over all candidates at once, then nearest-first paging
+        if candidates:
+            ids = np.fromiter((c[0] for c in candidates), dtype=np.int64, count=len(candidates))
+            dist = haversine_m(lat, lon, [c[1] for c in candidates], [c[2] for c in candidates])
+            inside = dist <= radius_m
+            ids, dist = ids[inside], dist[inside]
+            order = np.lexsort((ids, dist))
+            ids, dist = ids[order], dist[order]
+        else:
+            ids, dist = np.array([], dtype=np.int64), np.array([])
+
+        total = int(ids.size)
+        page_ids = ids[offset:offset + limit].tolist()
+        page_dist = dist[offset:offset + limit].tolist()
+
+        rows = {}
+        if page_ids:
+            rows = {
+                da.id: da for da in DevelopmentApplication.query.filter(DevelopmentApplication.id.in_(page_ids))
+                .options(joinedload(DevelopmentApplication.property))
+                .options(joinedload(DevelopmentApplication.council)).all()
+            }
+        items = [_serialize_nearby(rows[i], d) for i, d in zip(page_ids, page_dist) if i in rows]
+        logging.info(f"[development] {total} DAs within {radius_m:.0f}m of property {property_id} "
+                     f"({len(candidates)} bbox candidates).")
+
+        return jsonify({
+            "property_id": property_id,
+            "radius_m": radius_m,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + limit if offset + limit < total else None,
+            "items": items,
+        }), 200
+    except Exception as e:
+        logging.error(f"[development] UNEXPECTED SERVER ERROR in get_nearby_applications: {str(e)}", exc_info=True)
+        return jsonify({
+            "error": "Unable to search nearby development applications due to server error",
+            "details": str(e)
+        }), 500
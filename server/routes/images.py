@@ -0,0 +1,37 @@
+# routes/images.py
+from flask import Blueprint, jsonify, request, send_file
+import logging
+
+from image_proxy import ImageError, MAX_AGE, get_variant, parse_params
+
+images_bp = Blueprint("images", __name__)
+
+
+@images_bp.route("/", methods=["GET"], strict_slashes=False)
+def get_image():
+    """
+    A resized copy of a remote image. No auth: URLs come signed from thumbnail_url() in the
+    JSON payloads, and the signature covers the source and the transform.
+    Query: src, w, h, fit=cover|contain, fmt=auto|avif|webp|jpeg|png, s
+    """
+    try:
+        params = parse_params(request.args)
+        path, mimetype, etag = get_variant(**params, accept=request.headers.get("Accept", ""))
+    except ImageError as e:
+        if e.status in (400, 403):
+            return jsonify({"error": "Invalid image request", "details": e.message}), e.status
+        return jsonify({"message": e.message}), e.status
+    except Exception as e:
+        logging.error(f"[img] UNEXPECTED SERVER ERROR in get_image: {str(e)}", exc_info=True)
+        return jsonify({
+            "error": "Unable to render image due to server error",
+            "details": str(e)
+        }), 500
+
+    # The signed URL names exactly one rendering, so it never changes under a client
+    resp = send_file(path, mimetype=mimetype, conditional=True, etag=etag, max_age=MAX_AGE)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    if params["fmt"] == "auto":
+        resp.vary.add("Accept")
+    return resp
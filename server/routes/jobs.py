@@ -0,0 +1,18 @@
+# routes/jobs.py
+from flask import Blueprint, jsonify, request
+
+from models import Job
+from routes.decorators import auth_required
+from jobs import serialize_job
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+@jobs_bp.route("/<int:job_id>", methods=["GET"])
+@auth_required
+def get_job(job_id):
+    """Status of a job the resident started (e.g. a notice download being rendered)."""
+    job = Job.query.filter_by(id=job_id, created_by=request.current_identity).first()
+    if not job:
+        return jsonify({"message": "Job not found or not authorized"}), 404
+    return jsonify(serialize_job(job)), 200
@@ -1,8 +1,10 @@
-from flask import Blueprint, jsonify, request # Import request
+from flask import Blueprint, current_app, jsonify, request, Response, stream_with_context # Import request
 from models import Process, db # Ensure db is imported if used for session
 import traceback
 import logging
-from routes.decorators import auth_required # Import the custom decorator from decorators.py
+from routes.decorators import auth_required, stream_auth_required # Import the custom decorator from decorators.py
+from process_events import event_stream, broker, MAX_STREAMS
+from auth_tokens import issue_stream_ticket
 
 process = Blueprint('process', __name__)
 
@@ -167,3 +169,45 @@ def delete_process(process_id):
             "error": "Unable to delete process due to server error",
             "details": str(e)
         }), 500
+
+# Server-sent events: status changes of the resident's processes, pushed as they commit
+@process.route('/events/ticket', methods=['POST'])
+@auth_required
+def process_events_ticket():
+    """A short-lived ticket for ?ticket= on /process/events (EventSource can't send headers)."""
+    user_id = request.current_identity
+    if user_id is None or not isinstance(user_id, int) or user_id <= 0:
+        return jsonify({"message": "Authentication required"}), 401
+    ticket, expires_in = issue_stream_ticket(user_id, current_app.config['JWT_SECRET_KEY'])
+    return jsonify({"ticket": ticket, "expires_in": expires_in}), 200
+
+@process.route('/events', methods=['GET'])
+@stream_auth_required
+def process_events():
+    user_id = request.current_identity
+    if user_id is None or not isinstance(user_id, int) or user_id <= 0:
+        return jsonify({"message": "Authentication required"}), 401
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"message": "Last-Event-ID must be an integer"}), 400
+
+    if broker.stream_count() >= MAX_STREAMS:
+        logging.warning(f"[process] Refusing event stream for user {user_id}: {MAX_STREAMS} streams open.")
+        resp = jsonify({"message": "Too many open event streams; retry shortly"})
+        resp.status_code = 503
+        resp.headers['Retry-After'] = '10'
+        return resp
+
+    logging.info(f"[process] Event stream opened for user {user_id} (last_event_id={last_event_id}).")
+    db.session.close()  # the stream re-acquires a connection only when it reads the table
+    return Response(
+        stream_with_context(event_stream(user_id, last_event_id)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # nginx: don't buffer the stream
+        },
+    )
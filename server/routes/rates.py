@@ -1,5 +1,5 @@
 # routes/rates.py
-from flask import Blueprint, jsonify, g, request
+from flask import Blueprint, jsonify, g, request, send_file
 from sqlalchemy import desc
 from sqlalchemy.orm import joinedload
 from models import (
@@ -10,15 +10,23 @@ from models import (
     RatesAccount,
     RatesBill,            # <-- matches your models.py
     Valuation,
-    RateCharge,
     WasteEntitlement,
     Concession,
     PropertyOverlay,
     BillingSetting,
     CouncilContact,
+    Instalment,
 )
 
 from routes.decorators import auth_required
+from rate_limit import rate_limited
+from query_budget import query_budget
+from notices import gather_notice_inputs, ensure_notice
+from payments_ledger import statement
+from instalments import serialize_schedule
+from image_proxy import thumbnail
+from partitioning import hot_window
+import datetime as dt
 
 rates_bp = Blueprint("rates", __name__)
 
@@ -107,10 +115,77 @@ def _serialize_bill(b: RatesBill):
         "payment_method": b.payment_method,        # 'direct_debit' | 'card' | 'bpay' ...
         "ebill_active": bool(b.ebill_active),
         "pdf_url": b.pdf_url,
+        "notice_url": f"/rates/bills/{b.id}/notice.pdf",
     }
 
 
-def _serialize_rates_block(prop: Property, council: Council):
+def _first_by(rows, key):
+    out = {}
+    for r in rows:
+        out.setdefault(getattr(r, key), r)
+    return out
+
+
+def _group_by(rows, key):
+    out = {}
+    for r in rows:
+        out.setdefault(getattr(r, key), []).append(r)
+    return out
+
+
+class RatesBatch:
+    """
+    Everything _serialize_rates_block needs for a list of properties, loaded with one
+    query per table (property_id IN ...) instead of nine queries per property.
+    """
+
+    RECENT_BILLS = 6
+
+    def __init__(self, props):
+        ids = [p.id for p in props]
+        council_ids = {p.council_id for p in props if p.council_id}
+        if not ids:
+            self.accounts, self.settings, self.waste, self.contacts = {}, {}, {}, {}
+            self.concessions, self.overlays, self.valuations, self.bills = {}, {}, {}, {}
+            self.instalments = {}
+            return
+        self.accounts = _first_by(
+            RatesAccount.query.filter(RatesAccount.property_id.in_(ids)).order_by(RatesAccount.id), "property_id")
+        self.settings = _first_by(
+            BillingSetting.query.filter(BillingSetting.property_id.in_(ids)).order_by(BillingSetting.id), "property_id")
+        self.waste = _first_by(
+            WasteEntitlement.query.filter(WasteEntitlement.property_id.in_(ids)).order_by(WasteEntitlement.id),
+            "property_id")
+        self.concessions = _group_by(
+            Concession.query.filter(Concession.property_id.in_(ids)).order_by(Concession.id), "property_id")
+        self.overlays = _group_by(
+            PropertyOverlay.query.filter(PropertyOverlay.property_id.in_(ids)).order_by(PropertyOverlay.id),
+            "property_id")
+        self.valuations = _group_by(
+            Valuation.query.filter(Valuation.property_id.in_(ids)).order_by(Valuation.year.desc()), "property_id")
+        self.contacts = _first_by(
+            CouncilContact.query.filter(CouncilContact.council_id.in_(council_ids)).order_by(CouncilContact.id),
+            "council_id")
+        account_ids = [a.id for a in self.accounts.values()]
+        self.instalments = _group_by(
+            Instalment.query.filter(Instalment.account_id.in_(account_ids)).order_by(Instalment.seq),
+            "account_id") if account_ids else {}
+
+        # Newest RECENT_BILLS per property in one pass (row_number over each property's bills),
+        # from the hot partitions only
+        rank = db.func.row_number().over(
+            partition_by=RatesBill.property_id, order_by=(desc(RatesBill.bill_date), desc(RatesBill.id))
+        ).label("rank")
+        ranked = (db.session.query(RatesBill.id.label("id"), rank)
+                  .filter(RatesBill.property_id.in_(ids), hot_window(RatesBill)).subquery())
+        self.bills = _group_by(
+            RatesBill.query.join(ranked, ranked.c.id == RatesBill.id)
+            .filter(ranked.c.rank <= self.RECENT_BILLS)
+            .order_by(RatesBill.property_id, ranked.c.rank),
+            "property_id")
+
+
+def _serialize_rates_block(prop: Property, council: Council, batch: RatesBatch = None):
     """
     Build the richer 'rates' payload using your current schema.
     - Account basics from RatesAccount (1:1 with property)
@@ -118,31 +193,20 @@ def _serialize_rates_block(prop: Property, council: Council):
     - Settings from BillingSetting
     - Valuations / entitlements / overlays / concessions from their tables
     - Contact links from CouncilContact
+    Pass a RatesBatch when serializing several properties.
     """
-    acc = RatesAccount.query.filter_by(property_id=prop.id).first()
-    settings = BillingSetting.query.filter_by(property_id=prop.id).first()
-    waste = WasteEntitlement.query.filter_by(property_id=prop.id).first()
-    concessions = Concession.query.filter_by(property_id=prop.id).all()
-    overlays = PropertyOverlay.query.filter_by(property_id=prop.id).all()
-    vals = (
-        Valuation.query.filter_by(property_id=prop.id)
-        .order_by(Valuation.year.desc())
-        .all()
-    )
-    contact = CouncilContact.query.filter_by(council_id=prop.council_id).first()
+    batch = batch or RatesBatch([prop])
+    acc = batch.accounts.get(prop.id)
+    settings = batch.settings.get(prop.id)
+    waste = batch.waste.get(prop.id)
+    concessions = batch.concessions.get(prop.id, [])
+    overlays = batch.overlays.get(prop.id, [])
+    vals = batch.valuations.get(prop.id, [])
+    contact = batch.contacts.get(prop.council_id)
 
     # Bills (newest = last bill)
-    last_bill = (
-        RatesBill.query.filter_by(property_id=prop.id)
-        .order_by(desc(RatesBill.bill_date))
-        .first()
-    )
-    recent_bills = (
-        RatesBill.query.filter_by(property_id=prop.id)
-        .order_by(desc(RatesBill.bill_date))
-        .limit(6)
-        .all()
-    )
+    recent_bills = batch.bills.get(prop.id, [])
+    last_bill = recent_bills[0] if recent_bills else None
 
     # Compose
     return {
@@ -151,7 +215,7 @@ def _serialize_rates_block(prop: Property, council: Council):
         "next_due_date": getattr(acc, "next_due_date", None).isoformat()
         if getattr(acc, "next_due_date", None)
         else None,
-        "instalment_schedule": getattr(acc, "instalment_plan", None) or [],
+        "instalment_schedule": serialize_schedule(acc, batch.instalments.get(getattr(acc, "id", None), [])),
 
         # Settings
         "dd_active": bool(getattr(settings, "direct_debit_active", False)),
@@ -207,7 +271,8 @@ def _serialize_rates_block(prop: Property, council: Council):
     }
 
 
-def _serialize_property(p: Property):
+def serialize_rates_detail_property(p: Property, batch: RatesBatch = None):
+    """One entry of GET /rates/properties (also re-sent by /dashboard/changes)."""
     council: Council = p.council_obj
     return {
         "id": p.id,
@@ -221,8 +286,9 @@ def _serialize_property(p: Property):
         "shape_file_data": p.shape_file_data or None,
         "council_name": council.name if council else None,
         "council_logo_url": council.logo_url if council else None,
+        "council_logo_thumbnail_url": thumbnail(council.logo_url, "council_logo") if council else None,
         # Rich rates block
-        "rates": _serialize_rates_block(p, council),
+        "rates": _serialize_rates_block(p, council, batch),
     }
 
 
@@ -230,6 +296,8 @@ def _serialize_property(p: Property):
 
 @rates_bp.route("/properties", methods=["GET"], strict_slashes=False)
 @auth_required
+@rate_limited('rates.properties', '30/minute', burst=10)
+@query_budget(12)
 def get_rates_properties():
     """
     Return the authenticated resident's properties with enriched 'rates' details.
@@ -250,4 +318,72 @@ def get_rates_properties():
     )
 
     # Always 200; if no properties, return an empty list
-    return jsonify({"properties": [_serialize_property(p) for p in props]}), 200
+    batch = RatesBatch(props)
+    return jsonify({"properties": [serialize_rates_detail_property(p, batch) for p in props]}), 200
+
+
+@rates_bp.route("/bills/<int:bill_id>/notice.pdf", methods=["GET"])
+@auth_required
+def get_bill_notice(bill_id):
+    """
+    Stream the rendered rates notice for one of the resident's bills.
+    The file is content-addressed, so its hash is a strong ETag; send_file handles
+    If-None-Match and Range requests.
+    """
+    try:
+        user_id = int(getattr(request, "current_identity", None))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    bill = (
+        RatesBill.query.join(Property, Property.id == RatesBill.property_id)
+        .filter(RatesBill.id == bill_id, Property.resident_id == user_id)
+        .first()
+    )
+    if not bill:
+        return jsonify({"message": "Bill not found or not authorized"}), 404
+
+    inputs = gather_notice_inputs([bill.id])[bill.id]
+    digest, path = ensure_notice(inputs)
+    resp = send_file(
+        path,
+        mimetype="application/pdf",
+        conditional=True,
+        etag=digest,
+        max_age=3600,
+        download_name=f"rates-notice-{bill.id}.pdf",
+    )
+    # The notice carries the account number and address: browser cache only, never a shared proxy
+    resp.cache_control.public = False
+    resp.cache_control.private = True
+    return resp
+
+
+@rates_bp.route("/properties/<int:property_id>/statement", methods=["GET"])
+@auth_required
+def get_account_statement(property_id):
+    """
+    Ledger statement for one of the resident's properties.
+    ?from=2025-07-01&to=2026-06-30 (defaults: the last 90 days).
+    """
+    try:
+        user_id = int(getattr(request, "current_identity", None))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    acc = (
+        RatesAccount.query.join(Property, Property.id == RatesAccount.property_id)
+        .filter(RatesAccount.property_id == property_id, Property.resident_id == user_id)
+        .first()
+    )
+    if not acc:
+        return jsonify({"message": "Account not found or not authorized"}), 404
+
+    try:
+        date_to = dt.date.fromisoformat(request.args["to"]) if request.args.get("to") else dt.date.today()
+        date_from = dt.date.fromisoformat(request.args["from"]) if request.args.get("from") \
+            else date_to - dt.timedelta(days=90)
+        return jsonify(statement(acc.id, date_from, date_to)), 200
+    except ValueError as e:  # LedgerError or a bad date
+        return jsonify({"error": "Invalid statement request", "details": str(e)}), 400
+
@@ -0,0 +1,55 @@
+# routes/search.py
+from flask import Blueprint, jsonify, request
+import logging
+
+from routes.decorators import auth_required
+from rate_limit import rate_limited
+from query_budget import query_budget
+from search import search, DOC_TYPES
+
+search_bp = Blueprint("search", __name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_QUERY_CHARS = 200
+
+
+@search_bp.route("/", methods=["GET"], strict_slashes=False)
+@auth_required
+@rate_limited('search', '60/minute', burst=20)
+@query_budget(4)
+def search_all():
+    """
+    Ranked search over policies and the resident's own processes and development applications.
+    Query: q (required; each word matches as a prefix), type (repeatable: policy|process|development),
+    limit, offset. facets counts every type, whatever type filter is applied.
+    """
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+    if len(q) > MAX_QUERY_CHARS:
+        return jsonify({"error": f"q must be at most {MAX_QUERY_CHARS} characters"}), 400
+    types = request.args.getlist("type")
+    unknown = [t for t in types if t not in DOC_TYPES]
+    if unknown:
+        return jsonify({"error": f"Unknown type(s): {', '.join(unknown)}", "details": f"Use {', '.join(DOC_TYPES)}."}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    try:
+        result = search(q, request.current_identity, types=types or None, limit=limit, offset=offset)
+        result.update({
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + limit if offset + limit < result["total"] else None,
+        })
+        return jsonify(result), 200
+    except Exception as e:
+        logging.error(f"[search] UNEXPECTED SERVER ERROR in search_all: {str(e)}", exc_info=True)
+        return jsonify({
+            "error": "Unable to search due to server error",
+            "details": str(e)
+        }), 500
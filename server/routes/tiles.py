@@ -0,0 +1,54 @@
+# routes/tiles.py
+from flask import Blueprint, jsonify, request, Response
+import hashlib
+import logging
+
+from routes.decorators import auth_required
+from vector_tiles import EXTENT, LAYERS, MAX_ZOOM, tile_cache, valid_tile
+
+tiles_bp = Blueprint("tiles", __name__)
+
+TILE_MIMETYPE = "application/vnd.mapbox-vector-tile"
+TILE_MAX_AGE = 300  # matches the in-process cache TTL; the ETag makes revalidation a 304
+
+
+@tiles_bp.route("/", methods=["GET"], strict_slashes=False)
+@auth_required
+def list_layers():
+    """Tile layers and their zoom range, with a URL template for the map client."""
+    return jsonify({
+        "extent": EXTENT,
+        "layers": [
+            {"name": name, "minzoom": minzoom, "maxzoom": MAX_ZOOM,
+             "tiles": f"{request.script_root}/tiles/{name}/{{z}}/{{x}}/{{y}}.mvt"}
+            for name, minzoom in LAYERS.items()
+        ],
+    }), 200
+
+
+@tiles_bp.route("/<layer>/<int:z>/<int:x>/<int:y>.mvt", methods=["GET"])
+@auth_required
+def get_tile(layer, z, x, y):
+    """
+    One Mapbox Vector Tile. Below the layer's minzoom the tile is empty; past MAX_ZOOM
+    clients should overzoom the MAX_ZOOM tile.
+    """
+    if layer not in LAYERS:
+        return jsonify({"message": f"Unknown tile layer '{layer}'"}), 404
+    if not valid_tile(z, x, y):
+        return jsonify({"message": "Tile out of range"}), 404
+
+    try:
+        data = tile_cache.get(layer, z, x, y)
+    except Exception as e:
+        logging.error(f"[tiles] UNEXPECTED SERVER ERROR in get_tile {layer}/{z}/{x}/{y}: {str(e)}", exc_info=True)
+        return jsonify({
+            "error": "Unable to build tile due to server error",
+            "details": str(e)
+        }), 500
+
+    etag = hashlib.sha1(data).hexdigest()
+    resp = Response(status=304) if etag in request.if_none_match else Response(data, mimetype=TILE_MIMETYPE)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = f"private, max-age={TILE_MAX_AGE}"
+    return resp
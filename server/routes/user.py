@@ -2,12 +2,15 @@ from flask import Blueprint, jsonify, request
 from models import Resident, Property, Council # Import Property and Council models
 import logging
 from routes.decorators import auth_required
+from query_budget import query_budget
+from image_proxy import thumbnail
 from sqlalchemy.orm import joinedload # Import joinedload for eager loading
 
 user_bp = Blueprint('user_bp', __name__)
 
 @user_bp.route('/profile', methods=['GET'])
 @auth_required
+@query_budget(3)
 def get_user_profile():
     user_id = request.current_identity
     logging.info(f"Fetching profile for user_id: {user_id}")
@@ -39,5 +42,6 @@ def get_user_profile():
         "name": resident.name,
         "email": resident.email,
         "council_name": council_name,        # Include council name
-        "council_logo_url": council_logo_url # Include council logo URL
+        "council_logo_url": council_logo_url, # Include council logo URL
+        "council_logo_thumbnail_url": thumbnail(council_logo_url, "council_logo")
     }), 200
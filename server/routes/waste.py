@@ -0,0 +1,118 @@
+# routes/waste.py
+from flask import Blueprint, jsonify, request, Response
+import datetime as dt
+import hashlib
+import json
+import logging
+
+from models import Property
+from routes.decorators import auth_required
+from waste_schedule import (
+    DEFAULT_OCCURRENCES,
+    MAX_OCCURRENCES,
+    calendar_cache,
+    council_calendar_fingerprints,
+    council_name,
+    render_ics,
+)
+
+waste_bp = Blueprint("waste", __name__)
+
+CALENDAR_MAX_AGE = 3600  # clients revalidate hourly; ETag makes that a 304
+
+# ---------- helpers ----------
+
+def _parse_count():
+    count = int(request.args.get("count", DEFAULT_OCCURRENCES))
+    return min(max(count, 1), MAX_OCCURRENCES)
+
+
+def _etag_response(body, etag, mimetype, public=False):
+    """public only for council-level feeds; anything built from the caller's properties stays private."""
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype=mimetype)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = f"{'public' if public else 'private'}, max-age={CALENDAR_MAX_AGE}"
+    return resp
+
+
+# ---------- routes ----------
+
+@waste_bp.route("/calendar", methods=["GET"])
+@auth_required
+def get_waste_calendar():
+    """
+    Upcoming collection dates for every stream of the resident's council(s).
+    Query: council_id (optional, defaults to the councils of the resident's properties), count
+    """
+    try:
+        count = _parse_count()
+        council_id = request.args.get("council_id")
+        if council_id:
+            council_ids = [int(council_id)]
+        else:
+            council_ids = sorted({
+                p.council_id for p in
+                Property.query.with_entities(Property.council_id)
+                .filter_by(resident_id=request.current_identity).all()
+            })
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid council_id or count"}), 400
+
+    try:
+        start = dt.date.today()
+        fingerprints, loader = council_calendar_fingerprints(council_ids, start=start, count=count)
+        etag = hashlib.sha1("|".join(fingerprints[c] for c in council_ids).encode()).hexdigest()
+        if etag in request.if_none_match:
+            return _etag_response(None, etag, "application/json")
+
+        def render():
+            return json.dumps({
+                "start": start.isoformat(),
+                "councils": [
+                    {"council_id": cid, "council_name": council_name(cid), "streams": loader(cid)["streams"]}
+                    for cid in council_ids
+                ],
+            })
+
+        body = calendar_cache.get_or_render(("json", tuple(council_ids), count), etag, render)
+        return _etag_response(body, etag, "application/json")
+    except Exception as e:
+        logging.error(f"[waste] UNEXPECTED SERVER ERROR in get_waste_calendar: {str(e)}", exc_info=True)
+        return jsonify({
+            "error": "Unable to load waste calendar due to server error",
+            "details": str(e)
+        }), 500
+
+
+@waste_bp.route("/calendar/<int:council_id>.ics", methods=["GET"])
+def get_waste_calendar_ics(council_id):
+    """
+    Public iCal feed for calendar apps (they can't send bearer tokens).
+    Only council-level schedule data is exposed.
+    """
+    try:
+        count = _parse_count()
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid count"}), 400
+
+    try:
+        start = dt.date.today()
+        fingerprints, loader = council_calendar_fingerprints([council_id], start=start, count=count)
+        etag = fingerprints[council_id]
+        if etag in request.if_none_match:
+            return _etag_response(None, etag, "text/calendar", public=True)
+
+        body = calendar_cache.get_or_render(
+            ("ics", council_id, count), etag,
+            lambda: render_ics(council_name(council_id), loader(council_id), start),
+        )
+        return _etag_response(body, etag, "text/calendar", public=True)
+    except Exception as e:
+        logging.error(f"[waste] UNEXPECTED SERVER ERROR in get_waste_calendar_ics: {str(e)}", exc_info=True)
+        return jsonify({
+            "error": "Unable to render waste calendar due to server error",
+            "details": str(e)
+        }), 500
@@ -0,0 +1,28 @@
+# server/scripts/assign_waste_routes.py
+"""
+Bulk mode for the waste route index: precompute which route(s) serve every property.
+
+    python -m scripts.assign_waste_routes            # every council
+    python -m scripts.assign_waste_routes 3 7        # only councils 3 and 7
+"""
+import sys
+import time
+
+from app import app
+from models import db, Council
+from waste_routes import assign_routes_for_council
+
+
+def run(council_ids=None):
+    with app.app_context():
+        if not council_ids:
+            council_ids = [cid for (cid,) in db.session.query(Council.id).order_by(Council.id).all()]
+        for cid in council_ids:
+            started = time.perf_counter()
+            written = assign_routes_for_council(cid)
+            print(f"🗺️  Council {cid}: {written} property→route rows in {time.perf_counter() - started:.2f}s")
+        print("✅ Waste route assignment complete.")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]])
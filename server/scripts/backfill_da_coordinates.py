@@ -0,0 +1,41 @@
+# server/scripts/backfill_da_coordinates.py
+"""
+One-off: populate development_application.lat/lon for rows written before the columns existed.
+New and updated rows are materialized by the before_insert/before_update hook in models.py.
+Reads the same key spellings as the hook: lat/latitude and lon/lng/longitude.
+
+    python -m scripts.backfill_da_coordinates
+"""
+from sqlalchemy import text
+
+from app import app
+from models import db
+
+LAT = "COALESCE(gps_coordinates ->> 'lat', gps_coordinates ->> 'latitude')"
+LON = "COALESCE(gps_coordinates ->> 'lon', gps_coordinates ->> 'lng', gps_coordinates ->> 'longitude')"
+# Postgres refuses to cast text that isn't a number; the hook leaves such rows empty too
+NUMBER = r"'^\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$'"
+
+
+def backfill_da_coordinates():
+    """Fill lat/lon from gps_coordinates where they are missing. Returns rows updated."""
+    where = f"gps_coordinates IS NOT NULL AND lat IS NULL AND {LAT} IS NOT NULL AND {LON} IS NOT NULL"
+    if db.engine.dialect.name == 'postgresql':
+        where += f" AND {LAT} ~ {NUMBER} AND {LON} ~ {NUMBER}"
+    result = db.session.execute(text(f"""
+        UPDATE development_application
+        SET lat = CAST({LAT} AS double precision),
+            lon = CAST({LON} AS double precision)
+        WHERE {where}
+    """))
+    db.session.commit()
+    return result.rowcount
+
+
+def run():
+    with app.app_context():
+        print(f"✅ Backfilled coordinates on {backfill_da_coordinates()} development applications.")
+
+
+if __name__ == "__main__":
+    run()
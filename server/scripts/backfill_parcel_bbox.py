@@ -0,0 +1,45 @@
+# server/scripts/backfill_parcel_bbox.py
+"""
+One-off: populate property.min_lon/min_lat/max_lon/max_lat for parcels written before the
+columns existed, then drop cached vector tiles built without them.
+New and updated rows are materialized by the before_insert/before_update hook in models.py.
+
+    python -m scripts.backfill_parcel_bbox
+"""
+from sqlalchemy import bindparam, update
+
+from app import app
+from geo import geojson_bbox
+from models import db, Property
+from vector_tiles import tile_cache
+
+BATCH_SIZE = 1000
+
+
+def run():
+    with app.app_context():
+        total, last_id = 0, 0
+        while True:
+            rows = (db.session.query(Property.id, Property.shape_file_data)
+                    .filter(Property.id > last_id, Property.shape_file_data.isnot(None), Property.min_lat.is_(None))
+                    .order_by(Property.id).limit(BATCH_SIZE).all())
+            if not rows:
+                break
+            params = [{"pid": pid, "min_lon": b[0], "min_lat": b[1], "max_lon": b[2], "max_lat": b[3]}
+                      for pid, b in ((pid, geojson_bbox(shape)) for pid, shape in rows) if b]
+            if params:
+                table = Property.__table__
+                # Keep updated_at: a derived column isn't a change delta sync should resend
+                db.session.execute(
+                    update(table).where(table.c.id == bindparam("pid")).values(updated_at=table.c.updated_at),
+                    params,
+                )
+            db.session.commit()
+            total += len(params)
+            last_id = rows[-1].id
+        tile_cache.clear()
+        print(f"✅ Backfilled bounding boxes on {total} parcels.")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,218 @@
+# server/scripts/bench_serving_modes.py
+"""
+Side-by-side load test of serving modes on the dashboard and login flows.
+
+Either let the script start gunicorn (gunicorn.conf.py) once per worker mode, on free
+ports, against the database in the environment:
+
+    python -m scripts.bench_serving_modes --spawn gthread --spawn gevent --spawn sync \\
+        --email resident@example.com --password secret --flow dashboard --flow login
+
+or point it at servers you started yourself (e.g. the ASGI mode), with the checkout
+header enabled:
+
+    DB_CHECKOUT_HEADER=1 gunicorn app:app
+    DB_CHECKOUT_HEADER=1 uvicorn asgi:application --workers 4 --port 5001
+
+    python -m scripts.bench_serving_modes --token <JWT> \\
+        --target wsgi=http://localhost:5000 --target asgi=http://localhost:5001 \\
+        --requests 2000 --concurrency 64
+
+Flows:
+    dashboard  GET /dashboard/ (--path) with a bearer token
+    login      POST /auth/login, then GET /dashboard/ with the token it returned.
+               Password hashing is CPU-bound, so this is where worker modes differ most.
+               Spawned servers run with RATE_LIMIT_ENABLED=0; start your own the same way.
+
+Reports latency percentiles and DB connections checked out per request
+(from the X-DB-Checkouts response header).
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+CHECKOUT_HEADER = 'X-DB-Checkouts'
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FLOWS = ('dashboard', 'login')
+
+
+def _one_request(url, token=None, body=None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    data = None
+    if body is not None:
+        data = json.dumps(body).encode()
+        headers["Content-Type"] = "application/json"
+    req = urllib.request.Request(url, data=data, headers=headers)
+    started = time.perf_counter()
+    payload = None
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            payload = resp.read()
+            status = resp.status
+            checkouts = resp.headers.get(CHECKOUT_HEADER)
+    except urllib.error.HTTPError as e:
+        status, checkouts = e.code, None
+    except Exception:
+        status, checkouts = 0, None
+    return time.perf_counter() - started, status, int(checkouts) if checkouts else None, payload
+
+
+def _login(base_url, email, password):
+    elapsed, status, checkouts, payload = _one_request(
+        base_url + '/auth/login', body={"email": email, "password": password})
+    token = json.loads(payload)["token"] if status == 200 else None
+    return elapsed, status, checkouts, token
+
+
+def _dashboard_flow(base_url, path, token, email, password):
+    elapsed, status, checkouts, _ = _one_request(base_url + path, token)
+    return elapsed, status, checkouts
+
+
+def _login_flow(base_url, path, token, email, password):
+    """Log in, then load the dashboard with the fresh token: one resident opening the app."""
+    login_elapsed, status, login_checkouts, token = _login(base_url, email, password)
+    if status != 200:
+        return login_elapsed, status, None
+    elapsed, status, checkouts, _ = _one_request(base_url + path, token)
+    if checkouts is not None and login_checkouts is not None:
+        checkouts += login_checkouts
+    return login_elapsed + elapsed, status, checkouts
+
+
+FLOW_RUNNERS = {'dashboard': _dashboard_flow, 'login': _login_flow}
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return float('nan')
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def run_target(name, base_url, flow, path, total, concurrency, warmup, token=None, email=None, password=None):
+    base_url = base_url.rstrip('/')
+    runner = FLOW_RUNNERS[flow]
+    if flow == 'dashboard' and not token:
+        token = _login(base_url, email, password)[3]
+        if not token:
+            raise SystemExit(f"❌ {name}: could not log in as {email}")
+
+    def one(_):
+        return runner(base_url, path, token, email, password)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(warmup)))
+        started = time.perf_counter()
+        results = list(pool.map(one, range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(r[0] * 1000 for r in results if r[1] == 200)
+    errors = sum(1 for r in results if r[1] != 200)
+    checkouts = [r[2] for r in results if r[2] is not None]
+    return {
+        "name": name,
+        "flow": flow,
+        "rps": len(results) / elapsed if elapsed else 0.0,
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "max": latencies[-1] if latencies else float('nan'),
+        "errors": errors,
+        "checkouts_mean": statistics.mean(checkouts) if checkouts else float('nan'),
+        "checkouts_max": max(checkouts) if checkouts else float('nan'),
+    }
+
+
+# ---------- spawned servers ----------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(mode, workers=None, ready_timeout=120):
+    """Start gunicorn in `mode` on a free port. Returns (process, base_url) once it answers."""
+    port = _free_port()
+    env = dict(os.environ, GUNICORN_MODE=mode, GUNICORN_BIND=f"127.0.0.1:{port}",
+               DB_CHECKOUT_HEADER='1', RATE_LIMIT_ENABLED='0')
+    if workers:
+        env['WEB_CONCURRENCY'] = str(workers)
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:app'], cwd=SERVER_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + ready_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"❌ gunicorn ({mode}) exited with {proc.returncode}")
+        if _one_request(base_url + '/')[1] == 200:
+            return proc, base_url
+        time.sleep(0.5)
+    stop_server(proc)
+    raise SystemExit(f"❌ gunicorn ({mode}) not ready after {ready_timeout}s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', default=[], help='name=base_url of a running server (repeat per mode)')
+    parser.add_argument('--spawn', action='append', default=[], choices=('gthread', 'gevent', 'sync'),
+                        help='start gunicorn in this worker mode (repeat per mode)')
+    parser.add_argument('--workers', type=int, help='WEB_CONCURRENCY for spawned servers (default: auto-sized)')
+    parser.add_argument('--flow', action='append', choices=FLOWS, help='flow to run (repeat; default dashboard)')
+    parser.add_argument('--token', help='Bearer token of a seeded resident (dashboard flow)')
+    parser.add_argument('--email', help='Seeded resident to log in as (login flow, or to get a token)')
+    parser.add_argument('--password')
+    parser.add_argument('--path', default='/dashboard/')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--warmup', type=int, default=50)
+    args = parser.parse_args()
+
+    flows = args.flow or ['dashboard']
+    if not args.target and not args.spawn:
+        parser.error('give at least one --target or --spawn')
+    if ('login' in flows or not args.token) and not (args.email and args.password):
+        parser.error('--email and --password are needed for the login flow or without --token')
+
+    rows = []
+    targets = [t.split('=', 1) for t in args.target] + [(mode, None) for mode in args.spawn]
+    for name, base_url in targets:
+        proc = None
+        if base_url is None:
+            print(f"🚀 Starting gunicorn ({name})...")
+            proc, base_url = spawn_server(name, args.workers)
+        try:
+            for flow in flows:
+                print(f"⏱️  {name}/{flow}: {args.requests} requests @ concurrency {args.concurrency} -> {base_url}")
+                rows.append(run_target(name, base_url, flow, args.path, args.requests, args.concurrency,
+                                       args.warmup, args.token, args.email, args.password))
+        finally:
+            if proc is not None:
+                stop_server(proc)
+
+    print(f"\n{'mode':<9}{'flow':<11}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'errors':>8}{'conn/req':>10}{'conn max':>10}")
+    for r in rows:
+        print(f"{r['name']:<9}{r['flow']:<11}{r['rps']:>9.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}"
+              f"{r['max']:>9.1f}{r['errors']:>8}{r['checkouts_mean']:>10.2f}{r['checkouts_max']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# server/scripts/check_query_budgets.py
+"""
+Enforce per-route query budgets (see query_budget.py) against seeded residents.
+
+Seeds residents with different numbers of properties into a SCRATCH database,
+calls every GET route that declares a budget as each of them, and fails (exit 1) if:
+- a route goes over its budget, or
+- a route's query count grows with the number of properties (an N+1).
+
+    python -m scripts.check_query_budgets --database-url postgresql://localhost/assembly_ci
+    python -m scripts.check_query_budgets --database-url ... --properties 1 4 16 --route /rates/properties
+
+tests/test_query_budgets.py runs the same check in the pytest suite (cd server && python -m pytest).
+"""
+import argparse
+import datetime as dt
+import os
+import sys
+
+
+def seed_resident(n_properties, tag):
+    from models import db, WaterConsumption, Process, DevelopmentApplication
+    from scripts.seed_rates import ensure_resident, ensure_council, create_property, seed_rates_for_property
+
+    resident = ensure_resident(email=f"budget-{tag}-{n_properties}@example.invalid", name=f"Budget {n_properties}")
+    council = ensure_council("Query Budget Council")
+    today = dt.date.today()
+    for i in range(n_properties):
+        p = create_property(resident.id, council.id, f"{i + 1} Budget St", -33.87 + i * 0.001, 151.2)
+        seed_rates_for_property(p)
+        for q in range(4):
+            db.session.add(WaterConsumption(property_id=p.id, quarter_start_date=today - dt.timedelta(days=91 * q),
+                                            consumed_litres=40000, allocated_litres=50000, amount_owing=120.0))
+        db.session.add(DevelopmentApplication(resident_id=resident.id, property_id=p.id, council_id=council.id,
+                                              application_type='DA', description='Deck'))
+        db.session.add(Process(resident_id=resident.id, category='Community' if i % 2 else 'Roads',
+                               title=f"Request {i}", form_data={}))
+    db.session.commit()
+    return resident.id
+
+
+def budgeted_routes(app, only=None):
+    from query_budget import budget_for
+    routes = []
+    for rule in app.url_map.iter_rules():
+        if 'GET' not in rule.methods or rule.arguments:
+            continue
+        if only and rule.rule.rstrip('/') not in {r.rstrip('/') for r in only}:
+            continue
+        budget = budget_for(rule.endpoint)
+        if budget is not None:
+            routes.append((rule.rule, rule.endpoint, budget))
+    return sorted(routes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', required=True, help='scratch database; fixtures are written to it')
+    parser.add_argument('--properties', type=int, nargs='+', default=[1, 5, 20],
+                        help='property counts to seed, one resident each')
+    parser.add_argument('--route', action='append', help='only check these paths')
+    args = parser.parse_args()
+
+    # Before the app is imported: it reads both at import time
+    os.environ['SQLALCHEMY_DATABASE_URI'] = args.database_url
+    os.environ['QUERY_BUDGET'] = 'strict'
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+
+    from app import app
+    from query_budget import QUERY_COUNT_HEADER
+    from routes.decorators import jwt_instance
+
+    tag = dt.datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    with app.app_context():
+        residents = {n: seed_resident(n, tag) for n in sorted(set(args.properties))}
+        routes = budgeted_routes(app, args.route)
+
+    client = app.test_client()
+    failures = []
+    for path, endpoint, budget in routes:
+        counts = {}
+        for n, resident_id in residents.items():
+            now = dt.datetime.utcnow()
+            token = jwt_instance.encode({'alg': 'HS256'}, {'sub': resident_id, 'iat': now,
+                                                           'exp': now + dt.timedelta(minutes=5)},
+                                        app.config['JWT_SECRET_KEY']).decode()
+            resp = client.get(path, headers={'Authorization': f'Bearer {token}'})
+            counts[n] = int(resp.headers.get(QUERY_COUNT_HEADER, -1))
+            if resp.status_code >= 500:
+                failures.append(f"{path} with {n} properties: {resp.status_code} {resp.get_data(as_text=True)[:200]}")
+        grows = len(set(counts.values())) > 1 and counts[max(counts)] > counts[min(counts)]
+        if grows:
+            failures.append(f"{path}: query count grows with properties {counts} (N+1)")
+        mark = '❌' if grows or max(counts.values()) > budget else '✅'
+        print(f"{mark} {path:<24} budget {budget:>3}  queries " + '  '.join(f"{n}p={c}" for n, c in counts.items()))
+
+    if failures:
+        print("\n".join(["", "Query budget failures:"] + [f"  - {f}" for f in failures]), file=sys.stderr)
+        sys.exit(1)
+    print(f"🎉 {len(routes)} routes within budget.")
+
+
+if __name__ == "__main__":
+    main()
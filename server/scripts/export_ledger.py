@@ -0,0 +1,75 @@
+# server/scripts/export_ledger.py
+"""
+Export a council's ledger tables for reconciliation, streamed in constant memory.
+
+    python -m scripts.export_ledger --council 3 --table bills --format csv --gzip --out bills.csv.gz
+    python -m scripts.export_ledger --council 3 --table charges --format parquet \
+        --columns id,property_id,category,amount_cents --from 2025-07-01 --to 2026-06-30 --out charges.parquet
+    python -m scripts.export_ledger --council 3 --all --format ndjson --gzip --out-dir exports/
+
+Without --out the extract goes to stdout.
+"""
+import argparse
+import datetime as dt
+import os
+import sys
+import time
+
+from app import app
+from ledger_export import TABLES, FORMATS, BATCH_SIZE, export_stream, export_filename, ExportError
+
+
+def export_one(council_id, table, fmt, out_path, columns, date_from, date_to, date_column, compress, batch_size,
+               archive=False):
+    started = time.perf_counter()
+    chunks = export_stream(council_id, table, fmt, columns=columns, date_from=date_from, date_to=date_to,
+                           date_column=date_column, compress=compress, batch_size=batch_size,
+                           archive=archive)
+    written = 0
+    out = open(out_path, 'wb') if out_path else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if out_path:
+            out.close()
+    if out_path:
+        print(f"📦 {table}: {written / 1e6:.1f} MB -> {out_path} in {time.perf_counter() - started:.1f}s",
+              file=sys.stderr)
+
+
+def run(args):
+    columns = [c.strip() for c in args.columns.split(',')] if args.columns else None
+    tables = list(TABLES) if args.all else [args.table]
+    with app.app_context():
+        try:
+            for table in tables:
+                out_path = args.out
+                if args.all:
+                    os.makedirs(args.out_dir, exist_ok=True)
+                    out_path = os.path.join(args.out_dir, export_filename(args.council, table, args.format, args.gzip))
+                export_one(args.council, table, args.format, out_path, columns, args.date_from, args.date_to,
+                           args.date_column, args.gzip, args.batch_size, args.archive)
+        except ExportError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--council', type=int, required=True)
+    which = parser.add_mutually_exclusive_group(required=True)
+    which.add_argument('--table', choices=list(TABLES))
+    which.add_argument('--all', action='store_true', help='every ledger table, one file each in --out-dir')
+    parser.add_argument('--format', choices=list(FORMATS), default='csv')
+    parser.add_argument('--columns', help='comma-separated column names')
+    parser.add_argument('--from', dest='date_from', type=dt.date.fromisoformat)
+    parser.add_argument('--to', dest='date_to', type=dt.date.fromisoformat)
+    parser.add_argument('--date-column', help="date column the filters apply to (default per table)")
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--archive', action='store_true', help='include archived financial years')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--out', help='output file (default stdout)')
+    parser.add_argument('--out-dir', default='.')
+    run(parser.parse_args())
@@ -0,0 +1,32 @@
+# server/scripts/grant_admin.py
+"""
+Give (or take away) a resident access to the /admin routes.
+
+    python -m scripts.grant_admin staff@council.example
+    python -m scripts.grant_admin staff@council.example --revoke
+"""
+import argparse
+import sys
+
+from app import app
+from models import db, Resident
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('email')
+    parser.add_argument('--revoke', action='store_true', help='remove admin access instead')
+    args = parser.parse_args()
+
+    with app.app_context():
+        resident = Resident.query.filter_by(email=args.email).first()
+        if resident is None:
+            print(f"❌ No resident with email {args.email}", file=sys.stderr)
+            sys.exit(1)
+        resident.is_admin = not args.revoke
+        db.session.commit()
+        print(f"✅ {args.email} {'is no longer' if args.revoke else 'is now'} an admin.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# server/scripts/import_data.py
+"""
+Bulk-load a council extract (CSV or Parquet) into valuations, water readings or charges.
+
+    python -m scripts.import_data valuations valuations_2026.csv --council 3
+    python -m scripts.import_data water reads_q3.parquet --council 3 \
+        --key account_number --ref-column ASSESSMENT --map METER_READ=consumed_litres
+
+Re-running the same command after a failure resumes after the last committed chunk
+(use --no-resume to start over). Rejected rows are written to a CSV report.
+"""
+import argparse
+import sys
+import time
+
+from app import app
+from bulk_import import run_import, DATASETS, PROPERTY_KEYS, DEFAULT_CHUNK_SIZE, BulkImportError
+
+
+def _mapping(pairs):
+    mapping = {}
+    for pair in pairs or []:
+        src, _, dst = pair.partition('=')
+        if not dst:
+            raise SystemExit(f"--map expects FILE_COLUMN=field, got '{pair}'")
+        mapping[src] = dst
+    return mapping
+
+
+def run(dataset, path, council_id, key, ref_column, mapping, chunk_size, resume):
+    with app.app_context():
+        started = time.perf_counter()
+        try:
+            summary = run_import(dataset, council_id, path, key=key, ref_column=ref_column, mapping=mapping,
+                                 chunk_size=chunk_size, resume=resume)
+        except BulkImportError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        elapsed = time.perf_counter() - started
+        print(f"✅ Import run {summary['id']}: {summary['rows_read']} rows read, {summary['rows_written']} written, "
+              f"{summary['rows_rejected']} rejected in {elapsed:.1f}s "
+              f"({summary['rows_read'] / elapsed if elapsed else 0:.0f} rows/s)")
+        if summary['error_report']:
+            print(f"⚠️  Rejected rows: {summary['error_report']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('dataset', choices=sorted(DATASETS))
+    parser.add_argument('path')
+    parser.add_argument('--council', type=int, required=True)
+    parser.add_argument('--key', choices=PROPERTY_KEYS, default='property_id',
+                        help='how rows reference a property')
+    parser.add_argument('--ref-column', help='file column holding the reference (default: the key name)')
+    parser.add_argument('--map', action='append', metavar='FILE_COLUMN=field', help='rename a file column')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--no-resume', action='store_true')
+    args = parser.parse_args()
+    run(args.dataset, args.path, args.council, args.key, args.ref_column, _mapping(args.map),
+        args.chunk_size, not args.no_resume)
@@ -0,0 +1,35 @@
+# server/scripts/instalments.py
+"""
+Instalment schedules: backfill from the legacy JSON plans, and send due-date reminders.
+
+    python -m scripts.instalments backfill
+    python -m scripts.instalments remind --days 7
+    python -m scripts.instalments remind --days 7 --today 2025-08-25
+
+To try reminders locally, start the sink first and point the mailer at it:
+
+    python -m scripts.smtp_sink --port 1025
+    SMTP_HOST=127.0.0.1 SMTP_PORT=1025 python -m scripts.instalments remind
+"""
+import argparse
+import datetime as dt
+
+from app import app
+from instalments import backfill_instalments, mark_overdue, send_due_reminders
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['backfill', 'remind'])
+    parser.add_argument('--days', type=int, default=7, help='remind: instalments due within this many days')
+    parser.add_argument('--today', type=dt.date.fromisoformat, help='remind: run as of this date')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == 'backfill':
+            print(f"✅ Created {backfill_instalments()} instalments from legacy plans.")
+        else:
+            overdue = mark_overdue(args.today)
+            r = send_due_reminders(args.days, today=args.today)
+            rate = r["sent"] / r["seconds"] if r["seconds"] else 0
+            print(f"📧 Sent {r['sent']} reminders ({r['failed']} failed) in {r['seconds']}s ({rate:.0f}/s); "
+                  f"{overdue} instalments marked overdue.")
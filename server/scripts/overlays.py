@@ -0,0 +1,45 @@
+# server/scripts/overlays.py
+"""
+Council overlay layers: load a layer, and re-derive property overlays from the layers.
+
+    python -m scripts.overlays load flood.geojson --council 1 --kind flood --source "Flood Planning Area 2024"
+    python -m scripts.overlays load heritage.geojson --council 1 --kind heritage --source "LEP Heritage" \\
+        --key ITEM_NO --note ITEM_NAME
+    python -m scripts.overlays recompute              # parcels or layer areas changed since the last run
+    python -m scripts.overlays recompute --full --council 1 --processes 8
+
+Reloading a layer writes only the features that changed, and the next recompute only
+revisits parcels under them.
+"""
+import argparse
+
+from app import app
+from overlay_engine import load_layer, recompute_overlays
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['load', 'recompute'])
+    parser.add_argument('path', nargs='?', help='load: GeoJSON FeatureCollection of polygons')
+    parser.add_argument('--council', type=int, help='council id (required for load)')
+    parser.add_argument('--kind', help="load: overlay kind, e.g. 'flood'")
+    parser.add_argument('--source', help='load: layer name; a reload with the same name replaces the layer')
+    parser.add_argument('--key', help='load: feature property holding a stable feature id')
+    parser.add_argument('--note', help='load: feature property copied into the overlay note')
+    parser.add_argument('--full', action='store_true', help='recompute: every parcel, not just changed ones')
+    parser.add_argument('--processes', type=int, help='recompute: worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == 'load':
+            if not (args.path and args.council and args.kind and args.source):
+                parser.error('load needs a path, --council, --kind and --source')
+            with open(args.path, encoding='utf-8') as f:
+                r = load_layer(args.council, args.kind, args.source, f.read(), key_property=args.key,
+                               note_property=args.note)
+            print(f"✅ Layer '{args.source}': {r['added']} added, {r['changed']} changed, "
+                  f"{r['removed']} removed, {r['unchanged']} unchanged.")
+        else:
+            r = recompute_overlays(args.council, full=args.full, processes=args.processes)
+            print(f"🗺️  Checked {r['parcels']} parcels against {r['features']} features in {r['seconds']}s "
+                  f"({r['per_second']:.0f}/s): {r['changed_parcels']} parcels changed, "
+                  f"{r['upserted']} overlays written, {r['deleted']} removed.")
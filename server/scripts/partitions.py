@@ -0,0 +1,76 @@
+# server/scripts/partitions.py
+"""
+Manage financial-year partitions of rates_bill, rates_invoice, water_consumption and processes.
+
+    python -m scripts.partitions status
+    python -m scripts.partitions convert --table rates_bill     # one-off; locks the table while it copies
+    python -m scripts.partitions convert --all
+    python -m scripts.partitions maintain                       # premake future years, archive cold ones
+    python -m scripts.partitions maintain --no-archive --premake 3
+
+Run `maintain` from cron (or enqueue the maintain_partitions job) once a month or so.
+"""
+import argparse
+import sys
+
+from app import app
+from models import db
+from partitioning import (
+    SPECS, ARCHIVE_SCHEMA, PREMAKE_YEARS, PartitionError,
+    convert_table, is_partitioned, list_partitions, maintain_partitions,
+)
+
+
+def status():
+    with db.engine.connect() as conn:
+        for name in SPECS:
+            if not is_partitioned(conn, name):
+                print(f"⚪ {name}: not partitioned")
+                continue
+            print(f"🟢 {name}")
+            for part, fy, rows in list_partitions(conn, name):
+                print(f"     {part:<34} {'default' if fy is None else f'FY{fy}-{(fy + 1) % 100:02d}':<10} ~{rows} rows")
+            if is_partitioned(conn, name, schema=ARCHIVE_SCHEMA):
+                for part, fy, rows in list_partitions(conn, name, schema=ARCHIVE_SCHEMA):
+                    print(f"  🗄️  {ARCHIVE_SCHEMA}.{part:<26} FY{fy}-{(fy + 1) % 100:02d}   ~{rows} rows")
+
+
+def convert(tables, premake):
+    for name in tables:
+        with db.engine.begin() as conn:
+            created = convert_table(conn, SPECS[name], premake=premake)
+        print(f"✅ {name}: " + (f"{len(created)} partitions" if created else "already partitioned"))
+
+
+def maintain(tables, premake, archive):
+    for r in maintain_partitions(tables, premake=premake, archive=archive):
+        if not r["partitioned"]:
+            print(f"⚪ {r['table']}: not partitioned (run convert first)")
+            continue
+        print(f"✅ {r['table']}: created {r['created'] or 'none'}, archived {r['archived'] or 'none'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['status', 'convert', 'maintain'])
+    which = parser.add_mutually_exclusive_group()
+    which.add_argument('--table', choices=list(SPECS))
+    which.add_argument('--all', action='store_true')
+    parser.add_argument('--premake', type=int, default=PREMAKE_YEARS, help='future financial years to create')
+    parser.add_argument('--no-archive', action='store_true', help="maintain: don't move cold partitions")
+    args = parser.parse_args()
+
+    tables = [args.table] if args.table else list(SPECS)
+    with app.app_context():
+        try:
+            if args.command == 'status':
+                status()
+            elif args.command == 'convert':
+                if not (args.table or args.all):
+                    parser.error("convert needs --table or --all")
+                convert(tables, args.premake)
+            else:
+                maintain(tables, args.premake, not args.no_archive)
+        except PartitionError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,19 @@
+# server/scripts/rebuild_search.py
+"""
+Rebuild search_document from policies, processes and development applications.
+
+    python -m scripts.rebuild_search
+
+Run once after deploying search, and after any bulk load that writes those tables
+with raw SQL (session writes keep the index current on their own).
+"""
+import time
+
+from app import app
+from search import rebuild_search_documents
+
+if __name__ == "__main__":
+    with app.app_context():
+        started = time.monotonic()
+        n = rebuild_search_documents()
+        print(f"✅ Indexed {n} documents in {time.monotonic() - started:.1f}s.")
@@ -0,0 +1,36 @@
+# server/scripts/render_notices.py
+"""
+Nightly notice run: render every missing rates notice for one or more councils.
+
+    python -m scripts.render_notices                       # every council
+    python -m scripts.render_notices --council 3 --since 2025-07-01 --processes 8
+"""
+import argparse
+import datetime as dt
+import time
+
+from app import app
+from models import db, Council
+from notices import render_council_notices
+
+
+def run(council_ids=None, since=None, processes=None):
+    with app.app_context():
+        if not council_ids:
+            council_ids = [cid for (cid,) in db.session.query(Council.id).order_by(Council.id).all()]
+        for cid in council_ids:
+            started = time.perf_counter()
+            stats = render_council_notices(cid, since=since, processes=processes)
+            elapsed = time.perf_counter() - started
+            print(f"🧾 Council {cid}: {stats['bills']} bills, {stats['rendered']} rendered in {elapsed:.1f}s "
+                  f"({stats['rendered'] / elapsed if elapsed else 0:.0f} notices/s)")
+        print("✅ Notice run complete.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render rates notices.")
+    parser.add_argument('--council', type=int, action='append')
+    parser.add_argument('--since', type=dt.date.fromisoformat)
+    parser.add_argument('--processes', type=int)
+    args = parser.parse_args()
+    run(args.council, since=args.since, processes=args.processes)
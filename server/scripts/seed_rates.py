@@ -7,7 +7,7 @@ from app import app
 from models import (
     db,
     Resident, Council, Property,
-    RatesAccount, RatesBill, Valuation, RateCharge,
+    RatesAccount, Instalment, RatesBill, Valuation, RateCharge,
     WasteEntitlement, Concession, PropertyOverlay, BillingSetting, CouncilContact
 )
 
@@ -27,6 +27,7 @@ def truncate_rates_and_properties():
     db.session.execute(text("""
         TRUNCATE TABLE
             rates_bill,
+            instalment,
             rates_account,
             valuation,
             rate_charge,
@@ -109,20 +110,23 @@ def create_property(resident_id, council_id, address, lat, lon, prop_type="prima
 
 
 def seed_rates_for_property(p: Property):
-    # Account + instalment plan
+    # Account + instalment schedule
     acc = RatesAccount(
         property_id=p.id,
         account_number=f"RA{p.id:06d}",
         balance_cents=cents(432.10),
         next_due_date=dt.date.today() + dt.timedelta(days=30),
-        instalment_plan=[
-            {"seq": 1, "due_date": (dt.date.today() - dt.timedelta(days=60)).isoformat(), "amount": 400.00},
-            {"seq": 2, "due_date": (dt.date.today() - dt.timedelta(days=30)).isoformat(), "amount": 400.00},
-            {"seq": 3, "due_date": (dt.date.today() + dt.timedelta(days=30)).isoformat(), "amount": 400.00},
-            {"seq": 4, "due_date": (dt.date.today() + dt.timedelta(days=60)).isoformat(), "amount": 400.00},
-        ],
     )
     db.session.add(acc)
+    db.session.flush()
+    for seq, days in enumerate((-60, -30, 30, 60), start=1):
+        db.session.add(Instalment(
+            account_id=acc.id,
+            seq=seq,
+            due_date=dt.date.today() + dt.timedelta(days=days),
+            amount_cents=cents(400.00),
+            status="overdue" if days < 0 else "due",
+        ))
 
     # Payment/eNotice settings
     bs = BillingSetting(
@@ -192,35 +196,40 @@ def seed_rates_for_property(p: Property):
 # -----------------------------
 # Entry point
 # -----------------------------
-def run():
-    with app.app_context():
-        # Make sure tables exist first (first ever run), then hard reset
-        db.create_all()
-        truncate_rates_and_properties()
-
-        # Councils
-        cos = ensure_council(
-            "City of Sydney",
-            logo_url="https://upload.wikimedia.org/wikipedia/commons/2/20/City_of_Sydney_Logo.png"
-        )
-        nb = ensure_council(
-            "Northern Beaches Council",
-            logo_url="https://upload.wikimedia.org/wikipedia/commons/2/2a/Northern_Beaches_Council_logo.png"
-        )
+def seed():
+    """Reset and seed the demo rates data. Expects an app context (CLI or job worker)."""
+    # Make sure tables exist first (first ever run), then hard reset
+    db.create_all()
+    truncate_rates_and_properties()
+
+    # Councils
+    cos = ensure_council(
+        "City of Sydney",
+        logo_url="https://upload.wikimedia.org/wikipedia/commons/2/20/City_of_Sydney_Logo.png"
+    )
+    nb = ensure_council(
+        "Northern Beaches Council",
+        logo_url="https://upload.wikimedia.org/wikipedia/commons/2/2a/Northern_Beaches_Council_logo.png"
+    )
+
+    # Resident
+    res = ensure_resident()
+
+    # Properties (fresh each run because we truncated)
+    p1 = create_property(res.id, cos.id, "123 Main Street", -33.8688, 151.2093, "primary", "Residential")
+    p2 = create_property(res.id, nb.id,  "45 Elm Avenue",   -33.7475, 151.2890, "investment", "Commercial")
 
-        # Resident
-        res = ensure_resident()
+    # Seed rates domain for each property
+    seed_rates_for_property(p1)
+    seed_rates_for_property(p2)
 
-        # Properties (fresh each run because we truncated)
-        p1 = create_property(res.id, cos.id, "123 Main Street", -33.8688, 151.2093, "primary", "Residential")
-        p2 = create_property(res.id, nb.id,  "45 Elm Avenue",   -33.7475, 151.2890, "investment", "Commercial")
+    db.session.commit()
+    print("✅ Seed complete. Open the app and check the Rates tab.")
 
-        # Seed rates domain for each property
-        seed_rates_for_property(p1)
-        seed_rates_for_property(p2)
 
-        db.session.commit()
-        print("✅ Seed complete. Open the app and check the Rates tab.")
+def run():
+    with app.app_context():
+        seed()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+# server/scripts/send_enotices.py
+"""
+Email rates notices to residents who opted in to e-notices (see enotices.py).
+
+    python -m scripts.send_enotices
+    python -m scripts.send_enotices --council 3 --since 2025-07-01 --concurrency 8
+    python -m scripts.send_enotices --sink          # deliver to an in-process SMTP sink and report throughput
+
+Without --sink, mail goes to SMTP_HOST/SMTP_PORT (see mailer.py). Bills already sent
+are skipped, so re-running after a failure only sends what's left.
+"""
+import argparse
+import datetime as dt
+
+from app import app
+from enotices import deliver_enotices, delivery_summary
+from mailer import SMTPPool
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--council', type=int, help='only this council')
+    parser.add_argument('--since', type=dt.date.fromisoformat, help='only bills issued on/after this date')
+    parser.add_argument('--concurrency', type=int, help='parallel SMTP connections (default SMTP_POOL_SIZE)')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--sink', action='store_true', help='send to a local SMTP sink instead of SMTP_HOST')
+    args = parser.parse_args()
+
+    sink = pool = None
+    if args.sink:
+        from scripts.smtp_sink import SMTPSink
+        sink = SMTPSink(port=0).start()
+        pool = SMTPPool(sink.host, sink.port, size=args.concurrency or 4)
+
+    with app.app_context():
+        r = deliver_enotices(args.council, args.since, batch_size=args.batch_size,
+                             concurrency=args.concurrency, pool=pool)
+        print(f"📧 {r['sent']} sent, {r['failed']} failed, {r['bounced']} bounced, {r['skipped']} skipped "
+              f"of {r['bills']} bills in {r['seconds']}s ({r['per_second']} msg/s)")
+        print("📊 All deliveries: " + ", ".join(f"{k} {v}" for k, v in sorted(delivery_summary(args.council).items())))
+    if sink:
+        print(f"📬 Sink received {len(sink.messages)} messages.")
+        pool.close()
+        sink.stop()
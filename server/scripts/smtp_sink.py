@@ -0,0 +1,115 @@
+# server/scripts/smtp_sink.py
+"""
+Local SMTP stand-in: accepts every message and keeps it, so mail senders can be
+exercised without a real relay.
+
+    python -m scripts.smtp_sink --port 1025                   # count messages, print a line each
+    python -m scripts.smtp_sink --port 1025 --maildir var/mail  # also write each message to a .eml file
+    SMTP_HOST=localhost SMTP_PORT=1025 python worker.py --queues maintenance
+
+Also usable in-process: sink = SMTPSink(port=0).start(); ...; sink.messages; sink.stop()
+"""
+import argparse
+import os
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        sink = self.server.sink
+        self._reply('220 smtp-sink ready')
+        sender, rcpts = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode('utf-8', 'replace').strip()
+            verb = cmd[:4].upper()
+            if verb == 'EHLO':
+                self.wfile.write(b'250-smtp-sink\r\n250-8BITMIME\r\n250 SIZE 52428800\r\n')
+            elif verb == 'HELO':
+                self._reply('250 smtp-sink')
+            elif verb == 'MAIL':
+                sender, rcpts = cmd[10:].strip(), []
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                rcpts.append(cmd[8:].strip())
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                chunks = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    chunks.append(data[1:] if data.startswith(b'..') else data)
+                sink.accept(sender, rcpts, b''.join(chunks))
+                sender, rcpts = None, []
+                self._reply('250 OK queued')
+            elif verb == 'RSET':
+                sender, rcpts = None, []
+                self._reply('250 OK')
+            elif verb == 'NOOP':
+                self._reply('250 OK')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    def __init__(self, host='127.0.0.1', port=1025, maildir=None, verbose=False):
+        self.maildir = maildir
+        self.verbose = verbose
+        self.messages = []
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+        self._thread = None
+
+    def accept(self, sender, rcpts, data):
+        with self._lock:
+            self.messages.append((sender, rcpts, data))
+            n = len(self.messages)
+        if self.maildir:
+            with open(os.path.join(self.maildir, f"{time.time_ns()}-{n}.eml"), 'wb') as f:
+                f.write(data)
+        if self.verbose:
+            print(f"📨 #{n} {sender} -> {', '.join(rcpts)} ({len(data)} bytes)")
+
+    def start(self):
+        if self.maildir:
+            os.makedirs(self.maildir, exist_ok=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1025)
+    parser.add_argument('--maildir', help='write each message to <maildir>/<ns>-<n>.eml')
+    args = parser.parse_args()
+    sink = SMTPSink(args.host, args.port, args.maildir, verbose=True)
+    print(f"📬 SMTP sink listening on {sink.host}:{sink.port}")
+    try:
+        sink._server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n👋 {len(sink.messages)} messages received.")
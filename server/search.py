@@ -0,0 +1,313 @@
+# server/search.py
+"""
+Ranked full-text search over policies, processes and development applications.
+
+Every searchable row has a mirror row in search_document. Session listeners upsert
+and delete those rows in the same flush as the source row. Raw-SQL writers that
+bypass the session should run rebuild_search_documents() (the rebuild_search job).
+
+Backends (SEARCH_BACKEND, defaults to the database dialect):
+- postgres: search_vector is a weighted tsvector (title A, category B, body C) under
+  a GIN index. Terms become an AND of prefix queries ('plan:* & pool:*') ranked with
+  ts_rank_cd. Facet counts stop at MAX_COUNT matches, so a broad query doesn't count
+  millions of rows.
+- memory: an in-process inverted index built from search_document. Prefix terms are
+  matched with a bisect over the sorted vocabulary and scored with the same weights
+  times idf. Like the animal facet index, it is marked stale on commit and rebuilt
+  on next read, with a TTL for changes made by other workers. This is the SQLite
+  stand-in.
+
+Visibility: policies are public. Processes and development applications are only
+returned to the resident they belong to.
+"""
+import bisect
+import datetime as dt
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from sqlalchemy import bindparam, delete, event, func, or_, select
+
+from models import db, Policy, Process, DevelopmentApplication, SearchDocument
+
+DOC_TYPES = ('policy', 'process', 'development')
+MODELS = {'policy': Policy, 'process': Process, 'development': DevelopmentApplication}
+WEIGHTS = {'title': 1.0, 'category': 0.4, 'body': 0.2}  # ts_rank's default A / B / C weights
+MAX_COUNT = 10000
+SNIPPET_CHARS = 160
+INDEX_TTL_SECONDS = int(os.getenv('SEARCH_INDEX_TTL_SECONDS', '60'))
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "an and are as at be by for from has in is it of on or that the this to was were will with".split()
+)
+
+
+def tokens(text):
+    return [t for t in _TOKEN.findall((text or '').lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def _strings(value):
+    """String leaves of a JSON value (form_data answers)."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _strings(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _strings(v)
+
+
+# ---------- documents ----------
+
+def document_for(obj):
+    """The search_document fields for a source row, or None if it isn't searchable."""
+    if isinstance(obj, Policy):
+        return {"doc_type": "policy", "doc_id": obj.id, "resident_id": None, "category": obj.category,
+                "status": None, "title": obj.title, "body": None, "url": obj.document_url}
+    if isinstance(obj, Process):
+        return {"doc_type": "process", "doc_id": obj.id, "resident_id": obj.resident_id, "category": obj.category,
+                "status": obj.status, "title": obj.title, "body": " ".join(_strings(obj.form_data)) or None,
+                "url": None}
+    if isinstance(obj, DevelopmentApplication):
+        description = (obj.description or '').strip()
+        title = description.split('\n', 1)[0][:200] or f"{obj.application_type} application"
+        return {"doc_type": "development", "doc_id": obj.id, "resident_id": obj.resident_id,
+                "category": obj.application_type, "status": obj.status, "title": title,
+                "body": description or None, "url": None}
+    return None
+
+
+def _upsert(conn, docs):
+    if not docs:
+        return
+    postgres = conn.dialect.name == 'postgresql'
+    if postgres:
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    stmt = upsert(SearchDocument.__table__)
+    if postgres:
+        # Computed from the row's own text, so an upsert can never leave a stale vector
+        def weighted(field, weight):
+            return func.setweight(func.to_tsvector('english', func.coalesce(bindparam(f"v_{field}"), '')), weight)
+        stmt = stmt.values(search_vector=weighted('title', 'A').op('||')(weighted('category', 'B'))
+                           .op('||')(weighted('body', 'C')))
+        docs = [dict(d, v_title=d["title"], v_category=d["category"], v_body=d["body"]) for d in docs]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['doc_type', 'doc_id'],
+        set_={c: getattr(stmt.excluded, c)
+              for c in ('resident_id', 'category', 'status', 'title', 'body', 'url', 'search_vector')}
+        | {"updated_at": dt.datetime.utcnow()},
+    )
+    conn.execute(stmt, docs)
+
+
+def _delete(conn, keys):
+    by_type = defaultdict(list)
+    for doc_type, doc_id in keys:
+        by_type[doc_type].append(doc_id)
+    for doc_type, ids in by_type.items():
+        conn.execute(delete(SearchDocument.__table__).where(
+            SearchDocument.doc_type == doc_type, SearchDocument.doc_id.in_(ids)))
+
+
+def register_search_listeners(session_cls=None):
+    """Mirror policy / process / DA writes into search_document within the same transaction."""
+    target = session_cls or db.session
+
+    @event.listens_for(target, 'after_flush')
+    def _index_writes(session, flush_context):
+        docs, gone = [], []
+        new = set(session.new)  # Session.new builds a fresh set on every access
+        for obj in list(new) + list(session.dirty):
+            doc = document_for(obj)
+            if doc is not None and (obj in new or session.is_modified(obj)):
+                docs.append(doc)
+        for obj in session.deleted:
+            doc = document_for(obj)
+            if doc is not None:
+                gone.append((doc["doc_type"], doc["doc_id"]))
+        if docs or gone:
+            conn = session.connection()
+            _upsert(conn, docs)
+            _delete(conn, gone)
+            session.info['search_dirty'] = True
+
+    @event.listens_for(target, 'after_commit')
+    def _refresh_on_commit(session):
+        if session.info.pop('search_dirty', False):
+            memory_index.mark_stale()
+
+    @event.listens_for(target, 'after_rollback')
+    def _clear_on_rollback(session):
+        session.info.pop('search_dirty', None)
+
+
+def rebuild_search_documents(batch_size=1000):
+    """Re-derive every search_document row from its source table. Returns rows written."""
+    total = 0
+    for doc_type, model in MODELS.items():
+        last_id = 0
+        while True:
+            rows = model.query.filter(model.id > last_id).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            _upsert(db.session.connection(), [document_for(r) for r in rows])
+            db.session.commit()
+            total += len(rows)
+            last_id = rows[-1].id
+        # Drop mirrors whose source row is gone
+        orphans = (db.session.query(SearchDocument.doc_id)
+                   .filter(SearchDocument.doc_type == doc_type,
+                           ~db.session.query(model.id).filter(model.id == SearchDocument.doc_id).exists()))
+        _delete(db.session.connection(), [(doc_type, i) for (i,) in orphans])
+        db.session.commit()
+    memory_index.mark_stale()
+    logging.info(f"[search] Rebuilt {total} search documents.")
+    return total
+
+
+# ---------- in-process index ----------
+
+class InvertedIndex:
+    def __init__(self, ttl_seconds=INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._docs = None        # [(doc_type, doc_id, resident_id, title, category, status, url, body)]
+        self._postings = {}      # token -> {doc index: weight}
+        self._vocab = []         # sorted tokens, for prefix ranges
+        self._built_at = 0.0
+        self._stale = True
+
+    def mark_stale(self):
+        self._stale = True
+
+    def _expired(self):
+        return self._stale or self._docs is None or (time.monotonic() - self._built_at) > self.ttl_seconds
+
+    def _rebuild(self):
+        docs, postings = [], defaultdict(dict)
+        rows = db.session.execute(select(
+            SearchDocument.doc_type, SearchDocument.doc_id, SearchDocument.resident_id, SearchDocument.title,
+            SearchDocument.category, SearchDocument.status, SearchDocument.url, SearchDocument.body,
+        ))
+        for row in rows:
+            i = len(docs)
+            docs.append(tuple(row))
+            for field, weight in WEIGHTS.items():
+                for tok in tokens(getattr(row, field)):
+                    p = postings[tok]
+                    p[i] = p.get(i, 0.0) + weight
+        self._docs, self._postings, self._vocab = docs, dict(postings), sorted(postings)
+        self._built_at = time.monotonic()
+        self._stale = False
+        logging.info(f"[search] In-process index rebuilt: {len(docs)} documents, {len(self._vocab)} terms.")
+
+    def _ensure(self):
+        if self._expired():
+            with self._lock:
+                if self._expired():
+                    self._rebuild()
+
+    def _prefix_scores(self, term):
+        """{doc index: score} for documents containing a token that starts with term."""
+        scores = Counter()
+        vocab = self._vocab
+        i = bisect.bisect_left(vocab, term)
+        while i < len(vocab) and vocab[i].startswith(term):
+            for doc, weight in self._postings[vocab[i]].items():
+                scores[doc] = max(scores[doc], weight)
+            i += 1
+        if scores:
+            idf = math.log(1 + len(self._docs) / len(scores))
+            for doc in scores:
+                scores[doc] *= idf
+        return scores
+
+    def search(self, terms, resident_id, types, limit, offset):
+        self._ensure()
+        docs = self._docs
+        matched = None
+        for term in terms:
+            scores = self._prefix_scores(term)
+            if matched is None:
+                matched = scores
+            else:
+                matched = Counter({d: s + scores[d] for d, s in matched.items() if d in scores})
+            if not matched:
+                break
+        visible = [(d, s) for d, s in (matched or {}).items() if docs[d][2] is None or docs[d][2] == resident_id]
+        facets = Counter(docs[d][0] for d, _ in visible)
+        hits = sorted(((d, s) for d, s in visible if docs[d][0] in types), key=lambda x: (-x[1], docs[x[0]][:2]))
+        items = [_item(*docs[d][:2], *docs[d][3:], rank=s) for d, s in hits[offset:offset + limit]]
+        return items, dict(facets), len(hits)
+
+
+memory_index = InvertedIndex()
+
+
+# ---------- querying ----------
+
+def _item(doc_type, doc_id, title, category, status, url, body, rank):
+    return {
+        "type": doc_type,
+        "id": doc_id,
+        "title": title,
+        "category": category,
+        "status": status,
+        "url": url,
+        "snippet": (body[:SNIPPET_CHARS] + ('…' if len(body) > SNIPPET_CHARS else '')) if body else None,
+        "rank": round(float(rank), 4),
+    }
+
+
+def _search_postgres(terms, resident_id, types, limit, offset):
+    query = func.to_tsquery('english', ' & '.join(f"{t}:*" for t in terms))
+    doc = SearchDocument
+    visible = (doc.search_vector.op('@@')(query), or_(doc.resident_id.is_(None), doc.resident_id == resident_id))
+
+    capped = select(doc.doc_type).where(*visible).limit(MAX_COUNT).subquery()
+    facets = dict(db.session.execute(select(capped.c.doc_type, func.count()).group_by(capped.c.doc_type)).all())
+
+    rank = func.ts_rank_cd(doc.search_vector, query).label('rank')
+    rows = db.session.execute(
+        select(doc.doc_type, doc.doc_id, doc.title, doc.category, doc.status, doc.url, doc.body, rank)
+        .where(*visible, doc.doc_type.in_(types))
+        .order_by(rank.desc(), doc.doc_type, doc.doc_id)
+        .limit(limit).offset(offset)
+    ).all()
+    total = sum(n for t, n in facets.items() if t in types)
+    return [_item(*r) for r in rows], facets, total
+
+
+def search_backend():
+    return os.getenv('SEARCH_BACKEND') or ('postgres' if db.engine.dialect.name == 'postgresql' else 'memory')
+
+
+def search(q, resident_id, types=None, limit=20, offset=0):
+    """
+    {"query", "total", "capped", "facets", "items"} for a free-text query, as seen by resident_id.
+    types limits items (not facets) to some of DOC_TYPES.
+    """
+    terms = list(dict.fromkeys(tokens(q)))
+    types = [t for t in (types or DOC_TYPES) if t in DOC_TYPES] or list(DOC_TYPES)
+    if not terms:
+        items, facets, total = [], {}, 0
+    elif search_backend() == 'postgres':
+        items, facets, total = _search_postgres(terms, resident_id, types, limit, offset)
+    else:
+        items, facets, total = memory_index.search(terms, resident_id, types, limit, offset)
+    return {
+        "query": q,
+        "terms": terms,
+        "total": total,
+        "capped": sum(facets.values()) >= MAX_COUNT,
+        "facets": {t: facets.get(t, 0) for t in DOC_TYPES},
+        "items": items,
+    }
@@ -0,0 +1,63 @@
+# server/tests/test_admin_auth.py
+import pytest
+
+from tests.conftest import bearer
+
+ADMIN_ROUTES = [
+    ('GET', '/admin/all'),
+    ('POST', '/admin/update_status/1'),
+    ('POST', '/admin/accounts/1/ledger'),
+    ('POST', '/admin/ledger/1/reverse'),
+    ('GET', '/admin/accounts/1/balance'),
+    ('GET', '/admin/accounts/1/statement'),
+    ('GET', '/admin/jobs'),
+    ('GET', '/admin/jobs/1'),
+    ('POST', '/admin/residents/1/revoke-tokens'),
+    ('GET', '/admin/token-denylist'),
+    ('GET', '/admin/rate-limits'),
+    ('PUT', '/admin/rating/1/parameters/2026'),
+    ('POST', '/admin/rating/1/what-if'),
+    ('POST', '/admin/rating/1/commit'),
+    ('GET', '/admin/imports'),
+]
+
+
+@pytest.mark.parametrize('method,path', ADMIN_ROUTES)
+def test_admin_routes_need_a_token(client, db_session, method, path):
+    assert client.open(path, method=method, json={}).status_code == 401
+
+
+@pytest.mark.parametrize('method,path', ADMIN_ROUTES)
+def test_admin_routes_refuse_residents(client, make_resident, method, path):
+    resident = make_resident()
+    resp = client.open(path, method=method, json={}, headers=bearer(resident.id))
+    assert resp.status_code == 403
+    assert resp.json == {"message": "Admin access required"}
+
+
+def test_admin_can_post_to_the_ledger(client, make_resident):
+    from models import Council, Property, RatesAccount, db
+    admin = make_resident(admin=True)
+    council = Council(name='Ledger Council')
+    db.session.add(council)
+    db.session.flush()
+    prop = Property(resident_id=admin.id, council_id=council.id, address='1 Ledger St')
+    db.session.add(prop)
+    db.session.flush()
+    account = RatesAccount(property_id=prop.id, account_number='RA-T1', balance_cents=0)
+    db.session.add(account)
+    db.session.commit()
+
+    resp = client.post(f'/admin/accounts/{account.id}/ledger', headers=bearer(admin.id),
+                       json={"entry_type": "charge", "amount_cents": 12500, "reference": "T-1"})
+    assert resp.status_code == 201, resp.json
+    assert client.get(f'/admin/accounts/{account.id}/balance', headers=bearer(admin.id)).json['balance_cents'] == 12500
+
+
+def test_demoted_admin_is_refused_immediately(client, make_resident, db_session):
+    admin = make_resident(admin=True)
+    headers = bearer(admin.id)
+    assert client.get('/admin/all', headers=headers).status_code == 200
+    admin.is_admin = False
+    db_session.commit()
+    assert client.get('/admin/all', headers=headers).status_code == 403
@@ -0,0 +1,100 @@
+# server/tests/test_animals.py
+import pytest
+
+from tests.conftest import bearer
+
+
+def test_dashboard_tile_is_the_first_page_with_card_fields(app, client, db_session, make_resident):
+    from models import Animal, Council
+    from routes.dashboard import DASHBOARD_ANIMAL_PAGE_SIZE
+    council = Council(name='Pound Council')
+    db_session.add(council)
+    db_session.flush()
+    for n in range(DASHBOARD_ANIMAL_PAGE_SIZE + 3):
+        db_session.add(Animal(council_id=council.id, name=f'Rex {n}', type='Dog', temperament='Gentle',
+                              main_photo_url=f'https://photos.example.com/rex{n}.jpg',
+                              gallery_urls=[f'https://photos.example.com/rex{n}-a.jpg']))
+    db_session.add(Animal(council_id=council.id, name='Adopted', type='Cat', status='adopted'))
+    db_session.commit()
+    headers = bearer(make_resident().id, app)
+
+    body = client.get('/dashboard/', headers=headers).get_json()
+    tile = body['Animals']
+    first_page = client.get('/animals/', query_string={"limit": DASHBOARD_ANIMAL_PAGE_SIZE, "facets": 0},
+                            headers=headers).get_json()
+    assert len(tile) == DASHBOARD_ANIMAL_PAGE_SIZE
+    assert [a['id'] for a in tile] == [a['id'] for a in first_page['items']]
+    assert first_page['total'] == DASHBOARD_ANIMAL_PAGE_SIZE + 3
+    # The count and the cursor to carry on from, as /animals would give them
+    assert body['AnimalsPage'] == {"total": DASHBOARD_ANIMAL_PAGE_SIZE + 3, "next_cursor": first_page['next_cursor']}
+    rest = client.get('/animals/', query_string={"cursor": body['AnimalsPage']['next_cursor']},
+                      headers=headers).get_json()
+    assert len(rest['items']) == 3 and rest['next_cursor'] is None
+
+    # What the AnimalDetails cards read
+    card = tile[0]
+    assert (card['type'], card['animal_type'], card['temperament']) == ('animal', 'Dog', 'Gentle')
+    assert card['gallery_urls'] == ['https://photos.example.com/rex0-a.jpg']
+    assert len(card['gallery_thumbnail_urls']) == 1 and card['main_photo_thumbnail_url']
+
+
+@pytest.fixture
+def shelter(db_session, make_resident):
+    """Two councils' adoptable animals, plus one already adopted."""
+    from models import Animal, Council
+    north, south = Council(name='North Pound'), Council(name='South Pound')
+    db_session.add_all([north, south])
+    db_session.flush()
+    rows = [
+        (north, 'Dog', 'Kelpie', 'Male', False), (north, 'Dog', 'Kelpie', 'Female', True),
+        (north, 'Dog', 'Beagle', 'Male', False), (north, 'Cat', 'Tabby', 'Female', False),
+        (south, 'Dog', 'Kelpie', 'Male', False), (south, 'Cat', 'Siamese', 'Male', True),
+    ]
+    for n, (council, kind, breed, sex, mixed) in enumerate(rows):
+        db_session.add(Animal(council_id=council.id, name=f'Pet {n}', type=kind, breed=breed, sex=sex, mixed=mixed))
+    db_session.add(Animal(council_id=north.id, name='Gone', type='Dog', breed='Kelpie', status='adopted'))
+    db_session.commit()
+    return north.id, south.id, bearer(make_resident().id)
+
+
+def _names(body):
+    return [a['name'] for a in body['items']]
+
+
+def test_filters_narrow_the_listing(app, client, shelter):
+    north, south, headers = shelter
+    get = lambda **q: client.get('/animals/', query_string=q, headers=headers).get_json()  # noqa: E731
+    assert _names(get(type='Dog', breed='Kelpie')) == ['Pet 0', 'Pet 1', 'Pet 4']
+    assert _names(get(type='Dog', council_id=north, sex='Male')) == ['Pet 0', 'Pet 2']
+    assert _names(get(mixed='true')) == ['Pet 1', 'Pet 5']
+    body = get(council_id=south)
+    assert _names(body) == ['Pet 4', 'Pet 5'] and body['total'] == 2
+    assert client.get('/animals/', query_string={"council_id": "north"}, headers=headers).status_code == 400
+
+
+def test_facets_ignore_their_own_filter(client, shelter):
+    north, south, headers = shelter
+    body = client.get('/animals/', query_string={"type": "Dog", "council_id": north}, headers=headers).get_json()
+    assert body['total'] == 3
+    facets = body['facets']
+    # type facet: every type in the north pound, not only dogs
+    assert {f['value']: f['count'] for f in facets['type']} == {'Dog': 3, 'Cat': 1}
+    assert {f['value']: f['count'] for f in facets['breed']} == {'Kelpie': 2, 'Beagle': 1}
+    assert {f['council_name']: f['count'] for f in facets['council']} == {'North Pound': 3, 'South Pound': 1}
+    assert 'facets' not in client.get('/animals/', query_string={"facets": 0}, headers=headers).get_json()
+    facet_only = client.get('/animals/facets', query_string={"type": "Cat"}, headers=headers).get_json()
+    assert facet_only['total'] == 2
+
+
+def test_cursor_continues_where_the_page_ended(client, shelter):
+    _, _, headers = shelter
+    seen, cursor = [], None
+    while True:
+        query = {"limit": 4, "facets": 0, **({"cursor": cursor} if cursor else {})}
+        body = client.get('/animals/', query_string=query, headers=headers).get_json()
+        seen += _names(body)
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [f'Pet {n}' for n in range(6)]
+    assert client.get('/animals/', query_string={"cursor": "!!"}, headers=headers).status_code == 400
@@ -0,0 +1,135 @@
+# server/tests/test_asgi.py
+"""The native ASGI dashboard: same rate limit and query budget as the Flask view."""
+import asyncio
+import json
+import os
+
+import pytest
+from sqlalchemy import text
+
+from rate_limit import MemoryBackend, limiter
+from tests.conftest import bearer
+
+
+@pytest.fixture
+def asgi(app):
+    import asgi
+    return asgi
+
+
+def _get(asgi, path, headers):
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'client': ('10.1.2.3', 4567),
+             'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()]}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.application(scope, receive, send))
+    response_headers = {k.decode(): v.decode() for k, v in sent[0]['headers']}
+    return sent[0]['status'], response_headers, json.loads(sent[1]['body'])
+
+
+def _dashboard_running(asgi, monkeypatch, queries):
+    """Stand in for the Postgres-only section loaders with `queries` sync statements."""
+    from models import db
+
+    def run():
+        for _ in range(queries):
+            db.session.execute(text('SELECT 1'))
+        return {"Rates": []}
+
+    async def load_dashboard(user_id):
+        return await asyncio.to_thread(asgi._in_app_context, run)
+    monkeypatch.setattr(asgi, 'load_dashboard', load_dashboard)
+
+
+def test_import_creates_no_engine(asgi, monkeypatch):
+    import async_db
+    assert async_db._engine is None
+    monkeypatch.delenv('ASYNC_SQLALCHEMY_DATABASE_URI', raising=False)
+    monkeypatch.delenv('SQLALCHEMY_DATABASE_URI', raising=False)
+    with pytest.raises(RuntimeError):
+        async_db.make_async_engine()
+
+
+def test_unauthenticated_request_is_refused(asgi):
+    status, _, body = _get(asgi, '/dashboard/', {})
+    assert status == 401
+
+
+def test_dashboard_is_rate_limited(app, asgi, monkeypatch):
+    monkeypatch.setattr(limiter, 'enabled', True)
+    monkeypatch.setattr(limiter, 'backend', MemoryBackend())
+    _dashboard_running(asgi, monkeypatch, queries=1)
+    headers = bearer(7, app)
+    burst = int(limiter.declared('dashboard').capacity)
+    statuses = [_get(asgi, '/dashboard/', headers)[0] for _ in range(burst + 1)]
+    assert statuses == [200] * burst + [429]
+    status, response_headers, body = _get(asgi, '/dashboard/', headers)
+    assert status == 429 and int(response_headers['retry-after']) >= 1
+    assert response_headers['x-ratelimit-remaining'] == '0'
+
+
+def test_dashboard_query_budget(app, asgi, monkeypatch):
+    assert asgi.QUERY_BUDGET == 'strict'
+    with app.app_context():
+        from query_budget import budget_for
+        budget = budget_for(asgi.DASHBOARD_ENDPOINT)
+
+    _dashboard_running(asgi, monkeypatch, queries=2)
+    status, response_headers, _ = _get(asgi, '/dashboard/', bearer(7, app))
+    assert (status, response_headers['x-db-queries']) == (200, '2')
+
+    _dashboard_running(asgi, monkeypatch, queries=budget + 1)
+    status, response_headers, body = _get(asgi, '/dashboard/', bearer(7, app))
+    assert status == 500 and body["error"] == "Query budget exceeded"
+    assert response_headers['x-db-queries'] == str(budget + 1)
+
+
+@pytest.fixture
+def async_engine(monkeypatch):
+    """The async sections on the test database; NullPool because every _get runs its own event loop."""
+    import async_db
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+    url = os.environ['SQLALCHEMY_DATABASE_URI']
+    url = url.replace('sqlite://', 'sqlite+aiosqlite://', 1) if url.startswith('sqlite') else async_db.async_database_url(url)
+    engine = create_async_engine(url, poolclass=NullPool)
+    monkeypatch.setattr(async_db, '_engine', engine)
+    monkeypatch.setattr(async_db, '_sessionmaker', async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+def test_dashboard_matches_the_flask_view_outside_the_hot_window(app, client, asgi, async_engine,
+                                                                   db_session, make_resident):
+    import datetime as dt
+    from models import Council, Process, Property, WaterConsumption
+    from partitioning import hot_since
+    resident = make_resident()
+    council = Council(name='Async Council')
+    db_session.add(council)
+    db_session.flush()
+    prop = Property(resident_id=resident.id, council_id=council.id, address='4 Loop St')
+    db_session.add(prop)
+    db_session.flush()
+    cold_water = hot_since(WaterConsumption) - dt.timedelta(days=1)
+    cold_process = dt.datetime.combine(hot_since(Process) - dt.timedelta(days=1), dt.time())
+    db_session.add_all([
+        WaterConsumption(property_id=prop.id, quarter_start_date=cold_water, consumed_litres=1, allocated_litres=1),
+        WaterConsumption(property_id=prop.id, quarter_start_date=dt.date.today(), consumed_litres=2,
+                         allocated_litres=1),
+        Process(resident_id=resident.id, category='Roads', title='Old pothole', submitted_at=cold_process),
+        Process(resident_id=resident.id, category='Roads', title='New pothole'),
+    ])
+    db_session.commit()
+
+    status, _, body = _get(asgi, '/dashboard/', bearer(resident.id, app))
+    assert status == 200
+    assert [wc['consumed_litres'] for wc in body['Water'][0]['water_consumptions']] == [2]
+    assert [p['title'] for p in body['Roads']] == ['New pothole']
+    assert body == client.get('/dashboard/', headers=bearer(resident.id, app)).get_json()
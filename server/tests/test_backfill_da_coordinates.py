@@ -0,0 +1,34 @@
+# server/tests/test_backfill_da_coordinates.py
+from scripts.backfill_da_coordinates import backfill_da_coordinates
+
+
+def test_backfill_reads_every_key_spelling(db_session, make_resident):
+    from models import Council, DevelopmentApplication, Property
+    resident = make_resident()
+    council = Council(name='Backfill Council')
+    db_session.add(council)
+    db_session.flush()
+    prop = Property(resident_id=resident.id, council_id=council.id, address='9 Legacy St')
+    db_session.add(prop)
+    db_session.commit()
+
+    spellings = [
+        {"lat": -33.1, "lon": 151.1},
+        {"lat": -33.2, "lng": 151.2},
+        {"latitude": -33.3, "longitude": 151.3},
+        {"latitude": "-33.4", "lng": "151.4"},
+        {"address": "no coordinates"},
+    ]
+    # Written straight to the table, like rows from before the columns and their hook existed
+    table = DevelopmentApplication.__table__
+    db_session.execute(table.insert(), [
+        {"resident_id": resident.id, "property_id": prop.id, "council_id": council.id,
+         "application_type": "DA", "status": "Submitted", "gps_coordinates": coords}
+        for coords in spellings])
+    db_session.commit()
+
+    assert backfill_da_coordinates() == 4
+    rows = db_session.execute(table.select().order_by(table.c.id)).all()
+    assert [(r.lat, r.lon) for r in rows] == [
+        (-33.1, 151.1), (-33.2, 151.2), (-33.3, 151.3), (-33.4, 151.4), (None, None)]
+    assert backfill_da_coordinates() == 0
@@ -0,0 +1,78 @@
+# server/tests/test_bulk_import.py
+import csv
+
+import pytest
+
+import bulk_import
+from bulk_import import Dataset, run_import
+
+
+@pytest.fixture
+def properties(db_session, make_resident):
+    from models import Council, Property
+    resident = make_resident()
+    council = Council(name='Import Council')
+    db_session.add(council)
+    db_session.flush()
+    props = [Property(resident_id=resident.id, council_id=council.id, address=f"{n} Import St") for n in range(1, 4)]
+    db_session.add_all(props)
+    db_session.commit()
+    return council.id, [p.id for p in props]
+
+
+def _valuations_csv(tmp_path, property_ids):
+    path = tmp_path / 'valuations.csv'
+    rows = []
+    for pid in property_ids:
+        rows += [[pid, 2026, 300000, 650000], [999999, 2026, 1, 1]]  # one good, one unknown property per chunk
+    with open(path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['property_id', 'year', 'land_value', 'capital_value'])
+        w.writerows(rows)
+    return str(path)
+
+
+def _report_rows(summary):
+    with open(summary["error_report"], newline='') as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_dataset_must_implement_transform_and_write():
+    class Half(Dataset):
+        name = 'half'
+
+        def transform(self, cols, pid, rj):
+            return {}
+
+    with pytest.raises(TypeError):
+        Half()
+
+
+def test_valuations_import(properties, tmp_path):
+    from models import Valuation
+    council_id, pids = properties
+    summary = run_import('valuations', council_id, _valuations_csv(tmp_path, pids), chunk_size=2)
+    assert (summary["status"], summary["rows_written"], summary["rows_rejected"]) == ('completed', 3, 3)
+    assert Valuation.query.filter_by(year=2026).count() == 3
+    assert [r[1] for r in _report_rows(summary)] == ['2', '4', '6']
+
+
+def test_resume_does_not_repeat_rejected_rows(properties, tmp_path, monkeypatch):
+    council_id, pids = properties
+    path = _valuations_csv(tmp_path, pids)
+    write_rejects = bulk_import._write_rejects
+
+    def dies_after_reporting_chunk_1(run, chunk_no, *args):
+        write_rejects(run, chunk_no, *args)
+        if chunk_no == 1:
+            raise RuntimeError('killed before the chunk committed')
+
+    monkeypatch.setattr(bulk_import, '_write_rejects', dies_after_reporting_chunk_1)
+    with pytest.raises(RuntimeError):
+        run_import('valuations', council_id, path, chunk_size=2)
+
+    monkeypatch.setattr(bulk_import, '_write_rejects', write_rejects)
+    summary = run_import('valuations', council_id, path, chunk_size=2)
+    assert summary["status"] == 'completed'
+    assert summary["rows_rejected"] == 3
+    assert [r[1] for r in _report_rows(summary)] == ['2', '4', '6']
@@ -0,0 +1,92 @@
+# server/tests/test_delta_sync.py
+import base64
+import datetime as dt
+import json
+
+import pytest
+
+from delta_sync import SYNC_OVERLAP, decode_token, encode_token
+from tests.conftest import bearer
+
+
+@pytest.fixture
+def resident(db_session, make_resident):
+    from models import Council
+    council = Council(name='Sync Council')
+    db_session.add(council)
+    db_session.commit()
+    return make_resident().id, council.id
+
+
+def _add_property(db_session, resident_id, council_id, address, updated_at=None):
+    from models import Property
+    prop = Property(resident_id=resident_id, council_id=council_id, address=address)
+    db_session.add(prop)
+    db_session.commit()
+    if updated_at:
+        db_session.execute(Property.__table__.update().where(Property.__table__.c.id == prop.id)
+                           .values(updated_at=updated_at))
+        db_session.commit()
+    return prop.id
+
+
+def _changes(client, app, resident_id, token=None):
+    resp = client.get('/dashboard/changes', query_string={"since": token} if token else {},
+                      headers=bearer(resident_id, app))
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    body = resp.get_json()
+    return body, sorted(p["id"] for p in body["changes"]["Rates"]["upserted"])
+
+
+def test_row_committed_late_is_still_sent(app, client, db_session, resident):
+    resident_id, council_id = resident
+    body, _ = _changes(client, app, resident_id)
+    assert body["full"] is True
+    since, _ = decode_token(body["token"])
+
+    # Written two minutes before the token was issued, by a transaction that only commits now
+    late = _add_property(db_session, resident_id, council_id, '2 Late St',
+                         updated_at=since - dt.timedelta(minutes=2))
+    body, ids = _changes(client, app, resident_id, body["token"])
+    assert body["full"] is False
+    assert ids == [late]
+
+
+def test_rows_inside_the_overlap_are_not_sent_twice(app, client, db_session, resident):
+    from models import Property
+    resident_id, council_id = resident
+    body, _ = _changes(client, app, resident_id)
+    pid = _add_property(db_session, resident_id, council_id, '3 Poll St')
+
+    body, ids = _changes(client, app, resident_id, body["token"])
+    assert ids == [pid]
+    body, ids = _changes(client, app, resident_id, body["token"])
+    assert ids == []  # still inside the overlap window, but already sent
+
+    db_session.get(Property, pid).address = '3a Poll St'
+    db_session.commit()
+    body, ids = _changes(client, app, resident_id, body["token"])
+    assert ids == [pid]
+    assert body["changes"]["Rates"]["upserted"][0]["address"] == '3a Poll St'
+
+
+def test_token_without_hashes_still_gives_a_delta(app, client, db_session, resident):
+    resident_id, council_id = resident
+    at = dt.datetime.utcnow() - SYNC_OVERLAP - dt.timedelta(minutes=1)
+    _add_property(db_session, resident_id, council_id, '4 Old St', updated_at=at - dt.timedelta(hours=1))
+    recent = _add_property(db_session, resident_id, council_id, '5 New St')
+    v1 = base64.urlsafe_b64encode(json.dumps({"v": 1, "t": at.isoformat()}).encode()).decode().rstrip('=')
+
+    body, ids = _changes(client, app, resident_id, v1)
+    assert body["full"] is False
+    assert ids == [recent]
+
+
+def test_token_round_trip_and_garbage():
+    at = dt.datetime(2026, 5, 1, 12, 0)
+    assert decode_token(encode_token(at, ['a1b2c3d4e5f6'])) == (None, frozenset())  # older than retention
+    now = dt.datetime.utcnow().replace(microsecond=0)
+    assert decode_token(encode_token(now, ['a1b2c3d4e5f6', '0f0f0f0f0f0f'])) == \
+        (now, frozenset({'a1b2c3d4e5f6', '0f0f0f0f0f0f'}))
+    assert decode_token('not-a-token') == (None, frozenset())
+    assert decode_token(None) == (None, frozenset())
@@ -0,0 +1,97 @@
+# server/tests/test_development_nearby.py
+import pytest
+
+from tests.conftest import bearer
+
+LAT, LON = -33.8688, 151.2093
+
+
+@pytest.fixture
+def nearby(db_session, make_resident):
+    """A resident's property, and DAs lodged by a neighbour at ~110 m, ~330 m and ~890 m from it."""
+    from models import Council, DevelopmentApplication, Property
+    resident, neighbour = make_resident(), make_resident()
+    council = Council(name='Nearby Council')
+    db_session.add(council)
+    db_session.flush()
+    home = Property(resident_id=resident.id, council_id=council.id, address='1 Home St',
+                    gps_coordinates={"lat": LAT, "lon": LON})
+    other = Property(resident_id=neighbour.id, council_id=council.id, address='2 Away St')
+    db_session.add_all([home, other])
+    db_session.flush()
+
+    def da(description, coords, status='Submitted'):
+        row = DevelopmentApplication(resident_id=neighbour.id, property_id=other.id, council_id=council.id,
+                                     application_type='DA', status=status, description=description,
+                                     gps_coordinates=coords)
+        db_session.add(row)
+        return row
+    das = {
+        "far": da('Far', {"lat": LAT + 0.008, "lon": LON}),
+        "mid": da('Mid', {"latitude": LAT, "lng": LON + 0.0036}, status='Approved'),
+        "near": da('Near', {"lat": LAT + 0.001, "lon": LON}),
+        "unplaced": da('Unplaced', None),
+    }
+    db_session.commit()
+    return resident.id, home.id, {k: v.id for k, v in das.items()}
+
+
+def _nearby(client, app, resident_id, **params):
+    return client.get('/development/nearby', query_string=params, headers=bearer(resident_id, app))
+
+
+def test_radius_cut_off_and_distance_order(app, client, nearby):
+    resident_id, home, das = nearby
+    body = _nearby(client, app, resident_id, property_id=home, radius_m=500).get_json()
+    assert [i['id'] for i in body['items']] == [das['near'], das['mid']]
+    assert body['items'][0]['distance_m'] == pytest.approx(111, abs=2)
+    assert body['items'][1]['distance_m'] == pytest.approx(333, abs=5)
+
+    body = _nearby(client, app, resident_id, property_id=home, radius_m=1000, limit=2).get_json()
+    assert [i['id'] for i in body['items']] == [das['near'], das['mid']]
+    assert (body['total'], body['next_offset']) == (3, 2)
+    page = _nearby(client, app, resident_id, property_id=home, radius_m=1000, limit=2, offset=2).get_json()
+    assert [i['id'] for i in page['items']] == [das['far']] and page['next_offset'] is None
+
+    body = _nearby(client, app, resident_id, property_id=home, radius_m=1000, status='Approved').get_json()
+    assert [i['id'] for i in body['items']] == [das['mid']]
+
+
+def test_rows_without_coordinates_are_left_out(app, client, db_session, nearby):
+    from models import DevelopmentApplication
+    resident_id, home, das = nearby
+    assert db_session.get(DevelopmentApplication, das['unplaced']).lat is None
+    body = _nearby(client, app, resident_id, property_id=home, radius_m=10_000).get_json()
+    assert das['unplaced'] not in [i['id'] for i in body['items']]
+    assert body['total'] == 3
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {"property_id": "x"},
+    {"radius_m": 0},
+    {"radius_m": 10_001},
+    {"radius_m": "nan"},
+    {"radius_m": "far"},
+])
+def test_bad_parameters_are_400(app, client, nearby, params):
+    resident_id, home, _ = nearby
+    query = {"property_id": home, **params} if params else {}
+    resp = _nearby(client, app, resident_id, **query)
+    assert resp.status_code == 400 and resp.get_json()['error']
+
+
+@pytest.mark.parametrize('coords', [None, {"lat": 91, "lon": LON}, {"lat": LAT, "lon": -181}, {"lat": "north"}])
+def test_missing_or_out_of_range_property_coordinates_are_400(app, client, db_session, nearby, coords):
+    from models import Property
+    resident_id, home, _ = nearby
+    db_session.get(Property, home).gps_coordinates = coords
+    db_session.commit()
+    resp = _nearby(client, app, resident_id, property_id=home)
+    assert resp.status_code == 400
+    assert resp.get_json()['error'] == 'Property has no valid GPS coordinates'
+
+
+def test_another_residents_property_is_404(app, client, make_resident, nearby):
+    _, home, _ = nearby
+    assert _nearby(client, app, make_resident().id, property_id=home).status_code == 404
@@ -0,0 +1,50 @@
+# server/tests/test_enotices.py
+import datetime as dt
+
+import enotices
+from enotices import deliver_enotices, delivery_summary
+from mailer import SMTPPool
+
+
+class SinkConnection:
+    def __init__(self, sent):
+        self.sent = sent
+
+    def send_message(self, msg):
+        self.sent.append(msg['To'])
+        return {}
+
+    def quit(self):
+        pass
+
+
+def test_bill_gone_before_its_inputs_are_gathered_is_recorded(db_session, make_resident, monkeypatch, tmp_path):
+    from models import BillingSetting, Council, NoticeDelivery, Property, RatesBill
+    resident = make_resident(email='notices@example.com')
+    council = Council(name='Notice Council')
+    db_session.add(council)
+    db_session.flush()
+    prop = Property(resident_id=resident.id, council_id=council.id, address='7 Paper St')
+    db_session.add(prop)
+    db_session.flush()
+    db_session.add(BillingSetting(property_id=prop.id, ebill_active=True))
+    kept, gone = (RatesBill(property_id=prop.id, bill_date=dt.date.today(), amount_cents=n, ebill_active=True)
+                  for n in (100, 200))
+    db_session.add_all([kept, gone])
+    db_session.commit()
+    kept_id, gone_id = kept.id, gone.id
+
+    gather = enotices.gather_notice_inputs
+    monkeypatch.setattr(enotices, 'gather_notice_inputs',
+                        lambda ids: {k: v for k, v in gather(ids).items() if k != gone_id})
+    sent = []
+    pool = SMTPPool(size=1)
+    monkeypatch.setattr(pool, '_open', lambda: SinkConnection(sent))
+
+    totals = deliver_enotices(pool=pool, store_dir=str(tmp_path))
+    assert (totals["bills"], totals["sent"], totals["skipped"]) == (2, 1, 1)
+    assert sent == ['notices@example.com']
+    skipped = NoticeDelivery.query.filter_by(bill_id=gone_id).one()
+    assert (skipped.status, skipped.attempts, skipped.notice_hash) == ('skipped', 0, None)
+    assert NoticeDelivery.query.filter_by(bill_id=kept_id).one().status == 'sent'
+    assert delivery_summary() == {'sent': 1, 'skipped': 1}
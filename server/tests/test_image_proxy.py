@@ -0,0 +1,66 @@
+# server/tests/test_image_proxy.py
+import base64
+import hashlib
+import hmac
+import io
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from PIL import Image
+
+import image_proxy
+from image_proxy import FileFetcher, set_fetcher, thumbnail_url
+
+SRC = 'https://photos.example.com/dog.png'
+
+
+@pytest.fixture
+def source(tmp_path):
+    Image.new('RGB', (640, 480), (200, 120, 40)).save(tmp_path / 'dog.png')
+    set_fetcher(FileFetcher(str(tmp_path)))
+    yield
+    set_fetcher(None)
+
+
+def _path(url):
+    parts = urlsplit(url)
+    return f'{parts.path}?{parts.query}'
+
+
+def test_thumbnail_urls_are_absolute_on_the_api_base(app, monkeypatch):
+    monkeypatch.setattr(image_proxy, '_base_url', 'https://api.example.com')
+    assert thumbnail_url(SRC, 320, 320).startswith('https://api.example.com/img?')
+
+    monkeypatch.setattr(image_proxy, '_base_url', '')
+    with app.test_request_context('/animals/', base_url='https://backend.example.org'):
+        assert thumbnail_url(SRC, 320, 320).startswith('https://backend.example.org/img?')
+
+
+def test_urls_are_signed_with_the_image_key_not_the_app_secret(client, source):
+    url = thumbnail_url(SRC, 320, 320)
+    resp = client.get(_path(url))
+    assert resp.status_code == 200
+    assert Image.open(io.BytesIO(resp.data)).size == (320, 320)
+
+    # A signature made with SECRET_KEY (e.g. by someone holding a JWT signing key) is refused
+    params = {k: v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+    params['s'] = base64.urlsafe_b64encode(hmac.new(
+        b'test-secret', "\n".join((SRC, '320', '320', 'cover', 'auto')).encode(), hashlib.sha256
+    ).digest()[:16]).decode().rstrip('=')
+    assert client.get('/img', query_string=params).status_code == 403
+
+
+def test_tampered_transform_is_refused(client, source):
+    url = thumbnail_url(SRC, 320, 320).replace('w=320', 'w=2000')
+    resp = client.get(_path(url))
+    assert resp.status_code == 403
+    assert resp.get_json()["error"] == "Invalid image request"
+
+
+def test_no_key_means_no_thumbnails(client, monkeypatch):
+    url = thumbnail_url(SRC, 320, 320)
+    monkeypatch.setattr(image_proxy, '_secret', None)
+    assert thumbnail_url(SRC, 320, 320) is None
+    resp = client.get(_path(url))
+    assert resp.status_code == 503
+    assert "message" in resp.get_json()
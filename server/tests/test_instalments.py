@@ -0,0 +1,112 @@
+# server/tests/test_instalments.py
+import datetime as dt
+import types
+
+import pytest
+
+from instalments import plan_rows, send_due_reminders
+from mailer import SMTPPool
+
+TODAY = dt.date(2026, 3, 1)
+
+
+class FakeConnection:
+    """Stands in for smtplib.SMTP: `broken` sends fail until it reconnects."""
+
+    def __init__(self, server):
+        self.server = server
+        self.broken = False
+
+    def ehlo(self):
+        pass
+
+    def close(self):
+        pass
+
+    def quit(self):
+        pass
+
+    def connect(self, host, port):
+        if not self.server.up:
+            raise ConnectionRefusedError("connection refused")
+        self.broken = False
+
+    def send_message(self, msg):
+        if self.broken:
+            raise ConnectionResetError("connection reset by peer")
+        if msg['To'] in self.server.drops:
+            self.server.drops.discard(msg['To'])
+            self.broken = True
+            raise ConnectionResetError("connection reset by peer")
+        self.server.sent.append(msg['To'])
+        return {}
+
+
+@pytest.fixture
+def server():
+    return types.SimpleNamespace(up=True, drops=set(), sent=[])
+
+
+@pytest.fixture
+def pool(server, monkeypatch):
+    pool = SMTPPool(size=1)
+    monkeypatch.setattr(pool, '_open', lambda: FakeConnection(server))
+    return pool
+
+
+@pytest.fixture
+def due(db_session, make_resident):
+    """Three residents with an instalment due tomorrow; returns their emails in due order."""
+    from models import Council, Instalment, Property, RatesAccount
+    council = Council(name='Instalment Council')
+    db_session.add(council)
+    db_session.flush()
+    emails = []
+    for n in range(3):
+        resident = make_resident(email=f'payer{n}@example.com')
+        prop = Property(resident_id=resident.id, council_id=council.id, address=f'{n} Due St')
+        db_session.add(prop)
+        db_session.flush()
+        account = RatesAccount(property_id=prop.id, account_number=f'ACC-{n}')
+        db_session.add(account)
+        db_session.flush()
+        db_session.add(Instalment(account_id=account.id, seq=1, due_date=TODAY + dt.timedelta(days=1),
+                                  amount_cents=12500))
+        emails.append(resident.email)
+    db_session.commit()
+    return emails
+
+
+def _reminded():
+    from models import Instalment
+    return Instalment.query.filter(Instalment.reminder_sent_at.isnot(None)).count()
+
+
+def test_broken_connection_is_reopened_for_the_next_message(due, pool, server):
+    server.drops.add(due[0])
+    result = send_due_reminders(today=TODAY, pool=pool)
+    assert (result["sent"], result["failed"]) == (2, 1)
+    assert server.sent == due[1:]
+    assert _reminded() == 2
+    assert pool._idle.qsize() == 1  # the reopened connection went back to the pool
+
+
+def test_unreachable_server_drops_the_connection_and_stops(due, pool, server):
+    server.drops.add(due[1])
+    server.up = False
+    result = send_due_reminders(today=TODAY, pool=pool)
+    assert (result["sent"], result["failed"]) == (1, 2)
+    assert server.sent == due[:1]
+    assert _reminded() == 1
+    assert pool._idle.qsize() == 0  # never handed out again
+
+
+def test_plan_rows_skip_repeated_and_malformed_seq():
+    account = types.SimpleNamespace(id=7, instalment_plan=[
+        {"seq": 1, "due_date": "2026-08-31", "amount": "100.00"},
+        {"seq": 1, "due_date": "2026-11-30", "amount": "100.00"},
+        {"seq": "two", "due_date": "2026-11-30", "amount": "100.00"},
+        {"due_date": "2027-02-28", "amount": 100},
+    ])
+    rows = plan_rows(account)
+    assert [(r["seq"], r["due_date"]) for r in rows] == [(1, dt.date(2026, 8, 31)), (4, dt.date(2027, 2, 28))]
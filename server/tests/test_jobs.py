@@ -0,0 +1,106 @@
+# server/tests/test_jobs.py
+import datetime as dt
+
+from jobs import (
+    LOCK_TIMEOUT, claim_next, enqueue, enqueue_periodic, handler_queues, heartbeat, job_handler,
+    registered_handlers, requeue_stale, run_job,
+)
+import job_handlers  # noqa: F401
+
+calls = []
+
+
+@job_handler('test_ok', queue='test', max_attempts=2)
+def _ok(payload):
+    calls.append(payload)
+    return {"echo": payload}
+
+
+@job_handler('test_fail', queue='test', max_attempts=2)
+def _fail(payload):
+    raise RuntimeError("boom")
+
+
+def _claim(worker='w1'):
+    return claim_next(worker, ('test',))
+
+
+def test_enqueue_is_idempotent_on_key(db_session):
+    first = enqueue('test_ok', {"n": 1}, idempotency_key='k1')
+    assert enqueue('test_ok', {"n": 2}, idempotency_key='k1').id == first.id
+
+
+def test_claim_and_run(db_session):
+    job = enqueue('test_ok', {"n": 1})
+    claimed = _claim()
+    assert claimed.id == job.id and claimed.status == 'running' and claimed.attempts == 1
+    assert run_job(claimed)
+    db_session.refresh(claimed)
+    assert claimed.status == 'succeeded' and claimed.result == {"echo": {"n": 1}}
+    assert _claim() is None
+
+
+def test_failures_retry_then_die(db_session):
+    job = enqueue('test_fail')
+    assert not run_job(_claim())
+    db_session.refresh(job)
+    assert job.status == 'queued' and job.run_at > dt.datetime.utcnow()
+    job.run_at = dt.datetime.utcnow()
+    db_session.commit()
+    assert not run_job(_claim())
+    db_session.refresh(job)
+    assert job.status == 'dead' and 'boom' in job.last_error
+
+
+def _age_lock(job, db_session, by=LOCK_TIMEOUT * 2):
+    job.locked_at = dt.datetime.utcnow() - by
+    db_session.commit()
+
+
+def test_heartbeat_keeps_long_jobs_claimed(db_session):
+    enqueue('test_ok')
+    job = _claim('w1')
+    _age_lock(job, db_session)
+    assert heartbeat(['w1']) == 1
+    assert requeue_stale() == 0
+    db_session.refresh(job)
+    assert job.status == 'running'
+
+
+def test_stale_jobs_count_attempts_and_die(db_session):
+    job = enqueue('test_ok')  # max_attempts=2
+    _age_lock(_claim(), db_session)
+    assert requeue_stale() == 1
+    db_session.refresh(job)
+    assert job.status == 'queued' and job.attempts == 1
+    job.run_at = dt.datetime.utcnow()
+    db_session.commit()
+    _age_lock(_claim(), db_session)
+    assert requeue_stale() == 1
+    db_session.refresh(job)
+    assert job.status == 'dead' and job.attempts == 2
+
+
+def test_a_requeued_job_is_not_recorded_by_its_old_worker(db_session):
+    calls.clear()
+    job = enqueue('test_ok', {"n": 7})
+    claimed = _claim('w1')
+    _age_lock(claimed, db_session)
+    requeue_stale()
+    assert not run_job(claimed)  # the handler ran, but w1 no longer holds the job
+    db_session.refresh(job)
+    assert job.status == 'queued' and job.result is None
+
+
+def test_periodic_jobs_enqueue_once_per_period(db_session):
+    periodic = {k for k, h in registered_handlers().items() if h.every}
+    assert {'purge_sync_tombstones', 'purge_process_events', 'maintain_partitions',
+            'ledger_snapshots', 'purge_expired_tokens'} <= periodic
+    now = dt.datetime(2026, 3, 1, 12, 0)
+    assert {j.kind for j in enqueue_periodic(now)} == periodic
+    assert enqueue_periodic(now + dt.timedelta(minutes=1)) == []
+    assert 'purge_sync_tombstones' in {j.kind for j in enqueue_periodic(now + dt.timedelta(days=1))}
+
+
+def test_workers_serve_every_handler_queue():
+    assert {'default', 'maintenance'} <= set(handler_queues())
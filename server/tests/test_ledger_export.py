@@ -0,0 +1,44 @@
+# server/tests/test_ledger_export.py
+import csv
+import io
+
+import pytest
+
+from tests.conftest import bearer
+
+
+@pytest.fixture
+def council_accounts(db_session, make_resident):
+    from models import Council, Property, RatesAccount
+    resident = make_resident()
+    council, other = Council(name='Export Council'), Council(name='Other Council')
+    db_session.add_all([council, other])
+    db_session.flush()
+    for c, address in ((council, '1 Export St'), (council, '2 Export St'), (other, '9 Elsewhere Rd')):
+        prop = Property(resident_id=resident.id, council_id=c.id, address=address)
+        db_session.add(prop)
+        db_session.flush()
+        db_session.add(RatesAccount(property_id=prop.id, account_number=f"RA-{prop.id}", balance_cents=100))
+    db_session.commit()
+    return council
+
+
+def test_export_needs_an_admin(client, make_resident, council_accounts):
+    path = f'/admin/councils/{council_accounts.id}/ledger/accounts.csv'
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=bearer(make_resident().id)).status_code == 403
+
+
+def test_admin_exports_one_councils_accounts(client, make_resident, council_accounts):
+    admin = make_resident(admin=True)
+    resp = client.get(f'/admin/councils/{council_accounts.id}/ledger/accounts.csv?columns=account_number,address',
+                      headers=bearer(admin.id))
+    assert resp.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    assert sorted(r['address'] for r in rows) == ['1 Export St', '2 Export St']
+
+
+def test_unknown_table_is_a_bad_request(client, make_resident, council_accounts):
+    admin = make_resident(admin=True)
+    resp = client.get(f'/admin/councils/{council_accounts.id}/ledger/nope.csv', headers=bearer(admin.id))
+    assert resp.status_code == 400
@@ -0,0 +1,58 @@
+# server/tests/test_notices.py
+import datetime as dt
+import os
+
+import pytest
+
+import notices
+from notices import ensure_notice, gather_notice_inputs, notice_hash
+from tests.conftest import bearer
+
+
+@pytest.fixture
+def bills(db_session, make_resident, monkeypatch, tmp_path):
+    """One bill each for two residents, with notices stored under tmp_path."""
+    from models import Council, Property, RatesAccount, RatesBill
+    monkeypatch.setattr(notices, 'NOTICE_STORE_DIR', str(tmp_path))
+    council = Council(name='Notice Council')
+    db_session.add(council)
+    db_session.flush()
+    ids = []
+    for n in range(2):
+        prop = Property(resident_id=make_resident().id, council_id=council.id, address=f'{n} Notice St')
+        db_session.add(prop)
+        db_session.flush()
+        db_session.add(RatesAccount(property_id=prop.id, account_number=f'ACC-{n}'))
+        bill = RatesBill(property_id=prop.id, bill_date=dt.date(2026, 7, 1), amount_cents=12345)
+        db_session.add(bill)
+        db_session.flush()
+        ids.append((prop.resident_id, bill.id))
+    db_session.commit()
+    return ids
+
+
+def test_digest_is_stable_and_the_file_is_reused(bills, monkeypatch):
+    _, bill_id = bills[0]
+    inputs = gather_notice_inputs([bill_id])[bill_id]
+    assert notice_hash(inputs) == notice_hash(dict(reversed(list(inputs.items()))))
+
+    digest, path = ensure_notice(inputs)
+    assert open(path, 'rb').read().startswith(b'%PDF-1.4')
+    monkeypatch.setattr(notices, 'render_notice_pdf', lambda inputs: pytest.fail('re-rendered a stored notice'))
+    assert ensure_notice(gather_notice_inputs([bill_id])[bill_id]) == (digest, path)
+
+    # A changed bill gets a new file, so the old ETag no longer matches
+    changed = notice_hash(dict(inputs, amount_cents=1))
+    assert changed != digest and not os.path.exists(notices.notice_path(changed))
+
+
+def test_notice_route_is_private_and_owner_only(app, client, bills):
+    (owner, bill_id), (other, _) = bills
+    resp = client.get(f'/rates/bills/{bill_id}/notice.pdf', headers=bearer(owner, app))
+    assert resp.status_code == 200 and resp.mimetype == 'application/pdf'
+    assert resp.cache_control.private and not resp.cache_control.public
+    assert client.get(f'/rates/bills/{bill_id}/notice.pdf',
+                      headers={**bearer(owner, app), 'If-None-Match': f'"{resp.get_etag()[0]}"'}).status_code == 304
+
+    resp = client.get(f'/rates/bills/{bill_id}/notice.pdf', headers=bearer(other, app))
+    assert resp.status_code == 404
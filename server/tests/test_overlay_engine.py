@@ -0,0 +1,60 @@
+# server/tests/test_overlay_engine.py
+import datetime as dt
+
+import overlay_engine
+from overlay_engine import recompute_overlays, write_overlays
+
+
+def _property(db_session, make_resident):
+    from models import Council, Property
+    council = Council(name='Overlay Council')
+    db_session.add(council)
+    db_session.flush()
+    prop = Property(resident_id=make_resident().id, council_id=council.id, address='1 Flood St')
+    db_session.add(prop)
+    db_session.commit()
+    return prop.resident_id, prop.id, council.id
+
+
+def test_changed_overlays_reach_delta_sync(db_session, make_resident):
+    from delta_sync import changes_since
+    from models import Property, PropertyOverlay
+    resident_id, pid, _ = _property(db_session, make_resident)
+    long_ago = dt.datetime(2020, 1, 1)
+    table = Property.__table__
+    db_session.execute(table.update().where(table.c.id == pid).values(updated_at=long_ago))
+    db_session.commit()
+    since = dt.datetime.utcnow() - dt.timedelta(minutes=1)
+    assert pid not in changes_since(resident_id, since).rates_properties
+
+    assert write_overlays([(pid, {('flood', 'council'): '1% AEP'})])[2] == {pid}
+    db_session.commit()
+    assert pid in changes_since(resident_id, since).rates_properties
+    assert db_session.query(PropertyOverlay).filter_by(property_id=pid, derived=True).count() == 1
+
+    # Nothing changed: the parcel is not sent again
+    db_session.execute(table.update().where(table.c.id == pid).values(updated_at=long_ago))
+    db_session.commit()
+    assert write_overlays([(pid, {('flood', 'council'): '1% AEP'})])[2] == set()
+    db_session.commit()
+    assert pid not in changes_since(resident_id, since).rates_properties
+
+
+def test_change_committed_out_of_id_order_survives_the_run(db_session, make_resident, monkeypatch):
+    from models import OverlayChange
+    _, _, council_id = _property(db_session, make_resident)
+    area = dict(council_id=council_id, min_lon=150.0, min_lat=-34.0, max_lon=150.1, max_lat=-33.9)
+    db_session.add(OverlayChange(id=10, **area))
+    db_session.commit()
+
+    load = overlay_engine.FeatureIndex.load
+
+    def load_while_a_lower_id_commits(council_ids, *args, **kwargs):
+        # Another transaction took id 3 before ours took 10, but commits only now
+        db_session.add(OverlayChange(id=3, **area))
+        db_session.commit()
+        return load(council_ids, *args, **kwargs)
+
+    monkeypatch.setattr(overlay_engine.FeatureIndex, 'load', load_while_a_lower_id_commits)
+    recompute_overlays(council_id, processes=1)
+    assert [c.id for c in db_session.query(OverlayChange).all()] == [3]
@@ -0,0 +1,47 @@
+# server/tests/test_partitioning.py
+import datetime as dt
+
+from models import Process, RatesBill, WaterConsumption
+from partitioning import hot_since
+from tests.conftest import bearer
+
+TODAY = dt.date.today()
+
+
+def test_hot_window_starts_with_the_oldest_hot_financial_year():
+    assert hot_since(RatesBill, dt.date(2026, 10, 19)) == dt.date(2024, 7, 1)
+    assert hot_since(RatesBill, dt.date(2027, 6, 30)) == dt.date(2024, 7, 1)
+    assert hot_since(RatesBill, dt.date(2027, 7, 1)) == dt.date(2025, 7, 1)
+    assert hot_since(Process, dt.date(2026, 10, 19)) == dt.date(2022, 7, 1)
+
+
+def test_dashboard_and_rates_read_hot_partitions_only(app, client, db_session, make_resident):
+    from models import Council, Property
+    from routes.rates import RatesBatch
+    resident = make_resident()
+    council = Council(name='Partition Council')
+    db_session.add(council)
+    db_session.flush()
+    prop = Property(resident_id=resident.id, council_id=council.id, address='6 Archive St')
+    db_session.add(prop)
+    db_session.flush()
+    old = dt.date(hot_since(RatesBill).year - 1, 1, 1)
+    db_session.add_all([
+        WaterConsumption(property_id=prop.id, quarter_start_date=old, consumed_litres=1, allocated_litres=1),
+        WaterConsumption(property_id=prop.id, quarter_start_date=TODAY, consumed_litres=2, allocated_litres=1),
+        Process(resident_id=resident.id, category='Roads', title='Old pothole',
+                submitted_at=dt.datetime.combine(hot_since(Process) - dt.timedelta(days=1), dt.time())),
+        Process(resident_id=resident.id, category='Roads', title='New pothole'),
+        RatesBill(property_id=prop.id, bill_date=old, amount_cents=100),
+        RatesBill(property_id=prop.id, bill_date=TODAY, amount_cents=200),
+    ])
+    db_session.commit()
+
+    data = client.get('/dashboard/', headers=bearer(resident.id, app)).get_json()
+    assert [wc['consumed_litres'] for wc in data['Water'][0]['water_consumptions']] == [2]
+    assert [p['title'] for p in data['Roads']] == ['New pothole']
+
+    body = client.get('/dashboard/changes', headers=bearer(resident.id, app)).get_json()
+    assert [p['title'] for p in body['changes']['Roads']['upserted']] == ['New pothole']
+
+    assert [b.amount_cents for b in RatesBatch([prop]).bills[prop.id]] == [200]
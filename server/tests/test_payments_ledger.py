@@ -0,0 +1,76 @@
+# server/tests/test_payments_ledger.py
+import datetime as dt
+
+import pytest
+
+
+@pytest.fixture
+def account(db_session, make_resident):
+    from models import Council, Property, RatesAccount
+    resident = make_resident()
+    council = Council(name='Ledger Council')
+    db_session.add(council)
+    db_session.flush()
+    prop = Property(resident_id=resident.id, council_id=council.id, address='1 Ledger St')
+    db_session.add(prop)
+    db_session.flush()
+    acc = RatesAccount(property_id=prop.id, account_number='RA-L1', balance_cents=0)
+    db_session.add(acc)
+    db_session.commit()
+    return acc
+
+
+def test_posts_move_the_balance_in_sequence(db_session, account):
+    from payments_ledger import post_entry, balance_as_of
+    charge, _ = post_entry(account.id, 'charge', 50000)
+    payment, _ = post_entry(account.id, 'payment', 20000)
+    assert (charge.seq, payment.seq) == (1, 2)
+    assert payment.amount_cents == -20000
+    assert account.balance_cents == 30000
+    assert balance_as_of(account.id, dt.date.today()) == 30000
+
+
+def test_reference_is_idempotent(db_session, account):
+    from payments_ledger import post_entry
+    first, created = post_entry(account.id, 'payment', 1000, reference='BPAY-1')
+    again, created_again = post_entry(account.id, 'payment', 1000, reference='BPAY-1')
+    assert created and not created_again
+    assert again.id == first.id
+    assert account.balance_cents == -1000
+
+
+def test_fractional_cents_round_instead_of_truncating(db_session, account):
+    from payments_ledger import post_entry, LedgerError
+    entry, _ = post_entry(account.id, 'charge', '1999.5')
+    assert entry.amount_cents == 2000
+    with pytest.raises(LedgerError):
+        post_entry(account.id, 'charge', 'ten dollars')
+
+
+def test_reversal_negates_once(db_session, account):
+    from payments_ledger import post_entry, reverse_entry, LedgerError
+    charge, _ = post_entry(account.id, 'charge', 7000)
+    reversal = reverse_entry(charge.id)
+    assert reversal.amount_cents == -7000 and account.balance_cents == 0
+    with pytest.raises(LedgerError):
+        reverse_entry(charge.id)
+
+
+def test_entries_are_append_only(db_session, account):
+    from payments_ledger import post_entry, LedgerError
+    entry, _ = post_entry(account.id, 'charge', 100)
+    entry.amount_cents = 1
+    with pytest.raises(LedgerError):
+        db_session.flush()
+    db_session.rollback()
+
+
+def test_open_ledgers_opens_each_account_once(db_session, account):
+    from models import LedgerEntry
+    from payments_ledger import open_ledgers
+    account.balance_cents = 43210
+    db_session.commit()
+    assert open_ledgers() == 1
+    assert open_ledgers() == 0
+    [entry] = LedgerEntry.query.filter_by(account_id=account.id).all()
+    assert (entry.seq, entry.amount_cents, entry.reference) == (1, 43210, 'opening-balance')
@@ -0,0 +1,115 @@
+# server/tests/test_process_events.py
+import datetime as dt
+
+import pytest
+
+import process_events
+from process_events import EventCursor, broker, event_stream
+from tests.conftest import bearer
+
+
+@pytest.fixture
+def resident_process(db_session, make_resident):
+    from models import Process
+    resident = make_resident()
+    proc = Process(resident_id=resident.id, category='Permits', title='Fence permit', status='pending')
+    db_session.add(proc)
+    db_session.commit()
+    return resident.id, proc.id
+
+
+def _event(db_session, resident_id, process_id, status, created_at, id=None):
+    from models import ProcessEvent
+    row = ProcessEvent(id=id, resident_id=resident_id, process_id=process_id, created_at=created_at,
+                       data={"process_id": process_id, "resident_id": resident_id, "status": status})
+    db_session.add(row)
+    db_session.commit()
+    return row.id
+
+
+def test_status_change_is_recorded_and_published(db_session, resident_process):
+    from models import Process, ProcessEvent
+    resident_id, process_id = resident_process
+    sub = broker.subscribe(resident_id)
+    try:
+        db_session.get(Process, process_id).status = 'approved'
+        db_session.commit()
+        items, gap = sub.wait(0)
+    finally:
+        broker.unsubscribe(sub)
+    row = ProcessEvent.query.one()
+    assert not gap
+    assert [(p['id'], p['previous_status'], p['status']) for p in items] == [(row.id, 'pending', 'approved')]
+    assert items[0]['created_at'] == row.created_at.isoformat()
+
+
+def test_cursor_finds_an_event_that_committed_out_of_order(db_session, resident_process):
+    resident_id, process_id = resident_process
+    now = dt.datetime.utcnow()
+    cursor = EventCursor(now - dt.timedelta(seconds=1))
+    assert [p['id'] for p in cursor.replay(resident_id)] == []
+    assert _event(db_session, resident_id, process_id, 'approved', now, id=11) == 11
+    assert [p['id'] for p in cursor.replay(resident_id)] == [11]
+
+    # Id 10 was taken first, but its transaction commits only now
+    _event(db_session, resident_id, process_id, 'in_review', now - dt.timedelta(milliseconds=5), id=10)
+    assert [p['id'] for p in cursor.replay(resident_id)] == [10]
+    assert list(cursor.replay(resident_id)) == []
+
+
+def test_reconnect_replays_late_commits_before_last_event_id(db_session, resident_process):
+    resident_id, process_id = resident_process
+    now = dt.datetime.utcnow()
+    first = _event(db_session, resident_id, process_id, 'in_review', now - dt.timedelta(seconds=2))
+    seen = _event(db_session, resident_id, process_id, 'approved', now)
+    newer = _event(db_session, resident_id, process_id, 'closed', now + dt.timedelta(seconds=1))
+
+    frames = list(event_stream(resident_id, last_event_id=seen, heartbeat=0, max_seconds=0.05))
+    ids = [int(f.split('\n')[0][4:]) for f in frames if f.startswith('id: ')]
+    assert seen not in ids
+    assert set(ids) == {first, newer}  # first is inside the overlap window: repeated, never lost
+
+
+def test_stream_ends_after_its_lifetime(db_session, resident_process):
+    resident_id, _ = resident_process
+    frames = list(event_stream(resident_id, heartbeat=0.01, max_seconds=0.05))
+    assert frames[0].startswith('retry:')
+    assert broker.stream_count() == 0
+
+
+def test_stream_ticket_replaces_access_token_in_the_url(client, resident_process):
+    resident_id, _ = resident_process
+    token = bearer(resident_id)['Authorization'].split(' ', 1)[1]
+    assert client.get(f'/process/events?access_token={token}').status_code == 401
+
+    resp = client.post('/process/events/ticket', headers=bearer(resident_id))
+    assert resp.status_code == 200
+    ticket = resp.json['ticket']
+    assert resp.json['expires_in'] <= 60
+    # A ticket opens nothing but streams
+    assert client.get('/process/', headers={'Authorization': f'Bearer {ticket}'}).status_code == 401
+    assert client.get(f'/process/events?ticket={token}').status_code == 401
+
+
+def test_expired_ticket_is_refused(app, resident_process):
+    from auth_tokens import issue_stream_ticket, stream_ticket_identity, TokenError
+    resident_id, _ = resident_process
+    secret = app.config['JWT_SECRET_KEY']
+    ticket, _ = issue_stream_ticket(resident_id, secret)
+    assert stream_ticket_identity(ticket, secret) == resident_id
+    stale, _ = issue_stream_ticket(resident_id, secret, now=dt.datetime.utcnow() - dt.timedelta(minutes=5))
+    with pytest.raises(TokenError):
+        stream_ticket_identity(stale, secret)
+
+
+def test_streams_over_the_worker_cap_get_503(client, resident_process, monkeypatch):
+    import routes.process
+    resident_id, _ = resident_process
+    monkeypatch.setattr(routes.process, 'MAX_STREAMS', 0)
+    resp = client.get('/process/events', headers=bearer(resident_id))
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After']
+
+
+def test_overlap_is_configurable():
+    assert process_events.EVENT_OVERLAP >= dt.timedelta(seconds=60)
@@ -0,0 +1,45 @@
+# server/tests/test_query_budgets.py
+"""
+Every GET route with a query budget, called as residents with 1, 5 and 20 properties.
+Fails when a route goes over its budget or its query count grows with the number of
+properties (an N+1). scripts/check_query_budgets.py runs the same check by hand.
+"""
+import pytest
+
+from tests.conftest import bearer, reset_database
+
+PROPERTY_COUNTS = (1, 5, 20)
+
+
+def _routes():
+    from app import app
+    from scripts.check_query_budgets import budgeted_routes
+    with app.app_context():
+        return budgeted_routes(app)
+
+
+@pytest.fixture(scope='module')
+def seeded_residents(app):
+    from scripts.check_query_budgets import seed_resident
+    with app.app_context():
+        residents = {n: seed_resident(n, 'pytest') for n in PROPERTY_COUNTS}
+        yield residents
+        reset_database()
+
+
+def test_budgets_are_declared():
+    assert len(_routes()) >= 5
+
+
+@pytest.mark.parametrize('path,endpoint,budget', _routes(), ids=lambda v: v if isinstance(v, str) else None)
+def test_route_within_budget(app, client, seeded_residents, path, endpoint, budget):
+    from query_budget import QUERY_COUNT_HEADER
+
+    counts = {}
+    for n, resident_id in seeded_residents.items():
+        resp = client.get(path, headers=bearer(resident_id, app))
+        assert resp.status_code < 500, f"{path} with {n} properties: {resp.get_data(as_text=True)[:300]}"
+        counts[n] = int(resp.headers[QUERY_COUNT_HEADER])
+
+    assert max(counts.values()) <= budget, f"{endpoint} over its budget of {budget}: {counts}"
+    assert counts[max(counts)] <= counts[min(counts)], f"{endpoint} query count grows with properties: {counts}"
@@ -0,0 +1,53 @@
+# server/tests/test_rate_limit.py
+import pytest
+
+from rate_limit import Limit, MemoryBackend, limiter, parse_rate
+
+
+@pytest.fixture
+def limiting(monkeypatch):
+    """The app's limiter switched on, with empty per-process buckets."""
+    monkeypatch.setattr(limiter, 'enabled', True)
+    monkeypatch.setattr(limiter, 'backend', MemoryBackend())
+    return limiter
+
+
+def test_parse_rate():
+    assert parse_rate('30/minute') == (30, 60)
+    assert parse_rate('5/10s') == (5, 10)
+    with pytest.raises(ValueError):
+        parse_rate('5/fortnight')
+
+
+def test_bucket_allows_the_burst_then_refuses():
+    backend, limit = MemoryBackend(), Limit('t', '60/minute', burst=3)
+    assert [backend.consume('k', limit)[0] for _ in range(4)] == [True, True, True, False]
+    assert backend.consume('other', limit)[0]
+
+
+def test_login_is_limited_per_ip(client, db_session, limiting):
+    body = {"email": "nobody@example.com", "password": "wrong"}
+    statuses = [client.post('/auth/login', json=body).status_code for _ in range(6)]
+    assert statuses == [401] * 5 + [429]
+
+    resp = client.post('/auth/login', json=body)
+    assert int(resp.headers['Retry-After']) >= 1
+    assert resp.headers['X-RateLimit-Remaining'] == '0'
+    assert client.post('/auth/login', json=body, environ_base={'REMOTE_ADDR': '10.0.0.9'}).status_code == 401
+    assert limiting.snapshot()["limits"]["auth.login"]["limited"] >= 2
+
+
+def test_backend_errors_fail_open(client, db_session, limiting, monkeypatch):
+    def broken(key, limit):
+        raise RuntimeError('backend down')
+    monkeypatch.setattr(limiting.backend, 'consume', broken)
+    body = {"email": "nobody@example.com", "password": "wrong"}
+    assert all(client.post('/auth/login', json=body).status_code == 401 for _ in range(7))
+
+
+def test_purge_job_is_periodic_and_skips_the_memory_backend(db_session, limiting):
+    import job_handlers  # noqa: F401
+    from jobs import registered_handlers
+    handler = registered_handlers()['purge_rate_limit_buckets']
+    assert handler.every is not None
+    assert handler.fn({}) == {"purged": 0}
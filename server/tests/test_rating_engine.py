@@ -0,0 +1,63 @@
+# server/tests/test_rating_engine.py
+import pytest
+
+from rating_engine import parse_year, validate_parameters
+from tests.conftest import bearer
+
+VALID = {"rate_in_dollar": {"default": 0.002}, "concessions": {"pensioner": {"percent": 50, "cap_cents": 25000}}}
+
+
+@pytest.mark.parametrize('params', [
+    [],
+    {"rate_in_dollar": {"default": "0.002"}},
+    {"rate_in_dollar": {"default": True}},
+    {"base_cents": {"default": 100}},
+    {**VALID, "concessions": ["pensioner"]},
+    {**VALID, "concessions": {"pensioner": 50}},
+    {**VALID, "concessions": {"pensioner": {"percent": "half"}}},
+    {**VALID, "concessions": {"pensioner": {"percent": 120}}},
+    {**VALID, "concessions": {"pensioner": {"percent": 10, "applies_to": "waste"}}},
+    {**VALID, "waste": {"bin_size_l": {"large": 100}}},
+    {**VALID, "waste": {"default_cents": -1}},
+    {**VALID, "valuation_year": "last year"},
+    {**VALID, "concession_statuses": "approved"},
+])
+def test_bad_parameters_raise_value_error(params):
+    with pytest.raises(ValueError):
+        validate_parameters(params)
+
+
+def test_valid_parameters_pass():
+    assert validate_parameters(VALID) is VALID
+
+
+def test_parse_year():
+    assert parse_year("2025", "y") == parse_year(2025, "y") == 2025
+    for bad in ("twenty", None, 2025.5, True, [2025], 12):
+        with pytest.raises(ValueError):
+            parse_year(bad, "y")
+
+
+def test_rating_routes_answer_bad_input_with_400(client, make_resident):
+    admin = make_resident(admin=True)
+    headers = bearer(admin.id)
+    resp = client.put('/admin/rating/1/parameters/2026', headers=headers,
+                      json={**VALID, "concessions": {"pensioner": "half"}})
+    assert resp.status_code == 400
+    assert resp.json["details"] == "concessions.pensioner must be an object."
+
+    resp = client.post('/admin/rating/1/what-if', headers=headers,
+                       json={"financial_year": 2026, "params": VALID, "baseline_year": "last"})
+    assert resp.status_code == 400
+    assert client.post('/admin/rating/1/commit', headers=headers, json={"financial_year": "soon"}).status_code == 400
+
+
+def test_stored_parameters_round_trip(client, make_resident):
+    from models import Council, db
+    admin = make_resident(admin=True)
+    council = Council(name='Rating Council')
+    db.session.add(council)
+    db.session.commit()
+    path = f'/admin/rating/{council.id}/parameters/2026'
+    assert client.put(path, headers=bearer(admin.id), json=VALID).status_code == 200
+    assert client.get(path, headers=bearer(admin.id)).json["params"] == VALID
@@ -0,0 +1,90 @@
+# server/tests/test_search.py
+import pytest
+
+from search import rebuild_search_documents, search
+from tests.conftest import bearer
+
+
+@pytest.fixture
+def corpus(db_session, make_resident):
+    """A public policy, one process for `owner` and one DA for `neighbour`, all about pools."""
+    from models import Council, DevelopmentApplication, Policy, Process, Property
+    owner, neighbour = make_resident(), make_resident()
+    council = Council(name='Search Council')
+    db_session.add(council)
+    db_session.flush()
+    prop = Property(resident_id=neighbour.id, council_id=council.id, address='5 Deck St')
+    db_session.add(prop)
+    db_session.flush()
+    policy = Policy(category='Building', title='Swimming pool fencing policy')
+    process = Process(resident_id=owner.id, category='Building', title='Pool fence inspection',
+                      form_data={"notes": "gate latch sticks"})
+    da = DevelopmentApplication(resident_id=neighbour.id, property_id=prop.id, council_id=council.id,
+                                application_type='DA', description='Backyard pool and timber deck')
+    db_session.add_all([policy, process, da])
+    db_session.commit()
+    return {"owner": owner.id, "neighbour": neighbour.id, "policy": policy.id, "process": process.id, "da": da.id}
+
+
+def _hits(result):
+    return sorted((i['type'], i['id']) for i in result['items'])
+
+
+def test_terms_are_prefixes_and_all_must_match(corpus):
+    result = search('pool fen', corpus['owner'])
+    assert result['terms'] == ['pool', 'fen']
+    assert _hits(result) == [('policy', corpus['policy']), ('process', corpus['process'])]
+    assert _hits(search('fen latch', corpus['owner'])) == [('process', corpus['process'])]
+    assert search('pool zebra', corpus['owner'])['total'] == 0
+    assert search('the and', corpus['owner'])['terms'] == []
+
+
+def test_other_residents_rows_are_invisible(corpus):
+    owner = search('pool', corpus['owner'])
+    assert ('development', corpus['da']) not in _hits(owner)
+    assert owner['facets'] == {'policy': 1, 'process': 1, 'development': 0}
+
+    neighbour = search('pool', corpus['neighbour'])
+    assert _hits(neighbour) == [('development', corpus['da']), ('policy', corpus['policy'])]
+    assert neighbour['facets'] == {'policy': 1, 'process': 0, 'development': 1}
+    assert search('latch', corpus['neighbour'])['total'] == 0
+
+
+def test_type_filter_narrows_items_not_facets(app, client, corpus):
+    resp = client.get('/search/', query_string={"q": "pool", "type": "policy"},
+                      headers=bearer(corpus['owner'], app))
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert [(i['type'], i['id']) for i in body['items']] == [('policy', corpus['policy'])]
+    assert body['total'] == 1 and body['next_offset'] is None
+    assert body['facets'] == {'policy': 1, 'process': 1, 'development': 0}
+
+    resp = client.get('/search/', query_string={"q": "pool", "type": "invoice"}, headers=bearer(corpus['owner'], app))
+    assert resp.status_code == 400
+
+
+def test_updates_and_deletes_are_reindexed(db_session, corpus):
+    from models import Process
+    process = db_session.get(Process, corpus['process'])
+    process.title = 'Spa barrier inspection'
+    db_session.commit()
+    assert _hits(search('fence', corpus['owner'])) == []
+    assert _hits(search('spa barr', corpus['owner'])) == [('process', corpus['process'])]
+
+    db_session.delete(process)
+    db_session.commit()
+    assert search('spa', corpus['owner'])['total'] == 0
+
+
+def test_rebuild_drops_orphans_and_indexes_raw_writes(db_session, corpus):
+    from models import Policy, Process, SearchDocument
+    # Raw SQL skips the session listeners
+    db_session.execute(Process.__table__.delete().where(Process.id == corpus['process']))
+    db_session.execute(Policy.__table__.insert().values(category='Waste', title='Green waste bin policy'))
+    db_session.commit()
+    assert SearchDocument.query.filter_by(doc_type='process', doc_id=corpus['process']).count() == 1
+
+    assert rebuild_search_documents() == 3
+    assert SearchDocument.query.filter_by(doc_type='process').count() == 0
+    assert search('latch', corpus['owner'])['total'] == 0
+    assert [i['title'] for i in search('green', corpus['owner'])['items']] == ['Green waste bin policy']
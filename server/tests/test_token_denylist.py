@@ -0,0 +1,67 @@
+# server/tests/test_token_denylist.py
+import datetime as dt
+
+from token_denylist import deny_list
+
+
+def _login(client, resident):
+    resp = client.post('/auth/login', json={"email": resident.email, "password": "pw"})
+    assert resp.status_code == 200, resp.json
+    return resp.json
+
+
+def test_login_does_not_print_the_token(client, make_resident, capsys):
+    tokens = _login(client, make_resident())
+    assert tokens['token'] not in capsys.readouterr().out
+
+
+def test_logout_revokes_the_access_token(client, make_resident):
+    tokens = _login(client, make_resident())
+    headers = {'Authorization': f"Bearer {tokens['token']}"}
+    assert client.get('/user/profile', headers=headers).status_code == 200
+    assert client.post('/auth/logout', headers=headers, json={}).status_code == 200
+    resp = client.get('/user/profile', headers=headers)
+    assert resp.status_code == 401 and resp.json == {"message": "Token has been revoked"}
+
+
+def test_logout_with_refresh_token_ends_the_session(client, make_resident):
+    # client/src/utils/auth.js: refresh on a 401, then sign out with the stored pair
+    tokens = _login(client, make_resident())
+    rotated = client.post('/auth/refresh', json={"refresh_token": tokens['refresh_token']}).json
+    headers = {'Authorization': f"Bearer {rotated['token']}"}
+    resp = client.post('/auth/logout', headers=headers, json={"refresh_token": rotated['refresh_token']})
+    assert resp.status_code == 200 and resp.json['sessions_revoked'] == 1
+    assert client.post('/auth/refresh', json={"refresh_token": rotated['refresh_token']}).status_code == 401
+
+
+def test_reused_refresh_token_signs_the_session_out(client, make_resident):
+    tokens = _login(client, make_resident())
+    rotated = client.post('/auth/refresh', json={"refresh_token": tokens['refresh_token']})
+    assert rotated.status_code == 200
+    assert client.post('/auth/refresh', json={"refresh_token": tokens['refresh_token']}).status_code == 401
+    headers = {'Authorization': f"Bearer {rotated.json['token']}"}
+    assert client.get('/user/profile', headers=headers).status_code == 401
+
+
+def test_sync_sees_revocations_that_commit_out_of_id_order(db_session):
+    """Another process's revocation with a lower id, committed after a higher one, is still picked up."""
+    from models import RevokedToken
+    exp = dt.datetime.utcnow() + dt.timedelta(minutes=10)
+    db_session.add(RevokedToken(id=50, jti='later-id', expires_at=exp))
+    db_session.commit()
+    deny_list.sync()
+    assert deny_list.is_revoked('later-id')
+
+    db_session.add(RevokedToken(id=10, jti='earlier-id', expires_at=exp))
+    db_session.commit()
+    deny_list.sync()
+    assert deny_list.is_revoked('earlier-id')
+
+
+def test_sync_drops_expired_entries(db_session):
+    from models import RevokedToken
+    db_session.add(RevokedToken(jti='expired', expires_at=dt.datetime.utcnow() - dt.timedelta(minutes=1)))
+    db_session.commit()
+    deny_list.sync()
+    assert not deny_list.is_revoked('expired')
+    assert not deny_list.is_revoked('never-revoked')
@@ -0,0 +1,86 @@
+# server/tests/test_valuation_analytics.py
+import csv
+import statistics
+
+import numpy as np
+import pytest
+
+import valuation_analytics
+from bulk_import import run_import
+from tests.conftest import bearer
+from valuation_analytics import council_analytics, council_fingerprint, get_snapshot
+
+# (zone, capital 2025, capital 2026, land 2026) in dollars; the last property jumps 50%
+ROWS = [('R1', 500_000, 525_000, 300_000), ('R1', 600_000, 624_000, 310_000), ('R2', 700_000, 742_000, None),
+        ('R2', 800_000, 840_000, 420_000), (None, 900_000, 945_000, 450_000), ('R1', 1_000_000, 1_500_000, 700_000)]
+
+
+@pytest.fixture
+def council(db_session, make_resident):
+    from models import Council, Property, Valuation
+    resident = make_resident()
+    council = Council(name='Valuation Council')
+    db_session.add(council)
+    db_session.flush()
+    pids = []
+    for n, (zone, before, after, land) in enumerate(ROWS):
+        prop = Property(resident_id=resident.id, council_id=council.id, address=f'{n} Value St', zone=zone)
+        db_session.add(prop)
+        db_session.flush()
+        db_session.add_all([
+            Valuation(property_id=prop.id, year=2025, capital_value_cents=before * 100),
+            Valuation(property_id=prop.id, year=2026, capital_value_cents=after * 100,
+                      land_value_cents=land * 100 if land else None),
+        ])
+        pids.append(prop.id)
+    db_session.commit()
+    valuation_analytics._cache.clear()
+    return council.id, pids
+
+
+def test_snapshot_matches_a_plain_recomputation(council):
+    council_id, pids = council
+    result = council_analytics(council_id)
+    assert (result["years"], result["year"], result["previous_year"], result["rows"]) == ([2025, 2026], 2026, 2025, 12)
+
+    capital = [after for _, _, after, _ in ROWS]
+    cuts = statistics.quantiles(capital, n=20, method='inclusive')
+    assert result["capital_value"]["count"] == 6
+    assert result["capital_value"]["mean"] == pytest.approx(statistics.mean(capital))
+    assert result["capital_value"]["percentiles"] == pytest.approx(
+        {"p5": cuts[0], "p25": cuts[4], "p50": cuts[9], "p75": cuts[14], "p95": cuts[18]})
+    assert result["land_value"]["count"] == 5  # NULL land is left out
+    assert sum(result["capital_value"]["histogram"]["counts"]) == 6
+
+    changes = [(after - before) / before for _, before, after, _ in ROWS]
+    assert result["capital_change"]["median"] == round(statistics.median(changes), 4)
+    by_zone = {g["zone"]: g["median"] for g in result["capital_change"]["median_by_zone"]}
+    expected = {z: round(statistics.median(c for (zone, *_), c in zip(ROWS, changes) if zone == z), 4)
+                for z in ('R1', 'R2', None)}
+    assert by_zone == expected
+    assert [(o["property_id"], o["change"]) for o in result["outliers"]] == [(pids[-1], 0.5)]
+
+    # A fresh process reads the same arrays back from the .npz snapshot
+    valuation_analytics._cache.clear()
+    from_disk = get_snapshot(council_id)
+    from_db = valuation_analytics._load_from_db(council_id, from_disk.fingerprint)
+    for column in ('property_id', 'year', 'land', 'capital', 'zone_code', 'zones'):
+        np.testing.assert_array_equal(getattr(from_disk, column), getattr(from_db, column))
+    assert council_analytics(council_id) == result
+
+
+def test_bulk_import_upsert_changes_the_fingerprint(app, client, council, make_resident, tmp_path):
+    council_id, pids = council
+    before = council_fingerprint(council_id)
+    assert get_snapshot(council_id).fingerprint == before
+
+    path = tmp_path / 'valuations.csv'
+    with open(path, 'w', newline='') as f:
+        csv.writer(f).writerows([['property_id', 'year', 'land_value', 'capital_value'],
+                                 [pids[0], 2026, 300000, 2_000_000]])
+    assert run_import('valuations', council_id, str(path))["rows_written"] == 1
+
+    assert council_fingerprint(council_id) != before
+    resp = client.get(f'/admin/valuations/{council_id}/analytics', headers=bearer(make_resident(admin=True).id, app))
+    assert resp.status_code == 200
+    assert resp.get_json()["capital_value"]["histogram"]["edges"][-1] == 2_000_000
@@ -0,0 +1,84 @@
+# server/tests/test_vector_tiles.py
+import pytest
+
+from vector_tiles import TileCache, render_tile, tile_range
+from tests.conftest import bearer
+
+LON, LAT = 151.2093, -33.8688
+BBOX = (LON - 0.0005, LAT - 0.0005, LON + 0.0005, LAT + 0.0005)
+
+
+def _tile(z=15):
+    x, y, _, _ = tile_range((LON, LAT, LON, LAT), z, buffer=0)
+    return z, x, y
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two workers' caches over one shared tile directory."""
+    return TileCache(str(tmp_path)), TileCache(str(tmp_path))
+
+
+def test_build_racing_another_workers_invalidation_is_not_cached(workers):
+    a, b = workers
+    z, x, y = _tile()
+
+    def build_while_b_invalidates(*key):
+        b.invalidate('parcels', BBOX)
+        return b'old rows'
+
+    assert a.get('parcels', z, x, y, build=build_while_b_invalidates) == b'old rows'
+    assert b.get('parcels', z, x, y, build=lambda *k: b'new rows') == b'new rows'
+    assert a.get('parcels', z, x, y, build=lambda *k: b'unused') == b'new rows'
+    assert a.stats()["stale_builds"] == 1
+
+
+def test_write_landing_after_the_stamp_is_taken_back(workers, monkeypatch):
+    a, b = workers
+    z, x, y = _tile()
+    write = a._write
+
+    def write_then_b_stamps(key, data):
+        write(key, data)
+        b._stamp(key[0])  # b's deletes already ran before our file appeared
+
+    monkeypatch.setattr(a, '_write', write_then_b_stamps)
+    a.get('parcels', z, x, y, build=lambda *k: b'old rows')
+    assert a._read(('parcels', z, x, y)) is None
+
+
+def test_invalidation_keeps_other_layers(workers):
+    a, b = workers
+    z, x, y = _tile()
+    a.get('waste_routes', z, x, y, build=lambda *k: b'route')
+    b.invalidate('parcels', BBOX)
+    assert b.get('waste_routes', z, x, y, build=lambda *k: b'rebuilt') == b'route'
+
+
+def test_development_tiles_carry_no_application_details(db_session, make_resident):
+    from models import Council, DevelopmentApplication, Property
+    resident = make_resident()
+    council = Council(name='Tile Council')
+    db_session.add(council)
+    db_session.flush()
+    prop = Property(resident_id=resident.id, council_id=council.id, address='1 Tile St')
+    db_session.add(prop)
+    db_session.flush()
+    db_session.add(DevelopmentApplication(
+        resident_id=resident.id, property_id=prop.id, council_id=council.id,
+        application_type='Secret Extension', status='Refused',
+        gps_coordinates={"lat": LAT, "lon": LON}, lat=LAT, lon=LON))
+    db_session.commit()
+
+    data = render_tile('development', *_tile())
+    assert data  # the point is drawn
+    for leaked in (b'Secret Extension', b'Refused', b'application_type', b'status', b'property_id'):
+        assert leaked not in data
+
+
+def test_tiles_need_a_token(client, db_session, make_resident):
+    z, x, y = _tile()
+    assert client.get(f'/tiles/development/{z}/{x}/{y}.mvt').status_code == 401
+    resp = client.get(f'/tiles/development/{z}/{x}/{y}.mvt', headers=bearer(make_resident().id))
+    assert resp.status_code == 200
+    assert resp.headers['Content-Type'] == 'application/vnd.mapbox-vector-tile'
@@ -0,0 +1,80 @@
+# server/tests/test_waste_routes.py
+import pytest
+
+from tests.conftest import bearer
+
+LON, LAT = 151.2093, -33.8688
+
+
+def _square(lon, lat, d=0.001):
+    return {"type": "Polygon", "coordinates": [[[lon - d, lat - d], [lon + d, lat - d], [lon + d, lat + d],
+                                                [lon - d, lat + d], [lon - d, lat - d]]]}
+
+
+@pytest.fixture
+def routes(db_session, make_resident):
+    """A property inside the 'here' service area and outside the 'there' one."""
+    from models import Council, Property, WasteCollection
+    council = Council(name='Route Council')
+    db_session.add(council)
+    db_session.flush()
+    resident = make_resident()
+    prop = Property(resident_id=resident.id, council_id=council.id, address='8 Bin St',
+                    gps_coordinates={"lat": LAT, "lon": LON})
+    here = WasteCollection(council_id=council.id, collection_type='Garbage', route_geojson=_square(LON, LAT))
+    there = WasteCollection(council_id=council.id, collection_type='Recycling',
+                            route_geojson=_square(LON + 0.05, LAT))
+    db_session.add_all([prop, here, there])
+    db_session.commit()
+    return resident.id, prop.id, here.id, there.id
+
+
+def _waste_ids(client, app, resident_id):
+    return sorted(w['id'] for w in client.get('/dashboard/', headers=bearer(resident_id, app)).get_json()['Waste'])
+
+
+def test_dashboard_reads_the_stored_assignment(app, client, db_session, routes):
+    from models import PropertyWasteRoute
+    resident_id, pid, here, there = routes
+    assert _waste_ids(client, app, resident_id) == [here]  # nothing stored: the index answers
+
+    # A stored assignment wins, even one the index would not give
+    db_session.add(PropertyWasteRoute(property_id=pid, waste_collection_id=there, distance_m=0.0))
+    db_session.commit()
+    assert _waste_ids(client, app, resident_id) == [there]
+
+
+def test_moving_a_property_or_rerouting_drops_stored_rows(db_session, routes):
+    from models import Property, PropertyWasteRoute, WasteCollection
+    from waste_routes import assign_routes_for_council, precomputed_routes
+    _, pid, here, there = routes
+    council_id = db_session.get(Property, pid).council_id
+
+    assert assign_routes_for_council(council_id) == 1
+    assert precomputed_routes(pid) == {here: 0.0}
+
+    db_session.get(Property, pid).gps_coordinates = {"lat": LAT, "lon": LON + 0.05}
+    db_session.commit()
+    assert precomputed_routes(pid) is None
+
+    assign_routes_for_council(council_id)
+    assert precomputed_routes(pid) == {there: 0.0}
+    db_session.get(WasteCollection, there).route_geojson = _square(LON + 0.1, LAT)
+    db_session.commit()
+    assert PropertyWasteRoute.query.count() == 0
+
+
+def test_non_geometry_edits_keep_stored_rows(db_session, routes):
+    from models import Property, WasteCollection
+    from waste_routes import assign_routes_for_council, precomputed_routes, route_index
+    _, pid, here, _ = routes
+    council_id = db_session.get(Property, pid).council_id
+    assign_routes_for_council(council_id)
+    index = route_index.get(council_id)
+
+    collection = db_session.get(WasteCollection, here)
+    collection.collection_day = 'Tuesday'
+    collection.notes = 'Bins out by 6am'
+    db_session.commit()
+    assert precomputed_routes(pid) == {here: 0.0}
+    assert route_index.get(council_id) is index
@@ -0,0 +1,88 @@
+# server/tests/test_waste_schedule.py
+import datetime as dt
+from types import SimpleNamespace
+
+import pytest
+
+from tests.conftest import bearer
+from waste_schedule import compute_occurrences
+
+
+def _row(day, frequency, anchor):
+    return SimpleNamespace(collection_day=day, collection_frequency=frequency,
+                           next_collection_date=anchor, created_at=None)
+
+
+def test_holidays_push_collections_forward():
+    row = _row('Monday', 'weekly', dt.date(2026, 1, 5))
+    holidays = {dt.date(2026, 1, 12): ('Show Day', 1),
+                dt.date(2026, 1, 19): ('Long Weekend', 1), dt.date(2026, 1, 20): ('Long Weekend', 2)}
+    got = compute_occurrences(row, dt.date(2026, 1, 5), 4, holidays)
+    assert [(o['scheduled_date'], o['date'], o['holiday']) for o in got] == [
+        ('2026-01-05', '2026-01-05', None),
+        ('2026-01-12', '2026-01-13', 'Show Day'),
+        ('2026-01-19', '2026-01-22', 'Long Weekend'),  # shifted twice, by 1 then 2 days
+        ('2026-01-26', '2026-01-26', None),
+    ]
+
+
+def test_fortnightly_keeps_the_anchor_phase():
+    row = _row('Tue', 'fortnightly', dt.datetime(2026, 1, 6, 7, 0))
+    # The week after an off-week starts on the next on-cycle Tuesday, not the first one
+    got = compute_occurrences(row, dt.date(2026, 1, 13), 3, {})
+    assert [o['date'] for o in got] == ['2026-01-20', '2026-02-03', '2026-02-17']
+    # An anchor further ahead still gives the nearest upcoming date
+    got = compute_occurrences(row, dt.date(2025, 12, 1), 1, {})
+    assert got[0]['date'] == '2025-12-09'
+
+
+@pytest.fixture
+def council(db_session, make_resident):
+    """A council with a weekly garbage run whose next collection is a public holiday."""
+    from models import Council, Property, PublicHoliday, WasteCollection
+    council = Council(name='Calendar Council')
+    db_session.add(council)
+    db_session.flush()
+    resident = make_resident()
+    today = dt.date.today()
+    db_session.add_all([
+        Property(resident_id=resident.id, council_id=council.id, address='3 Calendar St'),
+        WasteCollection(council_id=council.id, collection_type='Garbage', collection_day=today.strftime('%A'),
+                        collection_frequency='weekly', next_collection_date=today),
+        PublicHoliday(council_id=council.id, holiday_date=today, name='Council Picnic Day', shift_days=1),
+    ])
+    db_session.commit()
+    return council.id, resident.id
+
+
+def test_resident_calendar_is_private_and_revalidates(app, client, council):
+    council_id, resident_id = council
+    resp = client.get('/waste/calendar', headers=bearer(resident_id, app))
+    assert resp.status_code == 200
+    assert resp.headers['Cache-Control'] == 'private, max-age=3600'
+    [cal] = resp.get_json()['councils']
+    first = cal['streams'][0]['occurrences'][0]
+    assert cal['council_id'] == council_id
+    assert first['date'] == (dt.date.today() + dt.timedelta(days=1)).isoformat()
+    assert first['holiday'] == 'Council Picnic Day'
+
+    etag = resp.get_etag()[0]
+    again = client.get('/waste/calendar', headers={**bearer(resident_id, app), 'If-None-Match': f'"{etag}"'})
+    assert again.status_code == 304 and again.data == b''
+    assert again.headers['Cache-Control'] == 'private, max-age=3600'
+
+
+def test_council_ics_feed(client, council):
+    council_id, _ = council
+    resp = client.get(f'/waste/calendar/{council_id}.ics?count=2')
+    assert resp.status_code == 200 and resp.mimetype == 'text/calendar'
+    assert resp.headers['Cache-Control'] == 'public, max-age=3600'
+    body = resp.get_data(as_text=True)
+    assert body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n')
+    assert 'X-WR-CALNAME:Calendar Council waste collection' in body
+    assert body.count('BEGIN:VEVENT') == 2
+    moved = (dt.date.today() + dt.timedelta(days=1)).strftime('%Y%m%d')
+    assert f'DTSTART;VALUE=DATE:{moved}' in body
+    assert 'SUMMARY:Garbage collection (moved for Council Picnic Day)' in body
+    assert client.get(f'/waste/calendar/{council_id}.ics?count=2',
+                      headers={'If-None-Match': f'"{resp.get_etag()[0]}"'}).status_code == 304
@@ -0,0 +1,166 @@
+# server/token_denylist.py
+"""
+In-process deny list for revoked access tokens (by jti).
+
+auth_required must not query the database on every request, so each process keeps a
+copy of the revoked_token table in memory:
+- a Bloom filter. Most tokens aren't revoked, and the filter answers "definitely not"
+  for them with a few bit probes. It can also answer "maybe", with a false-positive
+  rate of DENYLIST_FP_RATE.
+- an exact {jti: expires_at} map, consulted only on a "maybe", so a false positive
+  never rejects a valid token.
+
+A daemon thread reloads the unexpired rows every DENYLIST_SYNC_SECONDS and rebuilds
+both structures from them, which also drops expired jtis. There is no id cursor to
+sync from: a revocation whose id was assigned before a higher id committed would be
+skipped by it. The unexpired set is small (rows expire with the access token they
+deny), so reloading it whole is cheap and never misses a commit. Revocations made in
+this process apply immediately. Other processes see them within one sync interval,
+which is well inside the access-token lifetime. The thread is started on first use
+in each process, so forked workers get their own.
+"""
+import datetime as dt
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+from sqlalchemy import select
+
+from models import db, RevokedToken
+
+SYNC_SECONDS = float(os.getenv('DENYLIST_SYNC_SECONDS', '15'))
+CAPACITY = int(os.getenv('DENYLIST_CAPACITY', '100000'))
+FP_RATE = float(os.getenv('DENYLIST_FP_RATE', '0.001'))
+
+
+class BloomFilter:
+    def __init__(self, capacity=CAPACITY, fp_rate=FP_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing (Kirsch-Mitzenmacher): k positions from two 64-bit halves of one digest
+        d = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(d[:8], 'little'), int.from_bytes(d[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class DenyList:
+    def __init__(self, sync_seconds=SYNC_SECONDS):
+        self.sync_seconds = sync_seconds
+        self._app = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._bloom = BloomFilter()
+        self._exact = {}
+        self.synced_at = None
+        self.bloom_hits = 0
+        self.false_positives = 0
+
+    def init_app(self, app):
+        self._app = app
+
+    # ---------- lookups ----------
+
+    def is_revoked(self, jti):
+        if not jti:
+            return False
+        self._ensure_started()
+        if jti not in self._bloom:
+            return False
+        self.bloom_hits += 1
+        if jti in self._exact:
+            return True
+        self.false_positives += 1
+        return False
+
+    def add(self, jti, expires_at):
+        """Record a revocation made in this process without waiting for the next sync."""
+        with self._lock:
+            if jti not in self._exact:
+                self._bloom.add(jti)
+            self._exact[jti] = expires_at
+
+    def stats(self):
+        return {
+            "entries": len(self._exact),
+            "bloom_bits": self._bloom.size,
+            "bloom_hashes": self._bloom.hashes,
+            "bloom_hits": self.bloom_hits,
+            "false_positives": self.false_positives,
+            "synced_at": self.synced_at.isoformat() if self.synced_at else None,
+        }
+
+    # ---------- syncing ----------
+
+    def _load(self, conn):
+        now = dt.datetime.utcnow()
+        return conn.execute(
+            select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > now)
+        ).all()
+
+    def sync(self):
+        """Reload every unexpired revocation. Returns the number of entries."""
+        with db.engine.connect() as conn:
+            rows = self._load(conn)
+        bloom = BloomFilter(max(CAPACITY, len(rows) * 2))
+        exact = {}
+        for row in rows:
+            bloom.add(row.jti)
+            exact[row.jti] = row.expires_at
+        with self._lock:
+            # Keep jtis added locally since the query ran
+            now = dt.datetime.utcnow()
+            for jti, exp in self._exact.items():
+                if jti not in exact and exp > now:
+                    bloom.add(jti)
+                    exact[jti] = exp
+            self._bloom, self._exact = bloom, exact
+        self.synced_at = dt.datetime.utcnow()
+        return len(exact)
+
+    def _run(self):
+        while True:
+            time.sleep(self.sync_seconds)
+            try:
+                with self._app.app_context():
+                    self.sync()
+            except Exception as e:
+                logging.error(f"[denylist] Sync failed: {e}", exc_info=True)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() or self._app is None:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        # The first check in a process loads the list before answering
+        try:
+            with self._app.app_context():
+                self.sync()
+        except Exception as e:
+            logging.error(f"[denylist] Initial load failed: {e}", exc_info=True)
+        threading.Thread(target=self._run, name='denylist-sync', daemon=True).start()
+
+
+deny_list = DenyList()
+
+
+def init_deny_list(app):
+    deny_list.init_app(app)
+    return deny_list
@@ -0,0 +1,246 @@
+# server/valuation_analytics.py
+"""
+Council-wide valuation analytics on a columnar snapshot.
+
+A council's valuations are loaded into NumPy arrays with one Core query
+(valuation JOIN property). The arrays are saved as an .npz snapshot and kept in
+memory. The snapshot is keyed by a fingerprint (row count, max id, max
+created/updated timestamps), so it is reloaded only after valuations or zones change.
+Every statistic below is computed on whole arrays; no ORM objects are built.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import func, select
+
+from models import db, Valuation, Property
+
+SNAPSHOT_DIR = os.getenv(
+    'VALUATION_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'var', 'valuation_snapshots')
+)
+PERCENTILES = (5, 25, 50, 75, 95)
+HISTOGRAM_BINS = 20
+MAX_CACHED_COUNCILS = 16
+
+
+class ValuationSnapshot:
+    """Column arrays for one council. Values are cents as float64, NaN where NULL."""
+
+    def __init__(self, fingerprint, property_id, year, land, capital, zone_code, zones):
+        self.fingerprint = fingerprint
+        self.property_id = property_id
+        self.year = year
+        self.land = land
+        self.capital = capital
+        self.zone_code = zone_code   # index into self.zones, per row
+        self.zones = zones           # list of zone labels ('' for NULL)
+
+    def __len__(self):
+        return int(self.property_id.size)
+
+    def years(self):
+        return np.unique(self.year).tolist()
+
+    def for_year(self, year):
+        mask = self.year == year
+        return (self.property_id[mask], self.land[mask], self.capital[mask], self.zone_code[mask])
+
+
+# ---------- loading ----------
+
+def council_fingerprint(council_id):
+    row = db.session.execute(
+        select(func.count(Valuation.id), func.max(Valuation.id),
+               func.max(Valuation.created_at), func.max(Valuation.updated_at),
+               func.max(Property.updated_at))  # zone lives on property
+        .join(Property, Property.id == Valuation.property_id)
+        .where(Property.council_id == council_id)
+    ).one()
+    return hashlib.sha1(repr(tuple(row)).encode()).hexdigest()
+
+
+def _load_from_db(council_id, fingerprint):
+    rows = db.session.execute(
+        select(Valuation.property_id, Valuation.year, Valuation.land_value_cents,
+               Valuation.capital_value_cents, Property.zone)
+        .join(Property, Property.id == Valuation.property_id)
+        .where(Property.council_id == council_id)
+        .order_by(Valuation.property_id, Valuation.year)
+    ).all()
+    n = len(rows)
+    if n:
+        pid, year, land, capital, zone = zip(*rows)
+    else:
+        pid = year = land = capital = zone = ()
+    zones, zone_code = np.unique(np.array([z or '' for z in zone], dtype=object), return_inverse=True)
+    return ValuationSnapshot(
+        fingerprint,
+        np.fromiter(pid, dtype=np.int64, count=n),
+        np.fromiter(year, dtype=np.int32, count=n),
+        np.array(land, dtype=np.float64),      # None -> NaN
+        np.array(capital, dtype=np.float64),
+        zone_code.astype(np.int32),
+        [str(z) for z in zones],
+    )
+
+
+def _snapshot_path(council_id):
+    return os.path.join(SNAPSHOT_DIR, f"council_{council_id}.npz")
+
+
+def _save(council_id, snap):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp = _snapshot_path(council_id) + '.tmp.npz'
+    np.savez(tmp, fingerprint=np.array(snap.fingerprint), property_id=snap.property_id, year=snap.year,
+             land=snap.land, capital=snap.capital, zone_code=snap.zone_code, zones=np.array(snap.zones, dtype=str))
+    os.replace(tmp, _snapshot_path(council_id))
+
+
+def _load_from_disk(council_id, fingerprint):
+    path = _snapshot_path(council_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as f:
+            if str(f['fingerprint']) != fingerprint:
+                return None
+            return ValuationSnapshot(fingerprint, f['property_id'], f['year'], f['land'], f['capital'],
+                                     f['zone_code'], [str(z) for z in f['zones']])
+    except Exception as e:
+        logging.warning(f"[valuations] Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_snapshot(council_id):
+    """Memory -> .npz on disk -> one DB query, checked against the live fingerprint."""
+    fingerprint = council_fingerprint(council_id)
+    with _lock:
+        snap = _cache.get(council_id)
+        if snap is not None and snap.fingerprint == fingerprint:
+            _cache.move_to_end(council_id)
+            return snap
+
+    snap = _load_from_disk(council_id, fingerprint)
+    if snap is None:
+        snap = _load_from_db(council_id, fingerprint)
+        _save(council_id, snap)
+        logging.info(f"[valuations] Snapshot rebuilt for council {council_id}: {len(snap)} rows.")
+
+    with _lock:
+        _cache[council_id] = snap
+        _cache.move_to_end(council_id)
+        while len(_cache) > MAX_CACHED_COUNCILS:
+            _cache.popitem(last=False)
+    return snap
+
+
+# ---------- analytics ----------
+
+def _dollars(x):
+    return None if x is None or np.isnan(x) else round(float(x) / 100.0, 2)
+
+
+def _distribution(values_cents):
+    v = values_cents[~np.isnan(values_cents)]
+    if v.size == 0:
+        return {"count": 0}
+    pct = np.percentile(v, PERCENTILES)
+    counts, edges = np.histogram(v, bins=HISTOGRAM_BINS)
+    return {
+        "count": int(v.size),
+        "mean": _dollars(v.mean()),
+        "percentiles": {f"p{p}": _dollars(x) for p, x in zip(PERCENTILES, pct)},
+        "histogram": {"edges": [_dollars(e) for e in edges], "counts": counts.tolist()},
+    }
+
+
+def _group_medians(codes, values, labels):
+    """Median of `values` per zone code, ignoring NaN."""
+    ok = ~np.isnan(values)
+    codes, values = codes[ok], values[ok]
+    if values.size == 0:
+        return []
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    uniq, starts, counts = np.unique(codes, return_index=True, return_counts=True)
+    out = []
+    for code, start, n in zip(uniq, starts, counts):
+        out.append({"zone": labels[code] or None, "count": int(n),
+                    "median": float(np.median(values[start:start + n]))})
+    return out
+
+
+def council_analytics(council_id, year=None, outlier_z=3.5, max_outliers=50):
+    snap = get_snapshot(council_id)
+    years = snap.years()
+    if not years:
+        return {"council_id": council_id, "years": [], "rows": 0}
+    year = year or years[-1]
+    prev_year = max((y for y in years if y < year), default=None)
+
+    pid, land, capital, zone = snap.for_year(year)
+    result = {
+        "council_id": council_id,
+        "years": years,
+        "year": year,
+        "previous_year": prev_year,
+        "rows": len(snap),
+        "land_value": _distribution(land),
+        "capital_value": _distribution(capital),
+    }
+
+    # Land-to-capital ratio
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(capital > 0, land / capital, np.nan)
+    r = ratio[~np.isnan(ratio)]
+    result["land_to_capital"] = {
+        "count": int(r.size),
+        "percentiles": {f"p{p}": round(float(x), 4) for p, x in zip(PERCENTILES, np.percentile(r, PERCENTILES))} if r.size else {},
+        "median_by_zone": [dict(g, median=round(g["median"], 4)) for g in _group_medians(zone, ratio, snap.zones)],
+    }
+
+    if prev_year is None:
+        return result
+
+    # Year-on-year change: align properties present in both years
+    ppid, _, pcapital, _ = snap.for_year(prev_year)
+    common, i_cur, i_prev = np.intersect1d(pid, ppid, assume_unique=True, return_indices=True)
+    cur_cap, prev_cap = capital[i_cur], pcapital[i_prev]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.where(prev_cap > 0, (cur_cap - prev_cap) / prev_cap, np.nan)
+    zones_common = zone[i_cur]
+
+    valid = ~np.isnan(change)
+    result["capital_change"] = {
+        "count": int(valid.sum()),
+        "median": round(float(np.median(change[valid])), 4) if valid.any() else None,
+        "median_by_zone": [dict(g, median=round(g["median"], 4)) for g in _group_medians(zones_common, change, snap.zones)],
+    }
+
+    # Outliers by robust z-score (median / MAD) of the change
+    outliers = []
+    if valid.sum() > 2:
+        med = np.median(change[valid])
+        mad = np.median(np.abs(change[valid] - med))
+        if mad > 0:
+            z = 0.6745 * (change - med) / mad
+            flagged = np.where(valid & (np.abs(z) >= outlier_z))[0]
+            flagged = flagged[np.argsort(-np.abs(z[flagged]))][:max_outliers]
+            outliers = [{
+                "property_id": int(common[k]),
+                "previous_capital_value": _dollars(prev_cap[k]),
+                "capital_value": _dollars(cur_cap[k]),
+                "change": round(float(change[k]), 4),
+                "robust_z": round(float(z[k]), 2),
+                "zone": snap.zones[zones_common[k]] or None,
+            } for k in flagged]
+    result["outliers"] = outliers
+    return result
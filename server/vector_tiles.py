@@ -0,0 +1,687 @@
+# server/vector_tiles.py
+"""
+Mapbox Vector Tiles (spec 2.1) for the map layers, built from stored geometries.
+
+Layers (GET /tiles/<layer>/<z>/<x>/<y>.mvt, routes/tiles.py):
+- parcels       Property.shape_file_data, tagged with zone and overlay kinds
+- overlays      one feature per PropertyOverlay row, drawn with its parcel's shape
+- waste_routes  WasteCollection.route_geojson (service-area polygons and truck route lines)
+- development   development application points (materialized lat/lon)
+
+Building a tile:
+1. Candidate rows come from a bounding-box query on the tile's lon/lat bounds. Parcels
+   use the materialized bbox columns (ix_property_bbox) and DAs use lat/lon. Waste routes
+   are few, so they are filtered by bbox in Python.
+2. Geometries are projected to web mercator tile coordinates (EXTENT units per tile) and
+   clipped to the tile plus BUFFER units: Sutherland-Hodgman for rings, Liang-Barsky for
+   lines. They are then simplified with Douglas-Peucker at SIMPLIFY_UNITS and snapped to
+   the integer grid. The tolerance is in tile units, so a zoomed-out tile carries
+   proportionally fewer vertices. Rings that collapse to nothing are dropped.
+3. A small protobuf writer encodes the result (no GIS or protobuf dependency, like geo.py).
+
+Caching: an in-process LRU (TILE_MEMORY_TILES entries, TILE_MEMORY_TTL_SECONDS) sits in
+front of a disk cache under TILE_CACHE_DIR, which every worker on the host shares.
+Session listeners collect the bounding boxes of geometry writes, old shape and new. After
+commit they drop the covering tiles at every zoom. If a change covers more than
+INVALIDATE_MAX_TILES tiles at one zoom, that whole zoom of the layer is dropped instead;
+a commit touching more than MERGE_CHANGES shapes is invalidated as their union.
+Other workers' memory copies age out within the TTL. Raw-SQL writers should call
+invalidate_tiles() with what they changed, or tile_cache.clear().
+
+A tile rendered while another worker invalidated its layer may have read the old rows.
+Every invalidation stamps the layer's marker file (TILE_CACHE_DIR/.invalidated/<layer>)
+with the time, before it deletes any tile. A build started before the latest stamp is
+served but never written to disk, and a write that lands just as the stamp moves is
+removed again.
+
+The development layer is drawn for every resident, so its features carry no
+application details: a point and nothing else. Residents see their own applications
+through /dashboard.
+"""
+import logging
+import math
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+from sqlalchemy import event, inspect
+
+from models import db, Property, PropertyOverlay, WasteCollection, DevelopmentApplication
+from geo import geojson_bbox, iter_geometries, load_geojson, property_point
+
+EXTENT = 4096
+BUFFER = 64                 # tile units drawn past each edge, so strokes don't seam
+SIMPLIFY_UNITS = float(os.getenv('TILE_SIMPLIFY_UNITS', '2'))
+MAX_ZOOM = 18
+MAX_LAT = 85.0511287798     # web mercator's square world
+# Parcels are found by a range on min_lat; one taller than this may be missing from
+# tiles well north of its southern edge
+MAX_PARCEL_SPAN_DEG = float(os.getenv('TILE_MAX_PARCEL_SPAN_DEG', '0.05'))
+
+LAYERS = {                  # layer -> minzoom; below it the tile is empty
+    'parcels': 13,
+    'overlays': 13,
+    'waste_routes': 10,
+    'development': 11,
+}
+
+TILE_CACHE_DIR = os.getenv(
+    'TILE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'var', 'tiles')
+)
+MEMORY_TILES = int(os.getenv('TILE_MEMORY_TILES', '2048'))
+MEMORY_TTL_SECONDS = int(os.getenv('TILE_MEMORY_TTL_SECONDS', '300'))
+INVALIDATE_MAX_TILES = int(os.getenv('TILE_INVALIDATE_MAX_TILES', '4096'))
+MERGE_CHANGES = 64          # more changed shapes than this in one commit are invalidated as their union
+
+POINT, LINESTRING, POLYGON = 1, 2, 3
+MOVE_TO, LINE_TO, CLOSE_PATH = 1, 2, 7
+
+
+# ---------- tile math ----------
+
+def valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def _lon(tx, n):
+    return tx / n * 360.0 - 180.0
+
+
+def _lat(ty, n):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+
+def tile_bounds(z, x, y, buffer=BUFFER):
+    """(min_lon, min_lat, max_lon, max_lat) of a tile, grown by `buffer` tile units."""
+    n = 2 ** z
+    pad = buffer / EXTENT
+    return _lon(x - pad, n), _lat(y + 1 + pad, n), _lon(x + 1 + pad, n), _lat(y - pad, n)
+
+
+def _world(lon, lat, n):
+    """Fractional tile coordinates of a lon/lat at a zoom with n tiles per side."""
+    lat = math.radians(max(-MAX_LAT, min(MAX_LAT, lat)))
+    return (lon + 180.0) / 360.0 * n, (1.0 - math.log(math.tan(lat) + 1.0 / math.cos(lat)) / math.pi) / 2.0 * n
+
+
+def tile_range(bbox, z, buffer=BUFFER):
+    """(x0, y0, x1, y1) inclusive: every tile at z whose buffered area touches bbox."""
+    n = 2 ** z
+    pad = buffer / EXTENT
+    min_lon, min_lat, max_lon, max_lat = bbox
+    wx0, wy0 = _world(min_lon, max_lat, n)
+    wx1, wy1 = _world(max_lon, min_lat, n)
+
+    def clamp(v):
+        return max(0, min(n - 1, int(math.floor(v))))
+
+    return clamp(wx0 - pad), clamp(wy0 - pad), clamp(wx1 + pad), clamp(wy1 + pad)
+
+
+def _project(coords, z, x, y):
+    a = np.asarray([c[:2] for c in coords], dtype=np.float64)
+    n = 2 ** z
+    lat = np.radians(np.clip(a[:, 1], -MAX_LAT, MAX_LAT))
+    px = ((a[:, 0] + 180.0) / 360.0 * n - x) * EXTENT
+    py = ((1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * n - y) * EXTENT
+    return list(zip(px.tolist(), py.tolist()))
+
+
+# ---------- clipping and simplification ----------
+
+def _crossing(a, b, axis, bound):
+    t = (bound - a[axis]) / (b[axis] - a[axis])
+    if axis == 0:
+        return bound, a[1] + t * (b[1] - a[1])
+    return a[0] + t * (b[0] - a[0]), bound
+
+
+def _clip_ring(ring, lo, hi):
+    """Sutherland-Hodgman against the square [lo, hi]; ring is open (no repeated first point)."""
+    for axis in (0, 1):
+        for bound, keep in ((lo, lambda v: v >= lo), (hi, lambda v: v <= hi)):
+            if not ring:
+                return ring
+            out = []
+            prev = ring[-1]
+            prev_in = keep(prev[axis])
+            for cur in ring:
+                cur_in = keep(cur[axis])
+                if cur_in != prev_in:
+                    out.append(_crossing(prev, cur, axis, bound))
+                if cur_in:
+                    out.append(cur)
+                prev, prev_in = cur, cur_in
+            ring = out
+    return ring
+
+
+def _clip_segment(a, b, lo, hi):
+    """Liang-Barsky: the part of segment ab inside the square, or None."""
+    (x0, y0), (x1, y1) = a, b
+    dx, dy = x1 - x0, y1 - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x0 - lo), (dx, hi - x0), (-dy, y0 - lo), (dy, hi - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return None
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return None
+            t1 = min(t1, t)
+    start = (x0 + t0 * dx, y0 + t0 * dy) if t0 > 0 else a
+    end = (x0 + t1 * dx, y0 + t1 * dy) if t1 < 1 else b
+    return start, end
+
+
+def _clip_line(line, lo, hi):
+    """A polyline clipped to the square, as the list of pieces left inside it."""
+    pieces, current = [], []
+    for a, b in zip(line, line[1:]):
+        seg = _clip_segment(a, b, lo, hi)
+        if seg is None:
+            if len(current) > 1:
+                pieces.append(current)
+            current = []
+            continue
+        start, end = seg
+        if not current or current[-1] != start:
+            if len(current) > 1:
+                pieces.append(current)
+            current = [start]
+        current.append(end)
+        if end != b:  # left the square
+            pieces.append(current)
+            current = []
+    if len(current) > 1:
+        pieces.append(current)
+    return pieces
+
+
+def _simplify(points, tolerance=SIMPLIFY_UNITS):
+    """Douglas-Peucker, iterative so long routes can't hit the recursion limit."""
+    if len(points) < 3 or tolerance <= 0:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    tol2 = tolerance * tolerance
+    stack = [(0, len(points) - 1)]
+    while stack:
+        i, j = stack.pop()
+        (ax, ay), (bx, by) = points[i], points[j]
+        dx, dy = bx - ax, by - ay
+        seg2 = dx * dx + dy * dy
+        best, index = tol2, None
+        for k in range(i + 1, j):
+            px, py = points[k]
+            t = 0.0 if seg2 == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg2))
+            d2 = (ax + t * dx - px) ** 2 + (ay + t * dy - py) ** 2
+            if d2 > best:
+                best, index = d2, k
+        if index is not None:
+            keep[index] = True
+            stack += [(i, index), (index, j)]
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _snap(points):
+    out = []
+    for x, y in points:
+        p = (int(round(x)), int(round(y)))
+        if not out or out[-1] != p:
+            out.append(p)
+    return out
+
+
+def _area2(ring):
+    """Twice the signed area; positive is clockwise on screen (y down), an MVT exterior ring."""
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]))
+
+
+def _tile_ring(coords, z, x, y, exterior):
+    ring = _project(coords, z, x, y)
+    if len(ring) > 1 and ring[0] == ring[-1]:
+        ring = ring[:-1]
+    ring = _snap(_simplify(_clip_ring(ring, -BUFFER, EXTENT + BUFFER)))
+    if len(ring) > 1 and ring[0] == ring[-1]:
+        ring = ring[:-1]
+    area = _area2(ring) if len(ring) >= 3 else 0
+    if area == 0:
+        return None
+    return ring if (area > 0) == exterior else ring[::-1]
+
+
+def _tile_polygon(rings, z, x, y):
+    if not rings:
+        return []
+    shell = _tile_ring(rings[0], z, x, y, exterior=True)
+    if shell is None:
+        return []
+    holes = [_tile_ring(r, z, x, y, exterior=False) for r in rings[1:]]
+    return [shell] + [h for h in holes if h]
+
+
+def _tile_lines(line, z, x, y):
+    pieces = _clip_line(_project(line, z, x, y), -BUFFER, EXTENT + BUFFER)
+    return [p for p in (_snap(_simplify(piece)) for piece in pieces) if len(p) > 1]
+
+
+def _tile_points(points, z, x, y):
+    lo, hi = -BUFFER, EXTENT + BUFFER
+    return [p for p in _snap(_project(points, z, x, y)) if lo <= p[0] <= hi and lo <= p[1] <= hi]
+
+
+def tile_geometry(value, z, x, y):
+    """{geometry type: parts} for a GeoJSON value clipped and simplified into tile (z, x, y)."""
+    out = defaultdict(list)
+    for geom in iter_geometries(load_geojson(value)):
+        t, coords = geom.get('type'), geom.get('coordinates') or []
+        try:
+            if t in ('Polygon', 'MultiPolygon'):
+                for rings in (coords if t == 'MultiPolygon' else [coords]):
+                    out[POLYGON] += _tile_polygon(rings, z, x, y)
+            elif t in ('LineString', 'MultiLineString'):
+                for line in (coords if t == 'MultiLineString' else [coords]):
+                    out[LINESTRING] += _tile_lines(line, z, x, y)
+            elif t in ('Point', 'MultiPoint'):
+                out[POINT] += _tile_points(coords if t == 'MultiPoint' else [coords], z, x, y)
+        except (TypeError, ValueError, IndexError):
+            continue  # malformed coordinates: leave the geometry out rather than fail the tile
+    return {k: v for k, v in out.items() if v}
+
+
+# ---------- encoding ----------
+
+def _varint(n):
+    out = bytearray()
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _zigzag(n):
+    return n << 1 if n >= 0 else (-n << 1) - 1
+
+
+def _key(number, wire_type):
+    return _varint(number << 3 | wire_type)
+
+
+def _message(number, payload):
+    return _key(number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(number, ints):
+    return _message(number, b''.join(_varint(i) for i in ints)) if ints else b''
+
+
+def _value(v):
+    if isinstance(v, bool):
+        return _key(7, 0) + _varint(int(v))
+    if isinstance(v, int):
+        return _key(6, 0) + _varint(_zigzag(v))
+    if isinstance(v, float):
+        return _key(3, 1) + struct.pack('<d', v)
+    return _message(1, str(v).encode())
+
+
+def _geometry_commands(kind, parts):
+    cmds = []
+    cx = cy = 0
+
+    def emit(points):
+        nonlocal cx, cy
+        for px, py in points:
+            cmds.append(_zigzag(px - cx))
+            cmds.append(_zigzag(py - cy))
+            cx, cy = px, py
+
+    if kind == POINT:
+        cmds.append(MOVE_TO | len(parts) << 3)
+        emit(parts)
+        return cmds
+    for part in parts:
+        cmds.append(MOVE_TO | 1 << 3)
+        emit(part[:1])
+        cmds.append(LINE_TO | (len(part) - 1) << 3)
+        emit(part[1:])
+        if kind == POLYGON:
+            cmds.append(CLOSE_PATH | 1 << 3)
+    return cmds
+
+
+def encode_layer(name, features, extent=EXTENT):
+    """One Tile.layers message. features: [(id, geometry type, parts, {key: value})]."""
+    keys, values = {}, {}
+    body = [_key(15, 0) + _varint(2), _message(1, name.encode())]
+    for fid, kind, parts, props in features:
+        tags = []
+        for k, v in props.items():
+            if v is None:
+                continue
+            tags.append(keys.setdefault(k, len(keys)))
+            tags.append(values.setdefault((type(v), v), len(values)))
+        feature = b''.join((
+            _key(1, 0) + _varint(fid) if fid is not None else b'',
+            _packed(2, tags),
+            _key(3, 0) + _varint(kind),
+            _packed(4, _geometry_commands(kind, parts)),
+        ))
+        body.append(_message(2, feature))
+    body += [_message(3, k.encode()) for k in keys]
+    body += [_message(4, _value(v)) for (_, v) in values]
+    body.append(_key(5, 0) + _varint(extent))
+    return _message(3, b''.join(body))
+
+
+# ---------- layers ----------
+
+def _parcel_filter(bounds):
+    min_lon, min_lat, max_lon, max_lat = bounds
+    return (Property.min_lat >= min_lat - MAX_PARCEL_SPAN_DEG, Property.min_lat <= max_lat,
+            Property.max_lat >= min_lat, Property.min_lon <= max_lon, Property.max_lon >= min_lon)
+
+
+def _parcel_features(bounds, z, x, y):
+    kinds = defaultdict(list)
+    for pid, kind in (db.session.query(PropertyOverlay.property_id, PropertyOverlay.kind)
+                      .join(Property, Property.id == PropertyOverlay.property_id)
+                      .filter(*_parcel_filter(bounds))
+                      .order_by(PropertyOverlay.kind)):
+        kinds[pid].append(kind)
+    rows = db.session.query(Property.id, Property.zone, Property.shape_file_data).filter(*_parcel_filter(bounds))
+    for pid, zone, shape in rows:
+        for kind, parts in tile_geometry(shape, z, x, y).items():
+            yield pid, kind, parts, {"property_id": pid, "zone": zone,
+                                     "overlays": ",".join(kinds[pid]) if pid in kinds else None}
+
+
+def _overlay_features(bounds, z, x, y):
+    rows = (db.session.query(PropertyOverlay.id, PropertyOverlay.property_id, PropertyOverlay.kind,
+                             PropertyOverlay.source, Property.shape_file_data)
+            .join(Property, Property.id == PropertyOverlay.property_id)
+            .filter(*_parcel_filter(bounds)))
+    shapes = {}  # a parcel with several overlays is clipped once
+    for oid, pid, kind, source, shape in rows:
+        if pid not in shapes:
+            shapes[pid] = tile_geometry(shape, z, x, y)
+        for gtype, parts in shapes[pid].items():
+            yield oid, gtype, parts, {"property_id": pid, "kind": kind, "source": source}
+
+
+def _waste_route_features(bounds, z, x, y):
+    min_lon, min_lat, max_lon, max_lat = bounds
+    rows = (db.session.query(WasteCollection.id, WasteCollection.council_id, WasteCollection.collection_type,
+                             WasteCollection.collection_day, WasteCollection.route_geojson)
+            .filter(WasteCollection.route_geojson.isnot(None)))
+    for wid, council_id, ctype, day, route in rows:
+        bbox = geojson_bbox(route)
+        if bbox is None or bbox[0] > max_lon or bbox[2] < min_lon or bbox[1] > max_lat or bbox[3] < min_lat:
+            continue
+        for kind, parts in tile_geometry(route, z, x, y).items():
+            yield wid, kind, parts, {"collection_id": wid, "council_id": council_id,
+                                     "collection_type": ctype, "collection_day": day}
+
+
+def _development_features(bounds, z, x, y):
+    min_lon, min_lat, max_lon, max_lat = bounds
+    da = DevelopmentApplication
+    rows = (db.session.query(da.lat, da.lon)
+            .filter(da.lat.between(min_lat, max_lat), da.lon.between(min_lon, max_lon)))
+    for lat, lon in rows:
+        points = _tile_points([(lon, lat)], z, x, y)
+        if points:
+            yield None, POINT, points, {}
+
+
+FEATURES = {
+    'parcels': _parcel_features,
+    'overlays': _overlay_features,
+    'waste_routes': _waste_route_features,
+    'development': _development_features,
+}
+
+
+def render_tile(layer, z, x, y):
+    """The encoded tile; b'' (a valid empty tile) below the layer's minzoom or with nothing in it."""
+    if z < LAYERS[layer]:
+        return b''
+    features = list(FEATURES[layer](tile_bounds(z, x, y), z, x, y))
+    return encode_layer(layer, features) if features else b''
+
+
+# ---------- caching ----------
+
+class TileCache:
+    def __init__(self, directory=TILE_CACHE_DIR, max_tiles=MEMORY_TILES, ttl_seconds=MEMORY_TTL_SECONDS):
+        self.directory = directory
+        self.max_tiles = max_tiles
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # (layer, z, x, y) -> (cached_at, data)
+        self.hits = self.disk_hits = self.misses = self.stale_builds = 0
+
+    def path(self, layer, z, x, y):
+        return os.path.join(self.directory, layer, str(z), str(x), f"{y}.mvt")
+
+    def _marker(self, layer):
+        return os.path.join(self.directory, '.invalidated', layer)
+
+    def invalidated_at(self, layer):
+        """time_ns() of the layer's latest invalidation by any worker, 0 if none."""
+        try:
+            with open(self._marker(layer)) as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _stamp(self, layer):
+        """Record an invalidation of layer for every worker. Call before deleting tiles."""
+        path = self._marker(layer)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp, path)
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._memory[key] = (time.monotonic(), data)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_tiles:
+                self._memory.popitem(last=False)
+
+    def _read(self, key):
+        try:
+            with open(self.path(*key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key, data):
+        path = self.path(*key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)  # atomic: readers never see a partial tile
+
+    def get(self, layer, z, x, y, build=None):
+        """Tile bytes from memory, disk, or build (render_tile by default)."""
+        key = (layer, z, x, y)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and time.monotonic() - entry[0] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        data = self._read(key)
+        if data is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            started = time.time_ns()
+            data = (build or render_tile)(layer, z, x, y)
+            if self.invalidated_at(layer) >= started:
+                self.stale_builds += 1
+                return data  # may predate the invalidation: serve it once, cache nothing
+            try:
+                self._write(key, data)
+            except OSError as e:
+                logging.warning(f"[tiles] Could not cache {layer}/{z}/{x}/{y}: {e}")
+            if self.invalidated_at(layer) >= started:
+                # Stamped between the check and the write, and the tile may already be gone from
+                # the invalidating worker's list: take ours back
+                self.stale_builds += 1
+                self._forget(key)
+                return data
+        self._remember(key, data)
+        return data
+
+    def _forget(self, key):
+        try:
+            os.remove(self.path(*key))
+        except FileNotFoundError:
+            pass
+
+    def _drop(self, layer, z, tiles=None):
+        """Forget tiles of a layer at one zoom: the given (x, y)s, or all of them."""
+        with self._lock:
+            if tiles is None:
+                for key in [k for k in self._memory if k[0] == layer and k[1] == z]:
+                    del self._memory[key]
+            else:
+                for tx, ty in tiles:
+                    self._memory.pop((layer, z, tx, ty), None)
+        if tiles is None:
+            shutil.rmtree(os.path.join(self.directory, layer, str(z)), ignore_errors=True)
+            return
+        for tx, ty in tiles:
+            self._forget((layer, z, tx, ty))
+
+    def invalidate(self, layer, bbox):
+        """Drop every cached tile of layer that draws anything inside bbox. Returns tiles dropped."""
+        self._stamp(layer)
+        dropped = 0
+        for z in range(LAYERS[layer], MAX_ZOOM + 1):
+            x0, y0, x1, y1 = tile_range(bbox, z)
+            count = (x1 - x0 + 1) * (y1 - y0 + 1)
+            if count > INVALIDATE_MAX_TILES:
+                self._drop(layer, z)
+            else:
+                self._drop(layer, z, [(tx, ty) for tx in range(x0, x1 + 1) for ty in range(y0, y1 + 1)])
+            dropped += count
+        return dropped
+
+    def clear(self, layer=None):
+        layers = [layer] if layer else list(LAYERS)
+        for name in layers:
+            self._stamp(name)
+        with self._lock:
+            for key in [k for k in self._memory if k[0] in layers]:
+                del self._memory[key]
+        for name in layers:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def stats(self):
+        return {"memory_tiles": len(self._memory), "hits": self.hits, "disk_hits": self.disk_hits,
+                "misses": self.misses, "stale_builds": self.stale_builds}
+
+
+tile_cache = TileCache()
+
+
+# ---------- invalidation ----------
+
+def _history(obj, attr):
+    """Current and pre-change values of an attribute in a pending write."""
+    h = inspect(obj).attrs[attr].history
+    return list(h.added) + list(h.unchanged) + list(h.deleted)
+
+
+def _changed(obj, *attrs):
+    state = inspect(obj)
+    return any(state.attrs[a].history.has_changes() for a in attrs)
+
+
+def _point_bbox(lon, lat):
+    return None if lon is None or lat is None else (lon, lat, lon, lat)
+
+
+def _tile_changes(session):
+    """[(layer, bbox)] drawn differently once the pending writes land: old and new shapes."""
+    changes = []
+    fresh = set(session.new) | set(session.deleted)
+    for obj in list(fresh) + list(session.dirty):
+        if isinstance(obj, Property):
+            if obj in fresh or _changed(obj, 'shape_file_data', 'zone'):
+                for bbox in map(geojson_bbox, _history(obj, 'shape_file_data')):
+                    changes += [('parcels', bbox), ('overlays', bbox)]
+        elif isinstance(obj, PropertyOverlay):
+            if obj in fresh or _changed(obj, 'kind', 'source', 'property_id'):
+                parcels = {session.get(Property, pid) for pid in _history(obj, 'property_id') if pid}
+                parcels.add(obj.property)  # set through the relationship, property_id isn't copied yet
+                for prop in parcels - {None}:
+                    bbox = geojson_bbox(prop.shape_file_data)
+                    changes += [('parcels', bbox), ('overlays', bbox)]
+        elif isinstance(obj, WasteCollection):
+            if obj in fresh or _changed(obj, 'route_geojson', 'collection_type', 'collection_day'):
+                changes += [('waste_routes', geojson_bbox(r)) for r in _history(obj, 'route_geojson')]
+        elif isinstance(obj, DevelopmentApplication):
+            if obj in fresh or _changed(obj, 'gps_coordinates', 'application_type', 'status'):
+                changes.append(('development', _point_bbox(obj.lon, obj.lat)))
+                for coords in _history(obj, 'gps_coordinates'):
+                    changes.append(('development', _point_bbox(*(property_point(coords) or (None, None)))))
+    return [(layer, bbox) for layer, bbox in changes if bbox is not None]
+
+
+def invalidate_tiles(changes):
+    """Drop cached tiles for committed (layer, bbox) changes, e.g. from a bulk writer that bypasses the session."""
+    by_layer = defaultdict(list)
+    for layer, bbox in changes:
+        if bbox is not None:
+            by_layer[layer].append(bbox)
+    for layer, boxes in by_layer.items():
+        if len(boxes) > MERGE_CHANGES:
+            # A bulk write: one pass over the union (usually dropping whole zooms)
+            # beats walking the tiles of every row
+            boxes = [(min(b[0] for b in boxes), min(b[1] for b in boxes),
+                      max(b[2] for b in boxes), max(b[3] for b in boxes))]
+        for bbox in boxes:
+            try:
+                tile_cache.invalidate(layer, bbox)
+            except OSError as e:
+                logging.error(f"[tiles] Invalidation of {layer} {bbox} failed: {e}", exc_info=True)
+
+
+def register_tile_listeners(session_cls=None):
+    """Drop cached tiles under changed geometry once the write commits."""
+    target = session_cls or db.session
+
+    @event.listens_for(target, 'before_flush')
+    def _collect_geometry_writes(session, flush_context, instances):
+        with session.no_autoflush:
+            changes = _tile_changes(session)
+        if changes:
+            session.info.setdefault('tile_changes', set()).update(changes)
+
+    @event.listens_for(target, 'after_commit')
+    def _invalidate_on_commit(session):
+        invalidate_tiles(session.info.pop('tile_changes', ()))
+
+    @event.listens_for(target, 'after_rollback')
+    def _clear_on_rollback(session):
+        session.info.pop('tile_changes', None)
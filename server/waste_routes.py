@@ -0,0 +1,271 @@
+# server/waste_routes.py
+"""
+Spatial index over WasteCollection.route_geojson.
+
+Route geometry is either a service-area polygon or a truck route line. Each council's
+geometries are bucketed into a uniform lon/lat grid by bounding box, so a property
+lookup touches one cell and runs the exact test (point-in-polygon, or distance to the
+line within ROUTE_BUFFER_M) against a handful of candidates.
+The per-council index is dropped whenever a commit adds, deletes, re-routes or moves a
+WasteCollection row of that council, and rebuilt on next use.
+
+Bulk mode (assign_routes_for_council) stores each property's serving routes in
+property_waste_route. The dashboard reads those rows first and only falls back to the
+index for properties without any. A flush that changes a council's route geometry (a new,
+deleted or re-routed WasteCollection) deletes that council's stored rows, and a flush that moves a property (new coordinates
+or council) deletes the property's own. So stored rows are never staler than the index.
+"""
+import math
+import threading
+import time
+import logging
+
+from sqlalchemy import event, inspect, or_
+from models import db, WasteCollection, Property, PropertyWasteRoute
+from geo import iter_geometries, property_point, M_PER_DEG_LAT
+
+GRID_DEG = 0.01            # ~1.1 km cells at Sydney's latitude
+ROUTE_BUFFER_M = 150.0     # a property "is on" a line route if within this distance of it
+DEFAULT_TTL_SECONDS = 300
+
+
+# ---------- geometry ----------
+
+def _parts(geom):
+    """Split a geometry into ('polygon', rings) / ('line', coords) parts."""
+    t, coords = geom.get('type'), geom.get('coordinates') or []
+    if t == 'Polygon':
+        return [('polygon', coords)]
+    if t == 'MultiPolygon':
+        return [('polygon', p) for p in coords]
+    if t == 'LineString':
+        return [('line', coords)]
+    if t == 'MultiLineString':
+        return [('line', line) for line in coords]
+    return []
+
+
+def _bbox(points):
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _point_in_ring(x, y, ring):
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _point_in_polygon(x, y, rings):
+    if not rings or not _point_in_ring(x, y, rings[0]):
+        return False
+    return not any(_point_in_ring(x, y, hole) for hole in rings[1:])
+
+
+def _distance_to_line_m(x, y, line):
+    """Min distance in metres from (lon, lat) to a polyline, on a local equirectangular projection."""
+    kx = M_PER_DEG_LAT * math.cos(math.radians(y))
+    ky = M_PER_DEG_LAT
+    best = math.inf
+    for (x1, y1, *_), (x2, y2, *_) in zip(line, line[1:]):
+        ax, ay = (x1 - x) * kx, (y1 - y) * ky
+        bx, by = (x2 - x) * kx, (y2 - y) * ky
+        dx, dy = bx - ax, by - ay
+        seg2 = dx * dx + dy * dy
+        t = 0.0 if seg2 == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / seg2))
+        px, py = ax + t * dx, ay + t * dy
+        best = min(best, math.hypot(px, py))
+    return best
+
+
+# ---------- index ----------
+
+class CouncilRouteIndex:
+    """Grid index of one council's route parts."""
+
+    def __init__(self, council_id, rows):
+        self.council_id = council_id
+        self.built_at = time.monotonic()
+        self.parts = []              # (collection_id, kind, coords, bbox)
+        self.grid = {}               # (cx, cy) -> [part index]
+        self.unrouted_ids = []       # collections without geometry serve the whole council
+        pad = ROUTE_BUFFER_M / M_PER_DEG_LAT * 1.5
+
+        for row in rows:
+            found = False
+            for geom in iter_geometries(row.route_geojson):
+                for kind, coords in _parts(geom):
+                    points = coords[0] if kind == 'polygon' else coords
+                    if not points:
+                        continue
+                    minx, miny, maxx, maxy = _bbox(points)
+                    if kind == 'line':
+                        minx, miny, maxx, maxy = minx - pad, miny - pad, maxx + pad, maxy + pad
+                    idx = len(self.parts)
+                    self.parts.append((row.id, kind, coords, (minx, miny, maxx, maxy)))
+                    for cx in range(math.floor(minx / GRID_DEG), math.floor(maxx / GRID_DEG) + 1):
+                        for cy in range(math.floor(miny / GRID_DEG), math.floor(maxy / GRID_DEG) + 1):
+                            self.grid.setdefault((cx, cy), []).append(idx)
+                    found = True
+            if not found:
+                self.unrouted_ids.append(row.id)
+
+    def lookup(self, lon, lat):
+        """{collection_id: distance_m} of routes serving the point (0 for polygon containment)."""
+        hits = {}
+        cell = (math.floor(lon / GRID_DEG), math.floor(lat / GRID_DEG))
+        for idx in self.grid.get(cell, ()):
+            cid, kind, coords, (minx, miny, maxx, maxy) = self.parts[idx]
+            if not (minx <= lon <= maxx and miny <= lat <= maxy):
+                continue
+            if kind == 'polygon':
+                if _point_in_polygon(lon, lat, coords):
+                    hits[cid] = 0.0
+            else:
+                d = _distance_to_line_m(lon, lat, coords)
+                if d <= ROUTE_BUFFER_M and d < hits.get(cid, math.inf):
+                    hits[cid] = d
+        return hits
+
+
+class RouteIndexRegistry:
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def invalidate(self, council_id):
+        self._indexes.pop(council_id, None)
+
+    def get(self, council_id):
+        idx = self._indexes.get(council_id)
+        if idx is None or (time.monotonic() - idx.built_at) > self.ttl_seconds:
+            with self._lock:
+                idx = self._indexes.get(council_id)
+                if idx is None or (time.monotonic() - idx.built_at) > self.ttl_seconds:
+                    rows = (
+                        db.session.query(WasteCollection.id, WasteCollection.route_geojson)
+                        .filter(WasteCollection.council_id == council_id)
+                        .all()
+                    )
+                    idx = CouncilRouteIndex(council_id, rows)
+                    self._indexes[council_id] = idx
+                    logging.info(f"[waste] Route index built for council {council_id}: {len(idx.parts)} parts.")
+        return idx
+
+    def serving_routes(self, council_id, gps_coordinates):
+        """
+        Collection ids serving a property: geometric matches plus council-wide streams.
+        Returns None when the property has no usable coordinates.
+        """
+        point = property_point(gps_coordinates)
+        if point is None:
+            return None
+        idx = self.get(council_id)
+        hits = idx.lookup(*point)
+        for cid in idx.unrouted_ids:
+            hits.setdefault(cid, None)
+        return hits
+
+
+route_index = RouteIndexRegistry()
+
+
+def precomputed_routes(property_id):
+    """{collection id: distance_m} stored for a property by bulk mode, or None if it has none."""
+    rows = (db.session.query(PropertyWasteRoute.waste_collection_id, PropertyWasteRoute.distance_m)
+            .filter(PropertyWasteRoute.property_id == property_id).all())
+    return dict(rows) if rows else None
+
+
+# ---------- bulk mode ----------
+
+def assign_routes_for_council(council_id, batch_size=5000):
+    """
+    Precompute property -> serving route for every property of a council and replace the
+    council's rows in property_waste_route. Returns the number of rows written.
+    """
+    idx = route_index.get(council_id)
+    prop_ids = db.session.query(Property.id).filter(Property.council_id == council_id).subquery()
+    PropertyWasteRoute.query.filter(PropertyWasteRoute.property_id.in_(db.select(prop_ids.c.id))) \
+        .delete(synchronize_session=False)
+
+    written = 0
+    buffer = []
+    q = (
+        db.session.query(Property.id, Property.gps_coordinates)
+        .filter(Property.council_id == council_id)
+        .order_by(Property.id)
+        .yield_per(batch_size)
+    )
+    for prop_id, gps in q:
+        point = property_point(gps)
+        if point is None:
+            continue
+        hits = idx.lookup(*point)
+        for cid in idx.unrouted_ids:
+            hits.setdefault(cid, None)
+        for cid, dist in hits.items():
+            buffer.append({"property_id": prop_id, "waste_collection_id": cid, "distance_m": dist})
+        if len(buffer) >= batch_size:
+            db.session.bulk_insert_mappings(PropertyWasteRoute, buffer)
+            written += len(buffer)
+            buffer = []
+    if buffer:
+        db.session.bulk_insert_mappings(PropertyWasteRoute, buffer)
+        written += len(buffer)
+    db.session.commit()
+    return written
+
+
+# ---------- invalidation ----------
+
+def register_route_listeners(session_cls=None):
+    """Drop a council's index after any commit that changed its route geometry."""
+    target = session_cls or db.session
+
+    @event.listens_for(target, 'after_flush')
+    def _collect_route_writes(session, flush_context):
+        councils, moved = set(), set()
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, WasteCollection):
+                if obj in session.dirty:
+                    # Only geometry and council feed the index; day/notes edits keep stored rows
+                    attrs = inspect(obj).attrs
+                    if not (attrs.route_geojson.history.has_changes() or attrs.council_id.history.has_changes()):
+                        continue
+                    councils.update(c for c in attrs.council_id.history.deleted if c is not None)
+                if obj.council_id is not None:
+                    councils.add(obj.council_id)
+            elif isinstance(obj, Property) and obj in session.dirty and obj.id is not None:
+                attrs = inspect(obj).attrs
+                if attrs.gps_coordinates.history.has_changes() or attrs.council_id.history.has_changes():
+                    moved.add(obj.id)
+        if not councils and not moved:
+            return
+        # Stored assignments for these are stale now; the index answers until bulk mode reruns
+        table = PropertyWasteRoute.__table__
+        stale = []
+        if councils:
+            stale.append(table.c.property_id.in_(
+                db.select(Property.id).where(Property.council_id.in_(councils)).scalar_subquery()))
+        if moved:
+            stale.append(table.c.property_id.in_(moved))
+        session.connection().execute(table.delete().where(or_(*stale)))
+        session.info.setdefault('route_councils', set()).update(councils)
+
+    @event.listens_for(target, 'after_commit')
+    def _invalidate_on_commit(session):
+        for council_id in session.info.pop('route_councils', ()):
+            route_index.invalidate(council_id)
+
+    @event.listens_for(target, 'after_rollback')
+    def _clear_on_rollback(session):
+        session.info.pop('route_councils', None)
@@ -0,0 +1,296 @@
+# server/waste_schedule.py
+"""
+Waste collection schedule engine.
+
+WasteCollection.collection_day / collection_frequency are free text, and
+next_collection_date is only a phase anchor: the real upcoming dates are computed
+here in bulk for every council/stream and shifted around PublicHoliday rows.
+Rendered JSON and iCal payloads are cached per council under a fingerprint of the
+inputs, which doubles as the HTTP ETag.
+"""
+import datetime as dt
+import hashlib
+import re
+import threading
+from collections import defaultdict
+
+from sqlalchemy import or_
+from models import db, WasteCollection, PublicHoliday, Council
+
+DEFAULT_OCCURRENCES = 8
+MAX_OCCURRENCES = 52
+
+_WEEKDAYS = {
+    'mon': 0, 'monday': 0,
+    'tue': 1, 'tues': 1, 'tuesday': 1,
+    'wed': 2, 'weds': 2, 'wednesday': 2,
+    'thu': 3, 'thur': 3, 'thurs': 3, 'thursday': 3,
+    'fri': 4, 'friday': 4,
+    'sat': 5, 'saturday': 5,
+    'sun': 6, 'sunday': 6,
+}
+
+_FREQUENCIES = {
+    'weekly': 7,
+    'fortnightly': 14,
+    'biweekly': 14,
+    'bi-weekly': 14,
+    'monthly': 28,  # council "monthly" services run on a 4-weekly cycle
+}
+
+# Columns that drive the schedule. route_geojson / notes are deliberately excluded.
+SCHEDULE_COLUMNS = (
+    WasteCollection.id,
+    WasteCollection.council_id,
+    WasteCollection.collection_type,
+    WasteCollection.collection_day,
+    WasteCollection.collection_frequency,
+    WasteCollection.next_collection_date,
+    WasteCollection.created_at,
+)
+
+
+# ---------- parsing ----------
+
+def parse_weekday(text):
+    """'Tue', 'Tuesday', 'tuesdays' -> 1. None if unparseable."""
+    if not text:
+        return None
+    key = text.strip().lower().rstrip('s').rstrip('.')
+    if key in _WEEKDAYS:
+        return _WEEKDAYS[key]
+    return _WEEKDAYS.get(key[:3])
+
+
+def parse_interval_days(text):
+    """'weekly' -> 7, 'fortnightly' -> 14, 'every 3 weeks' -> 21. Defaults to weekly."""
+    if not text:
+        return 7
+    key = text.strip().lower()
+    if key in _FREQUENCIES:
+        return _FREQUENCIES[key]
+    m = re.search(r'every\s+(\d+)\s+(day|week)', key)
+    if m:
+        n = int(m.group(1))
+        return n * 7 if m.group(2) == 'week' else n
+    return 7
+
+
+# ---------- computation ----------
+
+def _anchor_date(weekday, next_collection_date, created_at):
+    """A date known to be on the cycle. Used to get the fortnightly/monthly phase right."""
+    if next_collection_date:
+        return next_collection_date.date() if isinstance(next_collection_date, dt.datetime) else next_collection_date
+    base = (created_at or dt.datetime(2000, 1, 3)).date()
+    if weekday is None:
+        return base
+    return base + dt.timedelta(days=(weekday - base.weekday()) % 7)
+
+
+def _first_on_or_after(anchor, interval, start):
+    if anchor >= start:
+        # Step backwards so an anchor in the future still yields the nearest upcoming date
+        steps_back = (anchor - start).days // interval
+        return anchor - dt.timedelta(days=steps_back * interval)
+    steps = -(-(start - anchor).days // interval)  # ceil division
+    return anchor + dt.timedelta(days=steps * interval)
+
+
+def _apply_holidays(day, holidays):
+    """Shift forward while the date lands on a holiday. Bounded to avoid loops on bad data."""
+    shifted_for = None
+    for _ in range(7):
+        h = holidays.get(day)
+        if not h:
+            return day, shifted_for
+        day = day + dt.timedelta(days=max(h[1], 1))
+        shifted_for = h[0]
+    return day, shifted_for
+
+
+def compute_occurrences(row, start, count, holidays):
+    """Upcoming dates for one collection row. holidays: {date: (name, shift_days)}."""
+    weekday = parse_weekday(row.collection_day)
+    interval = parse_interval_days(row.collection_frequency)
+    anchor = _anchor_date(weekday, row.next_collection_date, row.created_at)
+    first = _first_on_or_after(anchor, interval, start)
+
+    out = []
+    for i in range(count):
+        scheduled = first + dt.timedelta(days=i * interval)
+        actual, shifted_for = _apply_holidays(scheduled, holidays)
+        out.append({
+            "date": actual.isoformat(),
+            "scheduled_date": scheduled.isoformat(),
+            "holiday": shifted_for,
+        })
+    return out
+
+
+def load_schedule_inputs(council_ids):
+    """One query for collections and one for holidays, covering every requested council."""
+    rows = (
+        db.session.query(*SCHEDULE_COLUMNS)
+        .filter(WasteCollection.council_id.in_(council_ids))
+        .order_by(WasteCollection.council_id, WasteCollection.id)
+        .all()
+    )
+    holiday_rows = (
+        PublicHoliday.query
+        .filter(or_(PublicHoliday.council_id.in_(council_ids), PublicHoliday.council_id.is_(None)))
+        .filter(PublicHoliday.holiday_date >= dt.date.today() - dt.timedelta(days=7))
+        .all()
+    )
+    by_council = defaultdict(list)
+    for r in rows:
+        by_council[r.council_id].append(r)
+
+    global_holidays = {}
+    council_holidays = defaultdict(dict)
+    for h in holiday_rows:
+        entry = (h.name, h.shift_days or 1)
+        if h.council_id is None:
+            global_holidays[h.holiday_date] = entry
+        else:
+            council_holidays[h.council_id][h.holiday_date] = entry
+
+    holidays = {}
+    for cid in council_ids:
+        merged = dict(global_holidays)
+        merged.update(council_holidays.get(cid, {}))  # council-specific rows override statewide ones
+        holidays[cid] = merged
+    return by_council, holidays
+
+
+def schedule_fingerprint(council_id, rows, holidays, start, count):
+    h = hashlib.sha1()
+    h.update(f"{council_id}|{start.isoformat()}|{count}".encode())
+    for r in rows:
+        h.update(repr((r.id, r.collection_type, r.collection_day, r.collection_frequency,
+                       r.next_collection_date, r.created_at)).encode())
+    for d in sorted(holidays):
+        h.update(f"{d.isoformat()}:{holidays[d]}".encode())
+    return h.hexdigest()
+
+
+def _build_streams(rows, start, count, holidays):
+    streams = []
+    for r in rows:
+        occurrences = compute_occurrences(r, start, count, holidays)
+        streams.append({
+            "collection_id": r.id,
+            "collection_type": r.collection_type,
+            "collection_day": r.collection_day,
+            "collection_frequency": r.collection_frequency,
+            "next_collection_date": occurrences[0]["date"] if occurrences else None,
+            "occurrences": occurrences,
+        })
+    return streams
+
+
+def build_calendars(council_ids, start=None, count=DEFAULT_OCCURRENCES):
+    """
+    Bulk compute: {council_id: {"fingerprint": ..., "streams": [...]}} for every council.
+    Rows are loaded once for all councils; dates are computed per stream.
+    """
+    start = start or dt.date.today()
+    by_council, holidays = load_schedule_inputs(council_ids)
+    result = {}
+    for cid in council_ids:
+        rows = by_council.get(cid, [])
+        result[cid] = {
+            "fingerprint": schedule_fingerprint(cid, rows, holidays[cid], start, count),
+            "streams": _build_streams(rows, start, count, holidays[cid]),
+        }
+    return result
+
+
+def council_calendar_fingerprints(council_ids, start=None, count=DEFAULT_OCCURRENCES):
+    """
+    Fingerprint every council's schedule without computing dates.
+    Returns ({council_id: fingerprint}, loader) where loader(cid) builds the streams on a cache miss.
+    """
+    start = start or dt.date.today()
+    by_council, holidays = load_schedule_inputs(council_ids)
+    fingerprints = {
+        cid: schedule_fingerprint(cid, by_council.get(cid, []), holidays[cid], start, count)
+        for cid in council_ids
+    }
+
+    def loader(cid):
+        return {"fingerprint": fingerprints[cid],
+                "streams": _build_streams(by_council.get(cid, []), start, count, holidays[cid])}
+    return fingerprints, loader
+
+
+def next_collection_dates(council_id):
+    """{collection_id: 'YYYY-MM-DD'} for the dashboard tile."""
+    cal = build_calendars([council_id], count=1)[council_id]
+    return {s["collection_id"]: s["next_collection_date"] for s in cal["streams"]}
+
+
+# ---------- iCal ----------
+
+def _ics_escape(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def render_ics(council_name, calendar, start):
+    dtstamp = start.strftime('%Y%m%dT000000Z')  # stable for a given day, so identical input -> identical bytes
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//LocalGov//Waste Collection//EN',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_ics_escape(council_name)} waste collection',
+    ]
+    for stream in calendar["streams"]:
+        for occ in stream["occurrences"]:
+            day = dt.date.fromisoformat(occ["date"])
+            summary = f'{stream["collection_type"]} collection'
+            if occ["holiday"]:
+                summary += f' (moved for {occ["holiday"]})'
+            lines += [
+                'BEGIN:VEVENT',
+                f'UID:waste-{stream["collection_id"]}-{occ["scheduled_date"].replace("-", "")}@localgov',
+                f'DTSTAMP:{dtstamp}',
+                f'DTSTART;VALUE=DATE:{day.strftime("%Y%m%d")}',
+                f'DTEND;VALUE=DATE:{(day + dt.timedelta(days=1)).strftime("%Y%m%d")}',
+                f'SUMMARY:{_ics_escape(summary)}',
+                'TRANSP:TRANSPARENT',
+                'END:VEVENT',
+            ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
+
+
+# ---------- render cache ----------
+
+class CalendarCache:
+    """Rendered payloads keyed by (council_id, format, count); reused while the fingerprint holds."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get_or_render(self, key, fingerprint, render):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit and hit[0] == fingerprint:
+                return hit[1]
+        body = render()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (fingerprint, body)
+        return body
+
+
+calendar_cache = CalendarCache()
+
+
+def council_name(council_id):
+    c = Council.query.get(council_id)
+    return c.name if c else f'Council {council_id}'
@@ -0,0 +1,105 @@
+# server/worker.py
+"""
+Job worker. Runs next to the web app against the same database:
+
+    python worker.py                                   # every handler's queue, 4 threads
+    python worker.py --queues maintenance --concurrency 8
+    python worker.py --once                            # drain runnable jobs and exit (cron / tests)
+    python worker.py --no-schedule                     # don't enqueue periodic jobs from this worker
+
+While running, the main thread heartbeats this process's jobs, requeues jobs whose
+worker died, and enqueues periodic jobs (every=... in job_handlers.py) when due.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from app import app
+from models import db
+from jobs import (
+    HEARTBEAT_INTERVAL, claim_next, enqueue_periodic, handler_queues, heartbeat, run_job, requeue_stale,
+)
+import job_handlers  # noqa: F401  (registers handlers)
+
+STALE_SWEEP_SECONDS = 60
+SCHEDULE_SECONDS = 60
+
+_stop = threading.Event()
+
+
+def _worker_loop(worker_id, queues, poll_interval, once):
+    with app.app_context():
+        while not _stop.is_set():
+            try:
+                job = claim_next(worker_id, queues)
+            except Exception as e:
+                logging.error(f"[worker] {worker_id} failed to claim a job: {e}", exc_info=True)
+                db.session.rollback()
+                job = None
+            if job is None:
+                if once:
+                    return
+                _stop.wait(poll_interval)
+                continue
+            logging.info(f"[worker] {worker_id} running job {job.id} ({job.kind}, attempt {job.attempts})")
+            run_job(job)
+            db.session.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background jobs.")
+    parser.add_argument('--queues', nargs='+', default=None, help='default: every queue a handler uses')
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('WORKER_CONCURRENCY', '4')))
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    parser.add_argument('--once', action='store_true')
+    parser.add_argument('--no-schedule', action='store_true', help="don't enqueue periodic jobs")
+    args = parser.parse_args()
+    queues = tuple(args.queues or handler_queues())
+
+    signal.signal(signal.SIGTERM, lambda *_: _stop.set())
+    signal.signal(signal.SIGINT, lambda *_: _stop.set())
+
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+    worker_ids = [f"{base_id}:{i}" for i in range(args.concurrency)]
+    if not args.once and not args.no_schedule:
+        with app.app_context():
+            enqueue_periodic()
+            db.session.remove()
+    threads = [
+        threading.Thread(target=_worker_loop, name=f"worker-{i}",
+                         args=(worker_id, queues, args.poll_interval, args.once))
+        for i, worker_id in enumerate(worker_ids)
+    ]
+    logging.info(f"[worker] Starting {args.concurrency} threads on queues {list(queues)}")
+    for t in threads:
+        t.start()
+
+    now = time.monotonic()
+    last_sweep, last_beat, last_schedule = 0.0, now, now
+    while any(t.is_alive() for t in threads):
+        now = time.monotonic()
+        try:
+            with app.app_context():
+                if now - last_beat > HEARTBEAT_INTERVAL.total_seconds():
+                    heartbeat(worker_ids)
+                    last_beat = now
+                if now - last_sweep > STALE_SWEEP_SECONDS:
+                    requeue_stale()
+                    last_sweep = now
+                if not args.once and not args.no_schedule and now - last_schedule > SCHEDULE_SECONDS:
+                    enqueue_periodic()
+                    last_schedule = now
+                db.session.remove()
+        except Exception as e:
+            # A DB blip must not stop the heartbeat for good; the next pass retries
+            logging.error(f"[worker] Maintenance pass failed: {e}", exc_info=True)
+        time.sleep(0.5)
+    logging.info("[worker] Stopped.")
+
+
+if __name__ == "__main__":
+    main()